@@ -0,0 +1,33 @@
+// Starts the Define language server (python -m compiler lsp) for .def files.
+// The server gives diagnostics, go to definition and hover; see
+// compiler/language_server.py.
+
+const vscode = require("vscode");
+const { LanguageClient } = require("vscode-languageclient/node");
+
+let client;
+
+function activate(context) {
+  const config = vscode.workspace.getConfiguration("define");
+  const folder = vscode.workspace.workspaceFolders?.[0];
+  const server = {
+    command: config.get("languageServer.python"),
+    args: ["-m", "compiler", "lsp"],
+    options: { cwd: folder?.uri.fsPath },
+  };
+  client = new LanguageClient("define", "Define Language Server", server, {
+    documentSelector: [{ scheme: "file", language: "define" }],
+    synchronize: {
+      // Tell the server about edits to files that aren't open.
+      fileEvents: vscode.workspace.createFileSystemWatcher("**/*.def"),
+    },
+  });
+  context.subscriptions.push(client);
+  return client.start();
+}
+
+function deactivate() {
+  return client?.stop();
+}
+
+module.exports = { activate, deactivate };
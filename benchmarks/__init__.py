@@ -0,0 +1,6 @@
+"""Benchmarks for the define compiler.
+
+Run a benchmark from the repository root with, for example:
+
+    uv run python -m benchmarks.parser_startup
+"""
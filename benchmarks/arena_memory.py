@@ -0,0 +1,79 @@
+"""Compare the memory and parse time of an arena with an AST's.
+
+A synthetic program is parsed with Parser.parse_to_ast and with
+Parser.parse_to_arena, and the memory each result holds on to (traced
+with tracemalloc, so not counting the names, which both share through the
+symbol table) and the median parse times are printed.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from benchmarks.programs import synthetic_program
+from compiler.parser import Parser
+from compiler.symbols import SymbolTable
+
+
+def _retained_bytes(parse: Callable[[], object]) -> int:
+    """Return the bytes the result of parse takes once parsing is over."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = parse()
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def _median_seconds(parse: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        parse()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=50_000)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    parser = Parser()
+    # The names are interned before measuring, so neither result is
+    # charged for them.
+    symbols = SymbolTable()
+    program = parser.parse_to_ast(source, symbols)
+    arena = parser.parse_to_arena(source, symbols)
+    if arena.program() != program:
+        raise RuntimeError("The arena doesn't hold the same program as the AST")
+    nodes = len(arena)
+    del program, arena
+
+    print(f"about {args.statements:,} statements, {nodes:,} nodes")
+    for label, parse in (
+        ("parse_to_ast", lambda: parser.parse_to_ast(source, symbols)),
+        ("parse_to_arena", lambda: parser.parse_to_arena(source, symbols)),
+    ):
+        retained = _retained_bytes(parse)
+        seconds = _median_seconds(parse, args.runs)
+        print(
+            f"{label:>14}: {retained / 2**20:6.1f} MiB, "
+            f"{retained / nodes:5.1f} bytes per node, {seconds * 1000:7.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Compare a cold project parse with a no-op rebuild from the AST cache.
+
+Parses a synthetic project three times: without a cache, with an empty
+cache, and again with the cache full, as when nothing has changed.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.programs import write_synthetic_project
+from compiler import project
+from compiler.ast_cache import AstCache
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--files", type=int, default=1_000)
+    arg_parser.add_argument("--statements-per-file", type=int, default=50)
+    arg_parser.add_argument("--workers", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp) / "project"
+        write_synthetic_project(root, args.files, args.statements_per_file)
+        cache = AstCache(Path(temp) / "cache")
+        for label, run_cache in [
+            ("no cache", None),
+            ("cold cache", cache),
+            ("warm cache", cache),
+        ]:
+            start = time.perf_counter()
+            result = project.parse_project(
+                root, max_workers=args.workers, cache=run_cache
+            )
+            seconds = time.perf_counter() - start
+            if result.errors:
+                raise RuntimeError(f"Parse errors: {result.errors}")
+            print(f"{label:>10}: {seconds:7.3f} s, {args.files / seconds:9.1f} files/s")
+        print(
+            f"cache: {cache.stats.hits} hits, {cache.stats.misses} misses, "
+            f"{len(cache)} entries, {cache.total_bytes / 2**20:.1f} MiB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Measure the memory used per AST node on a large synthetic program.
+
+The program is built from ast nodes directly (not parsed), so only the
+nodes themselves are measured. Identifier strings are shared between
+statements, as they are after parsing.
+
+It's measured without spans, which costs each node only its span slot,
+and again with a different span for every node, as after parsing. For
+comparison, the memory of one lark.Token per node, with its positions,
+is measured too: that's what keeping tokens for positions would cost.
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import lark
+
+from compiler import ast
+
+
+def _statements(count: int) -> tuple[list[ast.ASTNode], int]:
+    """Return count statements and the total number of nodes in them."""
+    statements: list[ast.ASTNode] = []
+    nodes = 0
+    for i in range(count):
+        match i % 6:
+            case 0:
+                statements.append(
+                    ast.TypeDeclaration(type_name="Source", parent_type="ViewPoint")
+                )
+                nodes += 1
+            case 1:
+                statements.append(
+                    ast.PropertyDeclaration(
+                        type_name="Source",
+                        property_type="String",
+                        property_name="label",
+                    )
+                )
+                nodes += 1
+            case 2:
+                statements.append(
+                    ast.EntityCreation(
+                        creator="Source",
+                        type_name="String",
+                        entity_name="greeting",
+                        properties=[
+                            ast.PropertyAssignment(
+                                name="value", value=ast.StringLiteral('"Hello"')
+                            )
+                        ],
+                    )
+                )
+                nodes += 3
+            case 3:
+                statements.append(
+                    ast.KnowledgeStatement(
+                        knower="Machine", owner="Source", entity_name="greeting"
+                    )
+                )
+                nodes += 1
+            case 4:
+                statements.append(
+                    ast.ActionExecution(
+                        actor="Machine",
+                        target=ast.PropertyOrEntityReference(
+                            owner="Machine", property_name="terminal"
+                        ),
+                        action_name="Output",
+                        arguments=[
+                            ast.PropertyOrEntityReference(
+                                owner="Source", property_name="greeting"
+                            ),
+                            ast.NumberLiteral("42"),
+                        ],
+                    )
+                )
+                nodes += 4
+            case _:
+                statements.append(
+                    ast.ActionDeclaration(
+                        type_name="Terminal",
+                        action_name="Output",
+                        parameters=[
+                            ast.ActionParameter(param_type="String", param_name="text")
+                        ],
+                    )
+                )
+                nodes += 2
+    return statements, nodes
+
+
+def _measure(count: int, *, spans: bool) -> tuple[int, int]:
+    """Return the number of nodes in a program, and the bytes it takes."""
+    gc.collect()
+    tracemalloc.start()
+    statements, nodes = _statements(count)
+    program = ast.Program(
+        universes=[ast.UniverseBlock(name="AbstractUniverse", statements=statements)]
+    )
+    nodes += 2
+    if spans:
+        for line, node in enumerate(ast.walk(program.universes[0]), start=1):
+            node.span = ast.make_span((line, 5), (line, 40))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del program
+    return nodes, current
+
+
+def _token_bytes(count: int) -> int:
+    """Return the bytes count tokens take, with positions as the lexer sets."""
+    gc.collect()
+    tracemalloc.start()
+    tokens = [
+        lark.Token("IDENTIFIER", "Source", i * 40, i, 5, i, 11, i * 40 + 6)
+        for i in range(count)
+    ]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+    return current
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=1_000_000)
+    args = arg_parser.parse_args()
+
+    nodes, without_spans = _measure(args.statements, spans=False)
+    _, with_spans = _measure(args.statements, spans=True)
+    tokens = _token_bytes(nodes)
+
+    print(f"{args.statements:,} statements, {nodes:,} nodes")
+    for label, current in (
+        ("without spans", without_spans),
+        ("with spans", with_spans),
+    ):
+        print(
+            f"{label:>14}: {current / 2**20:6.1f} MiB, "
+            f"{current / nodes:5.1f} bytes per node"
+        )
+    print(f"spans add {(with_spans - without_spans) / nodes:.1f} bytes per node")
+    print(f"a token per node would add {tokens / nodes:.1f} bytes per node")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
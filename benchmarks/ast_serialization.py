@@ -0,0 +1,83 @@
+"""Compare the binary AST encoding with pickle.
+
+A synthetic program is parsed once, then encoded and decoded with
+binary_ast and with pickle, and the sizes and median times are printed,
+with throughput in AST nodes per second. Decoding just the physical
+universe block with a ProgramReader is timed too, since that's what the
+binary encoding's directory is for.
+"""
+
+import argparse
+import gc
+import pickle
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.programs import synthetic_program
+from compiler import ast, binary_ast
+from compiler.parser import Parser
+
+
+def _median_seconds(run: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=50_000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    program = Parser().parse_to_ast(synthetic_program(args.statements))
+    nodes = sum(len(list(ast.walk(universe))) for universe in program.universes)
+    physical_nodes = len(list(ast.walk(program.get_physical_universe())))
+    encoded = binary_ast.encode(program)
+    pickled = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+    if binary_ast.decode(encoded) != program:
+        raise RuntimeError("The binary encoding didn't round-trip")
+    if pickle.loads(pickled) != program:  # noqa: S301 - pickled above
+        raise RuntimeError("The pickle didn't round-trip")
+
+    print(f"about {args.statements:,} statements, {nodes:,} nodes")
+    print(
+        f"binary_ast: {len(encoded):>12,} bytes, {len(encoded) / nodes:5.1f} per node"
+    )
+    print(
+        f"pickle:     {len(pickled):>12,} bytes, {len(pickled) / nodes:5.1f} per node"
+    )
+    # Each timing's label, what it runs, and how many nodes that handles.
+    timings = (
+        ("binary_ast.encode", lambda: binary_ast.encode(program), nodes),
+        (
+            "pickle.dumps",
+            lambda: pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL),
+            nodes,
+        ),
+        ("binary_ast.decode", lambda: binary_ast.decode(encoded), nodes),
+        ("pickle.loads", lambda: pickle.loads(pickled), nodes),  # noqa: S301
+        (
+            "physical universe",
+            lambda: binary_ast.ProgramReader(encoded).universe(1),
+            physical_nodes,
+        ),
+    )
+    for label, run, count in timings:
+        seconds = _median_seconds(run, args.runs)
+        print(
+            f"{label:>18}: {seconds * 1000:8.1f} ms, "
+            f"{count / seconds / 1e6:5.2f}M nodes/s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
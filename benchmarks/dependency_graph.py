@@ -0,0 +1,125 @@
+"""Compare incremental cycle detection with a whole-graph check.
+
+Builds a random acyclic dependency graph of global names spread over
+files, then edits one file at a time and compares how long the graph
+takes to update with how long Tarjan's algorithm takes over the whole
+graph.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from compiler.dependencies import DependencyGraph, find_cycles
+
+
+def random_project(
+    rng: random.Random, names: int, names_per_file: int, dependencies: int
+) -> dict[Path, dict[str, set[str]]]:
+    """Return the dependencies of each file in a random acyclic project.
+
+    Each name depends on names that come later, so there are no cycles.
+    """
+    files: dict[Path, dict[str, set[str]]] = {}
+    for i in range(names):
+        later = range(i + 1, names)
+        targets = rng.sample(later, min(dependencies, len(later)))
+        path = Path(f"file{i // names_per_file}.def")
+        files.setdefault(path, {})[f"N{i}"] = {f"N{j}" for j in targets}
+    return files
+
+
+def _time(function: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--names", type=int, default=100_000)
+    arg_parser.add_argument("--names-per-file", type=int, default=10)
+    arg_parser.add_argument("--dependencies", type=int, default=3)
+    arg_parser.add_argument("--edits", type=int, default=1_000)
+    arg_parser.add_argument("--cycle-rate", type=float, default=0.001)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)  # noqa: S311 - not for security
+    files = random_project(rng, args.names, args.names_per_file, args.dependencies)
+    graph = DependencyGraph()
+    start = time.perf_counter()
+    for path, dependencies in files.items():
+        graph.set_file(path, dependencies)
+    build = time.perf_counter() - start
+    edges = graph.edges()
+    edge_count = sum(len(targets) for targets in edges.values())
+    print(f"{len(graph):,} names, {edge_count:,} edges, {len(files):,} files")
+    print(f"build incrementally: {build:8.3f} s")
+    full = _time(lambda: find_cycles(graph.edges()), runs=3)
+    print(f"whole-graph Tarjan:  {full * 1000:8.1f} ms")
+
+    # Most edits give a file new dependencies on names later in the
+    # project, as in the original. Some add a dependency on an earlier
+    # name, which may close a cycle, until that file is edited again.
+    paths = list(files)
+    edit_times = []
+    cyclic_edits = 0
+    cycles: list[list[str]] = []
+    for _ in range(args.edits):
+        path = rng.choice(paths)
+        dependencies = {}
+        for name in files[path]:
+            i = int(name[1:])
+            dependencies[name] = {
+                f"N{rng.randrange(i + 1, args.names)}"
+                for _ in range(args.dependencies)
+                if i + 1 < args.names
+            }
+            if rng.random() < args.cycle_rate:
+                dependencies[name].add(f"N{rng.randrange(i)}")
+        start = time.perf_counter()
+        graph.set_file(path, dependencies)
+        found = graph.cycles()
+        edit_times.append(time.perf_counter() - start)
+        if found:
+            cyclic_edits += 1
+            cycles = found
+    edit = statistics.median(edit_times)
+    print(
+        f"one-file edit:       {edit * 1000:8.3f} ms median, "
+        f"{max(edit_times) * 1000:.1f} ms max "
+        f"({cyclic_edits} of {args.edits} left a cycle)"
+    )
+    print(f"speedup per edit:    {full / edit:8.0f}x")
+    if cycles:
+        print(f"cycle from an edit: {' -> '.join(cycles[0])}")
+
+    # Close a cycle through a long path on purpose, then break it.
+    order = graph.topological_order()
+    source, target = order[-1], order[0]
+    start = time.perf_counter()
+    graph.set_file(Path("cycle.def"), {target: {source}})
+    cycles = graph.cycles()
+    closing = time.perf_counter() - start
+    start = time.perf_counter()
+    graph.remove_file(Path("cycle.def"))
+    remaining = graph.cycles()
+    breaking = time.perf_counter() - start
+    print(f"close a cycle:       {closing * 1000:8.3f} ms, {len(cycles[0]) - 1} names")
+    print(f"  {' -> '.join(cycles[0])}")
+    print(f"break it again:      {breaking * 1000:8.3f} ms")
+    if remaining:
+        raise RuntimeError(f"Cycles left after breaking: {remaining}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Compare parsing then transforming with parsing straight to the AST.
+
+Reports wall time and peak traced memory (tracemalloc) for both paths.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from benchmarks.programs import synthetic_program
+from compiler import ast
+from compiler.parser import Parser
+from compiler.transformer import DefineTransformer
+
+
+def _two_step(parser: Parser, source: str) -> ast.Program:
+    return DefineTransformer().transform(parser.parse(source))
+
+
+def _fused(parser: Parser, source: str) -> ast.Program:
+    return parser.parse_to_ast(source)
+
+
+def _measure(
+    parse: Callable[[Parser, str], ast.Program], parser: Parser, source: str, runs: int
+) -> tuple[float, int]:
+    """Return the median seconds and the peak traced bytes for one parse."""
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        parse(parser, source)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    parse(parser, source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    parser = Parser()
+    # Build both Lark parsers up front so only parsing is measured.
+    if _two_step(parser, source) != _fused(parser, source):
+        raise AssertionError("The two parse paths produced different ASTs")
+
+    print(f"{len(source):,} characters, about {args.statements:,} statements")
+    results = {}
+    for label, parse in (("two-step", _two_step), ("fused", _fused)):
+        seconds, peak = _measure(parse, parser, source, args.runs)
+        results[label] = (seconds, peak)
+        print(f"{label:>8}: {seconds * 1000:9.1f} ms, peak {peak / 2**20:8.1f} MiB")
+
+    (step_time, step_peak), (fused_time, fused_peak) = results.values()
+    print(
+        f"fused saves {1 - fused_time / step_time:.0%} of the time "
+        f"and {1 - fused_peak / step_peak:.0%} of the peak memory"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Compare parsing a large file again after each keystroke with parsing part of it.
+
+Types into the middle of a synthetic program one character at a time,
+timing ParsedSource.edit for each keystroke against parsing the whole
+edited file. Two kinds of typing are timed: extending an identifier,
+where every keystroke leaves the file valid, and typing a new statement
+on a new line, where most keystrokes leave it with a syntax error.
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+
+import lark
+
+from benchmarks.programs import synthetic_program
+from compiler.incremental import ParsedSource, TextEdit
+from compiler.parser import Parser
+
+
+def _milliseconds(times: list[float]) -> str:
+    ordered = sorted(times)
+    return (
+        f"p50 {ordered[len(ordered) // 2] * 1000:8.2f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:8.2f} ms, "
+        f"max {ordered[-1] * 1000:8.2f} ms"
+    )
+
+
+def _type(
+    parser: Parser, parsed: ParsedSource, offset: int, text: str
+) -> tuple[list[float], list[float], int]:
+    """Type text at offset, timing incremental and full parses of each keystroke.
+
+    Returns:
+        The incremental times, the full parse times, and how many
+        keystrokes left the file with an error.
+    """
+    incremental: list[float] = []
+    full: list[float] = []
+    errors = 0
+    for i, character in enumerate(text):
+        edit = TextEdit(offset + i, offset + i, character)
+        start = time.perf_counter()
+        try:
+            parsed.edit(edit)
+        except lark.exceptions.LarkError:
+            errors += 1
+        incremental.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        with contextlib.suppress(lark.exceptions.LarkError):
+            parser.parse_to_ast(parsed.source)
+        full.append(time.perf_counter() - start)
+    return incremental, full, errors
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    source = synthetic_program(args.statements)
+    start = time.perf_counter()
+    parsed = ParsedSource(source, parser=parser)
+    print(
+        f"{len(source.splitlines()):,} lines, {len(source):,} characters, "
+        f"parsed in {(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+
+    middle = f"named label{args.statements // 22}"
+    for name, after, text in (
+        ("extending an identifier", middle, "Renamed"),
+        ("typing a new statement", f"{middle}Renamed.", "\n    Added is a ViewPoint."),
+    ):
+        offset = parsed.source.index(after) + len(after)
+        incremental, full, errors = _type(parser, parsed, offset, text)
+        if parsed.program != parser.parse_to_ast(parsed.source):
+            raise RuntimeError("The incremental and full parses differ")
+        print(f"{name}: {len(text)} keystrokes, {errors} left an error")
+        print(f"    incremental: {_milliseconds(incremental)}")
+        print(f"    full parse:  {_milliseconds(full)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
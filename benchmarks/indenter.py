@@ -0,0 +1,131 @@
+"""Measure how fast DefineIndenter adds indentation tokens to a token stream.
+
+The tokens of a synthetic program are lexed once, then run through
+DefineIndenter and through the indenter that Lark's own Indenter makes
+for Define, which the compiler used before. Only the indenters are timed,
+not the lexer.
+"""
+
+import argparse
+import collections
+import statistics
+import sys
+import time
+from collections.abc import Iterator
+
+import lark
+from lark.indenter import Indenter
+from lark.lark import PostLex
+
+from benchmarks.programs import synthetic_program
+from compiler import parser
+from compiler.indenter import DefineIndenter
+
+
+class _LarkIndenter(Indenter):
+    """Configures Lark's Indenter for Define, with properties as before."""
+
+    @property
+    def NL_type(self) -> str:  # noqa: N802
+        """Return the token type for newlines."""
+        return "_NEWLINE"
+
+    @property
+    def OPEN_PAREN_types(self) -> list[str]:  # noqa: N802
+        """Return the list of token types for opening parentheses."""
+        return []
+
+    @property
+    def CLOSE_PAREN_types(self) -> list[str]:  # noqa: N802
+        """Return the list of token types for closing parentheses."""
+        return []
+
+    @property
+    def INDENT_type(self) -> str:  # noqa: N802
+        """Return the token type for indentation."""
+        return "INDENT"
+
+    @property
+    def DEDENT_type(self) -> str:  # noqa: N802
+        """Return the token type for dedentation."""
+        return "DEDENT"
+
+    @property
+    def tab_len(self) -> int:
+        """Return the tab length in spaces."""
+        return 4
+
+
+class _Recorder(DefineIndenter):
+    """Keeps the tokens the lexer makes."""
+
+    def __init__(self) -> None:
+        self.lexed: list[lark.Token] = []
+
+    def process(self, stream: Iterator[lark.Token]) -> Iterator[lark.Token]:
+        """Return stream with indentation tokens added, keeping its tokens."""
+        return super().process(self._record(stream))
+
+    def _record(self, stream: Iterator[lark.Token]) -> Iterator[lark.Token]:
+        for token in stream:
+            self.lexed.append(token)
+            yield token
+
+
+def _milliseconds(times: list[float]) -> str:
+    ordered = sorted(times)
+    return (
+        f"p50 {ordered[len(ordered) // 2] * 1000:8.2f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:8.2f} ms, "
+        f"max {ordered[-1] * 1000:8.2f} ms"
+    )
+
+
+def _times(indenter: PostLex, tokens: list[lark.Token], repeats: int) -> list[float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        # Run the generator to the end without keeping its tokens.
+        collections.deque(indenter.process(iter(tokens)), maxlen=0)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    arg_parser.add_argument("--repeats", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    recorder = _Recorder()
+    lark_parser = lark.Lark.open(
+        str(parser.GRAMMAR_PATH), parser="lalr", postlex=recorder
+    )
+    lark_parser.parse(synthetic_program(args.statements))
+    tokens = recorder.lexed
+    newlines = sum(token.type == "_NEWLINE" for token in tokens)
+
+    expected = [
+        (token.type, token.value, token.start_pos)
+        for token in _LarkIndenter().process(iter(tokens))
+    ]
+    actual = [
+        (token.type, token.value, token.start_pos)
+        for token in DefineIndenter().process(iter(tokens))
+    ]
+    if actual != expected:
+        raise RuntimeError("DefineIndenter's tokens differ from Lark's Indenter's")
+
+    lark_times = _times(_LarkIndenter(), tokens, args.repeats)
+    define_times = _times(DefineIndenter(), tokens, args.repeats)
+    print(f"{len(tokens):,} tokens, {newlines:,} newlines")
+    print(f"lark Indenter:  {_milliseconds(lark_times)}")
+    print(f"DefineIndenter: {_milliseconds(define_times)}")
+    speedup = statistics.median(lark_times) / statistics.median(define_times)
+    print(f"  {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Measure the memory an AST keeps alive with and without interning.
+
+Without interning, every identifier in the AST is the lark.Token the
+lexer produced. With interning, identifiers are shared plain strings
+from the compilation's SymbolTable.
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import lark
+
+from benchmarks.programs import synthetic_program
+from compiler.parser import Parser
+from compiler.transformer import DefineTransformer
+
+
+class _TokenTransformer(DefineTransformer):
+    """Keeps identifier tokens as they are, as before interning.
+
+    Names are interned as each rule is reduced, by _name, so that's what
+    is replaced.
+    """
+
+    def _name(self, token: lark.Token) -> str:
+        return token
+
+
+def _retained_bytes(parser: Parser, source: str, transformer: DefineTransformer) -> int:
+    """Return the bytes still allocated once only the AST is kept."""
+    gc.collect()
+    tracemalloc.start()
+    program = transformer.transform(parser.parse(source))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del program
+    return current
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    parser = Parser()
+    parser.parse(source)
+
+    tokens = _retained_bytes(parser, source, _TokenTransformer())
+    interned = _retained_bytes(parser, source, DefineTransformer())
+    print(f"about {args.statements:,} statements")
+    print(f"  tokens: {tokens / 2**20:7.1f} MiB")
+    print(f"interned: {interned / 2**20:7.1f} MiB ({1 - interned / tokens:.0%} less)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Measure how many actions per second the interpreter runs.
+
+Two programs are prepared with compiler.interpreter and run, with a
+Terminal Output builtin that does nothing, so the time is the
+interpreter's own:
+
+- builtin: a synthetic program whose physical universe outputs a
+  greeting per group, so every action is a builtin.
+- declared: a program that runs a declared action over and over, whose
+  body outputs its parameter twice, so a third of the actions are
+  declared ones, each running in a new frame.
+
+The median times to prepare each program, to create its entities, and
+to run its actions are printed. Throughput in actions per second only
+counts running the actions, which is dispatch and the actions' own
+work; creating the entities, which every run does first, is timed on
+its own.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.programs import STATEMENTS_PER_GROUP, synthetic_program
+from compiler.interpreter import Interpreter, Value
+from compiler.parser import Parser
+
+_COMPUTER = Path(__file__).parent.parent / "examples" / "computer.def"
+
+_DECLARED = """\
+PhysicalUniverse:
+    Machine is a Computer.
+    Terminal can Relay using a String named text:
+        Machine makes Machine's terminal Output Terminal's text.
+        Machine makes Machine's terminal Output Terminal's text.
+"""
+_DECLARED_EXECUTION = """\
+    Machine makes Machine's terminal Relay "Hello, world!".
+"""
+# The actions each execution in _DECLARED_EXECUTION runs: Relay, and the
+# two Outputs in its body.
+_ACTIONS_PER_RELAY = 3
+
+
+def _median_seconds(run: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _discard(target: Value, arguments: list[Value]) -> None:
+    pass
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=50_000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    computer = parser.parse_to_ast(_COMPUTER.read_text())
+    builtins = {("Terminal", "Output"): _discard}
+    groups = max(1, args.statements // STATEMENTS_PER_GROUP)
+    # Each workload's label, program, and the actions a run of it runs.
+    workloads = [
+        ("builtin", parser.parse_to_ast(synthetic_program(args.statements)), groups),
+        (
+            "declared",
+            parser.parse_to_ast(_DECLARED + _DECLARED_EXECUTION * args.statements),
+            args.statements * _ACTIONS_PER_RELAY,
+        ),
+    ]
+    for label, program, actions in workloads:
+        runner = Interpreter(program, [computer], builtins)
+        prepare = _median_seconds(
+            lambda program=program: Interpreter(program, [computer], builtins),
+            args.runs,
+        )
+        create = _median_seconds(runner.create_entities, args.runs)
+        seconds = _median_seconds(runner.run_actions, args.runs)
+        print(
+            f"{label:>8}: prepared in {prepare * 1000:7.1f} ms, "
+            f"entities created in {create * 1000:7.1f} ms, "
+            f"{actions:>9,} actions run in {seconds * 1000:7.1f} ms, "
+            f"{actions / seconds / 1e6:5.2f}M actions/s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
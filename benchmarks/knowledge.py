@@ -0,0 +1,79 @@
+"""Check that knowledge checking takes time linear in program size.
+
+Programs with growing numbers of knowledge statements are built directly
+as ASTs (parsing hundreds of thousands of statements would take most of
+the run): each has a ViewPoint creating an entity per knower, a knowledge
+statement per knower, and an action execution per knower reading the
+entity it knows. knowledge.check is timed on each, and the median time
+per knowledge statement is printed. It should stay about the same as
+programs grow.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from compiler import ast, knowledge
+
+
+def _median_seconds(run: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _program(knowers: int) -> ast.Program:
+    statements: list[ast.ASTNode] = [ast.TypeDeclaration("Source", "ViewPoint")]
+    for i in range(knowers):
+        entity = f"entity{i}"
+        knower = f"Knower{i}"
+        statements += [
+            ast.EntityCreation("Source", "String", entity, []),
+            ast.TypeDeclaration(knower, "ViewPoint"),
+            ast.KnowledgeStatement(knower, "Source", entity),
+            ast.ActionExecution(
+                knower,
+                ast.PropertyOrEntityReference("Source", entity),
+                "Print",
+                [ast.PropertyOrEntityReference(entity, "value")],
+            ),
+        ]
+    return ast.Program([ast.UniverseBlock("AbstractUniverse", statements)])
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--knowledge-statements",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 300_000],
+    )
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for knowers in args.knowledge_statements:
+        program = _program(knowers)
+        errors = knowledge.check(program)
+        if errors:
+            raise RuntimeError(f"The program should have no errors: {errors[0]}")
+        seconds = _median_seconds(
+            lambda program=program: knowledge.check(program), args.runs
+        )
+        print(
+            f"{knowers:>8,} knowledge statements: {seconds * 1000:8.1f} ms, "
+            f"{seconds / knowers * 1e6:5.2f} us per knowledge statement"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
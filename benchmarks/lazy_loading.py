@@ -0,0 +1,60 @@
+"""Compare loading one program on demand with parsing a whole monorepo.
+
+Writes a synthetic monorepo of many independent programs, each a chain of
+files that refer to the next, then times loading one program from its
+entry file against parsing every file in the repository.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from compiler import project
+from compiler.loader import Loader
+
+
+def write_monorepo(root: Path, programs: int, depth: int, statements: int) -> None:
+    """Write programs chains of depth files, P<i>D0.def referring to P<i>D1."""
+    for program in range(programs):
+        for level in range(depth):
+            name = f"P{program}D{level}"
+            lines = [f"    {name} is a ViewPoint.\n"]
+            if level + 1 < depth:
+                lines.append(f"    {name} has a P{program}D{level + 1} named next.\n")
+            lines.extend(
+                f"    {name} has a String named label{k}.\n" for k in range(statements)
+            )
+            (root / f"{name}.def").write_text("AbstractUniverse:\n" + "".join(lines))
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--programs", type=int, default=500)
+    arg_parser.add_argument("--depth", type=int, default=5)
+    arg_parser.add_argument("--statements", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp)
+        write_monorepo(root, args.programs, args.depth, args.statements)
+
+        start = time.perf_counter()
+        loaded = Loader(root).load(Path("P0D0.def"))
+        lazy = time.perf_counter() - start
+        print(f"load one program: {lazy:7.3f} s, {len(loaded):,} files parsed")
+
+        start = time.perf_counter()
+        parsed = project.parse_project(root, max_workers=1)
+        eager = time.perf_counter() - start
+        print(
+            f"parse everything: {eager:7.3f} s, {len(parsed.programs):,} files parsed"
+        )
+        print(f"speedup: {eager / lazy:.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Measure how long the language server takes to answer as a large file is edited.
+
+Opens a synthetic program in a language server running in this process,
+connected over pipes, and types into the middle of it. Each keystroke is
+timed from the didChange notification to the diagnostics for that
+version. A burst of keystrokes sent without waiting is timed to the
+diagnostics for the last one, which is what the editor waits for when
+someone types quickly: the checks of the versions in between are
+skipped. Hover requests are timed in between edits.
+"""
+
+import argparse
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.programs import synthetic_program
+from compiler import language_server
+
+
+class _Client:
+    def __init__(self, root: Path) -> None:
+        server_in, client_out = os.pipe()
+        client_in, server_out = os.pipe()
+        self._server_out = os.fdopen(server_out, "wb")
+        self._client_in = os.fdopen(client_in, "rb")
+        self._client_out = os.fdopen(client_out, "wb")
+        self.server = language_server.LanguageServer(
+            os.fdopen(server_in, "rb"), self._server_out
+        )
+        self.root = root
+        self._messages: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._next_id = 0
+        threading.Thread(target=self._serve).start()
+        threading.Thread(target=self._read).start()
+
+    def _serve(self) -> None:
+        self.server.serve()
+        self._server_out.close()
+
+    def _read(self) -> None:
+        while (message := language_server.read_message(self._client_in)) is not None:
+            self._messages.put(message)
+
+    def send(self, message: dict[str, Any]) -> None:
+        language_server.write_message(self._client_out, {"jsonrpc": "2.0", **message})
+
+    def request(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        self._next_id += 1
+        self.send({"id": self._next_id, "method": method, "params": params})
+        return self.receive(lambda message: message.get("id") == self._next_id)
+
+    def receive(self, matches: Any) -> dict[str, Any]:
+        while not matches(message := self._messages.get(timeout=60)):
+            pass
+        return message
+
+    def wait_for_diagnostics(self, uri: str, version: int) -> dict[str, Any]:
+        return self.receive(
+            lambda message: (
+                message.get("method") == "textDocument/publishDiagnostics"
+                and message["params"]["uri"] == uri
+                and message["params"].get("version") == version
+            )
+        )
+
+    def close(self) -> None:
+        self.request("shutdown", {})
+        self.send({"method": "exit"})
+
+
+def _milliseconds(times: list[float]) -> str:
+    ordered = sorted(times)
+    return (
+        f"p50 {ordered[len(ordered) // 2] * 1000:8.2f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:8.2f} ms, "
+        f"max {ordered[-1] * 1000:8.2f} ms"
+    )
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    arg_parser.add_argument("--keystrokes", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        client = _Client(root)
+        uri = language_server.path_to_uri(root / "large.def")
+        client.request("initialize", {"rootUri": root.as_uri(), "capabilities": {}})
+        client.send({"method": "initialized", "params": {}})
+
+        start = time.perf_counter()
+        client.send(
+            {
+                "method": "textDocument/didOpen",
+                "params": {
+                    "textDocument": {
+                        "uri": uri,
+                        "languageId": "define",
+                        "version": 1,
+                        "text": source,
+                    }
+                },
+            }
+        )
+        client.wait_for_diagnostics(uri, 1)
+        print(
+            f"{len(source.splitlines()):,} lines: first diagnostics in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        # Type a new identifier at the end of a line in the middle.
+        after = f"named label{args.statements // 22}"
+        offset = source.index(after) + len(after)
+        line = source.count("\n", 0, offset)
+        character = offset - source.rfind("\n", 0, offset) - 1
+        version = 1
+
+        def keystroke() -> None:
+            nonlocal version, character
+            version += 1
+            client.send(
+                {
+                    "method": "textDocument/didChange",
+                    "params": {
+                        "textDocument": {"uri": uri, "version": version},
+                        "contentChanges": [
+                            {
+                                "range": {
+                                    "start": {"line": line, "character": character},
+                                    "end": {"line": line, "character": character},
+                                },
+                                "text": "x",
+                            }
+                        ],
+                    },
+                }
+            )
+            character += 1
+
+        keystrokes: list[float] = []
+        hovers: list[float] = []
+        for _ in range(args.keystrokes):
+            start = time.perf_counter()
+            keystroke()
+            diagnostics = client.wait_for_diagnostics(uri, version)
+            keystrokes.append(time.perf_counter() - start)
+            # The synthetic program refers to types it doesn't declare, but
+            # every keystroke leaves it parsing.
+            for diagnostic in diagnostics["params"]["diagnostics"]:
+                if not diagnostic["message"].startswith("Unknown type name"):
+                    raise RuntimeError(f"Unexpected diagnostic: {diagnostic}")
+            start = time.perf_counter()
+            hover = client.request(
+                "textDocument/hover",
+                {
+                    "textDocument": {"uri": uri},
+                    "position": {"line": line, "character": 6},
+                },
+            )
+            hovers.append(time.perf_counter() - start)
+            if not hover.get("result"):
+                raise RuntimeError(f"Unexpected hover: {hover}")
+
+        bursts: list[float] = []
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(10):
+                keystroke()
+            client.wait_for_diagnostics(uri, version)
+            bursts.append(time.perf_counter() - start)
+
+        client.close()
+
+    print(f"keystroke to diagnostics: {_milliseconds(keystrokes)}")
+    print(f"hover:                    {_milliseconds(hovers)}")
+    print(f"10-keystroke burst:       {_milliseconds(bursts)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
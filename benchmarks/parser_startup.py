@@ -0,0 +1,77 @@
+"""Compare cold and warm construction of the Define parser.
+
+"Cold" builds the LALR tables from grammar.lark. "Warm" loads them from
+the on-disk cache that a previous construction wrote. "Generated"
+imports them from a module written by compiler.build_parser_module.
+"""
+
+import argparse
+import importlib.util
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from compiler import build_parser_module
+from compiler.parser import Parser, parser_from_module
+
+_SOURCE = "AbstractUniverse:\n    Foo is a Bar.\n"
+
+
+def _time_construction(*, cache: Path | bool) -> float:
+    """Return the seconds taken to build a parser and parse one line."""
+    start = time.perf_counter()
+    Parser(cache=cache, use_generated=False).parse(_SOURCE)
+    return time.perf_counter() - start
+
+
+def _time_generated(module_path: Path) -> float:
+    """Return the seconds taken to import the generated module and parse."""
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("generated_parser", module_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot import {module_path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    lark_parser = parser_from_module(module)
+    if lark_parser is None:
+        raise ImportError(f"{module_path} does not match the current grammar")
+    lark_parser.parse(_SOURCE)
+    return time.perf_counter() - start
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:>9}: median {statistics.median(samples) * 1000:8.2f} ms, "
+        f"min {min(samples) * 1000:8.2f} ms over {len(samples)} runs"
+    )
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--runs", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    cold = [_time_construction(cache=False) for _ in range(args.runs)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Prime the cache once so every measured run is a cache hit.
+        _time_construction(cache=Path(cache_dir))
+        warm = [_time_construction(cache=Path(cache_dir)) for _ in range(args.runs)]
+
+        module_path = Path(cache_dir) / "generated_parser.py"
+        build_parser_module.write_parser_module(module_path)
+        generated = [_time_generated(module_path) for _ in range(args.runs)]
+
+    _report("cold", cold)
+    _report("warm", warm)
+    _report("generated", generated)
+    for label, samples in (("warm", warm), ("generated", generated)):
+        speedup = statistics.median(cold) / statistics.median(samples)
+        print(f"{label} speedup over cold: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
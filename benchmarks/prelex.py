@@ -0,0 +1,64 @@
+"""Measure how long the character and whitespace checks take before lexing.
+
+Checks a synthetic program of a few megabytes, first as it is and then
+with a non-ASCII character in every string, which makes the checks find
+the strings and comments on those lines. Parsing the program is timed
+too, for scale.
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.programs import synthetic_program
+from compiler import prelex
+from compiler.parser import Parser
+
+
+def _milliseconds(times: list[float]) -> str:
+    ordered = sorted(times)
+    return (
+        f"p50 {ordered[len(ordered) // 2] * 1000:8.2f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:8.2f} ms, "
+        f"max {ordered[-1] * 1000:8.2f} ms"
+    )
+
+
+def _check_times(source: str, repeats: int) -> list[float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        violations = prelex.find_violations(source)
+        times.append(time.perf_counter() - start)
+        if violations:
+            raise RuntimeError(f"Unexpected violation: {violations[0]}")
+    return times
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=50_000)
+    arg_parser.add_argument("--repeats", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    unicode_source = source.replace("Hello, ", "Héllo, ")
+    megabytes = len(source.encode()) / 2**20
+    print(f"{megabytes:.1f} MiB, {source.count(chr(10)):,} lines")
+
+    ascii_times = _check_times(source, args.repeats)
+    unicode_times = _check_times(unicode_source, args.repeats)
+    print(f"check:                  {_milliseconds(ascii_times)}")
+    print(f"check, Unicode strings: {_milliseconds(unicode_times)}")
+    print(f"  {megabytes / sorted(ascii_times)[len(ascii_times) // 2]:.0f} MiB/s")
+
+    parser = Parser()
+    start = time.perf_counter()
+    parser.parse(source)
+    print(f"parse (with check):     {(time.perf_counter() - start) * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Synthetic Define programs for benchmarks."""
+
+from pathlib import Path
+
+_PREAMBLE = """\
+AbstractUniverse:
+    String is.
+    Number is.
+    String has a String named value.
+    Number has a Number named value.
+"""
+
+# One group of statements per index. Each group declares its own names,
+# so programs of any size parse.
+_ABSTRACT_GROUP = """\
+    Source{i} is a ViewPoint.
+    Source{i} has a String named label{i}.
+    Source{i} creates a String named greeting{i}:
+        value: "Hello, {i}!"
+    Source{i} creates a Number named count{i}:
+        value: {i}
+    Source{i} can Describe{i} using a String named text, a Number named size:
+        Source{i} makes Source{i}'s greeting{i} Print "text", 1.
+"""
+
+_PHYSICAL_GROUP = """\
+    Machine{i} is a Computer.
+    Machine{i} knows Source{i}'s greeting{i}.
+    Machine{i} makes Machine{i}'s terminal Output Source{i}'s greeting{i}.
+"""
+
+# The number of statements (counting each property assignment) produced
+# per group in each universe.
+STATEMENTS_PER_GROUP = 11
+
+
+def synthetic_program(statements: int) -> str:
+    """Return a Define program with about the given number of statements."""
+    groups = max(1, statements // STATEMENTS_PER_GROUP)
+    abstract = "".join(_ABSTRACT_GROUP.format(i=i) for i in range(groups))
+    physical = "".join(_PHYSICAL_GROUP.format(i=i) for i in range(groups))
+    return f"{_PREAMBLE}{abstract}\nPhysicalUniverse:\n{physical}"
+
+
+def write_synthetic_project(root: Path, files: int, statements_per_file: int) -> None:
+    """Write a project of synthetic programs under root, 100 per directory.
+
+    Each file starts with a comment naming it, so no two files have the
+    same contents.
+    """
+    source = synthetic_program(statements_per_file)
+    for i in range(files):
+        path = root / f"dir{i // 100}" / f"file{i}.def"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# file {i}\n{source}")
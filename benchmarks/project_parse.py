@@ -0,0 +1,47 @@
+"""Measure project parse throughput across worker counts.
+
+Writes a synthetic project of many small files to a temporary directory
+and parses it with compiler.project.parse_project using 1, 2, 4 and 8
+worker processes.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.programs import write_synthetic_project
+from compiler import project
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--files", type=int, default=2_000)
+    arg_parser.add_argument("--statements-per-file", type=int, default=50)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = arg_parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.files:,} files")
+    with tempfile.TemporaryDirectory() as root:
+        write_synthetic_project(Path(root), args.files, args.statements_per_file)
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = project.parse_project(Path(root), max_workers=workers)
+            seconds = time.perf_counter() - start
+            if result.errors:
+                raise RuntimeError(f"Parse errors: {result.errors}")
+            baseline = baseline or seconds
+            print(
+                f"{workers} workers: {seconds:7.2f} s, "
+                f"{args.files / seconds:8.1f} files/s, "
+                f"{baseline / seconds:4.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Measure what parsing past syntax errors costs.
+
+A synthetic program is parsed with Parser.parse_to_ast and with
+Parser.parse_recovering, which should take the same time when there are
+no errors. Then the period is taken off one statement in every so many,
+and the time parse_recovering takes to report every one of those errors
+is compared with the time of a parse without them.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.programs import synthetic_program
+from compiler.parser import Parser
+
+
+def _median_seconds(parse: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        parse()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _with_errors(source: str, every: int) -> tuple[str, int]:
+    """Return source with every so many type declarations missing a period."""
+    lines = source.splitlines(keepends=True)
+    errors = 0
+    declarations = 0
+    for i, line in enumerate(lines):
+        if line.endswith(" is a ViewPoint.\n"):
+            declarations += 1
+            if declarations % every == 0:
+                lines[i] = line.replace(".\n", "\n")
+                errors += 1
+    return "".join(lines), errors
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=20_000)
+    arg_parser.add_argument("--every", type=int, default=50)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = synthetic_program(args.statements)
+    broken, error_count = _with_errors(source, args.every)
+    parser = Parser()
+    if parser.parse_recovering(source).errors:
+        raise RuntimeError("The synthetic program has syntax errors")
+    if len(parser.parse_recovering(broken).errors) != error_count:
+        raise RuntimeError("Not every syntax error was reported")
+
+    print(f"{len(source):,} characters, about {args.statements:,} statements")
+    clean = _median_seconds(lambda: parser.parse_to_ast(source), args.runs)
+    recovering = _median_seconds(lambda: parser.parse_recovering(source), args.runs)
+    broken_time = _median_seconds(lambda: parser.parse_recovering(broken), args.runs)
+    print(f"parse_to_ast:                 {clean * 1000:9.1f} ms")
+    print(f"parse_recovering, no errors:  {recovering * 1000:9.1f} ms")
+    print(
+        f"parse_recovering, {error_count:,} errors: {broken_time * 1000:9.1f} ms "
+        f"({broken_time / clean:.1f}x a parse without errors)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Compare checking a project through the compile server with a fresh process.
+
+Writes a synthetic project, times a one-off python -m compiler check in a
+new process, then starts a server and times no-op checks and checks after
+editing one file.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from compiler import server
+from compiler.workspace import Workspace
+
+
+def write_project(root: Path, files: int, statements: int) -> None:
+    """Write files that each declare one type and refer to the one before."""
+    for i in range(files):
+        lines = [f"    T{i} is a ViewPoint.\n"]
+        if i:
+            lines.append(f"    T{i} has a T{i - 1} named previous.\n")
+        lines.extend(
+            f"    T{i} has a String named label{k}.\n" for k in range(statements)
+        )
+        (root / f"T{i}.def").write_text("AbstractUniverse:\n" + "".join(lines))
+
+
+def _milliseconds(times: list[float]) -> str:
+    ordered = sorted(times)
+    return (
+        f"p50 {ordered[len(ordered) // 2] * 1000:7.2f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:7.2f} ms"
+    )
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--files", type=int, default=1_000)
+    arg_parser.add_argument("--statements", type=int, default=20)
+    arg_parser.add_argument("--requests", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp) / "project"
+        root.mkdir()
+        write_project(root, args.files, args.statements)
+        socket_path = Path(temp) / "server.sock"
+        print(f"{args.files:,} files")
+
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "compiler",
+                "check",
+                "--root",
+                str(root),
+                "--socket",
+                str(socket_path),
+            ],
+            check=True,
+        )
+        print(
+            f"new process, no server:   {(time.perf_counter() - start) * 1000:7.0f} ms"
+        )
+
+        workspace = Workspace(root)
+        start = time.perf_counter()
+        workspace.scan()
+        print(
+            f"server start-up scan:     {(time.perf_counter() - start) * 1000:7.0f} ms"
+        )
+        compile_server = server.CompileServer(socket_path, workspace)
+        thread = threading.Thread(target=compile_server.serve_forever)
+        thread.start()
+        try:
+            no_op = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                server.send_request(socket_path, {"command": "check"})
+                no_op.append(time.perf_counter() - start)
+            print(f"no-op check (all files):  {_milliseconds(no_op)}")
+
+            edited = []
+            middle = args.files // 2
+            for i in range(args.requests):
+                (root / f"T{middle}.def").write_text(
+                    f"AbstractUniverse:\n    T{middle} is a ViewPoint.\n"
+                    f"    T{middle} has a String named edit{i}.\n"
+                )
+                start = time.perf_counter()
+                response = server.send_request(
+                    socket_path, {"command": "check", "paths": [f"T{middle}.def"]}
+                )
+                edited.append(time.perf_counter() - start)
+                if not response["ok"]:
+                    raise RuntimeError(response)
+            print(f"check after one edit:     {_milliseconds(edited)}")
+            stats = server.send_request(socket_path, {"command": "stats"})
+            print(f"server-side latency: {stats['latency']}")
+        finally:
+            compile_server.shutdown()
+            thread.join()
+            compile_server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
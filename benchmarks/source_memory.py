@@ -0,0 +1,102 @@
+"""Measure the memory it takes to get a large file ready to lex.
+
+Each way of reading a file runs in its own process, so its peak resident
+set size isn't hidden by another's. Each reads the file, decodes it and
+runs the checks Parser.parse runs before lexing:
+
+- read_text: Path.read_text, as the compiler used to.
+- read_bytes: Path.read_bytes, then Parser.parse_bytes's decoding, with
+  the bytes kept, as a caller that also hashes them does.
+- parse_file: Parser.parse_file's reading, which maps the file into
+  memory and decodes straight from the map.
+
+The peak of the Python heap is reported too. The pages of a memory map
+count towards the resident set while they're mapped, but they're the
+file's own pages, which the kernel can drop without writing anything,
+whereas the heap has to stay in memory.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.programs import synthetic_program
+from compiler import parser, prelex
+
+_MODES = ("read_text", "read_bytes", "parse_file")
+
+
+def _peak_rss() -> int:
+    """Return the peak resident set size of this process, in bytes.
+
+    It's read from /proc rather than getrusage, whose peak is carried over
+    from the parent process on Linux.
+    """
+    status = Path("/proc/self/status").read_text()
+    (line,) = (line for line in status.splitlines() if line.startswith("VmHWM:"))
+    return int(line.split()[1]) * 1024
+
+
+def _ingest(path: Path, mode: str) -> None:
+    """Read path the given way and print the peaks, in bytes."""
+    before = _peak_rss()
+    tracemalloc.start()
+    data = None
+    if mode == "read_text":
+        source = path.read_text(encoding="utf-8")
+    elif mode == "read_bytes":
+        data = path.read_bytes()
+        source = prelex.decode(data)
+    else:
+        source = parser.read_source(path)
+    prelex.check(source)
+    _, heap = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(heap, _peak_rss() - before)
+    del data
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--statements", type=int, default=1_000_000)
+    arg_parser.add_argument("--mode", choices=_MODES, help=argparse.SUPPRESS)
+    arg_parser.add_argument("--path", type=Path, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.mode:
+        _ingest(args.path, args.mode)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "large.def"
+        path.write_text(synthetic_program(args.statements), encoding="utf-8")
+        size = path.stat().st_size
+        print(f"{size / 2**20:.1f} MiB file")
+        for mode in _MODES:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.source_memory",
+                    "--mode",
+                    mode,
+                    "--path",
+                    str(path),
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            heap, rss = (int(value) for value in output.split())
+            print(
+                f"{mode:>10}: peak heap {heap / size:4.2f}x the file, "
+                f"peak RSS growth {rss / size:4.2f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
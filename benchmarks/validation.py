@@ -0,0 +1,74 @@
+"""Check that semantic validation takes time linear in program size.
+
+Synthetic programs of growing size are parsed, then validated against a
+dependency declaring what they use (Computer, and String's Print action),
+and the median validation time per statement is printed for each size. It
+should stay about the same as programs grow.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.programs import synthetic_program
+from compiler import validator
+from compiler.parser import Parser
+
+_DEPENDENCY = """\
+AbstractUniverse:
+    String is.
+    Number is.
+    String can Print using a String named text, a Number named size:
+        # Implemented by the compiler
+
+PhysicalUniverse:
+    Computer is a ViewPoint.
+    Terminal is a DimensionPoint.
+    Terminal can Output using a String named str:
+        # Implemented by the compiler
+    Computer has a Terminal named terminal.
+"""
+
+
+def _median_seconds(run: Callable[[], object], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--statements", type=int, nargs="+", default=[5_000, 20_000, 80_000]
+    )
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = Parser()
+    dependency = parser.parse_to_ast(_DEPENDENCY)
+    for statements in args.statements:
+        program = parser.parse_to_ast(synthetic_program(statements))
+        errors = validator.validate(program, [dependency])
+        if errors:
+            raise RuntimeError(f"The synthetic program isn't valid: {errors[0]}")
+        seconds = _median_seconds(
+            lambda program=program: validator.validate(program, [dependency]),
+            args.runs,
+        )
+        print(
+            f"{statements:>8,} statements: {seconds * 1000:8.1f} ms, "
+            f"{seconds / statements * 1e6:5.2f} us per statement"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Measure how long watch mode takes from saving a file to reporting on it.
+
+Writes a synthetic project, scans it, then watches it in a thread while
+one file is edited over and over. Each edit's latency is the time from
+the write to the report of its diagnostics, so it includes the debounce.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.server_latency import write_project
+from compiler import watch
+from compiler.workspace import Diagnostic, Workspace
+
+
+def main() -> int:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--files", type=int, default=10_000)
+    arg_parser.add_argument("--statements", type=int, default=5)
+    arg_parser.add_argument("--edits", type=int, default=50)
+    arg_parser.add_argument(
+        "--polling", action="store_true", help="Poll instead of using inotify"
+    )
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp)
+        write_project(root, args.files, args.statements)
+        workspace = Workspace(root)
+        start = time.perf_counter()
+        workspace.scan()
+        print(f"{args.files:,} files, scanned in {time.perf_counter() - start:.1f} s")
+
+        watcher = (
+            watch.PollingWatcher(root) if args.polling else watch.open_watcher(root)
+        )
+        print(f"watching with {type(watcher).__name__}")
+        reported = threading.Event()
+        reports: list[set[Path]] = []
+
+        def report(affected: set[Path], _: dict[Path, list[Diagnostic]]) -> None:
+            reports.append(affected)
+            reported.set()
+
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=watch.watch,
+            args=(workspace, report),
+            kwargs={"watcher": watcher, "stop": stop},
+        )
+        thread.start()
+        try:
+            latencies = []
+            middle = args.files // 2
+            for i in range(args.edits):
+                reported.clear()
+                start = time.perf_counter()
+                (root / f"T{middle}.def").write_text(
+                    f"AbstractUniverse:\n    T{middle} is a ViewPoint.\n"
+                    f"    T{middle} has a String named edit{i}.\n"
+                )
+                if not reported.wait(timeout=10):
+                    raise RuntimeError(f"Edit {i} was never reported")
+                latencies.append(time.perf_counter() - start)
+            if any(affected != {Path(f"T{middle}.def")} for affected in reports):
+                raise RuntimeError(f"Unexpected reports: {reports}")
+        finally:
+            stop.set()
+            thread.join()
+
+    ordered = sorted(latencies)
+    print(
+        f"save to report: p50 {ordered[len(ordered) // 2] * 1000:.1f} ms, "
+        f"p95 {ordered[len(ordered) * 95 // 100] * 1000:.1f} ms, "
+        f"max {ordered[-1] * 1000:.1f} ms "
+        f"(debounce {watch.DEFAULT_DEBOUNCE_SECONDS * 1000:.0f} ms)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""The define command line: python -m compiler <command>."""
+
+import argparse
+import contextlib
+import sys
+from pathlib import Path
+
+from compiler import language_server, server, watch
+from compiler.workspace import Diagnostic, Workspace
+
+
+def _as_text(diagnostics: dict[Path, list[Diagnostic]]) -> dict[str, list[str]]:
+    return {
+        str(path): [str(diagnostic) for diagnostic in found]
+        for path, found in diagnostics.items()
+    }
+
+
+def _print_diagnostics(diagnostics: dict[str, list[str]]) -> None:
+    for path, messages in diagnostics.items():
+        for message in messages:
+            print(f"{path}:{message}")
+
+
+def _serve(args: argparse.Namespace) -> int:
+    socket_path = args.socket or server.default_socket_path(args.root)
+    workspace = Workspace(args.root)
+    workspace.scan()
+    with server.CompileServer(socket_path, workspace) as compile_server:
+        print(f"Serving {args.root} on {socket_path}", file=sys.stderr)
+        with contextlib.suppress(KeyboardInterrupt):
+            compile_server.serve_forever()
+    return 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    workspace = Workspace(args.root)
+    workspace.scan()
+    _print_diagnostics(_as_text(workspace.check()))
+    print(f"Watching {len(workspace.files)} files in {args.root}", file=sys.stderr)
+
+    def report(affected: set[Path], diagnostics: dict[Path, list[Diagnostic]]) -> None:
+        _print_diagnostics(_as_text(diagnostics))
+        print(
+            f"Checked {len(affected)} files: {len(diagnostics)} with problems",
+            file=sys.stderr,
+        )
+
+    with contextlib.suppress(KeyboardInterrupt):
+        watch.watch(workspace, report)
+    return 0
+
+
+def _lsp() -> int:
+    return language_server.LanguageServer(sys.stdin.buffer, sys.stdout.buffer).serve()
+
+
+def _check(args: argparse.Namespace) -> int:
+    socket_path = args.socket or server.default_socket_path(args.root)
+    request: dict[str, object] = {"command": "check"}
+    if args.paths:
+        request["paths"] = [str(path) for path in args.paths]
+    try:
+        response = server.send_request(socket_path, request)
+    except OSError:
+        # No server is running, so check the project in this process.
+        workspace = Workspace(args.root)
+        workspace.scan()
+        checked = None
+        if args.paths:
+            # Check the files that depend on the paths too.
+            requested = set(args.paths)
+            checked = requested | workspace.dependents(requested)
+        diagnostics = workspace.check(checked)
+        response = {
+            "ok": not diagnostics,
+            "diagnostics": _as_text(diagnostics),
+        }
+    if "error" in response:
+        print(response["error"], file=sys.stderr)
+        return 1
+    _print_diagnostics(response["diagnostics"])
+    return 0 if response["ok"] else 1
+
+
+def _send(command: str, args: argparse.Namespace) -> int:
+    socket_path = args.socket or server.default_socket_path(args.root)
+    try:
+        response = server.send_request(socket_path, {"command": command})
+    except OSError as e:
+        print(f"No server at {socket_path}: {e}", file=sys.stderr)
+        return 1
+    for key, value in response.items():
+        print(f"{key}: {value}")
+    return 0 if response["ok"] else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run a define command."""
+    arg_parser = argparse.ArgumentParser(prog="define", description=__doc__)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, help_text: str) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument(
+            "--root",
+            type=Path,
+            default=Path(),
+            help="The project root (default: the current directory)",
+        )
+        command.add_argument(
+            "--socket",
+            type=Path,
+            help="The compile server's socket (default: one for the root)",
+        )
+        return command
+
+    add_command("serve", "Run a compile server for a project")
+    check = add_command(
+        "check", "Check a project, through its compile server if it has one"
+    )
+    check.add_argument(
+        "paths", nargs="*", type=Path, help="Only check these files (and dependents)"
+    )
+    add_command("watch", "Check a project whenever its files change")
+    add_command("stats", "Show a compile server's request latencies")
+    add_command("shutdown", "Stop a compile server")
+    commands.add_parser(
+        "lsp", help="Run a language server for an editor, over stdin and stdout"
+    )
+
+    args = arg_parser.parse_args(argv)
+    match args.command:
+        case "serve":
+            return _serve(args)
+        case "check":
+            return _check(args)
+        case "watch":
+            return _watch(args)
+        case "lsp":
+            return _lsp()
+        case _:
+            return _send(args.command, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""A columnar representation of a program, for whole-program analyses.
+
+An ast.Program is an object per node, which is most of the memory a large
+program takes. An Arena holds the same nodes as parallel arrays instead,
+with an entry per node in each:
+
+    kinds          the node's type, as an index into NODE_TYPES
+    parents        the index of the node's parent, or -1 for universe blocks
+    name_starts    where the node's names start in names
+    child_starts   where the node's children start in children
+    child_ends     where they end
+    span_starts    the packed start position of the node's span
+    span_ends      the packed end position (see ast.make_span)
+
+A node's names are the symbol IDs of its name fields, in the order in
+NAME_FIELDS, or for a literal, the index of its text in literals. Its
+children are the indexes of its child nodes, in source order: an
+ActionExecution's target comes before its arguments, and an
+ActionDeclaration's parameters before its body. Children are always added
+before their parents.
+
+Parser.parse_to_arena builds an arena directly while parsing. The node,
+universe and program methods build the equivalent ast nodes on demand, so
+code written against the ast classes can work on part of an arena.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from compiler import ast
+from compiler.symbols import SymbolTable
+
+# The name fields of each type of node, in the order their names are
+# stored. A literal's one field holds its text rather than a name.
+NAME_FIELDS: dict[type[ast.ASTNode], tuple[str, ...]] = {
+    ast.UniverseBlock: ("name",),
+    ast.CompilerTypeDeclaration: ("type_name",),
+    ast.TypeDeclaration: ("type_name", "parent_type"),
+    ast.PropertyDeclaration: ("type_name", "property_type", "property_name"),
+    ast.StringLiteral: ("raw_value",),
+    ast.NumberLiteral: ("raw_value",),
+    ast.PropertyOrEntityReference: ("owner", "property_name"),
+    ast.EntityCreation: ("creator", "type_name", "entity_name"),
+    ast.PropertyAssignment: ("name",),
+    ast.KnowledgeStatement: ("knower", "owner", "entity_name"),
+    ast.ActionParameter: ("param_type", "param_name"),
+    ast.ActionDeclaration: ("type_name", "action_name"),
+    ast.ActionExecution: ("actor", "action_name"),
+}
+# The type of each kind of node is its index here.
+NODE_TYPES: tuple[type[ast.ASTNode], ...] = tuple(NAME_FIELDS)
+_KINDS = {node_type: kind for kind, node_type in enumerate(NODE_TYPES)}
+_LITERAL_KINDS = frozenset((_KINDS[ast.StringLiteral], _KINDS[ast.NumberLiteral]))
+
+_POSITION_BITS = ast.LINE_BITS + ast.COLUMN_BITS
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+
+
+def kind_of(node_type: type[ast.ASTNode]) -> int:
+    """Return the kind that nodes of a type have in an arena.
+
+    Raises:
+        KeyError: If arenas can't hold nodes of the type.
+    """
+    return _KINDS[node_type]
+
+
+class Arena:
+    """A program's nodes, as a column per field (see the module docstring).
+
+    The columns can be read directly, but are only changed by add and
+    pop. Names are symbol IDs in symbols, so the arenas of every file in a
+    compilation can share one table.
+    """
+
+    def __init__(self, symbols: SymbolTable | None = None) -> None:
+        """Create an empty arena.
+
+        Args:
+            symbols: The table the arena's names are IDs in. A new table is
+                used if none is given.
+        """
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.kinds = array("B")
+        self.parents = array("i")
+        self.name_starts = array("I")
+        self.names = array("I")
+        self.child_starts = array("I")
+        self.child_ends = array("I")
+        self.children = array("I")
+        self.span_starts = array("Q")
+        self.span_ends = array("Q")
+        self.literals: list[str] = []
+        # The index of each universe block, in source order.
+        self.universes = array("I")
+        # The lines of the file the arena was parsed from, as in
+        # ast.Program.
+        self.lines: ast.LineTable | None = None
+
+    def __len__(self) -> int:
+        """Return the number of nodes in the arena."""
+        return len(self.kinds)
+
+    def add(
+        self,
+        node_type: type[ast.ASTNode],
+        names: Iterable[int],
+        children: Sequence[int] = (),
+        span: int = ast.NO_SPAN,
+    ) -> int:
+        """Add a node after its children, and return its index.
+
+        Args:
+            node_type: The type of the node.
+            names: The symbol IDs of its name fields, in the order in
+                NAME_FIELDS, or for a literal, the index of its text (see
+                add_literal).
+            children: The indexes of its children, in source order. They
+                mustn't have a parent yet.
+            span: Its span.
+        """
+        index = len(self.kinds)
+        self.kinds.append(_KINDS[node_type])
+        self.parents.append(-1)
+        self.name_starts.append(len(self.names))
+        self.names.extend(names)
+        self.child_starts.append(len(self.children))
+        self.children.extend(children)
+        self.child_ends.append(len(self.children))
+        for child in children:
+            self.parents[child] = index
+        self.span_starts.append(span >> _POSITION_BITS)
+        self.span_ends.append(span & _POSITION_MASK)
+        return index
+
+    def add_literal(self, raw_value: str) -> int:
+        """Store the text of a literal, and return its index in literals."""
+        self.literals.append(raw_value)
+        return len(self.literals) - 1
+
+    def pop(self) -> None:
+        """Remove the node added last, and leave its children without a parent."""
+        name_start = self.name_starts.pop()
+        del self.names[name_start:]
+        child_start = self.child_starts.pop()
+        self.child_ends.pop()
+        for child in self.children[child_start:]:
+            self.parents[child] = -1
+        del self.children[child_start:]
+        if self.kinds.pop() in _LITERAL_KINDS:
+            self.literals.pop()
+        self.parents.pop()
+        self.span_starts.pop()
+        self.span_ends.pop()
+
+    def node_type(self, index: int) -> type[ast.ASTNode]:
+        """Return the type of a node."""
+        return NODE_TYPES[self.kinds[index]]
+
+    def name_ids(self, index: int) -> "array[int]":
+        """Return the symbol IDs of a node's names, as in NAME_FIELDS."""
+        start = self.name_starts[index]
+        count = len(NAME_FIELDS[NODE_TYPES[self.kinds[index]]])
+        return self.names[start : start + count]
+
+    def name(self, index: int, field: str) -> str:
+        """Return one of a node's names, without building the node.
+
+        Raises:
+            ValueError: If the node has no name field called field.
+        """
+        fields = NAME_FIELDS[NODE_TYPES[self.kinds[index]]]
+        value = self.names[self.name_starts[index] + fields.index(field)]
+        if self.kinds[index] in _LITERAL_KINDS:
+            return self.literals[value]
+        return self.symbols.name(value)
+
+    def child_indexes(self, index: int) -> "array[int]":
+        """Return the indexes of a node's children, in source order."""
+        return self.children[self.child_starts[index] : self.child_ends[index]]
+
+    def span(self, index: int) -> int:
+        """Return a node's span."""
+        return self.span_starts[index] << _POSITION_BITS | self.span_ends[index]
+
+    def indexes_of(self, node_type: type[ast.ASTNode]) -> Iterator[int]:
+        """Return the index of every node of a type, in the order added.
+
+        Subclasses aren't included: indexes_of(ast.BaseTypeDeclaration)
+        finds nothing.
+        """
+        kind = _KINDS.get(node_type)
+        if kind is None:
+            return iter(())
+        kinds = self.kinds
+        return (index for index in range(len(kinds)) if kinds[index] == kind)
+
+    def node(self, index: int) -> Any:
+        """Build the ast node at index, and the nodes under it.
+
+        Each call builds new nodes, which don't change the arena if they're
+        changed.
+        """
+        kind = self.kinds[index]
+        node_type = NODE_TYPES[kind]
+        fields = NAME_FIELDS[node_type]
+        start = self.name_starts[index]
+        ids = self.names[start : start + len(fields)]
+        values: dict[str, Any]
+        if kind in _LITERAL_KINDS:
+            values = {fields[0]: self.literals[ids[0]]}
+        else:
+            name = self.symbols.name
+            values = {
+                field: name(symbol_id)
+                for field, symbol_id in zip(fields, ids, strict=True)
+            }
+        children = [self.node(child) for child in self.child_indexes(index)]
+        if node_type is ast.UniverseBlock:
+            values["statements"] = children
+        elif node_type is ast.EntityCreation:
+            values["properties"] = children
+        elif node_type is ast.PropertyAssignment:
+            values["value"] = children[0]
+        elif node_type is ast.ActionDeclaration:
+            values["parameters"] = [
+                child for child in children if isinstance(child, ast.ActionParameter)
+            ]
+            values["body"] = [
+                child for child in children if isinstance(child, ast.ActionExecution)
+            ]
+        elif node_type is ast.ActionExecution:
+            values["target"] = children[0]
+            values["arguments"] = children[1:]
+        return node_type(**values, span=self.span(index))
+
+    def universe(self, name: str) -> ast.UniverseBlock:
+        """Build the first universe block with a name.
+
+        Raises:
+            ast.UniverseNotFoundError: If there's no universe block called
+                name.
+        """
+        for index in self.universes:
+            if self.name(index, "name") == name:
+                return self.node(index)
+        raise ast.UniverseNotFoundError(f"Universe {name!r} not found")
+
+    def program(self) -> ast.Program:
+        """Build the whole program as ast nodes."""
+        program = ast.Program([self.node(index) for index in self.universes])
+        program.lines = self.lines
+        return program
+
+    @classmethod
+    def from_program(
+        cls, program: ast.Program, symbols: SymbolTable | None = None
+    ) -> "Arena":
+        """Return an arena holding the nodes of a program.
+
+        Args:
+            program: The program.
+            symbols: The table to add its names to, as in Arena().
+
+        Raises:
+            KeyError: If the program has a type of node arenas can't hold.
+        """
+        arena = cls(symbols)
+        for universe in program.universes:
+            arena.universes.append(arena._add_tree(universe))
+        arena.lines = program.lines
+        return arena
+
+    def _add_tree(self, node: ast.ASTNode) -> int:
+        node_type = type(node)
+        fields = NAME_FIELDS[node_type]
+        if isinstance(node, ast.StringLiteral | ast.NumberLiteral):
+            names = [self.add_literal(node.raw_value)]
+        else:
+            symbol_id = self.symbols.symbol_id
+            names = [symbol_id(getattr(node, field)) for field in fields]
+        match node:
+            case ast.UniverseBlock():
+                children = node.statements
+            case ast.EntityCreation():
+                children = node.properties
+            case ast.PropertyAssignment():
+                children = [node.value]
+            case ast.ActionDeclaration():
+                children = [*node.parameters, *node.body]
+            case ast.ActionExecution():
+                children = [node.target, *node.arguments]
+            case _:
+                children = []
+        return self.add(
+            node_type,
+            names,
+            [self._add_tree(child) for child in children],
+            node.span,
+        )
@@ -0,0 +1,163 @@
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from compiler import arena, ast
+from compiler.arena import Arena
+from compiler.parser import Parser
+from compiler.symbols import SymbolTable
+from compiler.transformer import ArenaTransformer
+
+_parser = Parser()
+
+_SOURCE = textwrap.dedent(
+    """\
+    AbstractUniverse:
+        String is.
+        Source is a ViewPoint.
+        Source has a String named label.
+        Source creates a String named greeting:
+            value: "Hello, world!"
+            count: 4.5
+        Source can Greet using a String named text,
+        a Number named times:
+            Source makes Source's label Print "hi", 2, Source's count.
+
+    PhysicalUniverse:
+        Machine is a Computer.
+        Machine knows Source's greeting.
+        Machine makes Machine's terminal Output Source's greeting.
+    """
+)
+
+_COLUMNS = (
+    "kinds",
+    "parents",
+    "name_starts",
+    "names",
+    "child_starts",
+    "child_ends",
+    "children",
+    "span_starts",
+    "span_ends",
+    "literals",
+    "universes",
+)
+
+
+def _spans(program: ast.Program) -> list[int]:
+    return [node.span for universe in program.universes for node in ast.walk(universe)]
+
+
+def _assert_same_columns(actual: Arena, expected: Arena):
+    for column in _COLUMNS:
+        assert getattr(actual, column) == getattr(expected, column), column
+
+
+def test_parse_to_arena_matches_the_ast():
+    symbols = SymbolTable()
+    program = _parser.parse_to_ast(_SOURCE, symbols)
+
+    parsed = _parser.parse_to_arena(_SOURCE, symbols)
+
+    _assert_same_columns(parsed, Arena.from_program(program, symbols))
+    assert parsed.program() == program
+    assert _spans(parsed.program()) == _spans(program)
+    assert parsed.lines == program.lines
+
+
+def test_transformer_matches_the_fused_parse():
+    symbols = SymbolTable()
+    transformer = ArenaTransformer(symbols)
+
+    transformed = transformer.transform(_parser.parse(_SOURCE))
+
+    assert transformed is transformer.arena
+    _assert_same_columns(transformed, _parser.parse_to_arena(_SOURCE, symbols))
+
+
+@pytest.mark.parametrize(
+    "path",
+    sorted((Path(__file__).parent.parent / "examples").rglob("*.def")),
+    ids=lambda path: path.name,
+)
+def test_from_program_round_trips_examples(path: Path):
+    program = _parser.parse_recovering(path.read_text()).program
+
+    built = Arena.from_program(program)
+
+    assert built.program() == program
+    assert _spans(built.program()) == _spans(program)
+
+
+def test_columns():
+    parsed = _parser.parse_to_arena(_SOURCE)
+
+    (declaration,) = parsed.indexes_of(ast.ActionDeclaration)
+    assert parsed.node_type(declaration) is ast.ActionDeclaration
+    assert parsed.name(declaration, "action_name") == "Greet"
+    assert [parsed.node_type(child) for child in parsed.child_indexes(declaration)] == [
+        ast.ActionParameter,
+        ast.ActionParameter,
+        ast.ActionExecution,
+    ]
+    assert parsed.parents[declaration] == parsed.universes[0]
+    assert parsed.kinds[declaration] == arena.kind_of(ast.ActionDeclaration)
+    (execution, _) = parsed.indexes_of(ast.ActionExecution)
+    assert [parsed.node_type(child) for child in parsed.child_indexes(execution)] == [
+        ast.PropertyOrEntityReference,
+        ast.StringLiteral,
+        ast.NumberLiteral,
+        ast.PropertyOrEntityReference,
+    ]
+    literal = parsed.child_indexes(execution)[1]
+    assert parsed.name(literal, "raw_value") == '"hi"'
+    assert [parsed.symbols.name(i) for i in parsed.name_ids(execution)] == [
+        "Source",
+        "Print",
+    ]
+    assert ast.span_start(parsed.span(execution)) == (10, 9)
+    assert list(parsed.indexes_of(ast.BaseTypeDeclaration)) == []
+
+
+def test_every_node_but_universe_blocks_has_a_parent():
+    parsed = _parser.parse_to_arena(_SOURCE)
+
+    orphans = [index for index, parent in enumerate(parsed.parents) if parent == -1]
+
+    assert orphans == list(parsed.universes)
+    (knowledge,) = parsed.indexes_of(ast.KnowledgeStatement)
+    assert parsed.node(knowledge) == ast.KnowledgeStatement(
+        "Machine", "Source", "greeting"
+    )
+    assert ast.span_end(parsed.span(knowledge)) == (14, 36)
+
+
+def test_universe():
+    parsed = _parser.parse_to_arena(_SOURCE)
+
+    physical = parsed.universe("PhysicalUniverse")
+
+    assert physical == _parser.parse_to_ast(_SOURCE).get_physical_universe()
+    with pytest.raises(ast.UniverseNotFoundError):
+        parsed.universe("OtherUniverse")
+
+
+def test_pop():
+    built = Arena()
+    literal = built.add(ast.StringLiteral, [built.add_literal('"hi"')])
+    assignment = built.add(
+        ast.PropertyAssignment, [built.symbols.symbol_id("value")], [literal]
+    )
+    assert built.parents[literal] == assignment
+
+    built.pop()
+
+    assert len(built) == 1
+    assert built.parents[literal] == -1
+    assert list(built.children) == []
+    built.pop()
+    assert len(built) == 0
+    assert built.literals == []
+    assert list(built.names) == []
@@ -1,7 +1,12 @@
 """Abstract Syntax Tree node definitions for the Define language."""
 
-from dataclasses import dataclass, field
-from functools import cached_property
+import bisect
+import itertools
+from array import array
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from dataclasses import dataclass, field, fields
+from functools import cache
+from typing import Any, Self, SupportsIndex, cast
 
 
 class ASTError(Exception):
@@ -20,21 +25,282 @@ class UniverseNotFoundError(ASTError):
     """Raised when a universe with the specified name is not found."""
 
 
-@dataclass(kw_only=True)
+class NodeList[T](list[T]):
+    """A list of AST nodes that holds lookup indexes over its contents.
+
+    Indexes are built on first use and thrown away whenever the list is
+    changed, so they always match the list's contents. They don't track
+    changes to the fields of the nodes in the list.
+    """
+
+    __slots__ = ("_indexes",)
+
+    def __init__(self, iterable: Iterable[T] = ()) -> None:
+        """Create a list holding the nodes from iterable."""
+        super().__init__(iterable)
+        self._indexes: dict[Hashable, Any] = {}
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle only the nodes; indexes are rebuilt on demand."""
+        return (self.__class__, (list(self),))
+
+    def cached_index[I](self, key: Hashable, build: Callable[[list[T]], I]) -> I:
+        """Return the index stored under key, building it if needed.
+
+        Args:
+            key: Identifies the index. Callers building different indexes
+                must use different keys.
+            build: Builds the index from the nodes in this list.
+        """
+        if key not in self._indexes:
+            self._indexes[key] = build(self)
+        return self._indexes[key]
+
+    def _changed(self) -> None:
+        if self._indexes:
+            self._indexes = {}
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        """Set an item or slice, and drop the indexes."""
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index: SupportsIndex | slice) -> None:
+        """Delete an item or slice, and drop the indexes."""
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, other: Iterable[T]) -> Self:
+        """Extend the list in place, and drop the indexes."""
+        super().__iadd__(other)
+        self._changed()
+        return self
+
+    def __imul__(self, count: SupportsIndex) -> Self:
+        """Repeat the list in place, and drop the indexes."""
+        super().__imul__(count)
+        self._changed()
+        return self
+
+    def append(self, item: T) -> None:
+        """Append an item, and drop the indexes."""
+        super().append(item)
+        self._changed()
+
+    def extend(self, items: Iterable[T]) -> None:
+        """Append items, and drop the indexes."""
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index: SupportsIndex, item: T) -> None:
+        """Insert an item, and drop the indexes."""
+        super().insert(index, item)
+        self._changed()
+
+    def remove(self, item: T) -> None:
+        """Remove the first occurrence of item, and drop the indexes."""
+        super().remove(item)
+        self._changed()
+
+    def pop(self, index: SupportsIndex = -1) -> T:
+        """Remove and return an item, and drop the indexes."""
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def clear(self) -> None:
+        """Remove all items, and drop the indexes."""
+        super().clear()
+        self._changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        """Sort the list in place, and drop the indexes."""
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        """Reverse the list in place, and drop the indexes."""
+        super().reverse()
+        self._changed()
+
+
+def _as_node_list[T](nodes: list[T]) -> NodeList[T]:
+    # Nodes that index their child lists store them as NodeLists; see
+    # their __setattr__.
+    return cast("NodeList[T]", nodes)
+
+
+def _by_name[T](nodes: list[T], name_of: Callable[[T], str]) -> dict[str, list[T]]:
+    index: dict[str, list[T]] = {}
+    for node in nodes:
+        index.setdefault(name_of(node), []).append(node)
+    return index
+
+
+# A span packs where a node is in its file into one int: the line and
+# column of its first character and of the character just after its
+# last, all 1-based. Lines take LINE_BITS bits and columns COLUMN_BITS,
+# so files can have up to 2**32 lines, of up to 2**24 characters. Lines,
+# rather than offsets, are stored so that an edit within a line doesn't
+# move the spans of the nodes on the lines after it.
+LINE_BITS = 32
+COLUMN_BITS = 24
+_POSITION_BITS = LINE_BITS + COLUMN_BITS
+_COLUMN_MASK = (1 << COLUMN_BITS) - 1
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+# Adding this to a span moves both of its lines down by one.
+_ONE_LINE = 1 << (_POSITION_BITS + COLUMN_BITS) | 1 << COLUMN_BITS
+# The span of a node that wasn't parsed from a file.
+NO_SPAN = 0
+
+
+def make_span(start: tuple[int, int], end: tuple[int, int]) -> int:
+    """Return the span from one line and column up to another."""
+    (start_line, start_column), (end_line, end_column) = start, end
+    return (
+        (start_line << COLUMN_BITS | start_column) << _POSITION_BITS
+        | end_line << COLUMN_BITS
+        | end_column
+    )
+
+
+def _position(packed: int) -> tuple[int, int]:
+    return packed >> COLUMN_BITS, packed & _COLUMN_MASK
+
+
+def span_start(span: int) -> tuple[int, int]:
+    """Return the line and column a span starts at."""
+    return _position(span >> _POSITION_BITS)
+
+
+def span_end(span: int) -> tuple[int, int]:
+    """Return the line and column just after the end of a span."""
+    return _position(span & _POSITION_MASK)
+
+
+def shift_span(span: int, lines: int) -> int:
+    """Return a span moved the given number of lines down its file."""
+    if span == NO_SPAN:
+        return span
+    return span + lines * _ONE_LINE
+
+
+class LineTable:
+    """Where each line of a file starts, to turn positions into offsets.
+
+    The table is built from the source the first time it's used, and the
+    source is let go of then. Parsing makes one for every file, and most
+    are never used.
+    """
+
+    __slots__ = ("_source", "_table")
+
+    def __init__(self, source: str) -> None:
+        """Create the table for a file's source."""
+        self._source: str | None = source
+        self._table: array[int] | None = None
+
+    @classmethod
+    def from_starts(cls, starts: Iterable[int]) -> Self:
+        """Create a table from the offsets where each line starts."""
+        table = cls("")
+        table._source = None
+        table._table = array("q", starts)
+        return table
+
+    @property
+    def starts(self) -> "array[int]":
+        """The offset where each line starts. Don't change it."""
+        return self._starts
+
+    @property
+    def _starts(self) -> "array[int]":
+        if self._table is None:
+            source = cast("str", self._source)
+            lengths = (len(line) + 1 for line in source.split("\n"))
+            self._table = array("q", itertools.accumulate(lengths, initial=0))
+            # The last entry is past the end of the source.
+            self._table.pop()
+            self._source = None
+        return self._table
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle the table rather than the source, which is bigger."""
+        return (LineTable.from_starts, (self._starts,))
+
+    def __len__(self) -> int:
+        """Return the number of lines in the file."""
+        return len(self._starts)
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether other is a table of the same lines."""
+        if not isinstance(other, LineTable):
+            return NotImplemented
+        return self._starts == other._starts
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def offset(self, position: tuple[int, int]) -> int:
+        """Return the offset of a line and column.
+
+        Raises:
+            IndexError: If the file has no such line.
+        """
+        line, column = position
+        if line < 1:
+            raise IndexError(f"No line {line}")
+        return self._starts[line - 1] + column - 1
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Return the line and column of an offset."""
+        line = bisect.bisect_right(self._starts, offset)
+        return line, offset - self._starts[line - 1] + 1
+
+    def offsets(self, span: int) -> tuple[int, int]:
+        """Return the offsets a span starts and ends at, to slice the source."""
+        return self.offset(span_start(span)), self.offset(span_end(span))
+
+
+# AST nodes use __slots__ rather than a per-instance __dict__, because
+# large programs have millions of them.
+@dataclass(kw_only=True, slots=True)
 class ASTNode:
-    """Base class for all AST nodes."""
+    """Base class for all AST nodes.
+
+    Each node has the span of the tokens it was parsed from (see
+    make_span), from its first name or literal to the end of its last.
+    Keywords and punctuation aren't kept by the parser, so a statement's
+    span doesn't include the period that ends it. Spans aren't compared,
+    so nodes built by hand equal parsed ones.
+    """
+
+    span: int = field(default=NO_SPAN, compare=False, repr=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class Program(ASTNode):
     """Represents the entire program (collection of universe blocks)."""
 
     universes: list["UniverseBlock"]
+    # The lines of the file the program was parsed from, for the
+    # positions of its nodes' spans.
+    lines: LineTable | None = field(
+        default=None, kw_only=True, compare=False, repr=False
+    )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Set a field, storing the universe list as an indexed NodeList."""
+        if name == "universes" and not isinstance(value, NodeList):
+            value = NodeList(value)
+        object.__setattr__(self, name, value)
 
     def _get_universe_by_name(self, name: str) -> "UniverseBlock":
-        for universe in self.universes:
-            if universe.name == name:
-                return universe
+        by_name = _as_node_list(self.universes).cached_index(
+            "universes_by_name",
+            lambda universes: _by_name(universes, lambda universe: universe.name),
+        )
+        if name in by_name:
+            return by_name[name][0]
         available = ", ".join(str(u.name) for u in self.universes) or "none"
         raise UniverseNotFoundError(
             f"Universe {name!r} not found. Available universes: {available}"
@@ -57,13 +323,19 @@ class Program(ASTNode):
         return self._get_universe_by_name("PhysicalUniverse")
 
 
-@dataclass
+@dataclass(slots=True)
 class UniverseBlock(ASTNode):
     """Represents a universe block (e.g., AbstractUniverse:, PhysicalUniverse:)."""
 
     name: str
     statements: list[ASTNode]
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Set a field, storing the statement list as an indexed NodeList."""
+        if name == "statements" and not isinstance(value, NodeList):
+            value = NodeList(value)
+        object.__setattr__(self, name, value)
+
     def get_statements_by_type[T: ASTNode](self, stmt_type: type[T]) -> list[T]:
         """Find statements of a specific type in this universe block.
 
@@ -74,29 +346,80 @@ class UniverseBlock(ASTNode):
             A list of statements that are instances of the specified type,
             or an empty list if no statements of the specified type are found.
         """
-        return [stmt for stmt in self.statements if isinstance(stmt, stmt_type)]
+        matches = _as_node_list(self.statements).cached_index(
+            ("statements_by_type", stmt_type),
+            lambda statements: [
+                stmt for stmt in statements if isinstance(stmt, stmt_type)
+            ],
+        )
+        return list(matches)
 
+    def get_declarations_by_type_name(self, type_name: str) -> list[ASTNode]:
+        """Find the statements that declare a type or its members.
 
-@dataclass
+        Args:
+            type_name: The name of the type.
+
+        Returns:
+            The type, property, and action declarations whose type_name is
+            type_name, in source order, or an empty list if there are none.
+        """
+        by_type_name = _as_node_list(self.statements).cached_index(
+            "declarations_by_type_name",
+            lambda statements: _by_name(
+                [
+                    stmt
+                    for stmt in statements
+                    if isinstance(
+                        stmt,
+                        BaseTypeDeclaration | PropertyDeclaration | ActionDeclaration,
+                    )
+                ],
+                lambda stmt: stmt.type_name,
+            ),
+        )
+        return list(by_type_name.get(type_name, ()))
+
+    def get_entity_creations_by_name(self, entity_name: str) -> list["EntityCreation"]:
+        """Find the statements that create an entity with the given name.
+
+        Args:
+            entity_name: The name of the entity.
+
+        Returns:
+            The entity creations for entity_name, in source order, or an
+            empty list if there are none.
+        """
+        by_entity_name = _as_node_list(self.statements).cached_index(
+            "entity_creations_by_name",
+            lambda statements: _by_name(
+                [stmt for stmt in statements if isinstance(stmt, EntityCreation)],
+                lambda stmt: stmt.entity_name,
+            ),
+        )
+        return list(by_entity_name.get(entity_name, ()))
+
+
+@dataclass(slots=True)
 class BaseTypeDeclaration(ASTNode):
     """Base class for type declarations."""
 
     type_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CompilerTypeDeclaration(BaseTypeDeclaration):
     """Represents a compiler type declaration (e.g., Number is.)."""
 
 
-@dataclass
+@dataclass(slots=True)
 class TypeDeclaration(BaseTypeDeclaration):
     """Represents a type declaration with a parent type (e.g., Source is a ViewPoint)."""
 
     parent_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PropertyDeclaration(ASTNode):
     """Represents a property declaration (e.g., String has a String named value)."""
 
@@ -105,7 +428,7 @@ class PropertyDeclaration(ASTNode):
     property_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ValueReference(ASTNode):
     """Base class for values that can be assigned to a property or passed to an action.
 
@@ -113,41 +436,50 @@ class ValueReference(ASTNode):
     """
 
 
-@dataclass
+@dataclass(slots=True)
 class StringLiteral(ValueReference):
     """Represents a string literal value."""
 
     raw_value: str
+    _value: str | None = field(default=None, init=False, repr=False, compare=False)
 
-    @cached_property
+    @property
     def value(self) -> str:
         """Parse the raw string value by removing quotes and unescaping."""
-        if not (self.raw_value.startswith('"') and self.raw_value.endswith('"')):
-            raise StringLiteralError(f"Invalid string literal: '{self.raw_value}'")
-        # TODO: Better string literal parsing
-        return self.raw_value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        if self._value is None:
+            if not (self.raw_value.startswith('"') and self.raw_value.endswith('"')):
+                raise StringLiteralError(f"Invalid string literal: '{self.raw_value}'")
+            # TODO: Better string literal parsing
+            self._value = self.raw_value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        return self._value
 
 
-@dataclass
+@dataclass(slots=True)
 class NumberLiteral(ValueReference):
     """Represents a numeric literal value (integer or floating-point)."""
 
     raw_value: str
+    _value: float | int | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
-    @cached_property
+    @property
     def value(self) -> float | int:
         """Parse the raw number value to int or float."""
-        try:
-            if "." in self.raw_value:
-                return float(self.raw_value)
-            return int(self.raw_value)
-        except ValueError as e:
-            raise NumberLiteralError(
-                f"Invalid number literal: '{self.raw_value}'"
-            ) from e
-
-
-@dataclass
+        if self._value is None:
+            try:
+                if "." in self.raw_value:
+                    self._value = float(self.raw_value)
+                else:
+                    self._value = int(self.raw_value)
+            except ValueError as e:
+                raise NumberLiteralError(
+                    f"Invalid number literal: '{self.raw_value}'"
+                ) from e
+        return self._value
+
+
+@dataclass(slots=True)
 class PropertyOrEntityReference(ValueReference):
     """Represents a reference to a property or entity (e.g., Owner's propertyName)."""
 
@@ -155,7 +487,7 @@ class PropertyOrEntityReference(ValueReference):
     property_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class EntityCreation(ASTNode):
     """Represents an entity creation (e.g., Source creates a String named helloWorld:)."""
 
@@ -165,7 +497,7 @@ class EntityCreation(ASTNode):
     properties: list["PropertyAssignment"]
 
 
-@dataclass
+@dataclass(slots=True)
 class PropertyAssignment(ASTNode):
     """Represents a property assignment (e.g., value: "Hello, world!")."""
 
@@ -173,7 +505,7 @@ class PropertyAssignment(ASTNode):
     value: ValueReference
 
 
-@dataclass
+@dataclass(slots=True)
 class KnowledgeStatement(ASTNode):
     """Represents a knowledge statement (e.g., Machine knows Source's helloWorld)."""
 
@@ -182,7 +514,7 @@ class KnowledgeStatement(ASTNode):
     entity_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionParameter(ASTNode):
     """Represents an action parameter (e.g., a String named str)."""
 
@@ -190,7 +522,7 @@ class ActionParameter(ASTNode):
     param_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionDeclaration(ASTNode):
     """Represents an action declaration (e.g., Terminal can Output using a String named str:)."""
 
@@ -200,7 +532,7 @@ class ActionDeclaration(ASTNode):
     body: list["ActionExecution"] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionExecution(ASTNode):
     """Represents an action execution (e.g., Machine makes terminal Output helloWorld.)."""
 
@@ -208,3 +540,34 @@ class ActionExecution(ASTNode):
     target: PropertyOrEntityReference
     action_name: str
     arguments: list[ValueReference]
+
+
+@cache
+def _child_fields(node_type: type[ASTNode]) -> tuple[str, ...]:
+    return tuple(
+        f.name
+        for f in fields(node_type)
+        if f.name not in ("span", "lines") and not f.name.startswith("_")
+    )
+
+
+def walk(node: ASTNode) -> Iterator[ASTNode]:
+    """Return node and all the nodes under it, each before its children."""
+    yield node
+    for name in _child_fields(type(node)):
+        value = getattr(node, name)
+        if isinstance(value, ASTNode):
+            yield from walk(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ASTNode):
+                    yield from walk(item)
+
+
+def shift_spans(nodes: Iterable[ASTNode], lines: int) -> None:
+    """Move the spans of nodes, and of the nodes under them, some lines down."""
+    if not lines:
+        return
+    for node in nodes:
+        for child in walk(node):
+            child.span = shift_span(child.span, lines)
@@ -0,0 +1,176 @@
+"""An on-disk cache of parsed ASTs, keyed by the content of their source."""
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import lark
+
+from compiler import ast, binary_ast, indenter, parser, prelex, symbols, transformer
+from compiler.symbols import SymbolTable
+
+# The modules whose code decides what AST a source produces. Changing any
+# of them invalidates every cache entry.
+_AST_MODULES = (ast, binary_ast, indenter, parser, prelex, symbols, transformer)
+
+ENTRY_SUFFIX = ".ast"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@cache
+def compiler_hash() -> str:
+    """Return a SHA-256 hex digest identifying this version of the compiler.
+
+    It covers the source of every module that shapes the AST and the Lark
+    version. The grammar is hashed separately, by parser.grammar_hash.
+    """
+    digest = hashlib.sha256(lark.__version__.encode())
+    for module in _AST_MODULES:
+        digest.update(Path(module.__file__ or "").read_bytes())
+    return digest.hexdigest()
+
+
+def cache_key(source: str) -> str:
+    """Return the cache key for a source file's contents.
+
+    The key combines the SHA-256 of the source with the grammar hash and
+    the compiler hash, so an entry is only ever found by the compiler
+    that wrote it.
+    """
+    digest = hashlib.sha256(source.encode("utf-8"))
+    digest.update(parser.grammar_hash().encode())
+    digest.update(compiler_hash().encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counts of what happened to lookups in an AstCache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits, or 0 if there were none."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class AstCache:
+    """A size-bounded cache of ASTs in a directory, in binary_ast's encoding.
+
+    Entries are evicted least recently used first once the total size of
+    the directory goes over max_bytes. Recency is kept in each entry's
+    modification time, so it carries over between runs.
+
+    Entries are only read back by the compiler that wrote them (see
+    cache_key). Unlike pickles, an entry can only ever decode to an AST,
+    so a corrupt entry is a miss rather than a risk.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        symbols: SymbolTable | None = None,
+    ) -> None:
+        """Open a cache, creating its directory if needed.
+
+        Args:
+            directory: Where to store the entries.
+            max_bytes: The total size the entries may take up.
+            symbols: The table to intern the names in ASTs read from the
+                cache into. A new table is used if none is given, and it's
+                shared by every AST the cache returns.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.stats = CacheStats()
+        directory.mkdir(parents=True, exist_ok=True)
+        # Entry sizes, least recently used first.
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        entries = []
+        for path in directory.glob(f"*{ENTRY_SUFFIX}"):
+            stat = path.stat()
+            entries.append((stat.st_mtime_ns, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+        self._total_bytes = sum(self._sizes.values())
+
+    def __len__(self) -> int:
+        """Return the number of entries in the cache."""
+        return len(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        """The total size of the entries in the cache."""
+        return self._total_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, source: str) -> ast.Program | None:
+        """Look up the AST for a source file's contents.
+
+        Returns:
+            The cached AST, or None if there isn't one.
+        """
+        key = cache_key(source)
+        if key in self._sizes:
+            path = self._path(key)
+            try:
+                program = binary_ast.decode(path.read_bytes(), self.symbols)
+                os.utime(path)
+            except (OSError, binary_ast.FormatError):
+                # Removed by another process, or truncated. Drop it and
+                # treat it as a miss.
+                self._discard(key)
+            else:
+                self._sizes.move_to_end(key)
+                self.stats.hits += 1
+                return program
+        self.stats.misses += 1
+        return None
+
+    def put(self, source: str, program: ast.Program) -> None:
+        """Store the AST for a source file's contents."""
+        self.put_encoded(source, binary_ast.encode(program))
+
+    def put_encoded(self, source: str, data: bytes) -> None:
+        """Store an AST already encoded with binary_ast.encode."""
+        key = cache_key(source)
+        # Write to a temporary file and rename it into place, so readers
+        # never see a partly written entry.
+        fd, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            Path(temp_name).replace(self._path(key))
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        self._total_bytes += len(data) - self._sizes.pop(key, 0)
+        self._sizes[key] = len(data)
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        for key in list(self._sizes):
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        self._total_bytes -= self._sizes.pop(key)
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._sizes:
+            self._discard(next(iter(self._sizes)))
+            self.stats.evictions += 1
@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+from compiler import ast, ast_cache
+from compiler.ast_cache import AstCache
+from compiler.parser import Parser
+
+_SOURCE = "AbstractUniverse:\n    Foo is a ViewPoint.\n"
+
+
+def _source(i: int) -> str:
+    return f"AbstractUniverse:\n    Type{i} is a ViewPoint.\n"
+
+
+def test_miss_then_hit(tmp_path: Path):
+    cache = AstCache(tmp_path)
+    program = Parser().parse_to_ast(_SOURCE)
+    assert cache.get(_SOURCE) is None
+    cache.put(_SOURCE, program)
+    assert cache.get(_SOURCE) == program
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_entries_persist(tmp_path: Path):
+    program = Parser().parse_to_ast(_SOURCE)
+    AstCache(tmp_path).put(_SOURCE, program)
+    reopened = AstCache(tmp_path)
+    assert len(reopened) == 1
+    assert reopened.get(_SOURCE) == program
+
+
+def test_key_includes_compiler_and_grammar(monkeypatch: pytest.MonkeyPatch):
+    key = ast_cache.cache_key(_SOURCE)
+    assert ast_cache.cache_key(_SOURCE + "\n") != key
+    monkeypatch.setattr(ast_cache, "compiler_hash", lambda: "other")
+    assert ast_cache.cache_key(_SOURCE) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(ast_cache.parser, "grammar_hash", lambda: "other")
+    assert ast_cache.cache_key(_SOURCE) != key
+
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    parser = Parser()
+    programs = [parser.parse_to_ast(_source(i)) for i in range(3)]
+    cache = AstCache(tmp_path)
+    cache.put(_source(0), programs[0])
+    entry_bytes = cache.total_bytes
+    cache.max_bytes = entry_bytes * 2
+    cache.put(_source(1), programs[1])
+    # Using entry 0 makes entry 1 the least recently used.
+    assert cache.get(_source(0)) is not None
+    cache.put(_source(2), programs[2])
+
+    assert cache.stats.evictions == 1
+    assert cache.get(_source(1)) is None
+    assert cache.get(_source(0)) == programs[0]
+    assert cache.get(_source(2)) == programs[2]
+    assert cache.total_bytes <= cache.max_bytes
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_corrupt_entry_is_a_miss(tmp_path: Path):
+    cache = AstCache(tmp_path)
+    cache.put(_SOURCE, Parser().parse_to_ast(_SOURCE))
+    (entry,) = tmp_path.iterdir()
+    entry.write_bytes(b"")
+    assert cache.get(_SOURCE) is None
+    assert len(cache) == 0
+    assert not entry.exists()
+
+
+def test_names_are_interned_into_the_cache_symbols(tmp_path: Path):
+    parser = Parser()
+    cache = AstCache(tmp_path)
+    for i in range(2):
+        cache.put(_source(i), parser.parse_to_ast(_source(i)))
+
+    parents = []
+    for i in range(2):
+        program = cache.get(_source(i))
+        assert program is not None
+        (declaration,) = program.get_abstract_universe().statements
+        assert isinstance(declaration, ast.TypeDeclaration)
+        parents.append(declaration.parent_type)
+
+    assert parents[0] is parents[1]
+    assert "Type1" in cache.symbols
+
+
+def test_clear(tmp_path: Path):
+    cache = AstCache(tmp_path)
+    cache.put(_SOURCE, Parser().parse_to_ast(_SOURCE))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+    assert list(tmp_path.iterdir()) == []
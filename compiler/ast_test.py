@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from compiler import ast
@@ -90,6 +92,153 @@ def test_get_statements_by_type_subclass():
     assert result[1] is type_decl
 
 
+def test_get_statements_by_type_sees_appended_statement():
+    type_decl = ast.TypeDeclaration(type_name="Foo", parent_type="Bar")
+    universe = ast.UniverseBlock(name="AbstractUniverse", statements=[type_decl])
+    assert universe.get_statements_by_type(ast.TypeDeclaration) == [type_decl]
+
+    new_decl = ast.TypeDeclaration(type_name="Baz", parent_type="Bar")
+    universe.statements.append(new_decl)
+    assert universe.get_statements_by_type(ast.TypeDeclaration) == [
+        type_decl,
+        new_decl,
+    ]
+
+
+def test_get_statements_by_type_sees_replaced_list():
+    type_decl = ast.TypeDeclaration(type_name="Foo", parent_type="Bar")
+    universe = ast.UniverseBlock(name="AbstractUniverse", statements=[type_decl])
+    assert universe.get_statements_by_type(ast.TypeDeclaration) == [type_decl]
+
+    universe.statements = []
+    assert isinstance(universe.statements, ast.NodeList)
+    assert universe.get_statements_by_type(ast.TypeDeclaration) == []
+
+
+def test_get_statements_by_type_result_is_a_copy():
+    type_decl = ast.TypeDeclaration(type_name="Foo", parent_type="Bar")
+    universe = ast.UniverseBlock(name="AbstractUniverse", statements=[type_decl])
+    universe.get_statements_by_type(ast.TypeDeclaration).clear()
+    assert universe.get_statements_by_type(ast.TypeDeclaration) == [type_decl]
+
+
+# UniverseBlock.get_declarations_by_type_name tests
+
+
+def test_get_declarations_by_type_name():
+    type_decl = ast.TypeDeclaration(type_name="Foo", parent_type="Bar")
+    prop_decl = ast.PropertyDeclaration(
+        type_name="Foo", property_type="String", property_name="value"
+    )
+    action_decl = ast.ActionDeclaration(
+        type_name="Foo", action_name="Act", parameters=[]
+    )
+    other_decl = ast.CompilerTypeDeclaration(type_name="Bar")
+    entity = ast.EntityCreation(
+        creator="Source", type_name="Foo", entity_name="foo", properties=[]
+    )
+    universe = ast.UniverseBlock(
+        name="AbstractUniverse",
+        statements=[type_decl, other_decl, prop_decl, entity, action_decl],
+    )
+    assert universe.get_declarations_by_type_name("Foo") == [
+        type_decl,
+        prop_decl,
+        action_decl,
+    ]
+    assert universe.get_declarations_by_type_name("Bar") == [other_decl]
+    assert universe.get_declarations_by_type_name("Missing") == []
+
+
+def test_get_declarations_by_type_name_sees_removed_statement():
+    type_decl = ast.TypeDeclaration(type_name="Foo", parent_type="Bar")
+    universe = ast.UniverseBlock(name="AbstractUniverse", statements=[type_decl])
+    assert universe.get_declarations_by_type_name("Foo") == [type_decl]
+
+    del universe.statements[0]
+    assert universe.get_declarations_by_type_name("Foo") == []
+
+
+# UniverseBlock.get_entity_creations_by_name tests
+
+
+def test_get_entity_creations_by_name():
+    greeting = ast.EntityCreation(
+        creator="Source", type_name="String", entity_name="greeting", properties=[]
+    )
+    count = ast.EntityCreation(
+        creator="Source", type_name="Number", entity_name="count", properties=[]
+    )
+    universe = ast.UniverseBlock(name="AbstractUniverse", statements=[greeting, count])
+    assert universe.get_entity_creations_by_name("greeting") == [greeting]
+    assert universe.get_entity_creations_by_name("missing") == []
+
+    universe.statements[0] = count
+    assert universe.get_entity_creations_by_name("greeting") == []
+    assert universe.get_entity_creations_by_name("count") == [count, count]
+
+
+# NodeList tests
+
+
+def test_node_list_drops_indexes_on_every_mutation():
+    mutations = [
+        lambda nodes: nodes.append(3),
+        lambda nodes: nodes.extend([3]),
+        lambda nodes: nodes.insert(0, 3),
+        lambda nodes: nodes.remove(1),
+        lambda nodes: nodes.pop(),
+        lambda nodes: nodes.clear(),
+        lambda nodes: nodes.sort(reverse=True),
+        lambda nodes: nodes.reverse(),
+        lambda nodes: nodes.__setitem__(0, 3),
+        lambda nodes: nodes.__setitem__(slice(0, 1), [3, 4]),
+        lambda nodes: nodes.__delitem__(0),
+        lambda nodes: nodes.__iadd__([3]),
+        lambda nodes: nodes.__imul__(2),
+    ]
+    for mutate in mutations:
+        nodes = ast.NodeList([1, 2])
+        assert nodes.cached_index("sum", sum) == 3
+        mutate(nodes)
+        assert nodes.cached_index("sum", sum) == sum(list(nodes))
+
+
+def test_node_list_pickles_without_indexes():
+    nodes = ast.NodeList([1, 2])
+    nodes.cached_index("sum", sum)
+    restored = pickle.loads(pickle.dumps(nodes))  # noqa: S301 - our own data
+    assert isinstance(restored, ast.NodeList)
+    assert restored == [1, 2]
+    assert restored.cached_index("sum", lambda _items: -1) == -1
+
+
+def test_program_universe_lookup_sees_appended_universe():
+    abstract_universe = ast.UniverseBlock(name="AbstractUniverse", statements=[])
+    program = ast.Program(universes=[abstract_universe])
+    with pytest.raises(ast.UniverseNotFoundError):
+        program.get_physical_universe()
+
+    physical_universe = ast.UniverseBlock(name="PhysicalUniverse", statements=[])
+    program.universes.append(physical_universe)
+    assert program.get_physical_universe() is physical_universe
+
+
+def test_program_round_trips_through_pickle():
+    universe = ast.UniverseBlock(
+        name="AbstractUniverse",
+        statements=[ast.TypeDeclaration(type_name="Foo", parent_type="Bar")],
+    )
+    program = ast.Program(universes=[universe])
+    program.get_abstract_universe().get_statements_by_type(ast.TypeDeclaration)
+    restored = pickle.loads(pickle.dumps(program))  # noqa: S301 - our own data
+    assert restored == program
+    assert isinstance(restored.universes, ast.NodeList)
+    assert restored.get_abstract_universe().get_declarations_by_type_name("Foo") == [
+        restored.get_abstract_universe().statements[0]
+    ]
+
+
 # StringLiteral.value tests
 
 
@@ -118,6 +267,17 @@ def test_string_literal_value_empty_string():
     assert literal.value == ""
 
 
+def test_string_literal_value_is_decoded_once():
+    literal = ast.StringLiteral(raw_value='"hello"')
+    assert literal.value is literal.value
+
+
+def test_string_literal_decoded_value_does_not_affect_equality():
+    decoded = ast.StringLiteral(raw_value='"hello"')
+    _ = decoded.value
+    assert decoded == ast.StringLiteral(raw_value='"hello"')
+
+
 def test_string_literal_value_no_quotes():
     literal = ast.StringLiteral(raw_value="hello")
     with pytest.raises(ast.StringLiteralError) as exc_info:
@@ -178,6 +338,11 @@ def test_number_literal_value_float_with_trailing_zero():
     assert isinstance(literal.value, float)
 
 
+def test_number_literal_value_is_decoded_once():
+    literal = ast.NumberLiteral(raw_value="3.14")
+    assert literal.value is literal.value
+
+
 def test_number_literal_value_invalid():
     literal = ast.NumberLiteral(raw_value="not_a_number")
     with pytest.raises(ast.NumberLiteralError) as exc_info:
@@ -190,3 +355,73 @@ def test_number_literal_value_empty():
     with pytest.raises(ast.NumberLiteralError) as exc_info:
         _ = literal.value
     assert "Invalid number literal: ''" in str(exc_info.value)
+
+
+# Span tests
+
+
+def test_span_round_trips_positions():
+    span = ast.make_span((3, 5), (70_000, 1 << 20))
+
+    assert ast.span_start(span) == (3, 5)
+    assert ast.span_end(span) == (70_000, 1 << 20)
+    assert ast.span_start(ast.shift_span(span, 2)) == (5, 5)
+    assert ast.span_end(ast.shift_span(span, -2)) == (69_998, 1 << 20)
+    assert ast.shift_span(ast.NO_SPAN, 2) == ast.NO_SPAN
+
+
+def test_span_does_not_affect_equality():
+    assert ast.TypeDeclaration("A", "B", span=ast.make_span((1, 1), (1, 2))) == (
+        ast.TypeDeclaration("A", "B")
+    )
+
+
+def test_line_table():
+    source = "ab\n\ncd\n"
+    lines = ast.LineTable(source)
+
+    assert len(lines) == 4
+    assert lines.offset((3, 2)) == 5
+    assert lines.position(5) == (3, 2)
+    assert lines.position(2) == (1, 3)
+    assert lines.offsets(ast.make_span((1, 2), (3, 3))) == (1, 6)
+    with pytest.raises(IndexError):
+        lines.offset((5, 1))
+
+
+def test_line_table_pickles_without_the_source():
+    lines = ast.LineTable("a\nb\n")
+
+    data = pickle.dumps(lines)
+
+    assert b"a\nb" not in data
+    assert pickle.loads(data) == lines  # noqa: S301 - pickled just above
+
+
+def test_walk_and_shift_spans():
+    span = ast.make_span((2, 5), (2, 9))
+    target = ast.PropertyOrEntityReference("A", "b", span=span)
+    argument = ast.NumberLiteral("1", span=span)
+    execution = ast.ActionExecution("A", target, "Go", [argument], span=span)
+
+    assert list(ast.walk(execution)) == [execution, target, argument]
+    ast.shift_spans([execution], 3)
+    assert {ast.span_start(node.span) for node in ast.walk(execution)} == {(5, 5)}
+
+
+# Node representation tests
+
+
+_NODE_TYPES = [
+    value
+    for value in vars(ast).values()
+    if isinstance(value, type) and issubclass(value, ast.ASTNode)
+]
+
+
+@pytest.mark.parametrize(
+    "node_type", _NODE_TYPES, ids=lambda node_type: node_type.__name__
+)
+def test_nodes_have_no_instance_dict(node_type: type[ast.ASTNode]):
+    assert "__slots__" in vars(node_type)
+    assert "__dict__" not in dir(node_type)
@@ -0,0 +1,483 @@
+"""A compact binary encoding of ASTs, for caches and for worker processes.
+
+An encoded program starts with a header, followed by two string tables
+(names, which are interned when decoded, and literals), the program's line
+table, a directory of its universe blocks, and then a section for each
+universe block:
+
+    header      magic, format version, and the sizes of what follows
+    names       character length of each name, then their UTF-8 text
+    literals    the same, for the raw text of string and number literals
+    lines       the offset where each line starts, if the program has a
+                line table
+    directory   for each universe block: its name, its span, and where
+                its section is
+    sections    the nodes of each universe block, in flat arrays
+
+A section holds its block's nodes in postorder, so a node's children come
+before it: a byte per node for its type, two ints per node for its span
+(see ast.make_span) and an array of operands. Each type of node has a
+fixed list of operands: indexes into the string tables, indexes of child
+nodes, and lists of child nodes as a count followed by the indexes. The
+block's statement list comes last.
+
+All ints are little-endian. Each universe block is decoded on its own, so
+a reader can decode one block without the others (see ProgramReader).
+Changing the layout, or the node types, needs a new FORMAT_VERSION.
+"""
+
+import itertools
+import struct
+import sys
+from array import array
+from collections.abc import Buffer, Iterator, Sequence
+from typing import Any
+
+from compiler import ast
+from compiler.symbols import SymbolTable
+
+MAGIC = b"DAST"
+FORMAT_VERSION = 1
+
+# Magic, version, then the name count and length of their text in bytes,
+# the same for literals, the line count (0 for no line table) and the
+# universe block count.
+_HEADER = struct.Struct("<4sI6I")
+# For each universe block: its name, its span's two halves, and the start
+# and end of its section relative to the first section.
+_DIRECTORY_ENTRY_INTS = 5
+# The type of each node is its index here.
+_NODE_TYPES: tuple[type[ast.ASTNode], ...] = (
+    ast.CompilerTypeDeclaration,
+    ast.TypeDeclaration,
+    ast.PropertyDeclaration,
+    ast.StringLiteral,
+    ast.NumberLiteral,
+    ast.PropertyOrEntityReference,
+    ast.EntityCreation,
+    ast.PropertyAssignment,
+    ast.KnowledgeStatement,
+    ast.ActionParameter,
+    ast.ActionDeclaration,
+    ast.ActionExecution,
+)
+_KINDS: dict[type[ast.ASTNode], int] = {
+    node_type: kind for kind, node_type in enumerate(_NODE_TYPES)
+}
+(
+    _COMPILER_TYPE_DECLARATION,
+    _TYPE_DECLARATION,
+    _PROPERTY_DECLARATION,
+    _STRING_LITERAL,
+    _NUMBER_LITERAL,
+    _PROPERTY_OR_ENTITY_REFERENCE,
+    _ENTITY_CREATION,
+    _PROPERTY_ASSIGNMENT,
+    _KNOWLEDGE_STATEMENT,
+    _ACTION_PARAMETER,
+    _ACTION_DECLARATION,
+    _ACTION_EXECUTION,
+) = range(len(_NODE_TYPES))
+
+# A span is stored as two ints: the packed start position and end position.
+_POSITION_BITS = ast.LINE_BITS + ast.COLUMN_BITS
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+
+
+class FormatError(Exception):
+    """The data isn't an encoded program that this compiler can read."""
+
+
+def _little_endian(values: "array[Any]") -> "array[Any]":
+    # Arrays are in the machine's byte order, and the format's is little.
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class _Strings:
+    """A string table being built."""
+
+    def __init__(self) -> None:
+        self.indexes: dict[str, int] = {}
+
+    def add(self, string: str) -> int:
+        index = self.indexes.get(string)
+        if index is None:
+            index = self.indexes[string] = len(self.indexes)
+        return index
+
+    def encode(self) -> tuple[int, bytes, bytes]:
+        """Return the count, the lengths and the text of the strings."""
+        lengths = _little_endian(array("I", map(len, self.indexes)))
+        return len(self.indexes), lengths.tobytes(), "".join(self.indexes).encode()
+
+
+class _Section:
+    """The arrays of one universe block being built."""
+
+    def __init__(self, names: _Strings, literals: _Strings) -> None:
+        self.names = names
+        self.literals = literals
+        self.kinds = bytearray()
+        self.spans = array("Q")
+        self.operands = array("I")
+
+    def nodes(self, nodes: list[Any]) -> list[int]:
+        return [self.node(node) for node in nodes]
+
+    def node(self, node: ast.ASTNode) -> int:
+        """Add a node after its children, and return its index."""
+        name = self.names.add
+        kind = _KINDS.get(type(node))
+        if kind is None:
+            raise TypeError(f"Can't encode a {type(node).__name__}")
+        operands: Sequence[int]
+        match node:
+            case ast.TypeDeclaration():
+                operands = (name(node.type_name), name(node.parent_type))
+            case ast.CompilerTypeDeclaration():
+                operands = (name(node.type_name),)
+            case ast.PropertyDeclaration():
+                operands = (
+                    name(node.type_name),
+                    name(node.property_type),
+                    name(node.property_name),
+                )
+            case ast.StringLiteral() | ast.NumberLiteral():
+                operands = (self.literals.add(node.raw_value),)
+            case ast.PropertyOrEntityReference():
+                operands = (name(node.owner), name(node.property_name))
+            case ast.EntityCreation():
+                properties = self.nodes(node.properties)
+                operands = (
+                    name(node.creator),
+                    name(node.type_name),
+                    name(node.entity_name),
+                    len(properties),
+                    *properties,
+                )
+            case ast.PropertyAssignment():
+                operands = (name(node.name), self.node(node.value))
+            case ast.KnowledgeStatement():
+                operands = (
+                    name(node.knower),
+                    name(node.owner),
+                    name(node.entity_name),
+                )
+            case ast.ActionParameter():
+                operands = (name(node.param_type), name(node.param_name))
+            case ast.ActionDeclaration():
+                parameters = self.nodes(node.parameters)
+                body = self.nodes(node.body)
+                operands = (
+                    name(node.type_name),
+                    name(node.action_name),
+                    len(parameters),
+                    *parameters,
+                    len(body),
+                    *body,
+                )
+            case ast.ActionExecution():
+                target = self.node(node.target)
+                arguments = self.nodes(node.arguments)
+                operands = (
+                    name(node.actor),
+                    target,
+                    name(node.action_name),
+                    len(arguments),
+                    *arguments,
+                )
+            case _:
+                raise AssertionError(type(node))
+        self.kinds.append(kind)
+        self.spans.append(node.span >> _POSITION_BITS)
+        self.spans.append(node.span & _POSITION_MASK)
+        self.operands.extend(operands)
+        return len(self.kinds) - 1
+
+    def encode(self, statements: list[ast.ASTNode]) -> bytes:
+        roots = self.nodes(statements)
+        self.operands.append(len(roots))
+        self.operands.extend(roots)
+        return b"".join(
+            (
+                struct.pack("<2I", len(self.kinds), len(self.operands)),
+                self.kinds,
+                _little_endian(self.spans).tobytes(),
+                _little_endian(self.operands).tobytes(),
+            )
+        )
+
+
+def encode(program: ast.Program) -> bytes:
+    """Return the binary encoding of a program."""
+    names = _Strings()
+    literals = _Strings()
+    directory = array("Q")
+    sections = []
+    offset = 0
+    for universe in program.universes:
+        section = _Section(names, literals).encode(universe.statements)
+        directory.extend(
+            (
+                names.add(universe.name),
+                universe.span >> _POSITION_BITS,
+                universe.span & _POSITION_MASK,
+                offset,
+                offset + len(section),
+            )
+        )
+        sections.append(section)
+        offset += len(section)
+    name_count, name_lengths, name_text = names.encode()
+    literal_count, literal_lengths, literal_text = literals.encode()
+    lines = program.lines.starts if program.lines is not None else array("q")
+    return b"".join(
+        (
+            _HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                name_count,
+                len(name_text),
+                literal_count,
+                len(literal_text),
+                len(lines),
+                len(program.universes),
+            ),
+            name_lengths,
+            name_text,
+            literal_lengths,
+            literal_text,
+            _little_endian(array("q", lines)).tobytes(),
+            _little_endian(directory).tobytes(),
+            *sections,
+        )
+    )
+
+
+class _Reader:
+    """Reads the parts of an encoded program in order."""
+
+    def __init__(self, data: memoryview) -> None:
+        self.data = data
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        if self.offset + size > len(self.data):
+            raise FormatError("The encoded program is truncated")
+        part = self.data[self.offset : self.offset + size]
+        self.offset += size
+        return part
+
+    def array(self, typecode: str, count: int) -> "array[int]":
+        values = array(typecode)
+        values.frombytes(self.take(count * values.itemsize))
+        return _little_endian(values)
+
+    def strings(self, count: int, size: int) -> list[str]:
+        lengths = self.array("I", count)
+        text = str(self.take(size), "utf-8")
+        ends = list(itertools.accumulate(lengths))
+        return [
+            text[end - length : end] for end, length in zip(ends, lengths, strict=True)
+        ]
+
+
+class ProgramReader:
+    """An encoded program, whose universe blocks are decoded on demand.
+
+    Reading the header, the string tables and the directory is all that
+    happens up front. Each universe block is decoded the first time it's
+    asked for, and not again.
+    """
+
+    def __init__(self, data: Buffer, symbols: SymbolTable | None = None) -> None:
+        """Read an encoded program's header.
+
+        Args:
+            data: The encoded program, such as a memory map of a file
+                holding one. It must not change while the reader is used.
+            symbols: The table to intern names into. A new table is used
+                if none is given.
+
+        Raises:
+            FormatError: If data isn't an encoded program, or is in a
+                format version this compiler can't read.
+        """
+        view = memoryview(data).cast("B")
+        if len(view) < _HEADER.size:
+            raise FormatError("The encoded program is truncated")
+        (
+            magic,
+            version,
+            name_count,
+            name_size,
+            literal_count,
+            literal_size,
+            line_count,
+            universe_count,
+        ) = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise FormatError("The data isn't an encoded program")
+        if version != FORMAT_VERSION:
+            raise FormatError(
+                f"The program is encoded in format version {version}, but "
+                f"only version {FORMAT_VERSION} can be read"
+            )
+        symbols = symbols if symbols is not None else SymbolTable()
+        reader = _Reader(view)
+        reader.offset = _HEADER.size
+        try:
+            self._names = [
+                symbols.intern(name) for name in reader.strings(name_count, name_size)
+            ]
+            self._literals = reader.strings(literal_count, literal_size)
+        except UnicodeDecodeError as e:
+            raise FormatError(f"The string tables aren't UTF-8: {e}") from e
+        self._lines = (
+            ast.LineTable.from_starts(reader.array("q", line_count))
+            if line_count
+            else None
+        )
+        directory = reader.array("Q", universe_count * _DIRECTORY_ENTRY_INTS)
+        self._entries = [
+            directory[i : i + _DIRECTORY_ENTRY_INTS]
+            for i in range(0, len(directory), _DIRECTORY_ENTRY_INTS)
+        ]
+        self._sections = view[reader.offset :]
+        self._universes: dict[int, ast.UniverseBlock] = {}
+        for entry in self._entries:
+            if not entry[3] <= entry[4] <= len(self._sections):
+                raise FormatError("The encoded program is truncated")
+            if entry[0] >= len(self._names):
+                raise FormatError("A universe block's name isn't in the table")
+
+    def __len__(self) -> int:
+        """Return the number of universe blocks in the program."""
+        return len(self._entries)
+
+    @property
+    def universe_names(self) -> list[str]:
+        """The name of each universe block, without decoding any of them."""
+        return [self._names[entry[0]] for entry in self._entries]
+
+    def universe(self, index: int) -> ast.UniverseBlock:
+        """Return a universe block, decoding it if it hasn't been yet.
+
+        Raises:
+            IndexError: If there's no universe block at index.
+            FormatError: If the block's section is malformed.
+        """
+        universe = self._universes.get(index)
+        if universe is None:
+            name, span_start, span_end, start, end = self._entries[index]
+            try:
+                statements = self._decode(self._sections[start:end])
+            except (IndexError, StopIteration, ValueError) as e:
+                raise FormatError(f"Universe block {index} is malformed: {e}") from e
+            universe = ast.UniverseBlock(
+                self._names[name],
+                statements,
+                span=span_start << _POSITION_BITS | span_end,
+            )
+            self._universes[index] = universe
+        return universe
+
+    def program(self) -> ast.Program:
+        """Return the whole program, decoding every universe block.
+
+        Raises:
+            FormatError: If a block's section is malformed.
+        """
+        program = ast.Program([self.universe(i) for i in range(len(self))])
+        program.lines = self._lines
+        return program
+
+    def _decode(self, section: memoryview) -> list[ast.ASTNode]:
+        reader = _Reader(section)
+        node_count, operand_count = struct.unpack("<2I", reader.take(8))
+        kinds = reader.take(node_count)
+        spans = reader.array("Q", 2 * node_count)
+        operands: Iterator[int] = iter(reader.array("I", operand_count))
+        names = self._names
+        literals = self._literals
+        nodes: list[Any] = []
+        append = nodes.append
+
+        def node_list() -> list[Any]:
+            return [nodes[next(operands)] for _ in range(next(operands))]
+
+        # Operands are taken in the order the encoder wrote them.
+        for i in range(node_count):
+            kind = kinds[i]
+            if kind == _TYPE_DECLARATION:
+                node = ast.TypeDeclaration(names[next(operands)], names[next(operands)])
+            elif kind == _ACTION_EXECUTION:
+                node = ast.ActionExecution(
+                    names[next(operands)],
+                    nodes[next(operands)],
+                    names[next(operands)],
+                    node_list(),
+                )
+            elif kind == _PROPERTY_OR_ENTITY_REFERENCE:
+                node = ast.PropertyOrEntityReference(
+                    names[next(operands)], names[next(operands)]
+                )
+            elif kind == _STRING_LITERAL:
+                node = ast.StringLiteral(literals[next(operands)])
+            elif kind == _NUMBER_LITERAL:
+                node = ast.NumberLiteral(literals[next(operands)])
+            elif kind == _PROPERTY_DECLARATION:
+                node = ast.PropertyDeclaration(
+                    names[next(operands)], names[next(operands)], names[next(operands)]
+                )
+            elif kind == _ENTITY_CREATION:
+                node = ast.EntityCreation(
+                    names[next(operands)],
+                    names[next(operands)],
+                    names[next(operands)],
+                    node_list(),
+                )
+            elif kind == _PROPERTY_ASSIGNMENT:
+                node = ast.PropertyAssignment(
+                    names[next(operands)], nodes[next(operands)]
+                )
+            elif kind == _KNOWLEDGE_STATEMENT:
+                node = ast.KnowledgeStatement(
+                    names[next(operands)], names[next(operands)], names[next(operands)]
+                )
+            elif kind == _ACTION_PARAMETER:
+                node = ast.ActionParameter(names[next(operands)], names[next(operands)])
+            elif kind == _ACTION_DECLARATION:
+                node = ast.ActionDeclaration(
+                    names[next(operands)],
+                    names[next(operands)],
+                    node_list(),
+                    node_list(),
+                )
+            elif kind == _COMPILER_TYPE_DECLARATION:
+                node = ast.CompilerTypeDeclaration(names[next(operands)])
+            else:
+                raise ValueError(f"Unknown node type {kind}")
+            node.span = spans[2 * i] << _POSITION_BITS | spans[2 * i + 1]
+            append(node)
+        statements = node_list()
+        if next(operands, None) is not None:
+            raise ValueError("Operands are left over")
+        return statements
+
+
+def decode(data: Buffer, symbols: SymbolTable | None = None) -> ast.Program:
+    """Return the program a binary encoding holds.
+
+    Args:
+        data: The encoded program.
+        symbols: The table to intern names into. A new table is used if
+            none is given.
+
+    Raises:
+        FormatError: If data isn't an encoded program, or is in a format
+            version this compiler can't read.
+    """
+    return ProgramReader(data, symbols).program()
@@ -0,0 +1,144 @@
+import struct
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from compiler import ast, binary_ast
+from compiler.binary_ast import FormatError, ProgramReader
+from compiler.parser import Parser
+from compiler.symbols import SymbolTable
+
+_parser = Parser()
+
+_SOURCE = textwrap.dedent(
+    """\
+    AbstractUniverse:
+        String is.
+        Source is a ViewPoint.
+        Source has a String named label.
+        Source creates a String named greeting:
+            value: "Hello, \\"world\\"!"
+        Source creates a Number named count:
+            value: 4.5
+        Source can Greet using a String named text,
+        a Number named times:
+            Source makes Source's label Print "hi", 2, Source's count.
+
+    PhysicalUniverse:
+        Machine is a Computer.
+        Machine knows Source's greeting.
+        Machine makes Machine's terminal Output Source's greeting.
+    """
+)
+
+
+def _spans(program: ast.Program) -> list[int]:
+    return [node.span for universe in program.universes for node in ast.walk(universe)]
+
+
+def test_round_trip():
+    program = _parser.parse_to_ast(_SOURCE)
+
+    decoded = binary_ast.decode(binary_ast.encode(program))
+
+    assert decoded == program
+    assert _spans(decoded) == _spans(program)
+    assert decoded.lines == program.lines
+    assert decoded.get_abstract_universe().get_declarations_by_type_name("Source")
+
+
+@pytest.mark.parametrize(
+    "path",
+    sorted((Path(__file__).parent.parent / "examples").rglob("*.def")),
+    ids=lambda path: path.name,
+)
+def test_round_trip_examples(path: Path):
+    recovered = _parser.parse_recovering(path.read_text())
+
+    decoded = binary_ast.decode(binary_ast.encode(recovered.program))
+
+    assert decoded == recovered.program
+    assert _spans(decoded) == _spans(recovered.program)
+
+
+def test_round_trip_without_spans_or_lines():
+    program = ast.Program(
+        [
+            ast.UniverseBlock(
+                "AbstractUniverse", [ast.TypeDeclaration("Source", "ViewPoint")]
+            ),
+            ast.UniverseBlock("PhysicalUniverse", []),
+        ]
+    )
+
+    decoded = binary_ast.decode(binary_ast.encode(program))
+
+    assert decoded == program
+    assert decoded.lines is None
+    assert set(_spans(decoded)) == {ast.NO_SPAN}
+
+
+def test_names_are_interned():
+    symbols = SymbolTable()
+    data = binary_ast.encode(_parser.parse_to_ast(_SOURCE))
+
+    first = binary_ast.decode(data, symbols)
+    second = binary_ast.decode(data, symbols)
+
+    first_decl = first.get_abstract_universe().statements[1]
+    second_decl = second.get_abstract_universe().statements[1]
+    assert isinstance(first_decl, ast.TypeDeclaration)
+    assert isinstance(second_decl, ast.TypeDeclaration)
+    assert first_decl.type_name is second_decl.type_name
+    assert "Greet" in symbols
+    assert '"hi"' not in symbols
+
+
+def test_reader_decodes_universe_blocks_on_demand():
+    program = _parser.parse_to_ast(_SOURCE)
+    reader = ProgramReader(binary_ast.encode(program))
+
+    assert len(reader) == 2
+    assert reader.universe_names == ["AbstractUniverse", "PhysicalUniverse"]
+    physical = reader.universe(1)
+    assert physical == program.get_physical_universe()
+    assert physical.span == program.get_physical_universe().span
+    assert reader.universe(1) is physical
+    assert reader.program().universes[1] is physical
+
+
+def test_reader_reads_a_memory_view():
+    data = bytearray(b"\0" + binary_ast.encode(_parser.parse_to_ast(_SOURCE)))
+
+    reader = ProgramReader(memoryview(data)[1:])
+
+    assert reader.universe_names == ["AbstractUniverse", "PhysicalUniverse"]
+
+
+def test_unencodable_node():
+    program = ast.Program([ast.UniverseBlock("AbstractUniverse", [ast.ASTNode()])])
+
+    with pytest.raises(TypeError, match="Can't encode a ASTNode"):
+        binary_ast.encode(program)
+
+
+def test_not_an_encoded_program():
+    with pytest.raises(FormatError, match="isn't an encoded program"):
+        binary_ast.decode(b"\x80\x05" + bytes(64))
+
+
+def test_other_format_version():
+    data = bytearray(binary_ast.encode(_parser.parse_to_ast(_SOURCE)))
+    struct.pack_into("<I", data, 4, binary_ast.FORMAT_VERSION + 1)
+
+    with pytest.raises(FormatError, match="format version"):
+        binary_ast.decode(data)
+
+
+@pytest.mark.parametrize("size", [0, 10, 40, 200, -1])
+def test_truncated(size: int):
+    data = binary_ast.encode(_parser.parse_to_ast(_SOURCE))
+
+    with pytest.raises(FormatError):
+        binary_ast.decode(data[:size])
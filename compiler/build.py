@@ -0,0 +1,423 @@
+"""Compiling the files of a project in dependency order, in parallel.
+
+Proposal 9 guarantees that the dependencies between files are acyclic, so
+a file can be compiled as soon as the files it depends on are, while
+files that don't depend on each other are compiled at the same time.
+"""
+
+import os
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from compiler import ast, binary_ast, prelex, project, references
+from compiler.ast_cache import AstCache
+from compiler.dependencies import CircularDependencyError, find_cycles
+from compiler.parser import read_source
+from compiler.symbols import SymbolTable
+
+
+@dataclass
+class CompiledFile:
+    """The result of compiling one file."""
+
+    path: Path
+    # The AST, or None if the file couldn't be read or parsed, or wasn't
+    # compiled because a file it depends on has errors.
+    program: ast.Program | None
+    errors: list[str] = field(default_factory=list)
+    # The type names the file declares and refers to.
+    defined: frozenset[str] = frozenset()
+    referenced: frozenset[str] = frozenset()
+    # The CPU time compiling the file took, and the process that parsed it,
+    # or 0 if it didn't need parsing. CPU time rather than wall time, so
+    # that a worker waiting for a CPU doesn't count as busy.
+    seconds: float = 0.0
+    worker: int = 0
+
+
+def _parse_timed(path_or_source: Path | str) -> tuple[bytes | str, float, int]:
+    """Parse a file in a worker, as project.parse_in_worker does.
+
+    Returns:
+        What parse_in_worker returns, the CPU time it took, and the
+        worker's process ID.
+    """
+    start = time.process_time()
+    outcome = project.parse_in_worker(path_or_source)
+    return outcome, time.process_time() - start, os.getpid()
+
+
+def check_file(
+    result: CompiledFile, program: ast.Program, available: frozenset[str]
+) -> None:
+    """Validate a parsed file, filling in its result.
+
+    The only validation so far is that every type name the file refers to
+    is declared in the file, declared by a file it depends on, or built
+    in.
+
+    Args:
+        result: The file's result, to fill in.
+        program: The file's AST.
+        available: The type names declared by the files it depends on.
+    """
+    result.program = program
+    result.defined = frozenset(references.defined_names(program))
+    result.referenced = frozenset(references.referenced_names(program))
+    unknown = result.referenced - result.defined - available - references.BUILTIN_TYPES
+    result.errors.extend(f"Unknown type name: {name}" for name in sorted(unknown))
+
+
+def file_dependencies(
+    defined: Mapping[Path, Iterable[str]], referenced: Mapping[Path, Iterable[str]]
+) -> dict[Path, set[Path]]:
+    """Work out which files depend on which from the names in them.
+
+    Args:
+        defined: The type names each file declares.
+        referenced: The type names each file refers to.
+
+    Returns:
+        The files each file depends on: those that declare a name it
+        refers to but doesn't declare itself.
+    """
+    declaring_files: dict[str, list[Path]] = {}
+    for path, names in defined.items():
+        for name in names:
+            declaring_files.setdefault(name, []).append(path)
+    dependencies: dict[Path, set[Path]] = {}
+    for path, names in referenced.items():
+        own = set(defined.get(path, ()))
+        dependencies[path] = {
+            other
+            for name in names
+            if name not in own
+            for other in declaring_files.get(name, ())
+        }
+    return dependencies
+
+
+@dataclass
+class DependencyScan:
+    """What parsing a project's files to find their dependencies found."""
+
+    # The dependencies of each file that parsed.
+    dependencies: dict[Path, set[Path]]
+    # The files' ASTs and errors, so a build doesn't parse them again.
+    parsed: project.ProjectParse
+
+
+def scan_dependencies(
+    root: Path,
+    paths: Iterable[Path],
+    *,
+    max_workers: int | None = None,
+    cache: AstCache | None = None,
+) -> DependencyScan:
+    """Parse files to find out which depend on which.
+
+    A build reports what each file declares and refers to, so this is only
+    needed when there's no earlier build to take the dependencies from.
+    """
+    parsed = project.parse_files(root, paths, max_workers=max_workers, cache=cache)
+    dependencies = file_dependencies(
+        {
+            path: references.defined_names(program)
+            for path, program in parsed.programs.items()
+        },
+        {
+            path: references.referenced_names(program)
+            for path, program in parsed.programs.items()
+        },
+    )
+    return DependencyScan(dependencies, parsed)
+
+
+@dataclass
+class BuildStats:
+    """Where the time in a build went."""
+
+    workers: int
+    wall_seconds: float
+    # The time spent compiling files, summed over every worker.
+    busy_seconds: float
+    # The busy time of each worker process, by process ID.
+    busy_by_worker: dict[int, float]
+    # The chain of dependent files whose compile times add up to the most,
+    # and that sum. No number of workers can make a build faster than it.
+    critical_path: list[Path]
+    critical_path_seconds: float
+
+    @property
+    def utilization(self) -> float:
+        """The fraction of the workers' time spent compiling files."""
+        available = self.workers * self.wall_seconds
+        return self.busy_seconds / available if available else 0.0
+
+    @property
+    def parallelism(self) -> float:
+        """The most workers the build could keep busy on average."""
+        if not self.critical_path_seconds:
+            return 0.0
+        return self.busy_seconds / self.critical_path_seconds
+
+
+class Build:
+    """Compiles files in dependency order across a pool of worker processes.
+
+    Iterating over a Build runs it, and gives the result for each file as
+    soon as it's done. After that, stats describes the build.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        dependencies: Mapping[Path, Iterable[Path]],
+        *,
+        max_workers: int | None = None,
+        parsed: project.ProjectParse | None = None,
+        cache: AstCache | None = None,
+    ) -> None:
+        """Plan a build.
+
+        Args:
+            root: The project root.
+            dependencies: The files to compile, relative to root, and the
+                files each one depends on. Dependencies that aren't being
+                compiled are ignored.
+            max_workers: How many worker processes to use. Defaults to the
+                number of CPUs.
+            parsed: Files that have already been parsed (see
+                scan_dependencies). They're compiled from their ASTs and
+                errors rather than parsed again.
+            cache: A cache to look the other files' ASTs up in before
+                parsing them, and to store them in after. Files found in
+                it aren't sent to a worker.
+
+        Raises:
+            CircularDependencyError: If the files depend on each other in a
+                cycle.
+        """
+        self.root = root
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._parsed = parsed or project.ProjectParse()
+        self._cache = cache
+        # ASTs parsed by workers intern their names here.
+        self._symbols = cache.symbols if cache is not None else SymbolTable()
+        self._dependencies = {
+            path: set(paths) & dependencies.keys() - {path}
+            for path, paths in dependencies.items()
+        }
+        for cycle in find_cycles(self._dependencies):
+            raise CircularDependencyError([str(path) for path in cycle])
+        self._dependents: dict[Path, list[Path]] = {
+            path: [] for path in self._dependencies
+        }
+        for path, paths in self._dependencies.items():
+            for dependency in paths:
+                self._dependents[dependency].append(path)
+        self.results: dict[Path, CompiledFile] = {}
+        self._stats: BuildStats | None = None
+
+    @property
+    def stats(self) -> BuildStats:
+        """Where the time in the build went.
+
+        Raises:
+            RuntimeError: If the build hasn't finished.
+        """
+        if self._stats is None:
+            raise RuntimeError("The build hasn't finished")
+        return self._stats
+
+    def _available_names(self, path: Path) -> frozenset[str] | Path:
+        """Return the names path's dependencies declare, or a failed one."""
+        names: set[str] = set()
+        for dependency in sorted(self._dependencies[path]):
+            result = self.results[dependency]
+            if result.program is None or result.errors:
+                return dependency
+            names.update(result.defined)
+        return frozenset(names)
+
+    def _compile_here(
+        self, path: Path, available: frozenset[str]
+    ) -> CompiledFile | Path | str:
+        """Compile a file in this process if it needn't be parsed.
+
+        Returns:
+            The result, or else what a worker should parse: the file, or
+            its source if it was read to look it up in the cache.
+        """
+        start = time.process_time()
+        if path in self._parsed.errors:
+            return CompiledFile(path, None, [self._parsed.errors[path]])
+        program = self._parsed.programs.get(path)
+        if program is None:
+            if self._cache is None:
+                return self.root / path
+            try:
+                source = read_source(self.root / path)
+            except (OSError, prelex.InvalidSourceError) as e:
+                return CompiledFile(path, None, [project.error_message(e)])
+            program = self._cache.get(source)
+            if program is None:
+                return source
+        result = CompiledFile(path, None)
+        check_file(result, program, available)
+        result.seconds = time.process_time() - start
+        return result
+
+    def _compile_parsed(
+        self,
+        path: Path,
+        path_or_source: Path | str,
+        available: frozenset[str],
+        parsed: tuple[bytes | str, float, int],
+    ) -> CompiledFile:
+        """Compile a file from what a worker parsed it to."""
+        outcome, seconds, worker = parsed
+        result = CompiledFile(path, None, seconds=seconds, worker=worker)
+        if isinstance(outcome, str):
+            result.errors.append(outcome)
+            return result
+        start = time.process_time()
+        program = binary_ast.decode(outcome, self._symbols)
+        if self._cache is not None and isinstance(path_or_source, str):
+            self._cache.put_encoded(path_or_source, outcome)
+        check_file(result, program, available)
+        result.seconds += time.process_time() - start
+        return result
+
+    def __iter__(self) -> Iterator[CompiledFile]:
+        """Run the build, giving each file's result as soon as it's done."""
+        start = time.perf_counter()
+        waiting_on = {path: len(paths) for path, paths in self._dependencies.items()}
+        ready = [path for path, count in waiting_on.items() if not count]
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=project.worker_context(),
+            initializer=project.init_worker,
+        ) as executor:
+            # What each worker is parsing: the file, what it was sent, and
+            # the names available to it.
+            running: dict[
+                Future[tuple[bytes | str, float, int]],
+                tuple[Path, Path | str, frozenset[str]],
+            ] = {}
+            while ready or running:
+                # Files whose dependencies failed, and files that needn't
+                # be parsed, finish without being sent to a worker, which
+                # may make their dependents ready.
+                finished: list[CompiledFile] = []
+                for path in ready:
+                    available = self._available_names(path)
+                    if isinstance(available, Path):
+                        finished.append(
+                            CompiledFile(
+                                path,
+                                None,
+                                [f"Not compiled: {available} has errors"],
+                            )
+                        )
+                        continue
+                    compiled = self._compile_here(path, available)
+                    if isinstance(compiled, CompiledFile):
+                        finished.append(compiled)
+                    else:
+                        future = executor.submit(_parse_timed, compiled)
+                        running[future] = (path, compiled, available)
+                ready = []
+                if not finished:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished.append(
+                            self._compile_parsed(*running.pop(future), future.result())
+                        )
+                for result in finished:
+                    self.results[result.path] = result
+                    for dependent in self._dependents[result.path]:
+                        waiting_on[dependent] -= 1
+                        if not waiting_on[dependent]:
+                            ready.append(dependent)
+                    yield result
+        self._stats = self._make_stats(time.perf_counter() - start)
+
+    def _make_stats(self, wall_seconds: float) -> BuildStats:
+        busy_by_worker: dict[int, float] = {}
+        for result in self.results.values():
+            if result.worker:
+                busy_by_worker[result.worker] = (
+                    busy_by_worker.get(result.worker, 0.0) + result.seconds
+                )
+        # The longest chain ending at each file, in the order the files
+        # finished, which has every file after its dependencies.
+        longest: dict[Path, tuple[float, Path | None]] = {}
+        for path, result in self.results.items():
+            before = max(
+                self._dependencies[path],
+                key=lambda dependency: longest[dependency][0],
+                default=None,
+            )
+            longest[path] = (
+                result.seconds + (longest[before][0] if before is not None else 0.0),
+                before,
+            )
+        critical_path: list[Path] = []
+        end = max(longest, key=lambda path: longest[path][0], default=None)
+        while end is not None:
+            critical_path.append(end)
+            end = longest[end][1]
+        critical_path.reverse()
+        return BuildStats(
+            workers=self.max_workers,
+            wall_seconds=wall_seconds,
+            busy_seconds=sum(busy_by_worker.values()),
+            busy_by_worker=busy_by_worker,
+            critical_path=critical_path,
+            critical_path_seconds=(
+                longest[critical_path[-1]][0] if critical_path else 0.0
+            ),
+        )
+
+
+def build_project(
+    root: Path,
+    dependencies: Mapping[Path, Iterable[Path]] | None = None,
+    *,
+    max_workers: int | None = None,
+    cache: AstCache | None = None,
+) -> Build:
+    """Plan a build of every Define file in a project.
+
+    Args:
+        root: The project root.
+        dependencies: The dependencies between the files, if they're
+            already known (see file_dependencies). Files missing from it
+            are assumed to have no dependencies. If not given, the files
+            are parsed to find them (see scan_dependencies).
+        max_workers: How many worker processes to use. Defaults to the
+            number of CPUs.
+        cache: A cache for parsing the files, both to find their
+            dependencies and to compile them.
+
+    Returns:
+        The build, to be run by iterating over it. If the files were
+        parsed to find their dependencies, it compiles them from those
+        ASTs.
+    """
+    paths = project.discover_files(root)
+    parsed = None
+    if dependencies is None:
+        scan = scan_dependencies(root, paths, max_workers=max_workers, cache=cache)
+        dependencies, parsed = scan.dependencies, scan.parsed
+    return Build(
+        root,
+        {path: dependencies.get(path, ()) for path in paths},
+        max_workers=max_workers,
+        parsed=parsed,
+        cache=cache,
+    )
@@ -0,0 +1,80 @@
+"""Generate a Python module holding the Define parser's LALR tables.
+
+Importing the generated module lets Parser skip analyzing grammar.lark.
+Run this whenever the grammar changes (Parser ignores a module that was
+generated from a different grammar or Lark version):
+
+    uv run python -m compiler.build_parser_module
+"""
+
+import argparse
+import py_compile
+import sys
+from pathlib import Path
+
+import lark
+from lark.grammar import Rule
+from lark.lexer import TerminalDef
+
+from compiler import indenter, parser
+
+_HEADER = '''"""LALR tables for the Define grammar.
+
+Generated by compiler.build_parser_module. Do not edit.
+"""
+
+'''
+
+
+# Where Parser imports the generated module from (parser.GENERATED_MODULE).
+DEFAULT_OUTPUT_PATH = Path(__file__).parent / "_generated_parser.py"
+
+
+def generate_parser_module() -> str:
+    """Return the source code of the generated parser module."""
+    lark_parser = lark.Lark.open(
+        str(parser.GRAMMAR_PATH),
+        parser="lalr",
+        postlex=indenter.DefineIndenter(),
+        start="start",
+    )
+    data, memo = lark_parser.memo_serialize([TerminalDef, Rule])
+    # The postlexer is an object, not data; it is passed in again when
+    # the tables are loaded.
+    del data["options"]["postlex"]
+    return (
+        f"{_HEADER}"
+        f"GRAMMAR_HASH = {parser.grammar_hash()!r}\n"
+        f"LARK_VERSION = {lark.__version__!r}\n"
+        f"DATA = {data!r}\n"
+        f"MEMO = {memo!r}\n"
+    )
+
+
+def write_parser_module(output: Path) -> None:
+    """Generate the parser module and write it to output.
+
+    The module is also byte-compiled, since compiling its large literals
+    costs far more than loading them.
+    """
+    output.write_text(generate_parser_module())
+    py_compile.compile(str(output), doraise=True)
+
+
+def main() -> int:
+    """Write the generated parser module."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT_PATH,
+        help="Where to write the module (default: %(default)s)",
+    )
+    args = arg_parser.parse_args()
+    write_parser_module(args.output)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+import lark
+import pytest
+
+from compiler import build_parser_module, parser, transformer
+
+_EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+_EXAMPLE_FILES = sorted(_EXAMPLES_DIR.rglob("*.def"))
+
+
+def _import_from(path: Path) -> ModuleType:
+    spec = importlib.util.spec_from_file_location("generated_parser_test", path)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def generated_module(tmp_path_factory: pytest.TempPathFactory) -> ModuleType:
+    path = tmp_path_factory.mktemp("generated") / "generated_parser.py"
+    build_parser_module.write_parser_module(path)
+    return _import_from(path)
+
+
+@pytest.fixture(scope="module")
+def generated_parser(generated_module: ModuleType) -> lark.Lark:
+    lark_parser = parser.parser_from_module(generated_module)
+    assert lark_parser is not None
+    return lark_parser
+
+
+def _shape(node: lark.Tree | lark.Token) -> object:
+    """Return a comparable form of a tree that includes token types."""
+    if isinstance(node, lark.Token):
+        return (node.type, node.value, node.line, node.column)
+    return (node.data, [_shape(child) for child in node.children])
+
+
+def _parse_or_error(lark_parser: lark.Lark | parser.Parser, source: str) -> object:
+    try:
+        return _shape(lark_parser.parse(source))
+    except lark.exceptions.LarkError as e:
+        return (type(e), str(e))
+
+
+def test_examples_corpus_is_not_empty():
+    assert _EXAMPLE_FILES
+
+
+@pytest.mark.parametrize(
+    "path",
+    _EXAMPLE_FILES,
+    ids=[str(p.relative_to(_EXAMPLES_DIR)) for p in _EXAMPLE_FILES],
+)
+def test_generated_parser_matches_dynamic_parser(
+    generated_parser: lark.Lark, path: Path
+):
+    source = path.read_text()
+    dynamic = parser.Parser(cache=False, use_generated=False)
+    assert _parse_or_error(generated_parser, source) == _parse_or_error(dynamic, source)
+
+
+def test_stale_module_is_ignored(generated_module: ModuleType):
+    stale = ModuleType("stale")
+    vars(stale).update(vars(generated_module), GRAMMAR_HASH="0" * 64)
+    assert parser.parser_from_module(stale) is None
+
+
+def test_module_from_other_lark_version_is_ignored(generated_module: ModuleType):
+    stale = ModuleType("stale")
+    vars(stale).update(vars(generated_module), LARK_VERSION="0.0.0")
+    assert parser.parser_from_module(stale) is None
+
+
+def test_generated_module_can_parse_straight_to_ast(generated_module: ModuleType):
+    fused = parser.parser_from_module(
+        generated_module, transformer.InlineDefineTransformer()
+    )
+    assert fused is not None
+    source = "AbstractUniverse:\n    Foo is a Bar.\n"
+    dynamic = parser.Parser(cache=False, use_generated=False)
+    assert fused.parse(source) == dynamic.parse_to_ast(source)
@@ -0,0 +1,139 @@
+from pathlib import Path
+
+import pytest
+
+from compiler import ast, build, project
+from compiler.ast_cache import AstCache
+from compiler.dependencies import CircularDependencyError
+
+
+def _write(root: Path, relative: str, source: str) -> None:
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source)
+
+
+def _type(name: str, *dependencies: str) -> str:
+    lines = [f"    {name} is a ViewPoint.\n"]
+    lines.extend(
+        f"    {name} has a {dep} named {dep.lower()}.\n" for dep in dependencies
+    )
+    return "AbstractUniverse:\n" + "".join(lines)
+
+
+def test_file_dependencies():
+    dependencies = build.file_dependencies(
+        {Path("a.def"): ["A"], Path("b.def"): ["B"], Path("c.def"): ["C", "A"]},
+        {Path("a.def"): ["A", "B"], Path("b.def"): ["B"], Path("c.def"): ["A", "B"]},
+    )
+    assert dependencies == {
+        Path("a.def"): {Path("b.def")},
+        Path("b.def"): set(),
+        Path("c.def"): {Path("b.def")},
+    }
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_build_project_compiles_dependencies_first(tmp_path: Path, max_workers: int):
+    _write(tmp_path, "a.def", _type("A", "B", "C"))
+    _write(tmp_path, "b.def", _type("B", "D"))
+    _write(tmp_path, "c.def", _type("C", "D"))
+    _write(tmp_path, "d.def", _type("D", "String"))
+
+    # With the dependencies given, every file is parsed in a worker.
+    scan = build.scan_dependencies(tmp_path, project.discover_files(tmp_path))
+    planned = build.build_project(tmp_path, scan.dependencies, max_workers=max_workers)
+    order = [result.path for result in planned]
+
+    assert order[0] == Path("d.def")
+    assert order[-1] == Path("a.def")
+    for result in planned.results.values():
+        assert result.errors == []
+        assert result.program is not None
+    assert planned.results[Path("a.def")].defined == {"A"}
+    assert planned.results[Path("a.def")].referenced == {"A", "B", "C", "ViewPoint"}
+
+    stats = planned.stats
+    assert stats.workers == max_workers
+    assert stats.critical_path[0] == Path("d.def")
+    assert stats.critical_path[-1] == Path("a.def")
+    assert len(stats.critical_path) == 3
+    assert 0 < stats.critical_path_seconds <= stats.busy_seconds
+    assert stats.busy_seconds == pytest.approx(sum(stats.busy_by_worker.values()))
+    assert 0 < stats.utilization <= 1
+
+
+def test_build_reports_unknown_names_and_skips_dependents(tmp_path: Path):
+    _write(tmp_path, "a.def", _type("A", "B"))
+    _write(tmp_path, "b.def", _type("B", "Missing"))
+    _write(tmp_path, "c.def", "AbstractUniverse:\n")
+
+    planned = build.build_project(tmp_path, max_workers=1)
+    results = {result.path: result for result in planned}
+
+    assert results[Path("b.def")].errors == ["Unknown type name: Missing"]
+    assert results[Path("a.def")].program is None
+    assert results[Path("a.def")].errors == ["Not compiled: b.def has errors"]
+    assert results[Path("c.def")].errors[0].startswith("UnexpectedToken: ")
+
+
+def test_build_reuses_the_scans_asts(tmp_path: Path):
+    _write(tmp_path, "a.def", _type("A", "B"))
+    _write(tmp_path, "b.def", _type("B"))
+    _write(tmp_path, "c.def", "AbstractUniverse:\n")
+
+    planned = build.build_project(tmp_path, max_workers=1)
+    results = {result.path: result for result in planned}
+
+    assert results[Path("a.def")].errors == []
+    assert results[Path("a.def")].program is not None
+    assert results[Path("c.def")].errors[0].startswith("UnexpectedToken: ")
+    assert all(result.worker == 0 for result in results.values())
+
+
+def test_build_uses_cache(tmp_path: Path):
+    root = tmp_path / "project"
+    _write(root, "a.def", _type("A", "B"))
+    _write(root, "b.def", _type("B"))
+    dependencies = {Path("a.def"): {Path("b.def")}}
+    cache = AstCache(tmp_path / "cache")
+
+    first = list(build.build_project(root, dependencies, max_workers=1, cache=cache))
+    second = list(build.build_project(root, dependencies, max_workers=1, cache=cache))
+
+    assert all(result.worker != 0 for result in first)
+    assert all(result.worker == 0 for result in second)
+    assert cache.stats.hits == 2
+    assert [result.errors for result in second] == [[], []]
+    a, b = second[1].program, second[0].program
+    assert a is not None
+    assert b is not None
+    reference = a.universes[0].statements[1]
+    declaration = b.universes[0].statements[0]
+    assert isinstance(reference, ast.PropertyDeclaration)
+    assert isinstance(declaration, ast.TypeDeclaration)
+    assert reference.property_type is declaration.type_name
+
+
+def test_build_uses_given_dependencies(tmp_path: Path):
+    _write(tmp_path, "a.def", _type("A", "B"))
+    _write(tmp_path, "b.def", _type("B"))
+
+    planned = build.build_project(
+        tmp_path, {Path("a.def"): {Path("b.def")}}, max_workers=1
+    )
+
+    assert [result.path for result in planned] == [Path("b.def"), Path("a.def")]
+
+
+def test_build_rejects_cycles(tmp_path: Path):
+    with pytest.raises(CircularDependencyError):
+        build.Build(
+            tmp_path,
+            {Path("a.def"): {Path("b.def")}, Path("b.def"): {Path("a.def")}},
+        )
+
+
+def test_stats_before_build(tmp_path: Path):
+    with pytest.raises(RuntimeError):
+        _ = build.Build(tmp_path, {}).stats
@@ -0,0 +1,356 @@
+"""The dependency graph between global names, and cycle detection.
+
+Proposal 9 forbids circular dependencies between global names. The graph
+here is kept up to date one file at a time, and checks for cycles as it
+goes, so an edit doesn't mean rechecking the whole program.
+"""
+
+from collections import Counter, deque
+from collections.abc import Hashable, Iterable, Mapping
+from pathlib import Path
+
+# An edge from a name to a name it depends on.
+type Edge = tuple[str, str]
+
+
+class CircularDependencyError(Exception):
+    """Global names depend on each other in a cycle."""
+
+    def __init__(self, cycle: list[str]) -> None:
+        """Create the error.
+
+        Args:
+            cycle: The names in the cycle, starting and ending with the
+                same name.
+        """
+        self.cycle = cycle
+        super().__init__(f"Circular dependency: {' -> '.join(cycle)}")
+
+
+def strongly_connected_components[N: Hashable](
+    successors: Mapping[N, Iterable[N]],
+) -> list[list[N]]:
+    """Find the strongly connected components of a graph.
+
+    This is Tarjan's algorithm, which takes time linear in the size of the
+    graph. It keeps its own stack rather than recursing, so it works on
+    graphs with long paths.
+
+    Args:
+        successors: The nodes each node has an edge to. Nodes that only
+            appear as successors are part of the graph too.
+
+    Returns:
+        The components, each of which is a node list. A component comes
+        after every component it has an edge to.
+    """
+    index: dict[N, int] = {}
+    lowlink: dict[N, int] = {}
+    stack: list[N] = []
+    on_stack: set[N] = set()
+    components: list[list[N]] = []
+
+    def visit(node: N) -> None:
+        index[node] = lowlink[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+
+    for root in list(successors):
+        if root in index:
+            continue
+        visit(root)
+        work = [(root, iter(successors.get(root, ())))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    visit(child)
+                    work.append((child, iter(successors.get(child, ()))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _shortest_path[N: Hashable](
+    successors: Mapping[N, Iterable[N]], start: N, goal: N, allowed: set[N]
+) -> list[N]:
+    """Return a shortest path from start to goal through allowed nodes."""
+    parents: dict[N, N | None] = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for child in successors.get(node, ()):
+            if child == goal:
+                path = [goal, node]
+                while (parent := parents[path[-1]]) is not None:
+                    path.append(parent)
+                return path[::-1]
+            if child in allowed and child not in parents:
+                parents[child] = node
+                queue.append(child)
+    raise ValueError(f"No path from {start!r} to {goal!r}")
+
+
+def find_cycles[N: Hashable](successors: Mapping[N, Iterable[N]]) -> list[list[N]]:
+    """Find one cycle in each cyclic strongly connected component of a graph.
+
+    Args:
+        successors: The graph, as for strongly_connected_components.
+
+    Returns:
+        The cycles, each starting and ending with the same node.
+    """
+    cycles = []
+    for component in strongly_connected_components(successors):
+        node = component[0]
+        if len(component) > 1 or node in successors.get(node, ()):
+            cycles.append(_shortest_path(successors, node, node, set(component)))
+    return cycles
+
+
+class DependencyGraph:
+    """The dependencies between global names, updated one file at a time.
+
+    The graph keeps a topological order of its acyclic part, and updates it
+    as edges are added (the Pearce-Kelly algorithm), so adding an edge only
+    looks at the names whose order it affects. An edge that would close a
+    cycle is kept aside; the graph is acyclic exactly when there are no
+    such edges. When an edge is removed, the edges kept aside are tried
+    again, since the cycle they closed may be gone.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty graph."""
+        # How many files contribute each edge.
+        self._edge_counts: Counter[Edge] = Counter()
+        self._file_edges: dict[Path, set[Edge]] = {}
+        # The acyclic part of the graph.
+        self._successors: dict[str, set[str]] = {}
+        self._predecessors: dict[str, set[str]] = {}
+        # The position of each name in a topological order of the acyclic
+        # part. Positions only need to be ordered, not contiguous.
+        self._order: dict[str, int] = {}
+        self._next_order = 0
+        # The edges that close a cycle, in the order they were added.
+        self._cyclic_edges: dict[Edge, None] = {}
+        # How many edges, acyclic or not, touch each name.
+        self._degree: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        """Return the number of names in the graph."""
+        return len(self._order)
+
+    def __contains__(self, name: object) -> bool:
+        """Return whether a name has any dependencies or dependents."""
+        return name in self._order
+
+    @property
+    def files(self) -> list[Path]:
+        """The files whose dependencies are in the graph."""
+        return list(self._file_edges)
+
+    def successors(self, name: str) -> set[str]:
+        """Return the names a name depends on directly."""
+        names = set(self._successors.get(name, ()))
+        names.update(target for source, target in self._cyclic_edges if source == name)
+        return names
+
+    def predecessors(self, name: str) -> set[str]:
+        """Return the names that depend on a name directly."""
+        names = set(self._predecessors.get(name, ()))
+        names.update(source for source, target in self._cyclic_edges if target == name)
+        return names
+
+    def edges(self) -> dict[str, set[str]]:
+        """Return every edge in the graph, as the successors of each name."""
+        graph = {name: set(targets) for name, targets in self._successors.items()}
+        for source, target in self._cyclic_edges:
+            graph.setdefault(source, set()).add(target)
+        return graph
+
+    def set_file(self, path: Path, dependencies: Mapping[str, Iterable[str]]) -> None:
+        """Replace the dependencies that come from one file.
+
+        Only the edges that differ from the file's previous ones are
+        removed or added.
+
+        Args:
+            path: The file.
+            dependencies: The names each name depends on, according to the
+                file (see references.name_dependencies).
+        """
+        new_edges = {
+            (source, target)
+            for source, targets in dependencies.items()
+            for target in targets
+        }
+        old_edges = self._file_edges.get(path, set())
+        # Removing edges first means additions can't be rejected because
+        # of a cycle that this change breaks.
+        removed_acyclic = False
+        for edge in old_edges - new_edges:
+            removed_acyclic |= self._remove_edge(edge)
+        if removed_acyclic and self._cyclic_edges:
+            self._retry_cyclic_edges()
+        for edge in new_edges - old_edges:
+            self._add_edge(edge)
+        if new_edges:
+            self._file_edges[path] = new_edges
+        else:
+            self._file_edges.pop(path, None)
+
+    def remove_file(self, path: Path) -> None:
+        """Remove the dependencies that come from one file."""
+        self.set_file(path, {})
+
+    def cycles(self) -> list[list[str]]:
+        """Return the cycles in the graph.
+
+        Returns:
+            One cycle for each edge that closes a cycle, as the names along
+            it, starting and ending with the same name. Empty if the graph
+            is acyclic.
+        """
+        cycles = []
+        for source, target in self._cyclic_edges:
+            if source == target:
+                cycles.append([source, source])
+                continue
+            # Every name on a path in the acyclic part lies between the
+            # path's ends in the topological order.
+            allowed = self._forward(target, self._order[source]) - {source}
+            path = _shortest_path(self._successors, target, source, allowed)
+            cycles.append([source, *path])
+        return cycles
+
+    def check(self) -> None:
+        """Check that the graph is acyclic.
+
+        Raises:
+            CircularDependencyError: For the first cycle, if there is one.
+        """
+        for cycle in self.cycles():
+            raise CircularDependencyError(cycle)
+
+    def topological_order(self) -> list[str]:
+        """Return every name after all of the names it depends on.
+
+        Raises:
+            CircularDependencyError: If the graph has a cycle.
+        """
+        self.check()
+        return sorted(self._order, key=self._order.__getitem__, reverse=True)
+
+    def _add_node(self, name: str) -> None:
+        if name not in self._order:
+            self._order[name] = self._next_order
+            self._next_order += 1
+
+    def _add_edge(self, edge: Edge) -> None:
+        self._edge_counts[edge] += 1
+        if self._edge_counts[edge] > 1:
+            return
+        for name in edge:
+            self._add_node(name)
+            self._degree[name] += 1
+        if not self._insert(edge):
+            self._cyclic_edges[edge] = None
+
+    def _remove_edge(self, edge: Edge) -> bool:
+        """Remove one file's contribution to an edge.
+
+        Returns:
+            Whether an edge was removed from the acyclic part.
+        """
+        self._edge_counts[edge] -= 1
+        if self._edge_counts[edge] > 0:
+            return False
+        del self._edge_counts[edge]
+        removed_acyclic = edge not in self._cyclic_edges
+        if removed_acyclic:
+            source, target = edge
+            self._successors[source].discard(target)
+            self._predecessors[target].discard(source)
+        else:
+            del self._cyclic_edges[edge]
+        for name in edge:
+            self._degree[name] -= 1
+            if not self._degree[name]:
+                del self._degree[name]
+                del self._order[name]
+                self._successors.pop(name, None)
+                self._predecessors.pop(name, None)
+        return removed_acyclic
+
+    def _retry_cyclic_edges(self) -> None:
+        """Add the edges that closed cycles to the acyclic part if they can be."""
+        for edge in list(self._cyclic_edges):
+            if self._insert(edge):
+                del self._cyclic_edges[edge]
+
+    def _forward(self, start: str, high: int) -> set[str]:
+        """Return the names reachable from start whose order is at most high."""
+        order = self._order
+        seen = {start}
+        stack = [start]
+        while stack:
+            for child in self._successors.get(stack.pop(), ()):
+                if child not in seen and order[child] <= high:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def _backward(self, start: str, low: int) -> set[str]:
+        """Return the names that reach start whose order is at least low."""
+        order = self._order
+        seen = {start}
+        stack = [start]
+        while stack:
+            for parent in self._predecessors.get(stack.pop(), ()):
+                if parent not in seen and order[parent] >= low:
+                    seen.add(parent)
+                    stack.append(parent)
+        return seen
+
+    def _insert(self, edge: Edge) -> bool:
+        """Add an edge to the acyclic part, unless it would close a cycle.
+
+        Returns:
+            Whether the edge was added.
+        """
+        source, target = edge
+        if source == target:
+            return False
+        order = self._order
+        low, high = order[target], order[source]
+        if low < high:
+            # The target comes before the source, so the order has to
+            # change. Only names between the two can be affected.
+            forward = self._forward(target, high)
+            if source in forward:
+                return False
+            backward = self._backward(source, low)
+            moved = sorted(backward, key=order.__getitem__) + sorted(
+                forward, key=order.__getitem__
+            )
+            positions = sorted(order[name] for name in moved)
+            for name, position in zip(moved, positions, strict=True):
+                order[name] = position
+        self._successors.setdefault(source, set()).add(target)
+        self._predecessors.setdefault(target, set()).add(source)
+        return True
@@ -0,0 +1,123 @@
+import itertools
+import random
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+import pytest
+
+from compiler.dependencies import (
+    CircularDependencyError,
+    DependencyGraph,
+    find_cycles,
+    strongly_connected_components,
+)
+
+
+def _is_cycle(graph: Mapping[str, Iterable[str]], cycle: list[str]) -> bool:
+    return (
+        len(cycle) >= 2
+        and cycle[0] == cycle[-1]
+        and all(b in graph.get(a, ()) for a, b in itertools.pairwise(cycle))
+    )
+
+
+def test_strongly_connected_components():
+    graph = {"a": ["b"], "b": ["c", "d"], "c": ["a"], "d": ["e"], "e": []}
+    components = strongly_connected_components(graph)
+    assert sorted(sorted(c) for c in components) == [["a", "b", "c"], ["d"], ["e"]]
+    # Components come after the components they have edges to.
+    assert components.index(["e"]) < components.index(["d"])
+
+
+def test_strongly_connected_components_long_path():
+    # Deeper than the recursion limit.
+    graph = {i: [i + 1] for i in range(100_000)}
+    assert len(strongly_connected_components(graph)) == 100_001
+
+
+def test_find_cycles():
+    graph = {"a": ["b"], "b": ["c"], "c": ["a"], "d": ["d"], "e": ["a"]}
+    cycles = find_cycles(graph)
+    assert sorted(sorted(set(cycle)) for cycle in cycles) == [["a", "b", "c"], ["d"]]
+    for cycle in cycles:
+        assert _is_cycle(graph, cycle)
+
+
+def test_acyclic_graph():
+    graph = DependencyGraph()
+    graph.set_file(Path("a.def"), {"A": {"B", "C"}})
+    graph.set_file(Path("b.def"), {"B": {"C"}})
+    graph.check()
+    assert graph.cycles() == []
+    assert graph.topological_order() == ["C", "B", "A"]
+    assert graph.successors("A") == {"B", "C"}
+    assert graph.predecessors("C") == {"A", "B"}
+
+
+def test_cycle_path():
+    graph = DependencyGraph()
+    graph.set_file(Path("foo.def"), {"foo": {"bar"}})
+    graph.set_file(Path("bar.def"), {"bar": {"baz"}})
+    graph.set_file(Path("baz.def"), {"baz": {"foo"}})
+    assert graph.cycles() == [["baz", "foo", "bar", "baz"]]
+    with pytest.raises(
+        CircularDependencyError, match="Circular dependency: baz -> foo -> bar -> baz"
+    ) as info:
+        graph.check()
+    assert info.value.cycle == ["baz", "foo", "bar", "baz"]
+    with pytest.raises(CircularDependencyError):
+        graph.topological_order()
+
+
+def test_self_dependency():
+    graph = DependencyGraph()
+    graph.set_file(Path("a.def"), {"A": {"A"}})
+    assert graph.cycles() == [["A", "A"]]
+
+
+def test_breaking_a_cycle():
+    graph = DependencyGraph()
+    graph.set_file(Path("a.def"), {"A": {"B"}})
+    graph.set_file(Path("b.def"), {"B": {"A"}})
+    assert graph.cycles() == [["B", "A", "B"]]
+    # Removing the edge that isn't the one set aside still breaks it.
+    graph.set_file(Path("a.def"), {"A": {"C"}})
+    assert graph.cycles() == []
+    assert graph.topological_order().index("A") < graph.topological_order().index("B")
+
+
+def test_edges_from_several_files():
+    graph = DependencyGraph()
+    graph.set_file(Path("a.def"), {"A": {"B"}})
+    graph.set_file(Path("b.def"), {"A": {"B"}})
+    graph.remove_file(Path("a.def"))
+    assert graph.successors("A") == {"B"}
+    graph.remove_file(Path("b.def"))
+    assert len(graph) == 0
+    assert graph.files == []
+
+
+def test_matches_tarjan_on_random_edits():
+    rng = random.Random(0)  # noqa: S311 - not for security
+    names = [f"N{i}" for i in range(30)]
+    graph = DependencyGraph()
+    for _ in range(300):
+        path = Path(f"{rng.randrange(10)}.def")
+        graph.set_file(
+            path,
+            {
+                rng.choice(names): set(rng.sample(names, rng.randrange(3)))
+                for _ in range(rng.randrange(3))
+            },
+        )
+        edges = graph.edges()
+        cycles = graph.cycles()
+        assert bool(cycles) == bool(find_cycles(edges))
+        for cycle in cycles:
+            assert _is_cycle(edges, cycle)
+        if not cycles:
+            order = graph.topological_order()
+            position = {name: i for i, name in enumerate(order)}
+            for source, targets in edges.items():
+                for target in targets:
+                    assert position[target] < position[source]
@@ -0,0 +1,521 @@
+"""Parsing a file again after an edit, only as far as the edit reaches.
+
+A universe block is delimited by indentation, and so is each statement in
+it, so an edit inside one statement can't change how the rest of the file
+parses. After an edit, ParsedSource parses just the statements the edit
+touched (wrapped in their block's header line) and splices them into the
+block. Edits that reach a block's header line, or that make a line start
+or stop a block, cause the universe blocks they touched to be parsed
+again instead, and those are spliced into Program.universes. The whole
+file is only parsed again when neither is possible.
+"""
+
+import bisect
+import re
+from dataclasses import dataclass
+
+import lark
+
+from compiler import ast, prelex
+from compiler.parser import Parser
+from compiler.symbols import SymbolTable
+
+# A line that starts a universe block: any line that isn't indented,
+# blank or a comment.
+_TOP_LEVEL_LINE = re.compile(r"^[^\s#]", re.MULTILINE)
+_STRING = re.compile(r'"(?:[^"\\\n]|\\.)*"')
+# Tokens the parser makes up at the end of the text. When the text is only
+# part of a file, an error at one of these is an error at the end of the
+# part, which may not be one in the whole file.
+_END_TOKEN_TYPES = frozenset({"$END", "DEDENT"})
+
+
+@dataclass(frozen=True)
+class TextEdit:
+    """A change to source text: source[start:end] is replaced with text."""
+
+    start: int
+    end: int
+    text: str
+
+    def apply(self, source: str) -> str:
+        """Return source with the edit made."""
+        return source[: self.start] + self.text + source[self.end :]
+
+
+@dataclass(frozen=True)
+class Reparsed:
+    """What was parsed again after an edit."""
+
+    # The span of the edited source that was parsed.
+    start: int
+    end: int
+    # If only statements were parsed, the index of the universe block
+    # they're in. None if whole universe blocks were.
+    universe: int | None
+
+
+@dataclass
+class _Block:
+    """Where a universe block is in the source."""
+
+    start: int
+    # Where the header line begins and the offset just after it, relative
+    # to start. Empty lines and unindented comments before the header line
+    # are part of the block.
+    header: int
+    header_end: int
+    # How far the block's statements are indented.
+    indent: int
+    # Where each statement begins, relative to start, or None if the
+    # statements couldn't be told apart. The first statement begins at
+    # header_end, and each one runs to the next, including the blank
+    # lines and comments that follow it.
+    statement_starts: list[int] | None
+
+
+def _code(line: str) -> str:
+    """Return a line without its comment or trailing spaces."""
+    return _STRING.sub('""', line).partition("#")[0].rstrip()
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _ends_continued(text: str) -> bool:
+    """Return whether the last line of code in text ends with a comma.
+
+    Arguments and parameters can carry on onto the next line after one.
+    """
+    for line in reversed(text.splitlines()):
+        if code := _code(line):
+            return code.endswith(",")
+    return False
+
+
+def _first_indent(source: str, start: int, end: int) -> int:
+    """Return the indentation of the first line in a span that isn't blank."""
+    for line in source[start:end].splitlines():
+        if line.strip():
+            return _indent(line)
+    return 0
+
+
+def _statement_starts(
+    source: str, start: int, end: int, indent: int, *, at_block_end: bool
+) -> list[int] | None:
+    """Find where each statement in part of a universe block begins.
+
+    Comments count as lines here, since the indenter sees their
+    indentation, but blank lines don't. An unindented comment ends the
+    block, so it can only be followed by blank lines and more of them, at
+    the end of the block.
+
+    Args:
+        source: The source.
+        start: Where the part begins. The first statement is taken to
+            begin here.
+        end: Where the part ends.
+        indent: How far the block's statements are indented.
+        at_block_end: Whether the part runs to the end of the block.
+
+    Returns:
+        The offset of each statement, relative to start, or None if the
+        first line isn't indented as far as the block's statements or a
+        line ends the block before the end of the part.
+    """
+    starts = [0]
+    seen_line = False
+    ended = False
+    # Whether the last line of code ended with a comma, so that the next
+    # one carries on the same statement.
+    continued = False
+    line_start = start
+    while line_start < end:
+        line_end = source.find("\n", line_start, end)
+        if line_end < 0:
+            line_end = end
+        line = source[line_start:line_end]
+        if line.strip():
+            line_indent = _indent(line)
+            if line_indent == 0 and line.startswith("#") and seen_line and at_block_end:
+                ended = True
+            elif ended or line_indent == 0 or (not seen_line and line_indent != indent):
+                return None
+            if code := _code(line):
+                if line_indent == indent and seen_line and not continued:
+                    starts.append(line_start - start)
+                continued = code.endswith(",")
+            seen_line = True
+        line_start = line_end + 1
+    return starts
+
+
+def _block_start(source: str, floor: int, header: int) -> int:
+    """Return where the block whose header line starts at header begins.
+
+    Empty lines and unindented comments right before the header are part
+    of the block, since they can't be part of the block before. (A line of
+    only spaces can't start a block: it's only skipped after a newline.)
+
+    Args:
+        source: The source.
+        floor: Where the line after the block before's header line begins.
+        header: Where the header line begins.
+    """
+    start = header
+    while start > floor:
+        line_start = source.rfind("\n", floor, start - 1) + 1 or floor
+        line = source[line_start : start - 1]
+        if line and not line.startswith("#"):
+            break
+        start = line_start
+    return start
+
+
+def _find_blocks(source: str, start: int, end: int) -> list[_Block]:
+    """Find the universe blocks in part of the source.
+
+    The part must begin at the start of a line. Anything before the first
+    header line is part of the first block.
+    """
+    headers = [m.start() for m in _TOP_LEVEL_LINE.finditer(source, start, end)]
+    header_ends = [source.find("\n", header, end) + 1 or end for header in headers]
+    block_starts = [
+        start if i == 0 else _block_start(source, header_ends[i - 1], header)
+        for i, header in enumerate(headers)
+    ]
+    blocks = []
+    for i, block_start in enumerate(block_starts):
+        block_end = block_starts[i + 1] if i + 1 < len(block_starts) else end
+        header_end = header_ends[i]
+        indent = _first_indent(source, header_end, block_end)
+        starts = _statement_starts(
+            source, header_end, block_end, indent, at_block_end=True
+        )
+        if starts is not None:
+            starts = [header_end - block_start + offset for offset in starts]
+        blocks.append(
+            _Block(
+                block_start,
+                headers[i] - block_start,
+                header_end - block_start,
+                indent,
+                starts,
+            )
+        )
+    return blocks
+
+
+def _check_statement_counts(
+    blocks: list[_Block], universes: list[ast.UniverseBlock]
+) -> None:
+    """Forget the statements of blocks where they weren't told apart right."""
+    for block, universe in zip(blocks, universes, strict=True):
+        starts = block.statement_starts
+        if starts is not None and len(starts) != len(universe.statements):
+            block.statement_starts = None
+
+
+class _CannotSpliceError(Exception):
+    """Part of the source can't be parsed on its own."""
+
+
+class ParsedSource:
+    """The AST of one file, kept up to date as the file is edited."""
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        parser: Parser | None = None,
+        symbols: SymbolTable | None = None,
+    ) -> None:
+        """Parse a whole file.
+
+        Args:
+            source: The file's contents.
+            parser: The parser to use. A new one is made if not given.
+            symbols: The table to intern identifiers into, here and after
+                each edit. A new table is used if none is given.
+
+        Raises:
+            lark.exceptions.LarkError: If the file doesn't parse.
+        """
+        self.parser = parser or Parser()
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.source = source
+        self.program = self.parser.parse_to_ast(source, self.symbols)
+        # The last source that parsed, which self.program and self._blocks
+        # are for.
+        self._parsed_source = source
+        self._blocks = self._index(source)
+        # If self.source doesn't parse, where it differs from
+        # self._parsed_source: the start, the end in self._parsed_source
+        # and the end in self.source.
+        self._unparsed: tuple[int, int, int] | None = None
+
+    def _index(self, source: str) -> list[_Block] | None:
+        blocks = _find_blocks(source, 0, len(source))
+        if len(blocks) != len(self.program.universes):
+            return None
+        _check_statement_counts(blocks, self.program.universes)
+        return blocks
+
+    def _block_end(self, blocks: list[_Block], index: int) -> int:
+        """Return where a block ends in the last source that parsed."""
+        if index + 1 < len(blocks):
+            return blocks[index + 1].start
+        return len(self._parsed_source)
+
+    def edit(self, edit: TextEdit) -> Reparsed:
+        """Make an edit, and parse again what it could have changed.
+
+        The new statements or universe blocks are spliced into
+        self.program, so the Program, and the blocks and statements the
+        edit didn't touch, are the same objects as before.
+
+        If the edited source doesn't parse, self.source is still edited,
+        but self.program is left as it was, for the last source that
+        parsed. The next edit parses again everything edited since then.
+
+        Raises:
+            ValueError: If the edit's span isn't in the source.
+            lark.exceptions.LarkError: If the edited source doesn't parse.
+        """
+        return self._reparse_since(self._record(edit))
+
+    def record(self, edit: TextEdit) -> None:
+        """Make an edit to self.source without parsing anything.
+
+        A burst of edits can be recorded and then parsed once, with
+        reparse.
+
+        Raises:
+            ValueError: If the edit's span isn't in the source.
+        """
+        self._record(edit)
+
+    def _record(self, edit: TextEdit) -> tuple[int, int, int]:
+        """Make an edit, and return the span that hasn't been parsed since."""
+        if not 0 <= edit.start <= edit.end <= len(self.source):
+            raise ValueError(
+                f"Edit {edit.start}:{edit.end} is outside the source, "
+                f"which has {len(self.source)} characters"
+            )
+        source = edit.apply(self.source)
+        start, parsed_end, end = self._unparsed or (edit.start,) * 3
+        # Widen the span that differs from the last source that parsed to
+        # cover this edit, and move its end to where it is after the edit.
+        beyond = max(end, edit.end) - end
+        start = min(start, edit.start)
+        parsed_end += beyond
+        end += beyond + len(edit.text) - (edit.end - edit.start)
+        self.source = source
+        self._unparsed = (start, parsed_end, end)
+        return self._unparsed
+
+    def reparse(self) -> Reparsed | None:
+        """Parse again what the edits since the last parse could have changed.
+
+        See edit.
+
+        Returns:
+            What was parsed, or None if nothing has been edited since.
+
+        Raises:
+            lark.exceptions.LarkError: If self.source doesn't parse.
+        """
+        if self._unparsed is None:
+            return None
+        return self._reparse_since(self._unparsed)
+
+    def _reparse_since(self, unparsed: tuple[int, int, int]) -> Reparsed:
+        start, parsed_end, end = unparsed
+        source = self.source
+        reparsed = self._reparse(TextEdit(start, parsed_end, source[start:end]))
+        self._parsed_source = source
+        self._unparsed = None
+        return reparsed
+
+    def _reparse(self, edit: TextEdit) -> Reparsed:
+        """Parse again what an edit to the last source that parsed changed."""
+        source = self.source
+        reparsed = None
+        if self._blocks is not None:
+            # The blocks the edit touches, counting an edit before a
+            # block's header line (or one that unindents it) as touching
+            # the block before too: an indented line there would be part
+            # of it.
+            blocks = self._blocks
+            block_starts = [block.start for block in blocks]
+            first = bisect.bisect_right(block_starts, edit.start) - 1
+            header = blocks[first].start + blocks[first].header
+            if first > 0 and (
+                edit.start < header
+                or (
+                    edit.start == header
+                    and not _TOP_LEVEL_LINE.match(source, edit.start)
+                )
+            ):
+                first -= 1
+            last = bisect.bisect_right(block_starts, edit.end) - 1
+            if first == last:
+                reparsed = self._reparse_statements(blocks, first, edit, source)
+            if reparsed is None:
+                reparsed = self._reparse_blocks(blocks, first, last, edit, source)
+        if reparsed is None:
+            program = self.parser.parse_to_ast(source, self.symbols)
+            self.program.universes = program.universes
+            self._blocks = self._index(source)
+            reparsed = Reparsed(0, len(source), None)
+        self.program.lines = ast.LineTable(source)
+        return reparsed
+
+    def _added_lines(self, edit: TextEdit) -> int:
+        """Return how many lines an edit to the last source that parsed adds."""
+        removed = self._parsed_source.count("\n", edit.start, edit.end)
+        return edit.text.count("\n") - removed
+
+    def _reparse_statements(
+        self, blocks: list[_Block], index: int, edit: TextEdit, source: str
+    ) -> Reparsed | None:
+        """Parse the statements in one block that an edit touches again.
+
+        Returns:
+            What was parsed, or None if the edit reaches the block's header
+            line or changes where the block ends.
+        """
+        block = blocks[index]
+        starts = block.statement_starts
+        if starts is None or edit.start < block.start + block.header_end:
+            return None
+        delta = len(edit.text) - (edit.end - edit.start)
+        # The statements the edit touches, counting an edit right at the
+        # start of a statement as touching the one before too.
+        first = max(0, bisect.bisect_left(starts, edit.start - block.start) - 1)
+        last = bisect.bisect_right(starts, edit.end - block.start) - 1
+        start = block.start + starts[first]
+
+        def end_after(statement: int) -> int:
+            if statement + 1 < len(starts):
+                return block.start + starts[statement + 1] + delta
+            return self._block_end(blocks, index) + delta
+
+        # A statement whose last line ends with a comma carries on into
+        # what was the next one.
+        end = end_after(last)
+        while last + 1 < len(starts) and _ends_continued(source[start:end]):
+            last += 1
+            end = end_after(last)
+        new_starts = _statement_starts(
+            source, start, end, block.indent, at_block_end=last + 1 == len(starts)
+        )
+        if new_starts is None:
+            return None
+        header = source[block.start : block.start + block.header_end]
+        try:
+            program = self._parse_part(source, header, start, end)
+        except _CannotSpliceError:
+            return None
+        (universe,) = program.universes
+        if len(universe.statements) != len(new_starts):
+            return None
+        # The part's lines are counted from the header's, and the lines
+        # after it move by as many lines as the edit added.
+        ast.shift_spans(
+            universe.statements,
+            self._parsed_source.count("\n", 0, start) - header.count("\n"),
+        )
+        added_lines = self._added_lines(edit)
+        statements = self.program.universes[index].statements
+        ast.shift_spans(statements[last + 1 :], added_lines)
+        ast.shift_spans(self.program.universes[index + 1 :], added_lines)
+        statements[first : last + 1] = universe.statements
+        block_universe = self.program.universes[index]
+        block_universe.span = ast.make_span(
+            ast.span_start(block_universe.span), ast.span_end(statements[-1].span)
+        )
+        starts[first : last + 1] = [starts[first] + offset for offset in new_starts]
+        for i in range(first + len(new_starts), len(starts)):
+            starts[i] += delta
+        for later in blocks[index + 1 :]:
+            later.start += delta
+        return Reparsed(start, end, index)
+
+    def _reparse_blocks(
+        self,
+        blocks: list[_Block],
+        first: int,
+        last: int,
+        edit: TextEdit,
+        source: str,
+    ) -> Reparsed | None:
+        """Parse the universe blocks from first to last again.
+
+        Returns:
+            What was parsed, or None if the blocks can't be parsed on their
+            own.
+        """
+        delta = len(edit.text) - (edit.end - edit.start)
+        start = blocks[first].start
+        end = self._block_end(blocks, last) + delta
+        new_blocks = _find_blocks(source, start, end)
+        if not new_blocks:
+            return None
+        try:
+            program = self._parse_part(source, "", start, end)
+        except _CannotSpliceError:
+            return None
+        if len(program.universes) != len(new_blocks):
+            return None
+        _check_statement_counts(new_blocks, program.universes)
+        ast.shift_spans(program.universes, self._parsed_source.count("\n", 0, start))
+        ast.shift_spans(self.program.universes[last + 1 :], self._added_lines(edit))
+        self.program.universes[first : last + 1] = program.universes
+        blocks[first : last + 1] = new_blocks
+        for later in blocks[first + len(new_blocks) :]:
+            later.start += delta
+        return Reparsed(start, end, None)
+
+    def _parse_part(
+        self, source: str, prefix: str, start: int, end: int
+    ) -> ast.Program:
+        """Parse part of the source on its own.
+
+        Args:
+            source: The edited source.
+            prefix: Text to parse before the part: the beginning of the
+                block the part is in, up to the end of its header line.
+            start: Where the part begins.
+            end: Where the part ends.
+
+        Raises:
+            lark.exceptions.UnexpectedInput: If the part has an error that
+                the whole source has too. Its position is in the whole
+                source.
+            _CannotSpliceError: If the part doesn't parse for some other reason,
+                like reaching its end too soon, which the whole source may
+                not.
+        """
+        try:
+            return self.parser.parse_to_ast(prefix + source[start:end], self.symbols)
+        except prelex.InvalidSourceError as e:
+            # Its positions are all in the part, and parsing the whole
+            # source finds the same violations without getting to Lark.
+            raise _CannotSpliceError from e
+        except lark.exceptions.UnexpectedInput as e:
+            token = getattr(e, "token", None)
+            if (
+                isinstance(e, lark.exceptions.UnexpectedEOF)
+                or (token is not None and token.type in _END_TOKEN_TYPES)
+                or e.pos_in_stream is None
+                or e.pos_in_stream < len(prefix)
+            ):
+                raise _CannotSpliceError from e
+            e.line += source.count("\n", 0, start) - prefix.count("\n")
+            e.pos_in_stream += start - len(prefix)
+            raise
+        except lark.exceptions.LarkError as e:
+            raise _CannotSpliceError from e
@@ -0,0 +1,247 @@
+import random
+import textwrap
+
+import lark
+import pytest
+
+from compiler import ast
+from compiler.incremental import ParsedSource, Reparsed, TextEdit
+from compiler.parser import Parser
+
+_parser = Parser()
+
+_SOURCE = textwrap.dedent(
+    """\
+    # A comment before the first block.
+    AbstractUniverse:
+        Source is a ViewPoint.
+        Source has a String named label.
+        Source can Greet using a String named text,
+        a Number named times:
+            Source makes Source's label Print "hello", 1,
+            2.
+            Source makes Source's label Print "again".
+
+    # A comment before the second block.
+    PhysicalUniverse:
+        Machine is a Computer.
+        Machine knows Source's label.
+    """
+)
+
+
+def _edit(parsed: ParsedSource, old: str, new: str) -> Reparsed:
+    start = parsed.source.index(old)
+    return parsed.edit(TextEdit(start, start + len(old), new))
+
+
+def _full_parse(source: str) -> ast.Program:
+    return _parser.parse_to_ast(source)
+
+
+def _spans(program: ast.Program) -> list[int]:
+    return [node.span for universe in program.universes for node in ast.walk(universe)]
+
+
+def test_edit_inside_a_statement_reparses_only_it():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+    program = parsed.program
+    abstract, physical = program.universes
+    untouched = list(abstract.statements)
+
+    reparsed = _edit(parsed, "named label.", "named title.")
+
+    line = "    Source has a String named title.\n"
+    assert reparsed == Reparsed(
+        parsed.source.index(line), parsed.source.index(line) + len(line), 0
+    )
+    assert parsed.program is program
+    assert program.universes[0] is abstract
+    assert program.universes[1] is physical
+    assert abstract.statements[1] == ast.PropertyDeclaration(
+        "Source", "String", "title"
+    )
+    assert abstract.statements[0] is untouched[0]
+    assert abstract.statements[2] is untouched[2]
+    assert program == _full_parse(parsed.source)
+    assert _spans(program) == _spans(_full_parse(parsed.source))
+
+
+def test_edit_inside_an_action_body():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+
+    reparsed = _edit(parsed, '"again"', '"once more"')
+
+    assert reparsed.universe == 0
+    assert parsed.source[reparsed.start : reparsed.end].startswith(
+        "    Source can Greet"
+    )
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_adding_and_removing_statements():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+
+    reparsed = _edit(
+        parsed, "    Machine knows", "    Disk is a Computer.\n    Machine knows"
+    )
+    assert reparsed.universe == 1
+    assert len(parsed.program.universes[1].statements) == 3
+
+    reparsed = _edit(parsed, "    Source has a String named label.\n", "")
+    assert reparsed.universe == 0
+    assert len(parsed.program.universes[0].statements) == 2
+    assert parsed.program == _full_parse(parsed.source)
+
+    # The statements after an edit are found at their new offsets.
+    _edit(parsed, "Machine knows Source's label", "Machine knows Source's name")
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_trailing_comma_carries_on_into_the_next_statement():
+    source = "AbstractUniverse:\n    A makes B's c Print 1.\n    B is a C.\n"
+    parsed = ParsedSource(source, parser=_parser)
+
+    # The error is in the statement after the edited one.
+    with pytest.raises(lark.exceptions.UnexpectedInput) as raised:
+        _edit(parsed, "1.", "1,")
+
+    assert (raised.value.line, raised.value.column) == (3, 6)
+
+
+def test_header_edit_reparses_the_block():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+    abstract = parsed.program.universes[0]
+
+    reparsed = _edit(parsed, "PhysicalUniverse:", "AbstractUniverse:")
+
+    assert reparsed.universe is None
+    assert parsed.source[reparsed.start :].startswith("\n# A comment before the second")
+    assert parsed.program.universes[0] is abstract
+    assert parsed.program.universes[1].name == "AbstractUniverse"
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_adding_and_removing_blocks():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+
+    _edit(
+        parsed,
+        "PhysicalUniverse:\n",
+        "PhysicalUniverse:\n    Other is a Computer.\nPhysicalUniverse:\n",
+    )
+    assert [len(u.statements) for u in parsed.program.universes] == [3, 1, 2]
+    assert parsed.program == _full_parse(parsed.source)
+
+    # Without its header line, a block's statements join the block before.
+    _edit(parsed, "PhysicalUniverse:\n    Machine", "    Machine")
+    assert [len(u.statements) for u in parsed.program.universes] == [3, 3]
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_error_positions_are_in_the_whole_source():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+    program = parsed.program
+
+    with pytest.raises(lark.exceptions.UnexpectedInput) as raised:
+        _edit(parsed, "Machine knows", "Machine  knows")
+
+    with pytest.raises(lark.exceptions.UnexpectedInput) as expected:
+        _full_parse(_SOURCE.replace("Machine knows", "Machine  knows"))
+    assert (raised.value.line, raised.value.column) == (14, 13)
+    assert (raised.value.line, raised.value.column) == (
+        expected.value.line,
+        expected.value.column,
+    )
+    # The source was edited, but the program is still the last one that
+    # parsed.
+    assert parsed.source == _SOURCE.replace("Machine knows", "Machine  knows")
+    assert parsed.program is program
+    assert program == _full_parse(_SOURCE)
+
+    # Fixing the error parses everything edited since the last success.
+    _edit(parsed, "Machine  knows Source's label", "Machine knows Source's name")
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_unindented_comment_ends_a_block():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+
+    with pytest.raises(lark.exceptions.UnexpectedInput):
+        _edit(parsed, "    Source has", "# Source has")
+    _edit(parsed, "# Source has", "    Source has")
+
+    # At the end of a block, it's fine.
+    _edit(parsed, "    Machine knows", "# Machine knows")
+    assert parsed.program == _full_parse(parsed.source)
+
+
+def test_recorded_edits_are_parsed_together():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+    program = parsed.program
+    assert parsed.reparse() is None
+
+    for old, new in [("label.", "labe."), ("labe.", "title."), ("Print", "Show")]:
+        start = parsed.source.index(old)
+        parsed.record(TextEdit(start, start + len(old), new))
+    assert parsed.program == _full_parse(_SOURCE)
+
+    reparsed = parsed.reparse()
+
+    assert reparsed is not None
+    assert reparsed.universe == 0
+    assert parsed.program is program
+    assert program == _full_parse(parsed.source)
+    assert parsed.reparse() is None
+
+
+def test_edit_outside_the_source():
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+
+    with pytest.raises(ValueError, match="outside the source"):
+        parsed.edit(TextEdit(0, len(_SOURCE) + 1, ""))
+
+
+def test_random_edits_match_a_full_parse():
+    rng = random.Random(0)  # noqa: S311 - not for security
+    snippets = ["", " ", "\n", "    ", "x", ",", "#", "# ", "    Z is a Y.\n"]
+    parsed = ParsedSource(_SOURCE, parser=_parser)
+    for _ in range(500):
+        source = parsed.source
+        lines = source.splitlines(keepends=True)
+        line_starts = [0]
+        for line in lines:
+            line_starts.append(line_starts[-1] + len(line))
+        if rng.random() < 0.5:
+            start = end = rng.choice(line_starts)
+            text = rng.choice([*lines, *snippets])
+        else:
+            start = rng.randrange(len(source) + 1)
+            end = min(len(source), start + rng.choice([0, 1, 3]))
+            text = rng.choice(snippets)
+        edits = [TextEdit(start, end, text)]
+        if rng.random() < 0.5:
+            # Undo it, after it may have left the source with an error.
+            edits.append(TextEdit(start, start + len(text), source[start:end]))
+        for edit in edits:
+            edited = edit.apply(parsed.source)
+            try:
+                expected = _full_parse(edited)
+            except lark.exceptions.LarkError as e:
+                error = e
+            else:
+                parsed.edit(edit)
+                assert parsed.program == expected
+                assert _spans(parsed.program) == _spans(expected)
+                assert parsed.program.lines == expected.lines
+                assert parsed.source == edited
+                continue
+            program = parsed.program
+            with pytest.raises(type(error)) as raised:
+                parsed.edit(edit)
+            assert getattr(raised.value, "line", None) == getattr(error, "line", None)
+            assert getattr(raised.value, "column", None) == getattr(
+                error, "column", None
+            )
+            assert parsed.source == edited
+            assert parsed.program is program
@@ -1,39 +1,103 @@
 """Indentation handling for the Define grammar."""
 
-from lark.indenter import Indenter
+from collections.abc import Callable, Iterator
+from typing import cast
 
+import lark
+from lark.lark import PostLex
 
-class DefineIndenter(Indenter):
-    """Configure indentation handling for the Define grammar tests."""
+# Every level of indentation is this many spaces.
+INDENT_WIDTH = 4
 
-    # We have to do all of this as properties to make pyright happy.
 
-    @property
-    def NL_type(self) -> str:  # noqa: N802
-        """Return the token type for newlines."""
-        return "_NEWLINE"
+class InvalidIndentationError(lark.exceptions.UnexpectedInput):
+    """A line is indented in a way that doesn't fit the lines before it.
 
-    @property
-    def OPEN_PAREN_types(self) -> list[str]:  # noqa: N802
-        """Return the list of token types for opening parentheses."""
-        return []
+    It's an UnexpectedInput, positioned at the first character after the
+    indentation, so it's reported like the errors Lark raises.
+    """
 
-    @property
-    def CLOSE_PAREN_types(self) -> list[str]:  # noqa: N802
-        """Return the list of token types for closing parentheses."""
-        return []
+    def __init__(self, message: str, newline: lark.Token) -> None:
+        """Create an error for the line that newline ends with the indentation of."""
+        super().__init__(message)
+        # The lexer gives every token its end position.
+        self.line = cast("int", newline.end_line)
+        self.column = cast("int", newline.end_column)
+        self.pos_in_stream = newline.end_pos
 
-    @property
-    def INDENT_type(self) -> str:  # noqa: N802
-        """Return the token type for indentation."""
-        return "INDENT"
 
-    @property
-    def DEDENT_type(self) -> str:  # noqa: N802
-        """Return the token type for dedentation."""
-        return "DEDENT"
+class DefineIndenter(PostLex):
+    """Adds INDENT and DEDENT tokens where the indentation changes.
 
-    @property
-    def tab_len(self) -> int:
-        """Return the tab length in spaces."""
-        return 4
+    Define has no brackets that suspend indentation, and only indents with
+    spaces, four at a time, so this does less than lark.indenter.Indenter.
+    The tokens it makes are the same: INDENT and DEDENT tokens whose values
+    are the new line's indentation, at the _NEWLINE's position.
+    """
+
+    # The Lark contextual lexer needs to be able to lex a newline anywhere.
+    always_accept = ("_NEWLINE",)
+
+    def __init__(
+        self, on_error: Callable[[InvalidIndentationError], None] | None = None
+    ) -> None:
+        """Create an indenter.
+
+        Args:
+            on_error: Called with each error instead of raising it, for
+                parsing that carries on past errors. The line is then
+                taken to be at the indentation of the line before.
+        """
+        self.on_error = on_error
+
+    def process(self, stream: Iterator[lark.Token]) -> Iterator[lark.Token]:
+        """Return stream with INDENT and DEDENT tokens added.
+
+        Raises:
+            InvalidIndentationError: If a line's indentation isn't a
+                multiple of four spaces, or goes back to a level that no
+                line before it was at, unless on_error was given.
+        """
+        # The indentation of each block the current line is in.
+        levels = [0]
+        token = None
+        for token in stream:
+            yield token
+            if token.type != "_NEWLINE":
+                continue
+            value = token.value
+            # A _NEWLINE can span blank lines, and ends with the spaces at
+            # the start of the next line.
+            indent = len(value) - value.rfind("\n") - 1
+            if indent == levels[-1]:
+                continue
+            if indent % INDENT_WIDTH:
+                self._error(
+                    f"Indentation of {indent} spaces isn't a multiple of "
+                    f"{INDENT_WIDTH}",
+                    token,
+                )
+                continue
+            spaces = value[len(value) - indent :]
+            if indent > levels[-1]:
+                levels.append(indent)
+                yield lark.Token.new_borrow_pos("INDENT", spaces, token)
+                continue
+            while indent < levels[-1]:
+                levels.pop()
+                yield lark.Token.new_borrow_pos("DEDENT", spaces, token)
+            if indent != levels[-1]:
+                self._error(
+                    f"Unexpected dedent to column {indent}. Expected dedent to "
+                    f"{levels[-1]}",
+                    token,
+                )
+        if token is not None:
+            for _ in levels[1:]:
+                yield lark.Token.new_borrow_pos("DEDENT", "", token)
+
+    def _error(self, message: str, newline: lark.Token) -> None:
+        error = InvalidIndentationError(message, newline)
+        if self.on_error is None:
+            raise error
+        self.on_error(error)
@@ -0,0 +1,161 @@
+import contextlib
+import itertools
+import textwrap
+from collections.abc import Iterator
+from pathlib import Path
+
+import lark
+import pytest
+from lark.indenter import Indenter
+from lark.lark import PostLex
+
+from compiler import parser
+from compiler.indenter import DefineIndenter, InvalidIndentationError
+
+_EXAMPLE_FILES = sorted((Path(__file__).parent.parent / "examples").rglob("*.def"))
+
+
+class _LarkIndenter(Indenter):
+    """The indenter Lark's own Indenter makes, configured for Define."""
+
+    @property
+    def NL_type(self) -> str:  # noqa: N802
+        return "_NEWLINE"
+
+    @property
+    def OPEN_PAREN_types(self) -> list[str]:  # noqa: N802
+        return []
+
+    @property
+    def CLOSE_PAREN_types(self) -> list[str]:  # noqa: N802
+        return []
+
+    @property
+    def INDENT_type(self) -> str:  # noqa: N802
+        return "INDENT"
+
+    @property
+    def DEDENT_type(self) -> str:  # noqa: N802
+        return "DEDENT"
+
+    @property
+    def tab_len(self) -> int:
+        return 4
+
+
+class _Recorder(PostLex):
+    """Indents with _LarkIndenter, keeping the tokens before and after."""
+
+    always_accept = ("_NEWLINE",)
+
+    def __init__(self) -> None:
+        self.lexed: list[lark.Token] = []
+        self.indented: list[lark.Token] = []
+
+    def _record(self, stream: Iterator[lark.Token]) -> Iterator[lark.Token]:
+        for token in stream:
+            self.lexed.append(token)
+            yield token
+
+    def process(self, stream: Iterator[lark.Token]) -> Iterator[lark.Token]:
+        for token in _LarkIndenter().process(self._record(stream)):
+            self.indented.append(token)
+            yield token
+
+
+def _shape(token: lark.Token) -> tuple[object, ...]:
+    return (
+        token.type,
+        token.value,
+        token.start_pos,
+        token.line,
+        token.column,
+        token.end_pos,
+        token.end_line,
+        token.end_column,
+    )
+
+
+@pytest.fixture(scope="module")
+def recording_parser() -> tuple[lark.Lark, _Recorder]:
+    recorder = _Recorder()
+    return lark.Lark.open(
+        str(parser.GRAMMAR_PATH), parser="lalr", postlex=recorder
+    ), recorder
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        *(pytest.param(path.read_text(), id=path.name) for path in _EXAMPLE_FILES),
+        pytest.param(
+            textwrap.dedent(
+                """\
+                AbstractUniverse:
+
+                    Source is a ViewPoint.
+                    Source can Greet using a String named text,
+                    a Number named times:
+                        Source makes Source's label Print "hello", 1,
+                        2.
+
+                # A comment ends the block.
+                PhysicalUniverse:
+                    Machine creates a Machine named m:
+                        label: "x"
+                    Machine is a Computer.
+                """
+            ),
+            id="nested_blocks",
+        ),
+    ],
+)
+def test_tokens_match_lark_indenter(
+    recording_parser: tuple[lark.Lark, _Recorder], source: str
+):
+    lark_parser, recorder = recording_parser
+    recorder.lexed.clear()
+    recorder.indented.clear()
+    # Some examples use syntax the grammar doesn't have yet, so the tokens
+    # are compared up to where the parser stops.
+    with contextlib.suppress(lark.exceptions.UnexpectedInput):
+        lark_parser.parse(source)
+
+    indented = DefineIndenter().process(iter(recorder.lexed))
+
+    assert [
+        _shape(token) for token in itertools.islice(indented, len(recorder.indented))
+    ] == [_shape(token) for token in recorder.indented]
+
+
+@pytest.mark.parametrize(
+    ("source", "message", "line", "column"),
+    [
+        pytest.param(
+            "AbstractUniverse:\n  Foo is a Bar.\n",
+            "Indentation of 2 spaces isn't a multiple of 4",
+            2,
+            3,
+            id="two_spaces",
+        ),
+        pytest.param(
+            "PhysicalUniverse:\n    A creates a B named c:\n          d: 1\n",
+            "Indentation of 10 spaces isn't a multiple of 4",
+            3,
+            11,
+            id="ten_spaces_in_nested_block",
+        ),
+        pytest.param(
+            "AbstractUniverse:\n        Foo is a Bar.\n    Baz is a Bar.\n",
+            "Unexpected dedent to column 4. Expected dedent to 0",
+            3,
+            5,
+            id="dedent_between_levels",
+        ),
+    ],
+)
+def test_invalid_indentation(source: str, message: str, line: int, column: int):
+    with pytest.raises(InvalidIndentationError, match=message) as raised:
+        parser.Parser().parse(source)
+
+    assert (raised.value.line, raised.value.column) == (line, column)
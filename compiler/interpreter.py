@@ -0,0 +1,451 @@
+"""Running the actions of a program's physical universe.
+
+Values are Python strs for Strings, ints and floats for Numbers, and
+Entity objects for everything else. Each ViewPoint type is also a single
+entity (Machine in "Machine's terminal"), and a property that hasn't been
+set gets a default value when it's first read: "" or 0 for a compiler
+type, and a new entity for anything else.
+
+Everything that can be worked out from the program is worked out when an
+Interpreter is made, so running it doesn't look names up:
+
+- Each reference becomes a function from a frame (the target of the
+  action running, then its arguments) to a value. A parameter is a slot
+  in the frame, an entity is a slot in a list of entities, and a
+  ViewPoint is the entity itself.
+- Each action execution becomes a function that evaluates its target and
+  arguments, and runs whatever the dispatch table holds for the target's
+  type and the action's name.
+- The dispatch table has an entry for every type and every action it has,
+  inherited ones included. A declared action's entry runs its body with a
+  new frame. A builtin's entry is a Python function, which replaces
+  anything Define declares for the same type and action, such as
+  Terminal's Output in computer.def.
+
+The interpreter expects a program that compiler.validator and
+compiler.knowledge accept. What it can't make sense of raises
+InterpreterError, when the Interpreter is made if it can be found then.
+"""
+
+import operator
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+
+from compiler import ast
+from compiler.validator import PRELUDE, TypeHierarchy
+
+_VIEW_POINT = "ViewPoint"
+_DIMENSION_POINT = "DimensionPoint"
+# The value a property of each compiler type has until it's set.
+_DEFAULTS: dict[str, str | int] = {"String": "", "Number": 0}
+
+
+class InterpreterError(Exception):
+    """A program can't be run."""
+
+
+@dataclass(eq=False, slots=True)
+class Entity:
+    """An entity of a type declared in Define, rather than a compiler type."""
+
+    type_name: str
+    # The properties that have been set or read, by name.
+    properties: dict[str, "Value"] = field(default_factory=dict)
+
+
+type Value = str | int | float | Entity
+# The target of the action running, then its arguments.
+type Frame = list[Value]
+# Runs an action with a target and arguments.
+type Builtin = Callable[[Value, list[Value]], object]
+
+type _Getter = Callable[[Frame], Value]
+type _Run = Callable[[Frame], None]
+
+
+def type_of(value: Value) -> str:
+    """Return the name of a value's type."""
+    if type(value) is Entity:
+        return value.type_name
+    return "String" if isinstance(value, str) else "Number"
+
+
+def text(value: Value) -> str:
+    """Return how a value is written out, such as by Terminal's Output."""
+    if isinstance(value, Entity):
+        inner = value.properties.get("value")
+        return value.type_name if inner is None else text(inner)
+    return str(value)
+
+
+def terminal_output(write: Callable[[str], object]) -> Builtin:
+    """Return a builtin for Terminal's Output that writes its argument.
+
+    Args:
+        write: Called with the text of the argument, such as print or a
+            list's append.
+    """
+
+    def output(target: Value, arguments: list[Value]) -> None:  # noqa: ARG001
+        write(text(arguments[0]))
+
+    return output
+
+
+def default_builtins() -> dict[tuple[str, str], Builtin]:
+    """Return the builtins an Interpreter uses if it isn't given any."""
+    return {("Terminal", "Output"): terminal_output(print)}
+
+
+def _statements(programs: Iterable[ast.Program]) -> list[ast.ASTNode]:
+    return [
+        statement
+        for program in programs
+        for universe in program.universes
+        for statement in universe.statements
+    ]
+
+
+def _by_type[T](
+    declared: dict[tuple[str, str], T], hierarchy: TypeHierarchy
+) -> dict[tuple[str, str], T]:
+    """Return what's declared for each type, including what it inherits.
+
+    Args:
+        declared: Something declared for a type and a name, keyed by both.
+        hierarchy: The types. What a type declares replaces what it
+            inherits with the same name.
+    """
+    names: dict[str, list[str]] = {}
+    for type_name, name in declared:
+        names.setdefault(type_name, []).append(name)
+    flattened = dict(declared)
+    for type_name in hierarchy:
+        for ancestor in hierarchy.ancestors(type_name):
+            for name in names.get(ancestor, ()):
+                flattened.setdefault((type_name, name), declared[ancestor, name])
+    return flattened
+
+
+class Interpreter:
+    """A program, ready to run (see the module docstring)."""
+
+    def __init__(
+        self,
+        program: ast.Program,
+        dependencies: Iterable[ast.Program] = (),
+        builtins: Mapping[tuple[str, str], Builtin] | None = None,
+    ) -> None:
+        """Prepare a program to run.
+
+        Args:
+            program: The program, whose physical universe has the actions
+                to run.
+            dependencies: Programs whose declarations and entities it uses,
+                as in validator.validate, such as computer.def.
+            builtins: The function for each type and action implemented in
+                Python, keyed by both. default_builtins() if not given.
+
+        Raises:
+            InterpreterError: If a reference or an action declaration can't
+                be resolved.
+            ast.UniverseNotFoundError: If the program has no physical
+                universe.
+        """
+        physical = program.get_physical_universe()
+        statements = [*PRELUDE, *_statements([*dependencies, program])]
+        parents: dict[str, str | None] = {}
+        for statement in statements:
+            if isinstance(statement, ast.BaseTypeDeclaration):
+                parents.setdefault(
+                    statement.type_name, getattr(statement, "parent_type", None)
+                )
+        self.hierarchy = TypeHierarchy(parents)
+        # What's declared first counts, as in validator.validate.
+        property_types: dict[tuple[str, str], str] = {}
+        for statement in statements:
+            if isinstance(statement, ast.PropertyDeclaration):
+                key = (statement.type_name, statement.property_name)
+                property_types.setdefault(key, statement.property_type)
+        self._property_types = _by_type(property_types, self.hierarchy)
+        self._view_points: dict[str, Entity] = {}
+
+        # Each entity's slot in the list of entities, in creation order.
+        self._entity_slots: dict[str, int] = {}
+        creations = []
+        for statement in statements:
+            if (
+                isinstance(statement, ast.EntityCreation)
+                and statement.entity_name not in self._entity_slots
+            ):
+                self._entity_slots[statement.entity_name] = len(creations)
+                creations.append(statement)
+        self._creators = {
+            creation.entity_name: creation.creator for creation in creations
+        }
+        self._entities: list[Value | None] = [None] * len(creations)
+
+        actions: dict[tuple[str, str], Builtin] = {}
+        bodies: list[tuple[ast.ActionDeclaration, list[_Run]]] = []
+        for statement in statements:
+            if isinstance(statement, ast.ActionDeclaration):
+                key = (statement.type_name, statement.action_name)
+                if key in actions:
+                    continue
+                body: list[_Run] = []
+                actions[key] = self._declared_action(statement, body)
+                bodies.append((statement, body))
+        actions.update(default_builtins() if builtins is None else builtins)
+        self.dispatch = _by_type(actions, self.hierarchy)
+
+        # Bodies are compiled once every action is in the table, so they
+        # can run any of them, themselves included.
+        for declaration, body in bodies:
+            slots = {
+                parameter.param_name: index
+                for index, parameter in enumerate(declaration.parameters, 1)
+            }
+            body.extend(
+                self._execution(execution, declaration.type_name, slots)
+                for execution in declaration.body
+            )
+        self._creations = [self._creation(creation) for creation in creations]
+        self._executions = [
+            self._execution(statement, None, {})
+            for statement in physical.statements
+            if isinstance(statement, ast.ActionExecution)
+        ]
+
+    def run(self) -> None:
+        """Create the program's entities, then run its physical universe.
+
+        This is create_entities, then run_actions.
+
+        Raises:
+            InterpreterError: If an action can't be run, or a declared
+                action recurses past Python's recursion limit.
+        """
+        self.create_entities()
+        self.run_actions()
+
+    def create_entities(self) -> None:
+        """Create the program's entities, replacing any created before.
+
+        The ViewPoints are the same every time.
+
+        Raises:
+            InterpreterError: If a value an entity is created with can't
+                be resolved.
+        """
+        entities = self._entities
+        for slot, create in enumerate(self._creations):
+            entities[slot] = create()
+
+    def run_actions(self) -> None:
+        """Run the physical universe, with the entities already created.
+
+        The actions executed at the top level of the physical universe run
+        in order.
+
+        Raises:
+            InterpreterError: If an action can't be run, or a declared
+                action recurses past Python's recursion limit.
+        """
+        frame: Frame = []
+        for execution in self._executions:
+            execution(frame)
+
+    def view_point(self, type_name: str) -> Entity:
+        """Return the entity a ViewPoint type is.
+
+        Raises:
+            InterpreterError: If the type isn't a ViewPoint.
+        """
+        entity = self._view_points.get(type_name)
+        if entity is None:
+            if not self.hierarchy.is_subtype(type_name, _VIEW_POINT):
+                raise InterpreterError(f"{type_name} isn't a ViewPoint")
+            entity = self._view_points[type_name] = Entity(type_name)
+        return entity
+
+    def entity(self, name: str) -> Value:
+        """Return an entity the program created, by name.
+
+        Raises:
+            InterpreterError: If there's no such entity, or it hasn't been
+                created yet.
+        """
+        slot = self._entity_slots.get(name)
+        value = None if slot is None else self._entities[slot]
+        if value is None:
+            raise InterpreterError(f"{name} hasn't been created")
+        return value
+
+    def property_value(self, value: Value, name: str) -> Value:
+        """Return a property of a value, giving it its default if it's unset.
+
+        Raises:
+            InterpreterError: If the value's type has no such property.
+        """
+        if type(value) is not Entity:
+            if name == "value":
+                return value
+            raise InterpreterError(f"{type_of(value)} has no property named {name}")
+        properties = value.properties
+        found = properties.get(name)
+        if found is not None:
+            return found
+        property_type = self._property_types.get((value.type_name, name))
+        if property_type is None:
+            raise InterpreterError(f"{value.type_name} has no property named {name}")
+        default = self._new(property_type, value)
+        properties[name] = default
+        return default
+
+    def _new(self, type_name: str, owner: Entity | None) -> Value:
+        """Return a new value of a type, with nothing set.
+
+        Args:
+            type_name: The type.
+            owner: The entity the value is made for. If the value is a
+                DimensionPoint, its owner is set to the ViewPoint that
+                entity is, or belongs to.
+        """
+        default = _DEFAULTS.get(type_name)
+        if default is not None:
+            return default
+        if self.hierarchy.is_subtype(type_name, _VIEW_POINT):
+            return self.view_point(type_name)
+        entity = Entity(type_name)
+        if owner is not None and self.hierarchy.is_subtype(type_name, _DIMENSION_POINT):
+            if self.hierarchy.is_subtype(owner.type_name, _VIEW_POINT):
+                entity.properties["owner"] = owner
+            elif "owner" in owner.properties:
+                entity.properties["owner"] = owner.properties["owner"]
+        return entity
+
+    def _creation(self, creation: ast.EntityCreation) -> Callable[[], Value]:
+        creator = self.view_point(creation.creator)
+        assignments = [
+            (assignment.name, self._value(assignment.value, None, {}))
+            for assignment in creation.properties
+        ]
+        type_name = creation.type_name
+        frame: Frame = []
+
+        def create() -> Value:
+            value = self._new(type_name, creator)
+            for name, get in assignments:
+                if isinstance(value, Entity):
+                    value.properties[name] = get(frame)
+                elif name == "value":
+                    value = get(frame)
+            return value
+
+        return create
+
+    def _value(
+        self,
+        value: ast.ValueReference,
+        type_name: str | None,
+        slots: dict[str, int],
+    ) -> _Getter:
+        """Return a function that gets a value, given the frame it's in.
+
+        Args:
+            value: The value.
+            type_name: The type whose action the value is in, if any.
+            slots: The frame slot of each of that action's parameters.
+        """
+        if isinstance(value, ast.StringLiteral | ast.NumberLiteral):
+            constant = value.value
+            return lambda frame: constant  # noqa: ARG005
+        if not isinstance(value, ast.PropertyOrEntityReference):
+            raise InterpreterError(f"Can't evaluate a {type(value).__name__}")
+        owner, name = value.owner, value.property_name
+        get_property = self.property_value
+        if owner == type_name:
+            slot = slots.get(name)
+            if slot is not None:
+                return operator.itemgetter(slot)
+            return lambda frame: get_property(frame[0], name)
+        if self._creators.get(name) == owner:
+            return self._entity_getter(name)
+        if owner in self._entity_slots:
+            get_entity = self._entity_getter(owner)
+            return lambda frame: get_property(get_entity(frame), name)
+        if self.hierarchy.is_subtype(owner, _VIEW_POINT):
+            view_point = self.view_point(owner)
+            return lambda frame: get_property(view_point, name)  # noqa: ARG005
+        raise InterpreterError(f"Can't resolve {owner}'s {name}")
+
+    def _entity_getter(self, name: str) -> _Getter:
+        entities = self._entities
+        slot = self._entity_slots[name]
+
+        def get(frame: Frame) -> Value:  # noqa: ARG001
+            value = entities[slot]
+            if value is None:
+                raise InterpreterError(f"{name} hasn't been created")
+            return value
+
+        return get
+
+    def _execution(
+        self,
+        execution: ast.ActionExecution,
+        type_name: str | None,
+        slots: dict[str, int],
+    ) -> _Run:
+        """Return a function that runs an action execution in a frame.
+
+        Args:
+            execution: The action execution.
+            type_name: The type whose action it's in the body of, if any.
+            slots: The frame slot of each of that action's parameters.
+        """
+        get_target = self._value(execution.target, type_name, slots)
+        get_arguments = [
+            self._value(argument, type_name, slots) for argument in execution.arguments
+        ]
+        action_name = execution.action_name
+        dispatch = self.dispatch
+
+        def run(frame: Frame) -> None:
+            target = get_target(frame)
+            action = dispatch.get((type_of(target), action_name))
+            if action is None:
+                raise InterpreterError(
+                    f"{type_of(target)} has no action named {action_name}"
+                )
+            action(target, [get(frame) for get in get_arguments])
+
+        return run
+
+    def _declared_action(
+        self, declaration: ast.ActionDeclaration, body: list[_Run]
+    ) -> Builtin:
+        """Return a function that runs an action's body.
+
+        Args:
+            declaration: The action.
+            body: The body, compiled. It may be filled in later.
+        """
+        parameters = len(declaration.parameters)
+        name = f"{declaration.type_name}'s {declaration.action_name}"
+
+        def run(target: Value, arguments: list[Value]) -> None:
+            if len(arguments) != parameters:
+                raise InterpreterError(
+                    f"{name} takes {parameters} arguments, not {len(arguments)}"
+                )
+            frame = [target, *arguments]
+            try:
+                for execution in body:
+                    execution(frame)
+            except RecursionError as e:
+                # Each action runs in Python frames, so recursing in Define
+                # recurses in Python. The innermost action names itself.
+                raise InterpreterError(f"{name} recursed too deeply") from e
+
+        return run
@@ -0,0 +1,181 @@
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from compiler import ast, interpreter, knowledge, validator
+from compiler.interpreter import Entity, Interpreter, InterpreterError
+from compiler.parser import Parser
+
+_parser = Parser()
+
+_EXAMPLES = Path(__file__).parent.parent / "examples"
+_computer = _parser.parse_to_ast((_EXAMPLES / "computer.def").read_text())
+
+_SOURCE = textwrap.dedent(
+    """\
+    AbstractUniverse:
+        Source is a ViewPoint.
+        Source creates a String named greeting:
+            value: "Hello"
+        Source creates a Number named count:
+            value: 3
+
+    PhysicalUniverse:
+        Machine is a Computer.
+        Machine knows Source's greeting.
+        Machine knows Source's count.
+        Terminal can Greet using a String named name, a String named punctuation:
+            Machine makes Machine's terminal Output Terminal's name.
+            Machine makes Machine's terminal Output Terminal's punctuation.
+        Screen is a Terminal.
+        Machine has a Screen named screen.
+        Machine makes Machine's terminal Greet Source's greeting, "!".
+        Machine makes Machine's screen Greet "Screen", "?".
+        Machine makes Machine's screen Output greeting's value.
+    """
+)
+
+
+def _run(source: str, **builtins: interpreter.Builtin) -> list[str]:
+    output: list[str] = []
+    table = {("Terminal", "Output"): interpreter.terminal_output(output.append)}
+    table.update({(name, "Output"): builtin for name, builtin in builtins.items()})
+    Interpreter(_parser.parse_to_ast(textwrap.dedent(source)), [_computer], table).run()
+    return output
+
+
+def test_hello_world(capsys: pytest.CaptureFixture[str]):
+    program = _parser.parse_to_ast((_EXAMPLES / "helloworld.def").read_text())
+
+    Interpreter(program, [_computer]).run()
+
+    assert capsys.readouterr().out == "Hello, world!\n"
+
+
+def test_declared_actions():
+    program = _parser.parse_to_ast(_SOURCE)
+    assert validator.validate(program, [_computer]) == []
+    assert knowledge.check(program, [_computer]) == []
+
+    assert _run(_SOURCE) == ["Hello", "!", "Screen", "?", "Hello"]
+
+
+def test_builtins_replace_and_are_inherited():
+    screen: list[str] = []
+
+    def output(target: interpreter.Value, arguments: list[interpreter.Value]) -> None:
+        assert isinstance(target, Entity)
+        screen.append(f"{target.type_name}: {interpreter.text(arguments[0])}")
+
+    # Greet's body outputs to Machine's terminal, whatever its target is.
+    assert _run(_SOURCE, Screen=output) == [
+        "Hello",
+        "!",
+        "Screen",
+        "?",
+    ]
+    assert screen == ["Screen: Hello"]
+
+
+def test_dispatch_table():
+    runner = Interpreter(_parser.parse_to_ast(_SOURCE), [_computer])
+
+    assert runner.dispatch["Screen", "Greet"] is runner.dispatch["Terminal", "Greet"]
+    assert runner.dispatch["Screen", "Output"] is runner.dispatch["Terminal", "Output"]
+    assert ("Machine", "Greet") not in runner.dispatch
+
+
+def test_properties_get_defaults():
+    runner = Interpreter(_parser.parse_to_ast(_SOURCE), [_computer])
+    machine = runner.view_point("Machine")
+
+    screen = runner.property_value(machine, "screen")
+
+    assert isinstance(screen, Entity)
+    assert screen.type_name == "Screen"
+    assert runner.property_value(machine, "screen") is screen
+    assert runner.property_value(screen, "owner") is machine
+    with pytest.raises(InterpreterError, match="Machine has no property named size"):
+        runner.property_value(machine, "size")
+
+
+def test_entities_are_created_by_running(capsys: pytest.CaptureFixture[str]):
+    # Without builtins, Terminal's Output is what computer.def declares,
+    # which does nothing.
+    runner = Interpreter(_parser.parse_to_ast(_SOURCE), [_computer], {})
+    with pytest.raises(InterpreterError, match="greeting hasn't been created"):
+        runner.entity("greeting")
+
+    runner.run()
+
+    assert capsys.readouterr().out == ""
+    assert runner.entity("greeting") == "Hello"
+    assert runner.entity("count") == 3
+
+
+def test_creating_entities_and_running_actions_separately():
+    output: list[str] = []
+    builtins = {("Terminal", "Output"): interpreter.terminal_output(output.append)}
+    runner = Interpreter(_parser.parse_to_ast(_SOURCE), [_computer], builtins)
+
+    runner.create_entities()
+    assert runner.entity("greeting") == "Hello"
+    assert output == []
+    runner.run_actions()
+    runner.run_actions()
+
+    assert output == ["Hello", "!", "Screen", "?", "Hello"] * 2
+
+
+def test_entities_of_declared_types():
+    source = """\
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Ball is a DimensionPoint.
+            Ball has a String named label.
+            Ball has a String named colour.
+            Source creates a Ball named ball:
+                label: "Ball"
+
+        PhysicalUniverse:
+            Machine is a Computer.
+            Machine knows Source's ball.
+            Machine makes Machine's terminal Output ball's label.
+            Machine makes Machine's terminal Output ball's colour.
+        """
+    program = _parser.parse_to_ast(textwrap.dedent(source))
+    assert validator.validate(program, [_computer]) == []
+
+    assert _run(source) == ["Ball", ""]
+
+
+def test_errors():
+    unresolved = """\
+        PhysicalUniverse:
+            Machine is a Computer.
+            Machine makes Machine's terminal Output Nobody's greeting.
+        """
+    wrong_arguments = """\
+        PhysicalUniverse:
+            Machine is a Computer.
+            Terminal can Beep using a String named sound:
+                Machine makes Machine's terminal Output Terminal's sound.
+            Machine makes Machine's terminal Beep "beep", "boop".
+        """
+    recursive = """\
+        PhysicalUniverse:
+            Machine is a Computer.
+            Terminal can Loop using a String named text:
+                Machine makes Machine's terminal Loop Terminal's text.
+            Machine makes Machine's terminal Loop "again".
+        """
+
+    with pytest.raises(InterpreterError, match="Can't resolve Nobody's greeting"):
+        _run(unresolved)
+    with pytest.raises(InterpreterError, match="Terminal's Beep takes 1 arguments"):
+        _run(wrong_arguments)
+    with pytest.raises(InterpreterError, match="Terminal's Loop recursed too deeply"):
+        _run(recursive)
+    with pytest.raises(ast.UniverseNotFoundError):
+        Interpreter(ast.Program([]))
@@ -0,0 +1,134 @@
+"""Checking that ViewPoints only access entities they may.
+
+"Knowledge" in the spec: a ViewPoint can access the entities it created,
+and the entities of other ViewPoints it knows with a knowledge statement.
+Entities are accessed through references, as the target or arguments of
+an action execution (accessed by its actor), or as the value of a
+property an entity creation sets (accessed by its creator).
+
+A reference accesses an entity if it's written as the entity's creator
+and name (Source's greeting), or if its owner is the entity, to get at one
+of its properties (greeting's value). Any other reference, to a type's
+property or an action's parameter, doesn't access an entity.
+
+KnowledgeIndex collects who created and who knows each entity in one pass
+over the statements, and check makes a second, looking each reference up
+in it, so checking is linear in the size of the program however many
+knowledge statements it has. check assumes the program has passed
+compiler.validator: it doesn't report unknown names or bad knowledge
+statements again.
+"""
+
+from collections.abc import Iterable
+
+from compiler import ast
+from compiler.validator import SemanticError
+
+
+class KnowledgeIndex:
+    """Who created and who knows each entity in some statements."""
+
+    def __init__(self, statements: Iterable[ast.ASTNode]) -> None:
+        """Index the entity creations and knowledge statements in statements.
+
+        Action bodies aren't looked in, since they can only hold action
+        executions.
+        """
+        # The creator of each entity. Entity names are unique in a valid
+        # program, but if one isn't, the first creation counts.
+        self.creators: dict[str, str] = {}
+        # Each (knower, owner, entity name) a knowledge statement declares.
+        self.known: set[tuple[str, str, str]] = set()
+        for statement in statements:
+            if isinstance(statement, ast.EntityCreation):
+                self.creators.setdefault(statement.entity_name, statement.creator)
+            elif isinstance(statement, ast.KnowledgeStatement):
+                self.known.add(
+                    (statement.knower, statement.owner, statement.entity_name)
+                )
+
+    def entity(
+        self, reference: ast.PropertyOrEntityReference
+    ) -> tuple[str, str] | None:
+        """Return the owner and name of the entity a reference accesses.
+
+        Returns:
+            The owner and name, or None if the reference doesn't access an
+            entity.
+        """
+        owner, name = reference.owner, reference.property_name
+        if self.creators.get(name) == owner:
+            return owner, name
+        creator = self.creators.get(owner)
+        if creator is not None:
+            return creator, owner
+        return None
+
+    def can_access(self, view_point: str, owner: str, entity_name: str) -> bool:
+        """Return whether a ViewPoint can access an entity another owns."""
+        return view_point == owner or (view_point, owner, entity_name) in self.known
+
+
+def _statements(programs: Iterable[ast.Program]) -> list[ast.ASTNode]:
+    return [
+        statement
+        for program in programs
+        for universe in program.universes
+        for statement in universe.statements
+    ]
+
+
+def _accesses(statement: ast.ASTNode) -> list[tuple[str, ast.ValueReference]]:
+    """Return each value a statement reads, with the ViewPoint reading it."""
+    match statement:
+        case ast.ActionExecution():
+            return [
+                (statement.actor, value)
+                for value in (statement.target, *statement.arguments)
+            ]
+        case ast.ActionDeclaration():
+            return [
+                access
+                for execution in statement.body
+                for access in _accesses(execution)
+            ]
+        case ast.EntityCreation():
+            return [
+                (statement.creator, assignment.value)
+                for assignment in statement.properties
+            ]
+        case _:
+            return []
+
+
+def check(
+    program: ast.Program, dependencies: Iterable[ast.Program] = ()
+) -> list[SemanticError]:
+    """Check that every entity a program accesses is visible where it is.
+
+    Args:
+        program: The program to check.
+        dependencies: Programs whose entities and knowledge it uses, as in
+            validator.validate. Only the program's own accesses are
+            checked.
+
+    Returns:
+        An error for each reference to an entity that the ViewPoint using
+        it didn't create and doesn't know, in source order.
+    """
+    statements = _statements([program])
+    index = KnowledgeIndex([*_statements(dependencies), *statements])
+    errors = []
+    for statement in statements:
+        for view_point, value in _accesses(statement):
+            if not isinstance(value, ast.PropertyOrEntityReference):
+                continue
+            entity = index.entity(value)
+            if entity is not None and not index.can_access(view_point, *entity):
+                owner, name = entity
+                errors.append(
+                    SemanticError(
+                        f"{view_point} doesn't know {owner}'s {name}", value.span
+                    )
+                )
+    return errors
@@ -0,0 +1,170 @@
+import textwrap
+from pathlib import Path
+
+from compiler import ast, knowledge
+from compiler.knowledge import KnowledgeIndex
+from compiler.parser import Parser
+
+_parser = Parser()
+
+_EXAMPLES = Path(__file__).parent.parent / "examples"
+
+_SOURCE_ENTITIES = """\
+    AbstractUniverse:
+        Source is a ViewPoint.
+        Source creates a String named greeting:
+            value: "Hello"
+        Source creates a Number named count:
+            value: 1
+    """
+
+
+def _errors(source: str, dependencies: tuple[str, ...] = ()) -> list[str]:
+    program = _parser.parse_to_ast(textwrap.dedent(source))
+    parsed = [
+        _parser.parse_to_ast(textwrap.dedent(dependency)) for dependency in dependencies
+    ]
+    return [str(error) for error in knowledge.check(program, parsed)]
+
+
+def test_hello_world():
+    program = _parser.parse_to_ast((_EXAMPLES / "helloworld.def").read_text())
+
+    assert knowledge.check(program) == []
+
+
+def test_view_points_can_access_what_they_created():
+    source = """\
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Source creates a String named greeting.
+            Source creates a String named copy:
+                value: Source's greeting
+            Source makes Source's greeting Print Source's copy, copy's value.
+        """
+
+    assert _errors(source) == []
+
+
+def test_view_points_must_know_what_others_created():
+    source = """\
+        PhysicalUniverse:
+            Machine is a Computer.
+            Machine knows Source's greeting.
+            Machine makes Machine's terminal Output Source's greeting.
+            Machine makes Machine's terminal Output Source's count.
+            Machine makes Source's count Print count's value.
+        """
+
+    assert _errors(source, (_SOURCE_ENTITIES,)) == [
+        "5:45: Machine doesn't know Source's count",
+        "6:19: Machine doesn't know Source's count",
+        "6:40: Machine doesn't know Source's count",
+    ]
+
+
+def test_knowledge_can_come_after_the_access():
+    source = """\
+        AbstractUniverse:
+            Other is a ViewPoint.
+            Other creates a String named label:
+                value: Source's count
+            Other knows Source's count.
+        """
+
+    assert _errors(source, (_SOURCE_ENTITIES,)) == []
+
+
+def test_knowing_one_entity_of_an_owner_isnt_knowing_another():
+    source = """\
+        AbstractUniverse:
+            Other is a ViewPoint.
+            Other knows Source's greeting.
+            Other creates a String named label:
+                value: Source's count
+        """
+
+    assert _errors(source, (_SOURCE_ENTITIES,)) == [
+        "5:16: Other doesn't know Source's count"
+    ]
+
+
+def test_action_bodies_are_checked_with_their_actor():
+    source = """\
+        AbstractUniverse:
+            Other is a ViewPoint.
+            Shape is a DimensionPoint.
+            Shape can Grow using a Number named by:
+                Other makes Shape's by Add Source's count.
+                Source makes Shape's by Add Source's count.
+        """
+
+    assert _errors(source, (_SOURCE_ENTITIES,)) == [
+        "5:36: Other doesn't know Source's count"
+    ]
+
+
+def test_references_to_types_and_parameters_arent_entity_accesses():
+    program = _parser.parse_to_ast(
+        textwrap.dedent(
+            """\
+            AbstractUniverse:
+                Source is a ViewPoint.
+                Source creates a String named greeting.
+                Other is a ViewPoint.
+                Other makes Source's label Print Source's size, Shape's by.
+            """
+        )
+    )
+    index = KnowledgeIndex(program.universes[0].statements)
+    execution = program.universes[0].statements[-1]
+    assert isinstance(execution, ast.ActionExecution)
+
+    assert index.entity(execution.target) is None
+    assert index.entity(ast.PropertyOrEntityReference("Source", "greeting")) == (
+        "Source",
+        "greeting",
+    )
+    assert index.entity(ast.PropertyOrEntityReference("greeting", "value")) == (
+        "Source",
+        "greeting",
+    )
+    assert knowledge.check(program) == []
+
+
+def test_the_first_creation_of_an_entity_counts():
+    index = KnowledgeIndex(
+        [
+            ast.EntityCreation("Source", "String", "greeting", []),
+            ast.EntityCreation("Other", "String", "greeting", []),
+            ast.KnowledgeStatement("Machine", "Source", "greeting"),
+        ]
+    )
+
+    assert index.creators == {"greeting": "Source"}
+    assert index.can_access("Machine", "Source", "greeting")
+    assert index.can_access("Source", "Source", "greeting")
+    assert not index.can_access("Other", "Source", "greeting")
+
+
+def test_many_knowledge_statements():
+    # Each knower reads the entity it knows and another, except the one
+    # in the middle, for which they're the same.
+    count = 100_001
+    statements: list[ast.ASTNode] = []
+    for i in range(count):
+        statements.append(ast.EntityCreation("Source", "String", f"e{i}", []))
+        statements.append(ast.KnowledgeStatement(f"Knower{i}", "Source", f"e{i}"))
+        statements.append(
+            ast.ActionExecution(
+                f"Knower{i}",
+                ast.PropertyOrEntityReference("Source", f"e{i}"),
+                "Print",
+                [ast.PropertyOrEntityReference("Source", f"e{count - 1 - i}")],
+            )
+        )
+    program = ast.Program([ast.UniverseBlock("AbstractUniverse", statements)])
+
+    errors = knowledge.check(program)
+
+    assert len(errors) == count - 1
@@ -0,0 +1,852 @@
+"""A language server for Define, spoken over stdin and stdout.
+
+Editors start it with `python -m compiler lsp` (the VS Code extension in
+.vscode/extensions/define-lang does). It speaks the parts of the Language
+Server Protocol that the compiler can answer so far:
+
+- Diagnostics: parse errors, unknown type names and circular
+  dependencies, for open files as they're edited and for the rest of the
+  project as it changes on disk.
+- Go to definition, for type names and entity names.
+- Hover, showing the statements that declare a type or create an entity.
+
+Messages are JSON-RPC, framed with a Content-Length header; the protocol
+needs no more than the standard library. Open files are parsed
+incrementally as they're edited (see compiler.incremental), in a pool of
+background threads, so the server keeps reading messages while a large
+file is checked. A check of a version of a file that has been edited
+since is skipped, and requests that the client cancels, or whose file is
+edited before they're answered, are answered with an error instead.
+
+An edit that breaks an open file only gets a diagnostic for the first
+syntax error straight away, since that's what the incremental parse
+finds. Finding the rest means parsing the whole file again, so it's done
+once the file hasn't been edited for a moment (RECOVERY_DELAY), outside
+the lock that checks hold, and the diagnostics are published again if
+the file hasn't changed since.
+
+Positions in the protocol are lines and UTF-16 code units, as the
+protocol requires by default.
+"""
+
+import bisect
+import json
+import logging
+import re
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+import lark
+
+from compiler import ast, project, references
+from compiler.incremental import ParsedSource, TextEdit
+from compiler.parser import Parser
+from compiler.workspace import Diagnostic, Workspace
+
+# How many requests and checks can be waiting on each other at once.
+# Parsing and checking happen one at a time, since they share the
+# workspace, but requests that are cancelled or out of date are answered
+# without waiting for them.
+DEFAULT_WORKERS = 4
+# How long, in seconds, an open file with a syntax error has to go without
+# an edit before the rest of its syntax errors are looked for.
+RECOVERY_DELAY = 0.5
+
+# Error codes, from the JSON-RPC and Language Server Protocol
+# specifications.
+_METHOD_NOT_FOUND = -32601
+_INTERNAL_ERROR = -32603
+_SERVER_NOT_INITIALIZED = -32002
+_REQUEST_CANCELLED = -32800
+_CONTENT_MODIFIED = -32801
+
+_SEVERITY_ERROR = 1
+_FILE_DELETED = 3
+# Incremental text document sync: didChange sends only the edited ranges.
+_SYNC_INCREMENTAL = 2
+
+_NEWLINE = re.compile("\n")
+_WORD = re.compile(r"\w+")
+# A comment, or a word outside one.
+_WORD_OR_COMMENT = re.compile(r"#[^\n]*|\w+")
+
+_logger = logging.getLogger(__name__)
+
+type Message = dict[str, Any]
+
+
+class _ResponseError(Exception):
+    """A request failed, with a JSON-RPC error code."""
+
+    def __init__(self, code: int, message: str) -> None:
+        """Create an error to answer a request with."""
+        super().__init__(message)
+        self.code = code
+
+
+def read_message(stream: BinaryIO) -> Message | None:
+    """Read one message.
+
+    Returns:
+        The message, or None if the stream ended.
+
+    Raises:
+        ValueError: If the message isn't framed or encoded properly.
+    """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length is None:
+        raise ValueError("Message has no Content-Length header")
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def write_message(stream: BinaryIO, message: Message) -> None:
+    """Write one message and flush it."""
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode()
+    stream.write(b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    stream.flush()
+
+
+def _utf16_length(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _utf16_index(line: str, units: int) -> int:
+    """Return the index of the character units UTF-16 code units into line."""
+    if line.isascii():
+        return min(units, len(line))
+    seen = 0
+    for index, char in enumerate(line):
+        if seen >= units:
+            return index
+        seen += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+def path_to_uri(path: Path) -> str:
+    """Return the file URI of a path."""
+    return path.absolute().as_uri()
+
+
+def uri_to_path(uri: str) -> Path:
+    """Return the path of a file URI."""
+    return Path(url2pathname(unquote(urlparse(uri).path)))
+
+
+class _Document:
+    """A file's text, and where its lines begin.
+
+    For an open file, it's the text the editor has, kept up to date as
+    it's edited, with the edits that haven't been parsed yet.
+    """
+
+    def __init__(self, uri: str, path: Path, version: int | None, text: str) -> None:
+        self.uri = uri
+        # Relative to the workspace root, if it's under it.
+        self.path = path
+        # The editor's version of an open file, or None for one on disk.
+        self.version = version
+        self.text = text
+        self._line_starts = [0, *(m.end() for m in _NEWLINE.finditer(text))]
+        # The edits made since the last check, in order.
+        self.pending: list[TextEdit] = []
+        # The file's AST, kept up to date by checks, or None until the file
+        # has parsed once. Only checks use it.
+        self.parsed: ParsedSource | None = None
+
+    def _line(self, line: int) -> str:
+        start = self._line_starts[line]
+        if line + 1 < len(self._line_starts):
+            return self.text[start : self._line_starts[line + 1] - 1]
+        return self.text[start:]
+
+    def offset(self, position: Message) -> int:
+        """Return the offset in the text of a protocol Position."""
+        line = position["line"]
+        if line >= len(self._line_starts):
+            return len(self.text)
+        return self._line_starts[line] + _utf16_index(
+            self._line(line), position["character"]
+        )
+
+    def position(self, offset: int) -> Message:
+        """Return the protocol Position of an offset in the text."""
+        line = bisect.bisect_right(self._line_starts, offset) - 1
+        start = self._line_starts[line]
+        return {"line": line, "character": _utf16_length(self.text[start:offset])}
+
+    def range(self, start: int, end: int) -> Message:
+        """Return the protocol Range of a span of the text."""
+        return {"start": self.position(start), "end": self.position(end)}
+
+    def change(self, change: Message) -> None:
+        """Make a change the editor sent, and remember it for the next check.
+
+        Args:
+            change: A TextDocumentContentChangeEvent: text, and the range
+                it replaces, or no range to replace the whole text.
+        """
+        if "range" in change:
+            start = self.offset(change["range"]["start"])
+            end = self.offset(change["range"]["end"])
+        else:
+            start, end = 0, len(self.text)
+        edit = TextEdit(start, end, change["text"])
+        self.text = edit.apply(self.text)
+        starts = self._line_starts
+        first = bisect.bisect_right(starts, edit.start)
+        last = bisect.bisect_right(starts, edit.end)
+        delta = len(edit.text) - (edit.end - edit.start)
+        starts[first:] = [
+            *(edit.start + m.end() for m in _NEWLINE.finditer(edit.text)),
+            *(start + delta for start in starts[last:]),
+        ]
+        self.pending.append(edit)
+
+    def word_at(self, offset: int) -> tuple[int, int] | None:
+        """Return the span of the word at or just before an offset, if any."""
+        line = bisect.bisect_right(self._line_starts, offset) - 1
+        line_start = self._line_starts[line]
+        for match in _WORD.finditer(self._line(line)):
+            if line_start + match.start() <= offset <= line_start + match.end():
+                return line_start + match.start(), line_start + match.end()
+        return None
+
+    def _span_offsets(self, span: int) -> tuple[int, int] | None:
+        """Return the offsets of a node's span, if the text has its lines."""
+        if span == ast.NO_SPAN:
+            return None
+        (start_line, start_column), (end_line, end_column) = (
+            ast.span_start(span),
+            ast.span_end(span),
+        )
+        if end_line > len(self._line_starts):
+            return None
+        return (
+            self._line_starts[start_line - 1] + start_column - 1,
+            self._line_starts[end_line - 1] + end_column - 1,
+        )
+
+    def name_span(self, node: ast.ASTNode, name: str) -> tuple[int, int] | None:
+        """Return the span of the text where a node names a name, if any.
+
+        Only the node's own words count, not those of the nodes under it
+        or of comments.
+        """
+        span = self._span_offsets(node.span)
+        if span is None:
+            return None
+        children = [
+            offsets
+            for child in ast.walk(node)
+            if child is not node
+            and (offsets := self._span_offsets(child.span)) is not None
+        ]
+        for match in _WORD_OR_COMMENT.finditer(self.text, *span):
+            if match.group() == name and not any(
+                start <= match.start() < end for start, end in children
+            ):
+                return match.span()
+        return None
+
+    def diagnostic(self, diagnostic: Diagnostic) -> Message:
+        """Return the protocol Diagnostic for a problem in the text."""
+        start = end = 0
+        # A problem with a name is at the name, rather than at the start
+        # of the node it's in.
+        name_span = None
+        if diagnostic.node is not None and diagnostic.name is not None:
+            name_span = self.name_span(diagnostic.node, diagnostic.name)
+        if name_span is not None:
+            start, end = name_span
+        elif diagnostic.line is not None and diagnostic.line <= len(self._line_starts):
+            start = (
+                self._line_starts[diagnostic.line - 1] + (diagnostic.column or 1) - 1
+            )
+            start = min(start, len(self.text))
+            span = self.word_at(start)
+            end = span[1] if span is not None else min(start + 1, len(self.text))
+        return {
+            "range": self.range(start, end),
+            "severity": _SEVERITY_ERROR,
+            "source": "define",
+            "message": diagnostic.message,
+        }
+
+
+def _render(statement: ast.ASTNode) -> str:
+    """Return the header line of a statement, as it's written in Define."""
+    match statement:
+        case ast.TypeDeclaration():
+            return f"{statement.type_name} is a {statement.parent_type}."
+        case ast.CompilerTypeDeclaration():
+            return f"{statement.type_name} is."
+        case ast.PropertyDeclaration():
+            return (
+                f"{statement.type_name} has a {statement.property_type} "
+                f"named {statement.property_name}."
+            )
+        case ast.ActionDeclaration():
+            line = f"{statement.type_name} can {statement.action_name}"
+            if statement.parameters:
+                line += " using " + ", ".join(
+                    f"a {param.param_type} named {param.param_name}"
+                    for param in statement.parameters
+                )
+            return line + ":"
+        case ast.EntityCreation():
+            line = (
+                f"{statement.creator} creates a {statement.type_name} "
+                f"named {statement.entity_name}"
+            )
+            return line + (":" if statement.properties else ".")
+    return ""
+
+
+class LanguageServer:
+    """Answers one editor's requests about a Define project."""
+
+    def __init__(
+        self,
+        reader: BinaryIO,
+        writer: BinaryIO,
+        *,
+        root: Path | None = None,
+        parser: Parser | None = None,
+        workers: int = DEFAULT_WORKERS,
+        recovery_delay: float = RECOVERY_DELAY,
+    ) -> None:
+        """Create a server. Call serve to start answering.
+
+        Args:
+            reader: Where messages from the client come from.
+            writer: Where messages to the client go.
+            root: The project root, if the client doesn't say. Defaults to
+                the current directory.
+            parser: The parser to use. A new one is made if not given.
+            workers: How many background threads to check and answer
+                requests in.
+            recovery_delay: How long an open file with a syntax error has
+                to go without an edit before the rest of its syntax errors
+                are looked for.
+        """
+        self._reader = reader
+        self._writer = writer
+        self._root = root or Path()
+        self._parser = parser
+        # Made when the client initializes the server.
+        self.workspace: Workspace | None = None
+        self._documents: dict[str, _Document] = {}
+        # The requests that have been received and not yet answered, and
+        # those of them that the client has cancelled.
+        self._outstanding: set[int | str] = set()
+        self._cancelled: set[int | str] = set()
+        self._shutdown = False
+        # Guards the documents and the request sets. It's only held
+        # briefly, so that messages keep being read.
+        self._lock = threading.Lock()
+        # Serializes checks and requests, which use the workspace and the
+        # documents' ASTs. It's taken before self._lock.
+        self._analysis_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="define-lsp")
+        self._recovery_delay = recovery_delay
+        # The timer for each open file whose syntax errors after the first
+        # will be looked for, and whether new timers can still be started.
+        # Both are guarded by self._lock.
+        self._recoveries: dict[str, threading.Timer] = {}
+        self._recovering = True
+        # Looks for syntax errors outside self._analysis_lock, so it has a
+        # parser of its own, which it only uses with its lock held.
+        self._recovery_parser: Parser | None = None
+        self._recovery_lock = threading.Lock()
+
+    def serve(self) -> int:
+        """Answer messages until the client says to exit, or stops sending.
+
+        Returns:
+            The exit code: 0 if the client shut the server down first, as
+            it should, and 1 otherwise.
+        """
+        try:
+            while (message := read_message(self._reader)) is not None:
+                if message.get("method") == "exit":
+                    break
+                self.handle(message)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            with self._lock:
+                self._recovering = False
+                timers = list(self._recoveries.values())
+            for timer in timers:
+                timer.cancel()
+                timer.join()
+        return 0 if self._shutdown else 1
+
+    def _send(self, message: Message) -> None:
+        message["jsonrpc"] = "2.0"
+        with self._write_lock:
+            write_message(self._writer, message)
+
+    def _notify(self, method: str, params: Message) -> None:
+        self._send({"method": method, "params": params})
+
+    def _respond(self, request_id: int | str, result: Any) -> None:
+        self._send({"id": request_id, "result": result})
+
+    def _respond_error(self, request_id: int | str, code: int, message: str) -> None:
+        self._send({"id": request_id, "error": {"code": code, "message": message}})
+
+    def handle(self, message: Message) -> None:
+        """Handle one message from the client, other than exit."""
+        method = message.get("method")
+        params = message.get("params") or {}
+        if method is None:
+            # A response to a request from the server, which it doesn't make.
+            return
+        if "id" not in message:
+            try:
+                self._handle_notification(method, params)
+            except Exception:
+                _logger.exception("Handling %s failed", method)
+            return
+        request_id = message["id"]
+        match method:
+            case "initialize":
+                self._respond(request_id, self._initialize(params))
+            case "shutdown":
+                self._shutdown = True
+                self._respond(request_id, None)
+            case _ if self.workspace is None:
+                self._respond_error(
+                    request_id, _SERVER_NOT_INITIALIZED, "Not initialized yet"
+                )
+            case "textDocument/definition":
+                self._submit_request(request_id, params, self._definition)
+            case "textDocument/hover":
+                self._submit_request(request_id, params, self._hover)
+            case _:
+                self._respond_error(
+                    request_id, _METHOD_NOT_FOUND, f"Unknown method: {method}"
+                )
+
+    def _handle_notification(self, method: str, params: Message) -> None:
+        match method:
+            case "initialized":
+                # The client is ready for diagnostics.
+                self._executor.submit(self._run, self._scan)
+            case "textDocument/didOpen":
+                self._did_open(params["textDocument"])
+            case "textDocument/didChange":
+                self._did_change(params["textDocument"], params["contentChanges"])
+            case "textDocument/didClose":
+                self._did_close(params["textDocument"]["uri"])
+            case "workspace/didChangeWatchedFiles":
+                self._did_change_watched_files(params["changes"])
+            case "$/cancelRequest":
+                with self._lock:
+                    if params["id"] in self._outstanding:
+                        self._cancelled.add(params["id"])
+
+    def _initialize(self, params: Message) -> Message:
+        if params.get("rootUri"):
+            self._root = uri_to_path(params["rootUri"])
+        elif params.get("rootPath"):
+            self._root = Path(params["rootPath"])
+        self.workspace = Workspace(self._root, parser=self._parser)
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": _SYNC_INCREMENTAL},
+                "definitionProvider": True,
+                "hoverProvider": True,
+            },
+            "serverInfo": {"name": "define"},
+        }
+
+    def _workspace(self) -> Workspace:
+        if self.workspace is None:
+            raise _ResponseError(_SERVER_NOT_INITIALIZED, "Not initialized yet")
+        return self.workspace
+
+    def _path(self, uri: str) -> Path:
+        """Return the path of a file, relative to the root if it's under it."""
+        path = uri_to_path(uri)
+        try:
+            return path.relative_to(self._root.absolute())
+        except ValueError:
+            return path
+
+    def _uri(self, path: Path) -> str:
+        with self._lock:
+            for document in self._documents.values():
+                if document.path == path:
+                    return document.uri
+        return path_to_uri(self._workspace().root / path)
+
+    def _open_paths(self) -> set[Path]:
+        with self._lock:
+            return {document.path for document in self._documents.values()}
+
+    def _run(self, task: Callable[[], None]) -> None:
+        try:
+            task()
+        except Exception:
+            _logger.exception("Background task failed")
+
+    # Notifications.
+
+    def _did_open(self, item: Message) -> None:
+        uri = item["uri"]
+        document = _Document(uri, self._path(uri), item["version"], item["text"])
+        with self._lock:
+            self._documents[uri] = document
+        self._executor.submit(self._run, lambda: self._check(uri, item["version"]))
+
+    def _did_change(self, identifier: Message, changes: list[Message]) -> None:
+        uri = identifier["uri"]
+        with self._lock:
+            document = self._documents[uri]
+            for change in changes:
+                document.change(change)
+            document.version = identifier["version"]
+            self._cancel_recovery(uri)
+        self._executor.submit(
+            self._run, lambda: self._check(uri, identifier["version"])
+        )
+
+    def _did_close(self, uri: str) -> None:
+        with self._lock:
+            document = self._documents.pop(uri)
+            self._cancel_recovery(uri)
+
+        def reload() -> None:
+            with self._analysis_lock:
+                if document.path in self._open_paths():
+                    return
+                # The editor's contents are gone, so go back to the disk's.
+                affected = self._workspace().update([document.path])
+                self._publish(affected | {document.path}, {document.path: uri})
+
+        self._executor.submit(self._run, reload)
+
+    def _did_change_watched_files(self, changes: list[Message]) -> None:
+        paths = {self._path(change["uri"]) for change in changes}
+        uris = {
+            self._path(change["uri"]): change["uri"]
+            for change in changes
+            if change["type"] == _FILE_DELETED
+        }
+
+        def update() -> None:
+            with self._analysis_lock:
+                # Open files are as the editor has them, not as on disk.
+                affected = self._workspace().update(paths - self._open_paths())
+                self._publish(affected, uris)
+
+        self._executor.submit(self._run, update)
+
+    # Checking.
+
+    def _scan(self) -> None:
+        with self._analysis_lock:
+            workspace = self._workspace()
+            paths = set(project.discover_files(workspace.root))
+            workspace.update(paths - self._open_paths())
+            self._publish(set(workspace.check()))
+
+    def _check(self, uri: str, version: int) -> None:
+        """Parse and check the edits to an open file, and publish diagnostics."""
+        with self._analysis_lock:
+            with self._lock:
+                document = self._documents.get(uri)
+                if document is None or document.version != version:
+                    # It's been closed, or edited again, and the check for
+                    # that will cover these edits too.
+                    return
+                edits, document.pending = document.pending, []
+                source = document.text
+            workspace = self._workspace()
+            parsed = self._parse(document, edits, source)
+            affected = workspace.update_parsed(document.path, source, parsed)
+            self._publish(affected | {document.path})
+            known = workspace.files.get(document.path)
+            if known is not None and known.first_error_only:
+                self._schedule_recovery(uri, version, source)
+
+    def _schedule_recovery(self, uri: str, version: int, source: str) -> None:
+        """Look for every syntax error in a version of an open file, soon.
+
+        It's put off until the file has gone RECOVERY_DELAY without an
+        edit: an edit cancels it (see _cancel_recovery).
+        """
+        timer = threading.Timer(
+            self._recovery_delay,
+            self._run,
+            [lambda: self._recover(uri, version, source)],
+        )
+        with self._lock:
+            if not self._recovering:
+                return
+            self._cancel_recovery(uri)
+            self._recoveries[uri] = timer
+        timer.start()
+
+    def _cancel_recovery(self, uri: str) -> None:
+        """Stop looking for a file's syntax errors. Hold self._lock."""
+        timer = self._recoveries.pop(uri, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _recover(self, uri: str, version: int, source: str) -> None:
+        """Find every syntax error in a version of an open file, and publish them.
+
+        The file is parsed without holding self._analysis_lock, so checks
+        of other files carry on meanwhile.
+        """
+        with self._lock:
+            document = self._documents.get(uri)
+            if document is None or document.version != version:
+                return
+        with self._recovery_lock:
+            if self._recovery_parser is None:
+                self._recovery_parser = Parser()
+            recovered = self._recovery_parser.recover(source)
+        with self._analysis_lock:
+            with self._lock:
+                if self._documents.get(uri) is not document or (
+                    document.version != version
+                ):
+                    return
+            if self._workspace().set_recovered(document.path, source, recovered.errors):
+                self._publish({document.path})
+
+    def _parse(
+        self, document: _Document, edits: list[TextEdit], source: str
+    ) -> ast.Program | Exception:
+        """Bring a document's AST up to date with source.
+
+        Returns:
+            The AST, or the error parsing source raised.
+        """
+        workspace = self._workspace()
+        try:
+            if document.parsed is None:
+                document.parsed = ParsedSource(
+                    source, parser=workspace.parser, symbols=workspace.symbols
+                )
+            else:
+                for edit in edits:
+                    document.parsed.record(edit)
+                document.parsed.reparse()
+        except lark.exceptions.LarkError as e:
+            return e
+        return document.parsed.program
+
+    def _document(self, path: Path) -> _Document | None:
+        """Return the text of a file: the editor's if it's open, or the disk's."""
+        with self._lock:
+            for document in self._documents.values():
+                if document.path == path:
+                    return document
+        try:
+            text = (self._workspace().root / path).read_text()
+        except (OSError, UnicodeDecodeError):
+            return None
+        return _Document(path_to_uri(self._workspace().root / path), path, None, text)
+
+    def _publish(self, paths: set[Path], uris: dict[Path, str] | None = None) -> None:
+        """Send the diagnostics of files to the client.
+
+        Args:
+            paths: The files.
+            uris: The URIs of files that aren't open and may not be on disk
+                any more.
+        """
+        workspace = self._workspace()
+        cycles = workspace.graph.cycles()
+        for path in sorted(paths):
+            document = self._document(path)
+            if document is None or path not in workspace.files:
+                # Removed, so it has no problems any more.
+                uri = (uris or {}).get(path) or self._uri(path)
+                self._notify(
+                    "textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []}
+                )
+                continue
+            with self._lock:
+                if document.pending:
+                    # It's been edited, and the check for that will publish
+                    # diagnostics that match what the editor has.
+                    continue
+                params: Message = {
+                    "uri": document.uri,
+                    "diagnostics": [
+                        document.diagnostic(diagnostic)
+                        for diagnostic in workspace.diagnostics(path, cycles)
+                    ],
+                }
+                if document.version is not None:
+                    params["version"] = document.version
+            self._notify("textDocument/publishDiagnostics", params)
+
+    # Requests.
+
+    def _submit_request(
+        self,
+        request_id: int | str,
+        params: Message,
+        answer: Callable[[_Document, int], Any],
+    ) -> None:
+        uri = params["textDocument"]["uri"]
+        with self._lock:
+            document = self._documents.get(uri)
+            version = document.version if document is not None else None
+            self._outstanding.add(request_id)
+        self._executor.submit(
+            self._answer, request_id, uri, version, params["position"], answer
+        )
+
+    def _answer(
+        self,
+        request_id: int | str,
+        uri: str,
+        version: int | None,
+        position: Message,
+        answer: Callable[[_Document, int], Any],
+    ) -> None:
+        """Answer a request about a position in an open file."""
+        try:
+            with self._lock:
+                # Don't wait for checks to answer a request that won't be.
+                self._check_current(request_id, uri, version)
+            with self._analysis_lock:
+                with self._lock:
+                    document = self._check_current(request_id, uri, version)
+                    offset = document.offset(position)
+                result = answer(document, offset)
+            with self._lock:
+                self._check_current(request_id, uri, version)
+        except _ResponseError as e:
+            self._respond_error(request_id, e.code, str(e))
+        except Exception as e:
+            _logger.exception("Answering request %r failed", request_id)
+            self._respond_error(request_id, _INTERNAL_ERROR, str(e))
+        else:
+            self._respond(request_id, result)
+        finally:
+            with self._lock:
+                self._outstanding.discard(request_id)
+                self._cancelled.discard(request_id)
+
+    def _check_current(
+        self, request_id: int | str, uri: str, version: int | None
+    ) -> _Document:
+        """Return the document a request is about. Hold self._lock.
+
+        Raises:
+            _ResponseError: If the request was cancelled, or the document
+                was closed or edited since the request was made.
+        """
+        if request_id in self._cancelled:
+            raise _ResponseError(_REQUEST_CANCELLED, "Request cancelled")
+        document = self._documents.get(uri)
+        if document is None or document.version != version:
+            raise _ResponseError(_CONTENT_MODIFIED, "The document has changed")
+        return document
+
+    def _declarations(self, name: str) -> list[tuple[Path, ast.ASTNode]]:
+        """Return the statements that declare a name, and their files.
+
+        A name can be a type or an entity, or both.
+        """
+        workspace = self._workspace()
+        found: list[tuple[Path, ast.ASTNode]] = []
+        paths = workspace.declaring_files(name) | workspace.creating_files(name)
+        for path in sorted(paths):
+            program = workspace.files[path].program
+            if program is None:
+                continue
+            for universe in program.universes:
+                found.extend(
+                    (path, stmt)
+                    for stmt in universe.get_declarations_by_type_name(name)
+                    if isinstance(stmt, ast.BaseTypeDeclaration)
+                )
+                found.extend(
+                    (path, stmt) for stmt in universe.get_entity_creations_by_name(name)
+                )
+        return found
+
+    def _definition(self, document: _Document, offset: int) -> list[Message]:
+        span = document.word_at(offset)
+        if span is None:
+            return []
+        name = document.text[span[0] : span[1]]
+        locations = []
+        for path, stmt in self._declarations(name):
+            declaring = document if path == document.path else self._document(path)
+            if declaring is None:
+                continue
+            if (found := declaring.name_span(stmt, name)) is not None:
+                locations.append(
+                    {"uri": declaring.uri, "range": declaring.range(*found)}
+                )
+        return locations
+
+    def _hover(self, document: _Document, offset: int) -> Message | None:
+        span = document.word_at(offset)
+        if span is None:
+            return None
+        name = document.text[span[0] : span[1]]
+        # The statements about the name in each universe, in file order.
+        # Member declarations count as references to their type, so the
+        # files that refer to the name have every declaration of it.
+        workspace = self._workspace()
+        by_universe: dict[str, list[str]] = {}
+        paths = workspace.referring_files(name) | workspace.creating_files(name)
+        for path in sorted(paths):
+            program = workspace.files[path].program
+            if program is None:
+                continue
+            for universe in program.universes:
+                statements = [
+                    *universe.get_declarations_by_type_name(name),
+                    *universe.get_entity_creations_by_name(name),
+                ]
+                if statements:
+                    by_universe.setdefault(universe.name, []).extend(
+                        _render(statement) for statement in statements
+                    )
+        if by_universe:
+            lines = []
+            for universe_name, statements in by_universe.items():
+                lines.append(f"{universe_name}:")
+                lines.extend(f"    {statement}" for statement in statements)
+            value = "```define\n" + "\n".join(lines) + "\n```"
+        elif name in references.BUILTIN_TYPES:
+            value = f"`{name}` is a built-in type."
+        else:
+            return None
+        return {
+            "contents": {"kind": "markdown", "value": value},
+            "range": document.range(*span),
+        }
@@ -0,0 +1,390 @@
+import io
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from compiler import language_server
+from compiler.parser import Parser
+
+_parser = Parser()
+
+_TYPES = "AbstractUniverse:\n    Source is a ViewPoint.\n    Source has a String named label.\n"
+_ENTITIES = (
+    "PhysicalUniverse:\n"
+    "    Source creates a Source named origin.\n"
+    "    Source knows Source's origin.\n"
+)
+
+
+class _Client:
+    """Talks to a LanguageServer running in a thread, over pipes."""
+
+    def __init__(
+        self, root: Path, recovery_delay: float = language_server.RECOVERY_DELAY
+    ) -> None:
+        server_in, client_out = os.pipe()
+        client_in, server_out = os.pipe()
+        self._server_in = os.fdopen(server_in, "rb")
+        self._server_out = os.fdopen(server_out, "wb")
+        self._client_in = os.fdopen(client_in, "rb")
+        self._client_out = os.fdopen(client_out, "wb")
+        self.server = language_server.LanguageServer(
+            self._server_in,
+            self._server_out,
+            parser=_parser,
+            recovery_delay=recovery_delay,
+        )
+        self.root = root
+        self.versions: dict[str, int] = {}
+        self.exit_code: int | None = None
+        self._next_id = 0
+        self._messages: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._responses: dict[int, dict[str, Any]] = {}
+        self._serving = threading.Thread(target=self._serve)
+        self._serving.start()
+        self._reading = threading.Thread(target=self._read)
+        self._reading.start()
+
+    def _serve(self) -> None:
+        self.exit_code = self.server.serve()
+        # Let the reader see the end of the messages.
+        self._server_out.close()
+
+    def _read(self) -> None:
+        while (message := language_server.read_message(self._client_in)) is not None:
+            self._messages.put(message)
+
+    def send(self, message: dict[str, Any]) -> None:
+        language_server.write_message(self._client_out, {"jsonrpc": "2.0", **message})
+
+    def notify(self, method: str, params: dict[str, Any]) -> None:
+        self.send({"method": method, "params": params})
+
+    def request(self, method: str, params: dict[str, Any]) -> int:
+        self._next_id += 1
+        self.send({"id": self._next_id, "method": method, "params": params})
+        return self._next_id
+
+    def receive(self, matches) -> dict[str, Any]:
+        """Return the next message that matches.
+
+        Notifications that don't match are skipped, and responses are kept
+        for response.
+        """
+        while True:
+            message = self._messages.get(timeout=10)
+            if matches(message):
+                return message
+            if "id" in message:
+                self._responses[message["id"]] = message
+
+    def response(self, request_id: int) -> dict[str, Any]:
+        if request_id in self._responses:
+            return self._responses.pop(request_id)
+        return self.receive(lambda message: message.get("id") == request_id)
+
+    def diagnostics(self, name: str) -> list[dict[str, Any]]:
+        uri = self.uri(name)
+        message = self.receive(
+            lambda message: (
+                message.get("method") == "textDocument/publishDiagnostics"
+                and message["params"]["uri"] == uri
+            )
+        )
+        return message["params"]["diagnostics"]
+
+    def uri(self, name: str) -> str:
+        return language_server.path_to_uri(self.root / name)
+
+    def open(self, name: str, text: str) -> None:
+        self.versions[name] = 1
+        self.notify(
+            "textDocument/didOpen",
+            {
+                "textDocument": {
+                    "uri": self.uri(name),
+                    "languageId": "define",
+                    "version": 1,
+                    "text": text,
+                }
+            },
+        )
+
+    def change(self, name: str, *changes: dict[str, Any]) -> None:
+        self.versions[name] += 1
+        self.notify(
+            "textDocument/didChange",
+            {
+                "textDocument": {"uri": self.uri(name), "version": self.versions[name]},
+                "contentChanges": list(changes),
+            },
+        )
+
+    def at(self, name: str, line: int, character: int) -> dict[str, Any]:
+        return {
+            "textDocument": {"uri": self.uri(name)},
+            "position": {"line": line, "character": character},
+        }
+
+    def close(self) -> None:
+        if self._serving.is_alive():
+            self.notify("exit", {})
+            self._serving.join(timeout=10)
+        self._reading.join(timeout=10)
+        assert not self._serving.is_alive()
+        assert not self._reading.is_alive()
+        for file in (self._server_in, self._client_in, self._client_out):
+            file.close()
+
+
+def _range(start_line: int, start: int, end_line: int, end: int) -> dict[str, Any]:
+    return {
+        "start": {"line": start_line, "character": start},
+        "end": {"line": end_line, "character": end},
+    }
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> Iterator[_Client]:
+    (tmp_path / "types.def").write_text(_TYPES)
+    (tmp_path / "broken.def").write_text("AbstractUniverse:\n    Foo  is a Bar.\n")
+    client = _Client(tmp_path)
+    try:
+        response = client.response(
+            client.request(
+                "initialize", {"rootUri": client.uri(""), "capabilities": {}}
+            )
+        )
+        assert response["result"]["capabilities"]["hoverProvider"] is True
+        client.notify("initialized", {})
+        # Files on disk with problems get diagnostics once the project is
+        # scanned.
+        (problem,) = client.diagnostics("broken.def")
+        assert problem["range"] == _range(1, 8, 1, 9)
+        yield client
+    finally:
+        client.close()
+
+
+def test_messages_are_framed_with_content_length():
+    stream = io.BytesIO()
+    language_server.write_message(stream, {"id": 1, "result": "é"})
+    language_server.write_message(stream, {"id": 2, "result": None})
+    # The length is in bytes, not characters.
+    assert stream.getvalue().startswith(b"Content-Length: 22\r\n\r\n{")
+
+    stream.seek(0)
+    assert language_server.read_message(stream) == {"id": 1, "result": "é"}
+    assert language_server.read_message(stream) == {"id": 2, "result": None}
+    assert language_server.read_message(stream) is None
+
+    with pytest.raises(ValueError, match="Content-Length"):
+        language_server.read_message(io.BytesIO(b"Content-Type: json\r\n\r\n{}"))
+
+
+def test_diagnostics_follow_edits(client: _Client):
+    client.open("main.def", "AbstractUniverse:\n    Main is a Missing.\n")
+    (problem,) = client.diagnostics("main.def")
+    assert problem["message"] == "Unknown type name: Missing"
+    assert problem["range"] == _range(1, 14, 1, 21)
+
+    # Break the file, then fix it by declaring the type, one edit at a time.
+    client.change("main.def", {"range": _range(1, 8, 1, 8), "text": " "})
+    (problem,) = client.diagnostics("main.def")
+    assert problem["message"].startswith("UnexpectedToken")
+    assert problem["range"]["start"] == {"line": 1, "character": 9}
+    client.change(
+        "main.def",
+        {"range": _range(1, 8, 1, 9), "text": ""},
+        {"range": _range(2, 0, 2, 0), "text": "    Missing is a ViewPoint.\n"},
+    )
+    assert client.diagnostics("main.def") == []
+
+    # Closing the file goes back to what's on disk, which isn't there.
+    client.notify(
+        "textDocument/didClose", {"textDocument": {"uri": client.uri("main.def")}}
+    )
+    assert client.diagnostics("main.def") == []
+
+
+def test_name_diagnostics_point_at_the_node(client: _Client):
+    client.open(
+        "main.def",
+        "AbstractUniverse:\n"
+        "    # Missing is declared elsewhere.\n"
+        "    Main is a ViewPoint.\n"
+        "    Main creates a String named label:\n"
+        '        value: "Missing"\n'
+        "    Main has a Missing named part.\n",
+    )
+
+    (problem,) = client.diagnostics("main.def")
+
+    assert problem["message"] == "Unknown type name: Missing"
+    assert problem["range"] == _range(5, 15, 5, 22)
+
+
+def test_every_syntax_error_is_found_once_edits_stop(tmp_path: Path):
+    client = _Client(tmp_path, recovery_delay=0.01)
+    try:
+        client.response(
+            client.request(
+                "initialize", {"rootUri": client.uri(""), "capabilities": {}}
+            )
+        )
+        client.open(
+            "main.def",
+            "AbstractUniverse:\n    A  is a ViewPoint.\n    B is a ViewPoint\n",
+        )
+
+        # The incremental parse stops at the first error.
+        (first,) = client.diagnostics("main.def")
+        both = client.diagnostics("main.def")
+
+        assert [problem["range"]["start"] for problem in both] == [
+            first["range"]["start"],
+            {"line": 2, "character": 20},
+        ]
+    finally:
+        client.close()
+
+
+def test_edits_affect_other_files(client: _Client):
+    (client.root / "user.def").write_text("AbstractUniverse:\n    User is a Source.\n")
+    client.notify(
+        "workspace/didChangeWatchedFiles",
+        {"changes": [{"uri": client.uri("user.def"), "type": 1}]},
+    )
+    assert client.diagnostics("user.def") == []
+
+    # Renaming Source in the open types.def breaks user.def.
+    client.open("types.def", _TYPES)
+    assert client.diagnostics("types.def") == []
+    client.change("types.def", {"range": _range(1, 4, 1, 10), "text": "Origin"})
+    (problem,) = client.diagnostics("user.def")
+    assert problem["message"] == "Unknown type name: Source"
+    assert problem["range"] == _range(1, 14, 1, 20)
+
+
+def test_positions_are_in_utf16_code_units(client: _Client):
+    text = 'PhysicalUniverse:\n    Source creates a Source named origin:\n        label: "😀é"\n'
+    client.open("main.def", text)
+    assert client.diagnostics("main.def") == []
+
+    # The emoji is two code units and é is one, so the closing quote is at
+    # 19.
+    client.change("main.def", {"range": _range(2, 19, 2, 19), "text": "x"})
+    assert client.diagnostics("main.def") == []
+    document = client.server._documents[client.uri("main.def")]
+    assert document.text == text.replace('é"', 'éx"')
+
+
+def test_definition(client: _Client):
+    client.open("main.def", _ENTITIES)
+    client.diagnostics("main.def")
+
+    response = client.response(
+        client.request("textDocument/definition", client.at("main.def", 1, 22))
+    )
+    assert response["result"] == [
+        {"uri": client.uri("types.def"), "range": _range(1, 4, 1, 10)}
+    ]
+
+    response = client.response(
+        client.request("textDocument/definition", client.at("main.def", 2, 27))
+    )
+    assert response["result"] == [
+        {"uri": client.uri("main.def"), "range": _range(1, 34, 1, 40)}
+    ]
+
+    response = client.response(
+        client.request("textDocument/definition", client.at("main.def", 2, 11))
+    )
+    assert response["result"] == []
+
+
+def test_hover(client: _Client):
+    client.open("main.def", _ENTITIES)
+    client.diagnostics("main.def")
+
+    response = client.response(
+        client.request("textDocument/hover", client.at("main.def", 1, 6))
+    )
+    assert response["result"] == {
+        "contents": {
+            "kind": "markdown",
+            "value": "```define\n"
+            "AbstractUniverse:\n"
+            "    Source is a ViewPoint.\n"
+            "    Source has a String named label.\n"
+            "```",
+        },
+        "range": _range(1, 4, 1, 10),
+    }
+
+    response = client.response(
+        client.request("textDocument/hover", client.at("main.def", 2, 30))
+    )
+    assert (
+        "Source creates a Source named origin."
+        in response["result"]["contents"]["value"]
+    )
+
+    client.change(
+        "main.def",
+        {"range": _range(2, 0, 2, 0), "text": "    Source knows String's x.\n"},
+    )
+    client.diagnostics("main.def")
+    response = client.response(
+        client.request("textDocument/hover", client.at("main.def", 2, 20))
+    )
+    assert response["result"]["contents"]["value"] == "`String` is a built-in type."
+
+
+def test_stale_and_cancelled_requests(client: _Client):
+    client.open("main.def", _ENTITIES)
+    client.diagnostics("main.def")
+
+    # Hold up the server's workers while the requests are made.
+    with client.server._analysis_lock:
+        cancelled = client.request("textDocument/hover", client.at("main.def", 1, 6))
+        client.notify("$/cancelRequest", {"id": cancelled})
+        stale = client.request("textDocument/hover", client.at("main.def", 1, 6))
+        client.change("main.def", {"range": _range(0, 0, 0, 0), "text": "# New.\n"})
+        # Wait for the change to be read.
+        while client.server._documents[client.uri("main.def")].version != 2:
+            time.sleep(0.001)
+
+    assert client.response(cancelled)["error"]["code"] == -32800
+    assert client.response(stale)["error"]["code"] == -32801
+
+
+def test_shutdown_and_exit(client: _Client):
+    assert client.response(client.request("shutdown", {})) == {
+        "jsonrpc": "2.0",
+        "id": 2,
+        "result": None,
+    }
+    client.notify("exit", {})
+    client.close()
+    assert client.exit_code == 0
+
+
+def test_requests_before_initialize(tmp_path: Path):
+    client = _Client(tmp_path)
+    try:
+        response = client.response(
+            client.request("textDocument/hover", client.at("a.def", 0, 0))
+        )
+        assert response["error"]["code"] == -32002
+        response = client.response(client.request("unknown", {}))
+        assert response["error"]["code"] == -32002
+    finally:
+        client.close()
+    assert client.exit_code == 1
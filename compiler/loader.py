@@ -0,0 +1,169 @@
+"""Loading the files of a program on demand, starting from an entry file.
+
+Proposal 8 loads a file when a global name is first referenced, and
+proposal 7 says where that file is: a global name's path under the
+project root matches the name. Type names stand in for global names (see
+compiler.references), so the type Foo is loaded from Foo.def.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from compiler import ast, project, references
+from compiler.ast_cache import AstCache
+from compiler.dependencies import DependencyGraph
+from compiler.parser import Parser, read_source
+from compiler.symbols import SymbolTable
+
+
+class LoadError(Exception):
+    """A file that a program needs couldn't be loaded."""
+
+
+class UnresolvedNameError(LoadError):
+    """A name isn't declared anywhere the program can see."""
+
+
+class MisplacedNameError(LoadError):
+    """A file doesn't declare the name that its path says it does."""
+
+
+def name_to_path(name: str) -> Path:
+    """Return the file a global name is loaded from, relative to the root."""
+    return Path(f"{name}{project.DEF_SUFFIX}")
+
+
+@dataclass
+class LoadedFile:
+    """A file that has been loaded."""
+
+    # Relative to the project root.
+    path: Path
+    program: ast.Program
+    # The type names the file declares.
+    defined: frozenset[str]
+    # The names the file refers to that it neither declares nor has built
+    # in, each with the file it's loaded from.
+    imports: dict[str, Path]
+
+
+class Loader:
+    """Loads files as the names in them are referenced, once each.
+
+    Loaded files are kept, so loading another entry file that shares
+    dependencies with one already loaded only parses the new files. Every
+    file parsed by one Loader interns its names into the same SymbolTable.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        parser: Parser | None = None,
+        cache: AstCache | None = None,
+    ) -> None:
+        """Create a loader.
+
+        Args:
+            root: The project root.
+            parser: The parser to use. A new one is made if not given.
+            cache: A cache to look ASTs up in before parsing, and to store
+                them in after. Its symbol table is shared, so cached and
+                parsed files intern names into the same one.
+        """
+        self.root = root
+        self.parser = parser or Parser()
+        self.cache = cache
+        self.symbols = cache.symbols if cache is not None else SymbolTable()
+        self.files: dict[Path, LoadedFile] = {}
+        # The dependencies between the names in the loaded files.
+        self.graph = DependencyGraph()
+
+    def _parse(self, path: Path) -> ast.Program:
+        try:
+            source = read_source(self.root / path)
+        except FileNotFoundError as e:
+            raise UnresolvedNameError(f"{path} does not exist") from e
+        if self.cache is not None and (program := self.cache.get(source)) is not None:
+            return program
+        program = self.parser.parse_to_ast(source, self.symbols)
+        if self.cache is not None:
+            self.cache.put(source, program)
+        return program
+
+    def load_file(self, path: Path) -> LoadedFile:
+        """Load one file, without the files it refers to.
+
+        Args:
+            path: The file, relative to the project root.
+
+        Returns:
+            The loaded file.
+
+        Raises:
+            UnresolvedNameError: If the file doesn't exist.
+        """
+        if path in self.files:
+            return self.files[path]
+        program = self._parse(path)
+        defined = frozenset(references.defined_names(program))
+        external = (
+            references.referenced_names(program) - defined - references.BUILTIN_TYPES
+        )
+        loaded = LoadedFile(
+            path,
+            program,
+            defined,
+            {name: name_to_path(name) for name in sorted(external)},
+        )
+        self.files[path] = loaded
+        self.graph.set_file(path, references.name_dependencies(program))
+        return loaded
+
+    def load(self, entry: Path) -> dict[Path, LoadedFile]:
+        """Load a file and every file it refers to, directly or not.
+
+        Args:
+            entry: The entry file, relative to the project root.
+
+        Returns:
+            The entry file and the files it needs, in the order they were
+            first referenced.
+
+        Raises:
+            UnresolvedNameError: If a referenced name has no file.
+            MisplacedNameError: If a name's file doesn't declare it.
+            CircularDependencyError: If the names in the loaded files
+                depend on each other in a cycle.
+        """
+        needed: dict[Path, LoadedFile] = {}
+        queue: deque[tuple[Path, str | None, Path | None]] = deque(
+            [(entry, None, None)]
+        )
+        while queue:
+            path, name, referrer = queue.popleft()
+            if path not in needed:
+                try:
+                    needed[path] = self.load_file(path)
+                except UnresolvedNameError as e:
+                    if name is None:
+                        raise
+                    raise UnresolvedNameError(
+                        f"{referrer} refers to {name}, but {path} does not exist"
+                    ) from e
+                queue.extend(
+                    (imported, imported_name, path)
+                    for imported_name, imported in needed[path].imports.items()
+                )
+            if name is not None and name not in needed[path].defined:
+                raise MisplacedNameError(
+                    f"{referrer} refers to {name}, but {path} does not declare it"
+                )
+        self.graph.check()
+        return needed
+
+    def invalidate(self, path: Path) -> None:
+        """Forget a loaded file, so that it's read again when it's needed."""
+        if self.files.pop(path, None) is not None:
+            self.graph.remove_file(path)
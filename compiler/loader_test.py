@@ -0,0 +1,138 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from compiler import ast
+from compiler.ast_cache import AstCache
+from compiler.dependencies import CircularDependencyError
+from compiler.loader import (
+    Loader,
+    MisplacedNameError,
+    UnresolvedNameError,
+    name_to_path,
+)
+
+
+def _write_type(root: Path, name: str, *dependencies: str) -> None:
+    lines = [f"    {name} is a ViewPoint.\n"]
+    lines.extend(
+        f"    {name} has a {dep} named {dep.lower()}.\n" for dep in dependencies
+    )
+    (root / f"{name}.def").write_text("AbstractUniverse:\n" + "".join(lines))
+
+
+def test_name_to_path():
+    assert name_to_path("Foo") == Path("Foo.def")
+
+
+def test_loads_only_reachable_files(tmp_path: Path):
+    _write_type(tmp_path, "Main", "A", "B", "String")
+    _write_type(tmp_path, "A", "C")
+    _write_type(tmp_path, "B", "C")
+    _write_type(tmp_path, "C")
+    _write_type(tmp_path, "Unrelated")
+    (tmp_path / "Broken.def").write_text("not Define at all")
+
+    loader = Loader(tmp_path)
+    loaded = loader.load(Path("Main.def"))
+
+    assert list(loaded) == [Path(f"{n}.def") for n in ["Main", "A", "B", "C"]]
+    assert loaded[Path("Main.def")].imports == {
+        "A": Path("A.def"),
+        "B": Path("B.def"),
+    }
+    assert loaded[Path("C.def")].defined == {"C"}
+    assert set(loader.files) == set(loaded)
+
+
+def test_memoizes_loaded_files(tmp_path: Path):
+    _write_type(tmp_path, "Main", "A")
+    _write_type(tmp_path, "Other", "A")
+    _write_type(tmp_path, "A")
+    loader = Loader(tmp_path)
+    first = loader.load(Path("Main.def"))
+    (tmp_path / "A.def").unlink()
+
+    second = loader.load(Path("Other.def"))
+
+    assert second[Path("A.def")] is first[Path("A.def")]
+    loader.invalidate(Path("A.def"))
+    with pytest.raises(UnresolvedNameError):
+        loader.load(Path("Other.def"))
+
+
+def test_shares_one_symbol_table(tmp_path: Path):
+    _write_type(tmp_path, "Main", "A")
+    _write_type(tmp_path, "A")
+    loader = Loader(tmp_path)
+    loaded = loader.load(Path("Main.def"))
+    reference = loaded[Path("Main.def")].program.universes[0].statements[1]
+    declaration = loaded[Path("A.def")].program.universes[0].statements[0]
+    assert isinstance(reference, ast.PropertyDeclaration)
+    assert isinstance(declaration, ast.TypeDeclaration)
+    assert reference.property_type is declaration.type_name
+    assert "A" in loader.symbols
+
+
+def test_unresolved_name(tmp_path: Path):
+    _write_type(tmp_path, "Main", "Missing")
+    with pytest.raises(
+        UnresolvedNameError,
+        match=re.escape("Main.def refers to Missing, but Missing.def does not exist"),
+    ):
+        Loader(tmp_path).load(Path("Main.def"))
+
+
+def test_missing_entry(tmp_path: Path):
+    with pytest.raises(UnresolvedNameError, match=re.escape("Main.def does not exist")):
+        Loader(tmp_path).load(Path("Main.def"))
+
+
+def test_misplaced_name(tmp_path: Path):
+    _write_type(tmp_path, "Main", "A")
+    (tmp_path / "A.def").write_text("AbstractUniverse:\n    B is a ViewPoint.\n")
+    with pytest.raises(
+        MisplacedNameError,
+        match=re.escape("Main.def refers to A, but A.def does not declare it"),
+    ):
+        Loader(tmp_path).load(Path("Main.def"))
+
+
+def test_circular_dependency(tmp_path: Path):
+    _write_type(tmp_path, "A", "B")
+    _write_type(tmp_path, "B", "A")
+    with pytest.raises(CircularDependencyError):
+        Loader(tmp_path).load(Path("A.def"))
+
+
+def test_uses_cache(tmp_path: Path):
+    root = tmp_path / "project"
+    root.mkdir()
+    _write_type(root, "Main", "A")
+    _write_type(root, "A")
+    cache = AstCache(tmp_path / "cache")
+    Loader(root, cache=cache).load(Path("Main.def"))
+    loaded = Loader(root, cache=cache).load(Path("Main.def"))
+    assert cache.stats.hits == 2
+    assert loaded[Path("A.def")].defined == {"A"}
+
+
+def test_cache_hits_and_misses_share_symbols(tmp_path: Path):
+    root = tmp_path / "project"
+    root.mkdir()
+    _write_type(root, "Main", "A")
+    _write_type(root, "A")
+    cache = AstCache(tmp_path / "cache")
+    Loader(root, cache=cache).load(Path("A.def"))
+
+    loader = Loader(root, cache=cache)
+    loaded = loader.load(Path("Main.def"))
+
+    assert cache.stats.hits == 1
+    reference = loaded[Path("Main.def")].program.universes[0].statements[1]
+    declaration = loaded[Path("A.def")].program.universes[0].statements[0]
+    assert isinstance(reference, ast.PropertyDeclaration)
+    assert isinstance(declaration, ast.TypeDeclaration)
+    assert reference.property_type is declaration.type_name
+    assert loader.symbols is cache.symbols
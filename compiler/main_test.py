@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+from compiler import __main__
+
+
+def test_check_without_a_server_checks_dependents(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+):
+    (tmp_path / "A.def").write_text(
+        "AbstractUniverse:\n    A is a B.\n    A has a Missing named missing.\n"
+    )
+    (tmp_path / "B.def").write_text("AbstractUniverse:\n    B is a ViewPoint.\n")
+    (tmp_path / "C.def").write_text("AbstractUniverse:\n    C is a Other.\n")
+    socket_path = tmp_path / "no-server.sock"
+
+    code = __main__.main(
+        ["check", "--root", str(tmp_path), "--socket", str(socket_path), "B.def"]
+    )
+
+    assert code == 1
+    assert capsys.readouterr().out == "A.def:3:5: Unknown type name: Missing\n"
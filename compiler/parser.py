@@ -1,27 +1,181 @@
 """Parser using Lark grammar with transformer and semantic validation."""
 
-from functools import cached_property
+import hashlib
+import importlib
+import mmap
+import os
+from collections.abc import Buffer
+from functools import cache, cached_property
 from pathlib import Path
+from types import ModuleType
+from typing import cast
 
 import lark
 
-from compiler import indenter
+from compiler import arena, ast, indenter, prelex, recovery, transformer
+from compiler.symbols import SymbolTable
+
+GRAMMAR_PATH = Path(__file__).parent / "grammar.lark"
+
+# The module written by compiler.build_parser_module. It isn't checked in;
+# Parser falls back to building the grammar when it's missing.
+GENERATED_MODULE = "compiler._generated_parser"
+
+
+# Files at least this big are memory-mapped rather than read. Mapping a
+# small file costs more than copying it.
+MMAP_THRESHOLD = 1 << 20
+
+
+def read_source(path: Path) -> str:
+    """Return the text of a Define file.
+
+    A large file is decoded straight from a memory map of it, so its bytes
+    are never copied into a bytes object. Only the text is left in memory
+    once this returns.
+
+    Raises:
+        OSError: If the file can't be read.
+        prelex.InvalidSourceError: If it isn't UTF-8, or starts with a
+            byte order mark.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # An empty file can't be mapped.
+        if size < MMAP_THRESHOLD or not size:
+            return prelex.decode(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return prelex.decode(mapped)
+
+
+@cache
+def grammar_hash() -> str:
+    """Return the SHA-256 hex digest of the Define grammar file."""
+    return hashlib.sha256(GRAMMAR_PATH.read_bytes()).hexdigest()
+
+
+def parser_from_module(
+    module: ModuleType, lark_transformer: lark.Transformer | None = None
+) -> lark.Lark | None:
+    """Load a Lark parser from a module written by build_parser_module.
+
+    Args:
+        module: The generated module.
+        lark_transformer: A transformer to apply during parsing, as in
+            the transformer argument to lark.Lark.
+
+    Returns:
+        The parser, or None if the module was generated from a different
+        grammar or by a different version of Lark.
+    """
+    if (
+        getattr(module, "GRAMMAR_HASH", None) != grammar_hash()
+        or getattr(module, "LARK_VERSION", None) != lark.__version__
+    ):
+        return None
+    # This is the same entry point that Lark's own standalone modules use.
+    return lark.Lark._load_from_dict(
+        module.DATA,
+        module.MEMO,
+        postlex=indenter.DefineIndenter(),
+        transformer=lark_transformer,
+    )
+
+
+def _load_generated_parser(
+    lark_transformer: lark.Transformer | None = None,
+) -> lark.Lark | None:
+    try:
+        module = importlib.import_module(GENERATED_MODULE)
+    except ModuleNotFoundError as e:
+        if e.name != GENERATED_MODULE:
+            raise
+        return None
+    return parser_from_module(module, lark_transformer)
 
 
 class Parser:
     """Parser for Define language with transformation and validation."""
 
-    @cached_property
-    def _parser(self) -> lark.Lark:
-        """A Lark parser using the Define grammar."""
-        grammar_path = Path(__file__).parent / "grammar.lark"
+    def __init__(
+        self, *, cache: Path | bool = True, use_generated: bool = True
+    ) -> None:
+        """Create a parser.
+
+        Args:
+            cache: Where to keep the serialized LALR tables between runs.
+                True uses Lark's default location in the system temporary
+                directory, a Path names a directory to store them in, and
+                False always builds the tables from the grammar.
+            use_generated: Whether to load the tables from the generated
+                parser module when it exists and matches the grammar.
+        """
+        self._cache = cache
+        self._use_generated = use_generated
+
+    @property
+    def cache_path(self) -> Path | None:
+        """The file the LALR tables are cached in, if it is under our control.
+
+        The file name includes the grammar hash and the Lark version, so
+        a grammar change or a Lark upgrade starts a new cache file rather
+        than reusing stale tables.
+        """
+        if not isinstance(self._cache, Path):
+            return None
+        return (
+            self._cache / f"grammar-{grammar_hash()[:16]}-lark-{lark.__version__}.lalr"
+        )
+
+    def _lark_cache_option(self) -> str | bool:
+        cache_path = self.cache_path
+        if cache_path is None:
+            return bool(self._cache)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        return str(cache_path)
+
+    def _build_lark(
+        self, lark_transformer: lark.Transformer | None = None
+    ) -> lark.Lark:
+        if self._use_generated:
+            generated = _load_generated_parser(lark_transformer)
+            if generated is not None:
+                return generated
+        # Lark verifies the cached tables against a hash of the grammar
+        # text and its own version before using them, and rebuilds (and
+        # rewrites) the cache when they don't match.
         return lark.Lark.open(
-            str(grammar_path),
+            str(GRAMMAR_PATH),
             parser="lalr",
             postlex=indenter.DefineIndenter(),
             start="start",
+            transformer=lark_transformer,
+            cache=self._lark_cache_option(),
         )
 
+    @cached_property
+    def _parser(self) -> lark.Lark:
+        """A Lark parser using the Define grammar."""
+        return self._build_lark()
+
+    @cached_property
+    def _inline_transformer(self) -> transformer.InlineDefineTransformer:
+        return transformer.InlineDefineTransformer()
+
+    @cached_property
+    def _ast_parser(self) -> lark.Lark:
+        """A Lark parser that builds AST nodes as it reduces each rule."""
+        return self._build_lark(self._inline_transformer)
+
+    @cached_property
+    def _inline_arena_transformer(self) -> transformer.InlineArenaTransformer:
+        return transformer.InlineArenaTransformer()
+
+    @cached_property
+    def _arena_parser(self) -> lark.Lark:
+        """A Lark parser that adds to an arena as it reduces each rule."""
+        return self._build_lark(self._inline_arena_transformer)
+
     def parse(self, source: str) -> lark.Tree:
         """
         Parse source code into a parse tree.
@@ -31,5 +185,176 @@ class Parser:
 
         Returns:
             Lark parse tree
+
+        Raises:
+            prelex.InvalidSourceError: If the source breaks the spec's
+                rules for characters and whitespace.
+            lark.exceptions.LarkError: If it doesn't parse.
         """
+        prelex.check(source)
         return self._parser.parse(source)
+
+    def parse_bytes(self, data: Buffer) -> lark.Tree:
+        """
+        Parse the bytes of a file into a parse tree.
+
+        Args:
+            data: The file's bytes, such as a memory map of it
+
+        Returns:
+            Lark parse tree
+
+        Raises:
+            prelex.InvalidSourceError: If the bytes aren't UTF-8, start
+                with a byte order mark, or break the spec's rules for
+                characters and whitespace.
+            lark.exceptions.LarkError: If it doesn't parse.
+        """
+        return self.parse(prelex.decode(data))
+
+    def parse_file(self, path: Path) -> lark.Tree:
+        """
+        Parse a file into a parse tree, memory-mapping it if it's large.
+
+        Args:
+            path: The file to parse
+
+        Returns:
+            Lark parse tree
+
+        Raises:
+            OSError: If the file can't be read.
+            prelex.InvalidSourceError: If it isn't UTF-8, starts with a
+                byte order mark, or breaks the spec's rules for characters
+                and whitespace.
+            lark.exceptions.LarkError: If it doesn't parse.
+        """
+        return self.parse(read_source(path))
+
+    def parse_to_ast(
+        self, source: str, symbols: SymbolTable | None = None
+    ) -> ast.Program:
+        """
+        Parse source code directly into an AST.
+
+        This gives the same result as transforming the tree from parse()
+        with DefineTransformer, but builds the AST nodes during parsing
+        instead of building a parse tree first.
+
+        Args:
+            source: Source code to parse
+            symbols: The table to intern identifiers into (see
+                DefineTransformer). A new table is used if none is given.
+
+        Returns:
+            The AST for the program, with the file's line table (see
+            ast.LineTable)
+
+        Raises:
+            prelex.InvalidSourceError: If the source breaks the spec's
+                rules for characters and whitespace.
+            lark.exceptions.LarkError: If it doesn't parse.
+        """
+        prelex.check(source)
+        # The Lark parser holds on to its transformer, so the table for
+        # this compilation is swapped in for the duration of the parse.
+        self._inline_transformer.symbols = (
+            symbols if symbols is not None else SymbolTable()
+        )
+        try:
+            program = cast("ast.Program", self._ast_parser.parse(source))
+        finally:
+            self._inline_transformer.symbols = SymbolTable()
+        program.lines = ast.LineTable(source)
+        return program
+
+    def parse_to_arena(
+        self, source: str, symbols: SymbolTable | None = None
+    ) -> arena.Arena:
+        """
+        Parse source code directly into an arena (see compiler.arena).
+
+        This is parse_to_ast for whole-program analyses of large programs:
+        the nodes go into the arena's columns as each rule is reduced, and
+        no AST nodes are made.
+
+        Args:
+            source: Source code to parse
+            symbols: The table the arena's names are IDs in. A new table
+                is used if none is given.
+
+        Returns:
+            The arena for the program, with the file's line table
+
+        Raises:
+            prelex.InvalidSourceError: If the source breaks the spec's
+                rules for characters and whitespace.
+            lark.exceptions.LarkError: If it doesn't parse.
+        """
+        prelex.check(source)
+        # As in parse_to_ast, the Lark parser holds on to its transformer,
+        # so a new arena is swapped in for each parse.
+        self._inline_arena_transformer.arena = arena.Arena(symbols)
+        try:
+            result = cast("arena.Arena", self._arena_parser.parse(source))
+        finally:
+            self._inline_arena_transformer.arena = arena.Arena()
+        result.lines = ast.LineTable(source)
+        return result
+
+    def parse_recovering(
+        self, source: str, symbols: SymbolTable | None = None
+    ) -> recovery.Recovered:
+        """
+        Parse source code into an AST, carrying on past syntax errors.
+
+        The source is parsed as parse_to_ast does first, so this costs no
+        more when there are no errors. If there are, it's parsed again in
+        a way that skips the lines with errors (see compiler.recovery).
+
+        Args:
+            source: Source code to parse
+            symbols: The table to intern identifiers into (see
+                DefineTransformer). A new table is used if none is given.
+
+        Returns:
+            The AST of the statements that parsed, and the errors. If the
+            source breaks the rules for characters and whitespace, it
+            isn't parsed, and the error is the prelex.InvalidSourceError,
+            which has every violation.
+        """
+        try:
+            return recovery.Recovered(self.parse_to_ast(source, symbols), [])
+        except prelex.InvalidSourceError as e:
+            return recovery.Recovered(ast.Program([]), [e])
+        except lark.exceptions.UnexpectedInput:
+            return self.recover(source, symbols)
+
+    def recover(
+        self, source: str, symbols: SymbolTable | None = None
+    ) -> recovery.Recovered:
+        """
+        Parse source code that has syntax errors, skipping the lines with them.
+
+        This is the second half of parse_recovering, for callers that
+        already know that source doesn't parse, and that it keeps to the
+        rules for characters and whitespace (see compiler.prelex), so it
+        isn't parsed normally first.
+
+        Args:
+            source: Source code to parse
+            symbols: The table to intern identifiers into (see
+                DefineTransformer). A new table is used if none is given.
+
+        Returns:
+            The AST of the statements that parsed, and the errors.
+        """
+        self._inline_transformer.symbols = (
+            symbols if symbols is not None else SymbolTable()
+        )
+        try:
+            recovered = recovery.recover(self._ast_parser, source)
+        finally:
+            self._inline_transformer.symbols = SymbolTable()
+        recovered.program.lines = ast.LineTable(source)
+        return recovered
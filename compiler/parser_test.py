@@ -4,7 +4,9 @@ import lark
 import pytest
 from lark.exceptions import UnexpectedCharacters, UnexpectedToken
 
+from compiler import parser
 from compiler.parser import Parser
+from compiler.prelex import InvalidSourceError
 
 # Shared parser instance to avoid rebuilding the Lark parser for each test
 _parser = Parser()
@@ -855,12 +857,6 @@ def test_blank_lines_in_action_body():
             " ",
             id="bad_universe_header_spacing",
         ),
-        pytest.param(
-            "AbstractUniverse:\n    Foo is a Bar.",
-            "DEDENT",
-            "",
-            id="missing_final_newline",
-        ),
         pytest.param(
             _strip(
                 """
@@ -923,12 +919,6 @@ def test_blank_lines_in_action_body():
             "",
             id="empty_universe_block",
         ),
-        pytest.param(
-            "AbstractUniverse:\n     \n\n",
-            "$END",
-            "",
-            id="empty_universe_block_with_indent_and_dedent",
-        ),
         pytest.param(
             _strip(
                 """
@@ -955,21 +945,116 @@ def test_unexpected_token(source: str, token_type: str, token_value: str):
 @pytest.mark.parametrize(
     ("source", "char"),
     [
+        pytest.param(
+            "AbstractUniverse:\n    Foo is a B@r.\n",
+            "@",
+            id="symbol_in_name",
+        ),
+    ],
+)
+def test_unexpected_characters(source: str, char: str):
+    with pytest.raises(UnexpectedCharacters) as exc_info:
+        _parser.parse(source)
+
+    exception = exc_info.value
+    assert exception.char == char, str(exception)
+
+
+@pytest.mark.parametrize(
+    ("source", "line", "column"),
+    [
+        pytest.param(
+            "AbstractUniverse:\n    Foo is a Bar.",
+            2,
+            18,
+            id="missing_final_newline",
+        ),
+        pytest.param(
+            "AbstractUniverse:\n     \n\n",
+            2,
+            1,
+            id="line_of_spaces",
+        ),
         pytest.param(
             "AbstractUniverse:\n\tFoo is a Bar.\n",
-            "\t",
+            2,
+            1,
             id="tab_indentation",
         ),
         pytest.param(
             "AbstractUniverse:\r\n    Foo is a Bar.\r\n",
-            "\r",
+            1,
+            18,
             id="carriage_return_usage",
         ),
     ],
 )
-def test_unexpected_characters(source: str, char: str):
-    with pytest.raises(UnexpectedCharacters) as exc_info:
+def test_invalid_source(source: str, line: int, column: int):
+    # These are caught before lexing.
+    with pytest.raises(InvalidSourceError) as exc_info:
         _parser.parse(source)
 
     exception = exc_info.value
-    assert exception.char == char, str(exception)
+    assert (exception.line, exception.column) == (line, column), str(exception)
+
+
+@pytest.mark.parametrize("threshold", [0, parser.MMAP_THRESHOLD], ids=["mmap", "read"])
+def test_parse_file(tmp_path, monkeypatch, threshold: int):
+    monkeypatch.setattr(parser, "MMAP_THRESHOLD", threshold)
+    source = 'PhysicalUniverse:\n    A creates a B named c:\n        text: "é😀"\n'
+    path = tmp_path / "main.def"
+    path.write_bytes(source.encode())
+
+    assert _parser.parse_file(path) == _parser.parse(source)
+    assert _parser.parse_bytes(source.encode()) == _parser.parse(source)
+
+    path.write_bytes(b"\xef\xbb\xbf" + source.encode())
+    with pytest.raises(InvalidSourceError, match="byte order mark"):
+        _parser.parse_file(path)
+
+    path.write_bytes(b"")
+    with pytest.raises(UnexpectedToken):
+        _parser.parse_file(path)
+
+
+# LALR table cache
+
+
+def test_cache_is_written_and_reused(tmp_path):
+    source = _strip(
+        """
+        AbstractUniverse:
+            Foo is a Bar.
+        """
+    )
+    cold = Parser(cache=tmp_path, use_generated=False)
+    cold_tree = cold.parse(source)
+    cache_path = cold.cache_path
+    assert cache_path is not None
+    assert cache_path.parent == tmp_path
+    assert cache_path.exists()
+
+    warm = Parser(cache=tmp_path, use_generated=False)
+    assert warm.cache_path == cache_path
+    assert warm.parse(source) == cold_tree
+
+
+def test_cache_rebuilds_from_stale_file(tmp_path):
+    source = _strip(
+        """
+        AbstractUniverse:
+            Foo is a Bar.
+        """
+    )
+    cached_parser = Parser(cache=tmp_path, use_generated=False)
+    cache_path = cached_parser.cache_path
+    assert cache_path is not None
+    cache_path.write_bytes(b"not-the-grammar-hash\n")
+
+    assert cached_parser.parse(source) == Parser(cache=False).parse(source)
+    assert not cache_path.read_bytes().startswith(b"not-the-grammar-hash")
+
+
+def test_cache_disabled_has_no_cache_path():
+    assert Parser(cache=False).cache_path is None
+    assert Parser().cache_path is None
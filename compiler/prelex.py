@@ -0,0 +1,208 @@
+"""Checking the spec's rules for characters and whitespace before lexing.
+
+"Parsing Define Files" in the spec restricts the text of a file in ways
+the grammar doesn't express:
+
+- Outside literal strings and comments, only line feeds and the
+  characters from decimal 31 to 126 are allowed. So tabs, carriage
+  returns, a byte order mark and any other Unicode are errors there.
+- A line must end with a line feed alone, not a carriage return and a
+  line feed, even in a comment.
+- Lines must not end with spaces.
+- The last character of a file, if it has any, must be a newline.
+
+Files are also UTF-8 without a byte order mark, which decode checks as it
+turns their bytes into text.
+
+The checks are regular expressions and bytes.translate over the whole
+file, so the cost is in C rather than a Python loop over characters.
+Strings and comments are only looked for on the lines that have a
+character that would be disallowed outside them, which in most files is
+none.
+"""
+
+import bisect
+import codecs
+import re
+from collections.abc import Buffer
+from dataclasses import dataclass
+
+import lark
+
+# Any character that's only allowed in strings and comments.
+_DISALLOWED = re.compile(r"[^\n\x1f-\x7e]")
+# The UTF-8 bytes of the characters allowed everywhere.
+_ALLOWED_BYTES = bytes([10, *range(31, 127)])
+# How many characters are encoded at a time to look for the others, so
+# that checking a large file doesn't copy all of it at once.
+_CHUNK = 1 << 20
+# The last space before a line ends, or before a carriage return that may
+# end one. A pattern that starts with a space rather than with the line
+# end is much faster, since the regex engine searches for the literal.
+_SPACE_BEFORE_LINE_END = re.compile(r" [\r\n]")
+# The strings and comments in a line. A comment doesn't include carriage
+# returns at the end of its line, since a line can't end with "\r\n".
+_LITERAL = re.compile(r'"(?:[^"\\\n]|\\[^\n])*"|#[^\n]*?(?=\r*\Z)')
+# Carriage returns that end a line.
+_LINE_END = re.compile(r"\r+(?:\n|\Z)")
+
+
+@dataclass(frozen=True)
+class Violation:
+    """A place where a file breaks the rules."""
+
+    message: str
+    # Where the violation is in the source, and the same as a 1-based line
+    # and column.
+    offset: int
+    line: int
+    column: int
+
+
+class InvalidSourceError(lark.exceptions.UnexpectedInput):
+    """A file breaks the spec's rules for characters and whitespace.
+
+    It's an UnexpectedInput, like the errors Lark raises for text it can't
+    lex, so it's reported with a position wherever those are. The
+    position is that of the first violation.
+    """
+
+    def __init__(self, violations: list[Violation]) -> None:
+        """Create an error for violations, in the order they're in the source."""
+        first = violations[0]
+        message = first.message
+        if len(violations) > 1:
+            message += f" (and {len(violations) - 1} more problems)"
+        super().__init__(message)
+        self.violations = violations
+        self.line = first.line
+        self.column = first.column
+        self.pos_in_stream = first.offset
+
+
+def _describe(source: str, offset: int) -> str:
+    char = source[offset]
+    if char == "\r":
+        if _LINE_END.match(source, offset):
+            return "Line ends with '\\r\\n'; lines must end with '\\n' only"
+        return "Carriage return outside a string or comment"
+    return (
+        f"Character {char!r} (U+{ord(char):04X}) is only allowed in strings "
+        "and comments"
+    )
+
+
+def _disallowed_offsets(source: str) -> list[int]:
+    """Return where characters are that aren't allowed where they are."""
+    # Most files have none, which deleting the allowed bytes shows faster
+    # than the regex can.
+    if not any(
+        source[i : i + _CHUNK]
+        .encode(errors="surrogatepass")
+        .translate(None, _ALLOWED_BYTES)
+        for i in range(0, len(source), _CHUNK)
+    ):
+        return []
+    offsets = []
+    line_start = line_end = -1
+    literal_starts: list[int] = []
+    literal_ends: list[int] = []
+    for match in _DISALLOWED.finditer(source):
+        offset = match.start()
+        if offset >= line_end:
+            line_start = source.rfind("\n", 0, offset) + 1
+            line_end = source.find("\n", offset)
+            if line_end < 0:
+                line_end = len(source)
+            literals = list(_LITERAL.finditer(source, line_start, line_end))
+            literal_starts = [literal.start() for literal in literals]
+            literal_ends = [literal.end() for literal in literals]
+        i = bisect.bisect_right(literal_starts, offset) - 1
+        if i < 0 or offset >= literal_ends[i]:
+            offsets.append(offset)
+    return offsets
+
+
+def _trailing_space_offsets(source: str) -> list[int]:
+    """Return where each run of spaces at the end of a line starts."""
+    ends = [
+        match.start() + 1
+        for match in _SPACE_BEFORE_LINE_END.finditer(source)
+        if source[match.start() + 1] == "\n"
+        or _LINE_END.match(source, match.start() + 1)
+    ]
+    if source.endswith(" "):
+        ends.append(len(source))
+    offsets = []
+    for end in ends:
+        start = end - 1
+        while start > 0 and source[start - 1] == " ":
+            start -= 1
+        offsets.append(start)
+    return offsets
+
+
+def find_violations(source: str) -> list[Violation]:
+    """Return every place source breaks the rules, in source order."""
+    found = [
+        (offset, _describe(source, offset)) for offset in _disallowed_offsets(source)
+    ]
+    found.extend(
+        (offset, "Trailing spaces") for offset in _trailing_space_offsets(source)
+    )
+    if source and not source.endswith("\n"):
+        found.append((len(source), "File doesn't end with a newline"))
+    found.sort()
+    violations = []
+    line = 1
+    previous = 0
+    for offset, message in found:
+        line += source.count("\n", previous, offset)
+        previous = offset
+        column = offset - source.rfind("\n", 0, offset)
+        violations.append(Violation(message, offset, line, column))
+    return violations
+
+
+def check(source: str) -> None:
+    """Check that source follows the rules.
+
+    Raises:
+        InvalidSourceError: If it doesn't.
+    """
+    violations = find_violations(source)
+    if violations:
+        raise InvalidSourceError(violations)
+
+
+def decode(data: Buffer) -> str:
+    """Return the text of a file's bytes.
+
+    The bytes are decoded straight from data, so it can be a memory map
+    without being copied into a bytes object first.
+
+    Raises:
+        InvalidSourceError: If data isn't UTF-8, or starts with a byte
+            order mark.
+    """
+    # A memory map can't be closed while there's a view of it, so the view
+    # is released however this returns.
+    with memoryview(data) as view:
+        if view[: len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+            raise InvalidSourceError(
+                [Violation("File starts with a UTF-8 byte order mark", 0, 1, 1)]
+            )
+        try:
+            return str(view, "utf-8")
+        except UnicodeDecodeError as e:
+            # Everything before the error decodes, so its position can be
+            # given in characters like any other.
+            before = str(view[: e.start], "utf-8")
+            line_start = before.rfind("\n") + 1
+            violation = Violation(
+                f"Invalid UTF-8: {e.reason}",
+                len(before),
+                before.count("\n", 0, line_start) + 1,
+                len(before) - line_start + 1,
+            )
+            raise InvalidSourceError([violation]) from e
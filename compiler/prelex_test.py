@@ -0,0 +1,170 @@
+import pytest
+
+from compiler import prelex
+from compiler.prelex import InvalidSourceError, Violation
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        pytest.param("", id="empty"),
+        pytest.param("AbstractUniverse:\n    Foo is a Bar.\n", id="statement"),
+        pytest.param(
+            'PhysicalUniverse:\n    A creates a B named c:\n        text: "\tüñ\r😀"\n',
+            id="string",
+        ),
+        pytest.param(
+            "# Tabs\tand ünïcode and \r in comments.\nAbstractUniverse:\n",
+            id="comment",
+        ),
+        pytest.param('AbstractUniverse:\n    # "é\n', id="quote_in_comment"),
+        pytest.param('AbstractUniverse:\n    A is "#". # ü\n', id="hash_in_string"),
+        pytest.param("\x1f\n", id="unit_separator"),
+    ],
+)
+def test_valid_source(source: str):
+    assert prelex.find_violations(source) == []
+    prelex.check(source)
+
+
+@pytest.mark.parametrize(
+    ("source", "violation"),
+    [
+        pytest.param(
+            "AbstractUniverse:\n\tFoo is a Bar.\n",
+            Violation(
+                "Character '\\t' (U+0009) is only allowed in strings and comments",
+                18,
+                2,
+                1,
+            ),
+            id="tab",
+        ),
+        pytest.param(
+            "\ufeffAbstractUniverse:\n",
+            Violation(
+                "Character '\\ufeff' (U+FEFF) is only allowed in strings and comments",
+                0,
+                1,
+                1,
+            ),
+            id="byte_order_mark",
+        ),
+        pytest.param(
+            "AbstractUniverse:\n    Café is a Bar.\n",
+            Violation(
+                "Character 'é' (U+00E9) is only allowed in strings and comments",
+                25,
+                2,
+                8,
+            ),
+            id="unicode_name",
+        ),
+        pytest.param(
+            "AbstractUniverse:\r\n",
+            Violation(
+                "Line ends with '\\r\\n'; lines must end with '\\n' only", 17, 1, 18
+            ),
+            id="crlf",
+        ),
+        pytest.param(
+            "# A comment.\r\n",
+            Violation(
+                "Line ends with '\\r\\n'; lines must end with '\\n' only", 12, 1, 13
+            ),
+            id="crlf_after_comment",
+        ),
+        pytest.param(
+            "AbstractUniverse:\n    Foo is\ra Bar.\n",
+            Violation("Carriage return outside a string or comment", 28, 2, 11),
+            id="carriage_return",
+        ),
+        pytest.param(
+            "AbstractUniverse:  \n",
+            Violation("Trailing spaces", 17, 1, 18),
+            id="trailing_spaces",
+        ),
+        pytest.param(
+            "# A comment. \n",
+            Violation("Trailing spaces", 12, 1, 13),
+            id="trailing_space_after_comment",
+        ),
+        pytest.param(
+            "AbstractUniverse:",
+            Violation("File doesn't end with a newline", 17, 1, 18),
+            id="no_final_newline",
+        ),
+    ],
+)
+def test_invalid_source(source: str, violation: Violation):
+    assert prelex.find_violations(source) == [violation]
+
+
+def test_spaces_before_a_carriage_return_inside_a_line_are_not_trailing():
+    source = "AbstractUniverse:\n    Foo is \ra Bar.\n"
+
+    (violation,) = prelex.find_violations(source)
+
+    assert violation.message == "Carriage return outside a string or comment"
+
+
+def test_string_ends_at_its_closing_quote():
+    source = 'PhysicalUniverse:\n    A creates a B named c:\n        text: "ü"ü\n'
+
+    (violation,) = prelex.find_violations(source)
+
+    assert (violation.line, violation.column) == (3, 18)
+
+
+def test_every_violation_is_reported_in_order():
+    source = "AbstractUniverse: \r\n\tFoo is a Bär.  \n    Baz is a Bar.  "
+
+    violations = prelex.find_violations(source)
+
+    assert [(v.message, v.line, v.column) for v in violations] == [
+        ("Trailing spaces", 1, 18),
+        ("Line ends with '\\r\\n'; lines must end with '\\n' only", 1, 19),
+        ("Character '\\t' (U+0009) is only allowed in strings and comments", 2, 1),
+        ("Character 'ä' (U+00E4) is only allowed in strings and comments", 2, 12),
+        ("Trailing spaces", 2, 15),
+        ("Trailing spaces", 3, 18),
+        ("File doesn't end with a newline", 3, 20),
+    ]
+    with pytest.raises(InvalidSourceError, match="and 6 more problems") as raised:
+        prelex.check(source)
+    assert raised.value.violations == violations
+    assert (raised.value.line, raised.value.column) == (1, 18)
+
+
+def test_decode():
+    assert prelex.decode("AbstractUniverse:\n    # é\n".encode()) == (
+        "AbstractUniverse:\n    # é\n"
+    )
+    assert prelex.decode(memoryview(b"")) == ""
+
+
+@pytest.mark.parametrize(
+    ("data", "violation"),
+    [
+        pytest.param(
+            b"\xef\xbb\xbfAbstractUniverse:\n",
+            Violation("File starts with a UTF-8 byte order mark", 0, 1, 1),
+            id="byte_order_mark",
+        ),
+        pytest.param(
+            "AbstractUniverse:\n    # é\xff\n".encode("latin-1"),
+            Violation("Invalid UTF-8: invalid continuation byte", 24, 2, 7),
+            id="latin_1",
+        ),
+        pytest.param(
+            'AbstractUniverse:\n    A is "é".\n'.encode()[:-4],
+            Violation("Invalid UTF-8: unexpected end of data", 28, 2, 11),
+            id="truncated",
+        ),
+    ],
+)
+def test_decode_invalid(data: bytes, violation: Violation):
+    with pytest.raises(InvalidSourceError) as raised:
+        prelex.decode(data)
+
+    assert raised.value.violations == [violation]
@@ -0,0 +1,219 @@
+"""Finding and parsing the files of a Define project."""
+
+import multiprocessing
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.context import BaseContext
+from pathlib import Path
+
+import lark
+
+from compiler import ast, binary_ast, prelex
+from compiler.ast_cache import AstCache
+from compiler.parser import Parser, read_source
+from compiler.symbols import SymbolTable
+
+DEF_SUFFIX = ".def"
+
+# How many files each worker parses per round trip to the parent.
+_DEFAULT_CHUNKSIZE = 16
+
+
+def discover_files(root: Path) -> list[Path]:
+    """Find the Define files in a project.
+
+    Args:
+        root: The project root.
+
+    Returns:
+        The paths of all .def files under root, relative to root, sorted.
+    """
+    return sorted(path.relative_to(root) for path in root.rglob(f"*{DEF_SUFFIX}"))
+
+
+@dataclass
+class ProjectParse:
+    """The result of parsing the files of a project."""
+
+    # The AST of each file that parsed, keyed by its path relative to the
+    # project root.
+    programs: dict[Path, ast.Program] = field(default_factory=dict)
+    # The error message for each file that didn't parse.
+    errors: dict[Path, str] = field(default_factory=dict)
+
+
+# Each worker process builds one Parser and reuses it for every file it
+# is given.
+_worker_parser: Parser | None = None
+
+
+def init_worker() -> None:
+    """Set up a worker process to parse files, as a pool initializer."""
+    global _worker_parser
+    _worker_parser = Parser()
+
+
+def worker_context() -> BaseContext:
+    """Return the multiprocessing context to start worker processes in.
+
+    Forking a process copies the locks its other threads hold, and the
+    language server, the compile server and the tests run threads. So
+    workers are forked from a fork server, a new process with no other
+    threads, where there is one, and are spawned otherwise.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def worker_parser() -> Parser:
+    """Return the parser of a worker process set up by init_worker."""
+    if _worker_parser is None:
+        raise RuntimeError("Worker parser was not initialized")
+    return _worker_parser
+
+
+def error_message(e: Exception) -> str:
+    """Return the message a failed file is reported with."""
+    return f"{type(e).__name__}: {e}"
+
+
+def parse_file(
+    parser: Parser, path: Path, cache: AstCache | None = None
+) -> ast.Program | str:
+    """Parse one file to an AST.
+
+    Args:
+        parser: The parser to use.
+        path: The file to parse.
+        cache: A cache to look the AST up in before parsing, and to store
+            it in after.
+
+    Returns:
+        The AST, or an error message if the file can't be read or parsed.
+    """
+    try:
+        source = read_source(path)
+        if cache is not None and (program := cache.get(source)) is not None:
+            return program
+        program = parser.parse_to_ast(source)
+    except (OSError, lark.exceptions.LarkError) as e:
+        # Errors are returned rather than raised so that they cross the
+        # process boundary as plain strings.
+        return error_message(e)
+    if cache is not None:
+        cache.put(source, program)
+    return program
+
+
+def parse_in_worker(path_or_source: Path | str) -> bytes | str:
+    """Parse a file, or a file's source, in a worker process.
+
+    The worker must have been set up by init_worker.
+
+    Returns:
+        The AST in binary_ast's encoding, or an error message if the file
+        can't be read or parsed.
+    """
+    if isinstance(path_or_source, Path):
+        outcome = parse_file(worker_parser(), path_or_source)
+    else:
+        try:
+            outcome = worker_parser().parse_to_ast(path_or_source)
+        except lark.exceptions.LarkError as e:
+            outcome = error_message(e)
+    return outcome if isinstance(outcome, str) else binary_ast.encode(outcome)
+
+
+def parse_files(
+    root: Path,
+    paths: Iterable[Path],
+    *,
+    max_workers: int | None = None,
+    chunksize: int = _DEFAULT_CHUNKSIZE,
+    cache: AstCache | None = None,
+) -> ProjectParse:
+    """Parse files in parallel across a pool of worker processes.
+
+    ASTs come back to this process in binary_ast's encoding, which is
+    smaller and quicker to make and read than a pickle of the nodes. Each
+    file's names are sent once, and are interned into one table here (the
+    cache's, if there is one), so the ASTs share their name strings.
+
+    With a cache, every file is looked up in it first and only the misses
+    are sent to the workers, so rebuilding a project where nothing has
+    changed doesn't start any.
+
+    Args:
+        root: The project root.
+        paths: The files to parse, relative to root.
+        max_workers: How many worker processes to use. Defaults to the
+            number of CPUs.
+        chunksize: How many files to send to a worker at once.
+        cache: A cache to look ASTs up in before parsing, and to store
+            them in after.
+
+    Returns:
+        The ASTs and errors for the files, keyed by their given paths.
+    """
+    result = ProjectParse()
+    symbols = cache.symbols if cache is not None else SymbolTable()
+    # Without a cache, workers read the files themselves. With one, this
+    # process has already read each file to look it up, so the misses are
+    # sent as source, which is also what their ASTs are stored under.
+    to_parse: dict[Path, Path | str] = {}
+    for path in paths:
+        if cache is None:
+            to_parse[path] = root / path
+            continue
+        try:
+            source = read_source(root / path)
+        except (OSError, prelex.InvalidSourceError) as e:
+            result.errors[path] = error_message(e)
+            continue
+        program = cache.get(source)
+        if program is None:
+            to_parse[path] = source
+        else:
+            result.programs[path] = program
+    if not to_parse:
+        return result
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=worker_context(),
+        initializer=init_worker,
+    ) as executor:
+        outcomes = executor.map(parse_in_worker, to_parse.values(), chunksize=chunksize)
+        for (path, path_or_source), outcome in zip(
+            to_parse.items(), outcomes, strict=True
+        ):
+            if isinstance(outcome, str):
+                result.errors[path] = outcome
+                continue
+            result.programs[path] = binary_ast.decode(outcome, symbols)
+            if cache is not None and isinstance(path_or_source, str):
+                cache.put_encoded(path_or_source, outcome)
+    return result
+
+
+def parse_project(
+    root: Path,
+    *,
+    max_workers: int | None = None,
+    chunksize: int = _DEFAULT_CHUNKSIZE,
+    cache: AstCache | None = None,
+) -> ProjectParse:
+    """Find and parse every Define file in a project.
+
+    See parse_files for the arguments.
+    """
+    return parse_files(
+        root,
+        discover_files(root),
+        max_workers=max_workers,
+        chunksize=chunksize,
+        cache=cache,
+    )
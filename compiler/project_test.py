@@ -0,0 +1,103 @@
+from pathlib import Path
+
+import pytest
+
+from compiler import ast, project
+from compiler.ast_cache import AstCache
+from compiler.parser import Parser
+
+
+def _write(root: Path, relative: str, source: str) -> Path:
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source)
+    return Path(relative)
+
+
+def test_discover_files_finds_nested_def_files(tmp_path: Path):
+    _write(tmp_path, "b.def", "")
+    _write(tmp_path, "a/c.def", "")
+    _write(tmp_path, "a/notes.txt", "")
+    assert project.discover_files(tmp_path) == [Path("a/c.def"), Path("b.def")]
+
+
+def test_parse_file_returns_error_message(tmp_path: Path):
+    path = tmp_path / "bad.def"
+    path.write_text("AbstractUniverse:\n    Foo  is a Bar.\n")
+    result = project.parse_file(Parser(), path)
+    assert isinstance(result, str)
+    assert result.startswith("UnexpectedToken: ")
+
+
+def test_parse_file_missing(tmp_path: Path):
+    result = project.parse_file(Parser(), tmp_path / "missing.def")
+    assert isinstance(result, str)
+    assert result.startswith("FileNotFoundError: ")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parse_project(tmp_path: Path, max_workers: int):
+    sources = {
+        f"types/type{i}.def": f"AbstractUniverse:\n    Type{i} is a ViewPoint.\n"
+        for i in range(5)
+    }
+    for relative, source in sources.items():
+        _write(tmp_path, relative, source)
+    bad = _write(tmp_path, "bad.def", "AbstractUniverse:\n")
+
+    result = project.parse_project(tmp_path, max_workers=max_workers, chunksize=2)
+
+    parser = Parser()
+    assert result.programs == {
+        Path(relative): parser.parse_to_ast(source)
+        for relative, source in sources.items()
+    }
+    assert list(result.errors) == [bad]
+    for program in result.programs.values():
+        assert isinstance(program, ast.Program)
+        assert isinstance(program.universes, ast.NodeList)
+    # Each worker's ASTs are decoded into one symbol table here.
+    parents = {
+        id(statement.parent_type)
+        for program in result.programs.values()
+        for universe in program.universes
+        for statement in universe.statements
+        if isinstance(statement, ast.TypeDeclaration)
+    }
+    assert len(parents) == 1
+
+
+def test_parse_file_uses_cache(tmp_path: Path):
+    path = tmp_path / "a.def"
+    path.write_text("AbstractUniverse:\n    Foo is a ViewPoint.\n")
+    cache = AstCache(tmp_path / "cache")
+    parser = Parser()
+    first = project.parse_file(parser, path, cache)
+    assert project.parse_file(parser, path, cache) == first
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_parse_project_with_cache(tmp_path: Path):
+    root = tmp_path / "project"
+    for i in range(3):
+        _write(
+            root, f"type{i}.def", f"AbstractUniverse:\n    Type{i} is a ViewPoint.\n"
+        )
+    _write(root, "bad.def", "AbstractUniverse:\n")
+    cache = AstCache(tmp_path / "cache")
+
+    first = project.parse_project(root, max_workers=1, cache=cache)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 4)
+    assert len(cache) == 3
+
+    # Nothing changed, so everything that parsed comes from the cache.
+    second = project.parse_project(root, max_workers=1, cache=cache)
+    assert second.programs == first.programs
+    assert second.errors == first.errors
+    assert cache.stats.hits == 3
+
+    _write(root, "type0.def", "AbstractUniverse:\n    Changed is a ViewPoint.\n")
+    third = project.parse_project(root, max_workers=1, cache=cache)
+    assert third.programs[Path("type0.def")] != first.programs[Path("type0.def")]
+    assert third.programs[Path("type1.def")] == first.programs[Path("type1.def")]
+    assert len(cache) == 4
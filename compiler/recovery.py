@@ -0,0 +1,237 @@
+"""Parsing past syntax errors, to report all of them at once.
+
+Parser.parse_recovering uses this once a normal parse has failed. It
+drives Lark's LALR parser a token at a time. On an error, it puts the
+parser back the way it was at the start of the line the error is in and
+skips tokens up to the _NEWLINE that ends the line, along with any block
+the skipped line opened. Parsing carries on from there, so the statements
+before and after the error end up in the AST, and the next error is
+reported too. If skipping leaves a block with no statements, the
+statement the block belongs to is dropped as well.
+
+Errors met while skipping aren't reported, since they're usually caused
+by the error that started it. Errors from the lexer and the indenter are
+recovered from the same way, once the rest of the line is skipped.
+"""
+
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, cast
+
+import lark
+from lark.exceptions import UnexpectedCharacters, UnexpectedInput, UnexpectedToken
+
+from compiler import ast, indenter
+
+if TYPE_CHECKING:
+    from lark.lexer import LexerState
+    from lark.parser_frontends import PostLexConnector
+
+# The tokens that the indentation of a new line is made of.
+_LAYOUT = frozenset({"_NEWLINE", "INDENT", "DEDENT"})
+
+# The parser's state and value stacks, and how many children each tree on
+# the value stack has, saved to go back to.
+type _Stacks = tuple[list[int], list[object], list[tuple[lark.Tree, int]]]
+
+
+@dataclass
+class Recovered:
+    """The result of parsing a file past its syntax errors."""
+
+    # The statements that parsed, in the universe blocks that did.
+    program: ast.Program
+    # Each error, in source order. An UnexpectedToken's expected attribute
+    # has the tokens that could have been there.
+    errors: list[UnexpectedInput]
+
+
+class _Recovery:
+    """One parse of a file that carries on after errors."""
+
+    def __init__(self, lark_parser: lark.Lark, source: str) -> None:
+        self.source = source
+        self.errors: list[UnexpectedInput] = []
+        self.interactive = lark_parser.parse_interactive(source)
+        self.states = self.interactive.parser_state.state_stack
+        self.values = self.interactive.parser_state.value_stack
+        # Whether tokens are being skipped after an error, and whether the
+        # lexer or the indenter has found an error that the parser hasn't
+        # recovered from yet.
+        self.skipping = False
+        self.pending = False
+
+    def _save(self) -> _Stacks:
+        # AST nodes and tokens don't change once they're made, but to parse
+        # a repetition, Lark appends to the children of the tree for the
+        # items before, so how many there were has to be kept too.
+        sizes = [
+            (value, len(value.children))
+            for value in self.values
+            if isinstance(value, lark.Tree)
+        ]
+        return self.states[:], self.values[:], sizes
+
+    def _restore(self, saved: _Stacks) -> None:
+        states, values, sizes = saved
+        # The stacks are changed in place, since the lexer has them too.
+        self.states[:] = states
+        self.values[:] = values
+        for tree, size in sizes:
+            del tree.children[size:]
+
+    def _error(self, error: UnexpectedInput) -> None:
+        # Once the lexer has an error on a line, it can have more before
+        # the parser gets to skip the line, as it lexes for the state the
+        # parser was left in.
+        if not self.skipping and not self.pending:
+            self.errors.append(error)
+            self.pending = True
+
+    def _lexed(self) -> Iterator[lark.Token]:
+        """Return the tokens the lexer makes, going on after errors."""
+        thread = self.interactive.lexer_thread
+        # The lexer behind the indenter, which is applied separately so
+        # that it keeps its state when the lexer is restarted.
+        lexer = cast("PostLexConnector", thread.lexer).lexer
+        # parse_interactive starts the lexer on the source.
+        lexer_state = cast("LexerState", thread.state)
+        while True:
+            try:
+                yield from lexer.lex(lexer_state, self.interactive.parser_state)
+            except UnexpectedToken as e:
+                # The token has been lexed, so lexing starts again after it.
+                self._error(e)
+            except UnexpectedCharacters as e:
+                self._error(e)
+                line_counter = lexer_state.line_ctr
+                line_end = self.source.find("\n", line_counter.char_pos)
+                if line_end < 0:
+                    line_end = len(self.source)
+                line_counter.feed(self.source[line_counter.char_pos : line_end])
+            else:
+                return
+
+    def run(self) -> Recovered:
+        # The stacks at the start of the current line, and at the start of
+        # the current statement.
+        line = statement = self._save()
+        # For each block the parser is in, the stacks at the start of the
+        # statement it belongs to, and how many errors there were then.
+        blocks: list[tuple[_Stacks, int]] = []
+        # While skipping, how many blocks the skipped tokens have opened,
+        # and whether they've reached the end of a line.
+        depth = 0
+        line_ended = False
+        # The last two tokens the parser was given.
+        previous: lark.Token | None = None
+        before: lark.Token | None = None
+        tokens = indenter.DefineIndenter(on_error=self._error).process(self._lexed())
+        for token in tokens:
+            if not self.skipping:
+                if previous is not None and _starts_line(previous, before):
+                    line = self._save()
+                    if token.type not in _LAYOUT:
+                        statement = line
+                if self.pending:
+                    # The lexer or the indenter found an error on this line.
+                    self._restore(line)
+                    self.skipping = True
+                    depth = 0
+                    line_ended = False
+            if self.skipping:
+                if token.type == "INDENT":
+                    depth += 1
+                    continue
+                if token.type == "DEDENT" and depth > 0:
+                    depth -= 1
+                    continue
+                if token.type == "_NEWLINE":
+                    line_ended = True
+                    continue
+                if not line_ended or depth > 0:
+                    continue
+                # A line at the indentation the error was at, or the end of
+                # the block it was in, so parsing carries on.
+                self.skipping = self.pending = False
+                line = self._save()
+                if token.type not in _LAYOUT:
+                    statement = line
+            previous, before = token, previous
+            try:
+                self.interactive.feed_token(token)
+            except UnexpectedToken as e:
+                if token.type == "DEDENT" and blocks:
+                    # The block ended before it had any statements, so the
+                    # statement it belongs to goes too. That's only an
+                    # error of its own if no lines in it were skipped.
+                    statement, errors = blocks.pop()
+                    if len(self.errors) == errors:
+                        self.errors.append(e)
+                    self._restore(statement)
+                    continue
+                self._error(e)
+                self._restore(line)
+                self.skipping = True
+                self.pending = False
+                # The token that was unexpected is skipped too.
+                depth = 1 if token.type == "INDENT" else 0
+                line_ended = token.type == "_NEWLINE"
+            else:
+                if token.type == "INDENT":
+                    blocks.append((statement, len(self.errors)))
+                elif token.type == "DEDENT":
+                    blocks.pop()
+        return Recovered(self._finish(previous), self.errors)
+
+    def _finish(self, last: lark.Token | None) -> ast.Program:
+        """Return the program, or the universe blocks that parsed."""
+        try:
+            return self.interactive.feed_eof(last)
+        except UnexpectedToken as e:
+            # After other errors, it's usually that what was skipped left
+            # the file without a universe block, or left one unfinished.
+            if not self.errors:
+                self.errors.append(e)
+        return ast.Program(
+            [
+                value
+                for value in _flatten(self.values)
+                if isinstance(value, ast.UniverseBlock)
+            ]
+        )
+
+
+def _starts_line(previous: lark.Token, before: lark.Token | None) -> bool:
+    """Return whether the token after previous starts a line of its own.
+
+    It does after the indentation at the start of a line, unless the line
+    before ended with a comma, which carries a list of arguments or
+    parameters on onto the next line.
+    """
+    if previous.type == "_NEWLINE":
+        return before is None or before.type != "COMMA"
+    return previous.type in _LAYOUT
+
+
+def _flatten(values: Sequence[object]) -> Iterator[object]:
+    """Return the values on a stack, and those in the trees on it."""
+    for value in values:
+        if isinstance(value, lark.Tree):
+            yield from _flatten(value.children)
+        else:
+            yield value
+
+
+def recover(lark_parser: lark.Lark, source: str) -> Recovered:
+    """Parse source, carrying on past syntax errors.
+
+    Args:
+        lark_parser: An LALR parser for the Define grammar. Its postlexer
+            isn't used: a DefineIndenter is applied to the tokens here.
+        source: The source to parse.
+
+    Returns:
+        The program made of the statements that parsed, and the errors.
+    """
+    return _Recovery(lark_parser, source).run()
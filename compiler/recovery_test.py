@@ -0,0 +1,180 @@
+import textwrap
+
+import pytest
+from lark.exceptions import UnexpectedCharacters, UnexpectedToken
+
+from compiler import ast
+from compiler.indenter import InvalidIndentationError
+from compiler.parser import Parser
+from compiler.prelex import InvalidSourceError
+
+
+@pytest.fixture(scope="module")
+def parser() -> Parser:
+    return Parser()
+
+
+def _names(program: ast.Program) -> list[tuple[str, list[str]]]:
+    return [
+        (
+            universe.name,
+            [
+                getattr(statement, "type_name", type(statement).__name__)
+                for statement in universe.statements
+            ],
+        )
+        for universe in program.universes
+    ]
+
+
+def test_error_free_source_has_no_errors(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Source can Greet:
+                Source makes Source's label Print "hi".
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert recovered.errors == []
+    assert recovered.program == parser.parse_to_ast(source)
+
+
+def test_every_error_is_reported(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse:
+            A is a ViewPoint.
+            B  is a ViewPoint.
+            C is a ViewPoint.
+            D has a String named d
+            E is a ViewPoint.
+
+        PhysicalUniverse:
+            F is a Computer.
+            F knows A's label
+            G is a Computer.
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert [(type(error), error.line, error.column) for error in recovered.errors] == [
+        (UnexpectedToken, 3, 7),
+        (UnexpectedToken, 5, 27),
+        (UnexpectedToken, 10, 22),
+    ]
+    missing_dot = recovered.errors[1]
+    assert isinstance(missing_dot, UnexpectedToken)
+    assert "DOT" in missing_dot.expected
+    assert _names(recovered.program) == [
+        ("AbstractUniverse", ["A", "C", "E"]),
+        ("PhysicalUniverse", ["F", "G"]),
+    ]
+
+
+def test_block_with_an_error_is_skipped(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse:
+            A is a ViewPoint.
+            A can Greet using String text:
+                A makes A's label Print "hi".
+            B is a ViewPoint.
+            B can Wave:
+                B makes B's label Print 1.
+                B makes B's label Print 2
+                B makes B's label Print 3.
+            C is a ViewPoint.
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert [(error.line, error.column) for error in recovered.errors] == [
+        (3, 23),
+        (8, 34),
+    ]
+    assert _names(recovered.program) == [("AbstractUniverse", ["A", "B", "B", "C"])]
+    (universe,) = recovered.program.universes
+    action = universe.statements[2]
+    assert isinstance(action, ast.ActionDeclaration)
+    assert [execution.arguments for execution in action.body] == [
+        [ast.NumberLiteral("1")],
+        [ast.NumberLiteral("3")],
+    ]
+
+
+def test_statement_whose_block_is_skipped_is_dropped(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse:
+            A is a ViewPoint.
+            A can Greet:
+                A makes A's label Print "hi"
+            B is a ViewPoint.
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert [(error.line, error.column) for error in recovered.errors] == [(4, 37)]
+    assert _names(recovered.program) == [("AbstractUniverse", ["A", "B"])]
+
+
+def test_universe_with_an_error_is_skipped(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse
+            A is a ViewPoint.
+
+        PhysicalUniverse:
+            B is a Computer.
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert [(error.line, error.column) for error in recovered.errors] == [(1, 17)]
+    assert _names(recovered.program) == [("PhysicalUniverse", ["B"])]
+
+
+def test_lexer_and_indentation_errors_are_reported(parser: Parser):
+    source = textwrap.dedent(
+        """\
+        AbstractUniverse:
+            A is a ViewPoint.
+            A makes @ Print 1.
+            B is a ViewPoint.
+              C is a ViewPoint.
+            D is a ViewPoint.
+        """
+    )
+
+    recovered = parser.parse_recovering(source)
+
+    assert [(type(error), error.line, error.column) for error in recovered.errors] == [
+        (UnexpectedCharacters, 3, 13),
+        (InvalidIndentationError, 5, 7),
+    ]
+    assert _names(recovered.program) == [("AbstractUniverse", ["A", "B", "D"])]
+
+
+def test_unexpected_end_of_file(parser: Parser):
+    recovered = parser.parse_recovering("AbstractUniverse:\n")
+
+    (error,) = recovered.errors
+    assert isinstance(error, UnexpectedToken)
+    assert recovered.program == ast.Program([])
+
+
+def test_invalid_source_is_not_parsed(parser: Parser):
+    recovered = parser.parse_recovering("AbstractUniverse: \n\tA is a B.\n")
+
+    (error,) = recovered.errors
+    assert isinstance(error, InvalidSourceError)
+    assert len(error.violations) == 2
+    assert recovered.program == ast.Program([])
@@ -0,0 +1,127 @@
+"""The names that a Define program defines and refers to.
+
+The grammar the compiler supports doesn't have proposal 7's global names
+yet, so type names stand in for them: a file defines the types it
+declares, and depends on the types its statements refer to.
+"""
+
+from collections.abc import Iterator
+
+from compiler import ast
+from compiler.arena import NAME_FIELDS
+
+# The types every program can refer to without declaring or loading them:
+# the basic types and the compiler types (see "Basic Types" and "Compiler
+# Types" in the spec).
+BUILTIN_TYPES = frozenset(
+    {"Consideration", "ViewPoint", "DimensionPoint", "Number", "String"}
+)
+
+
+def defined_names(program: ast.Program) -> list[str]:
+    """Return the type names a program declares, in source order."""
+    return [
+        stmt.type_name
+        for universe in program.universes
+        for stmt in universe.statements
+        if isinstance(stmt, ast.BaseTypeDeclaration)
+    ]
+
+
+def created_names(program: ast.Program) -> list[str]:
+    """Return the entity names a program creates, in source order."""
+    return [
+        stmt.entity_name
+        for universe in program.universes
+        for stmt in universe.statements
+        if isinstance(stmt, ast.EntityCreation)
+    ]
+
+
+def _value_owners(values: list[ast.ValueReference]) -> Iterator[str]:
+    for value in values:
+        if isinstance(value, ast.PropertyOrEntityReference):
+            yield value.owner
+
+
+def _statement_references(stmt: ast.ASTNode) -> tuple[str, list[str]] | None:
+    """Return the subject of a statement and the type names it refers to."""
+    match stmt:
+        case ast.TypeDeclaration():
+            return stmt.type_name, [stmt.parent_type]
+        case ast.PropertyDeclaration():
+            return stmt.type_name, [stmt.property_type]
+        case ast.EntityCreation():
+            return stmt.creator, [
+                stmt.type_name,
+                *_value_owners([prop.value for prop in stmt.properties]),
+            ]
+        case ast.KnowledgeStatement():
+            return stmt.knower, [stmt.owner]
+        case ast.ActionDeclaration():
+            references = [param.param_type for param in stmt.parameters]
+            for execution in stmt.body:
+                references.append(execution.actor)
+                references.extend(_execution_references(execution))
+            return stmt.type_name, references
+        case ast.ActionExecution():
+            return stmt.actor, list(_execution_references(stmt))
+    return None
+
+
+def _execution_references(execution: ast.ActionExecution) -> Iterator[str]:
+    yield execution.target.owner
+    yield from _value_owners(execution.arguments)
+
+
+def name_dependencies(program: ast.Program) -> dict[str, set[str]]:
+    """Return the type names each name in a program depends on.
+
+    A statement makes its subject (the type being declared, or the
+    creator, knower, or actor) depend on every other type name in it. A
+    type referring to itself isn't a dependency.
+
+    Returns:
+        The dependencies of each statement subject, which may include
+        names the program doesn't declare.
+    """
+    dependencies: dict[str, set[str]] = {}
+    for universe in program.universes:
+        for stmt in universe.statements:
+            found = _statement_references(stmt)
+            if found is None:
+                continue
+            subject, references = found
+            targets = dependencies.setdefault(subject, set())
+            targets.update(name for name in references if name != subject)
+    return dependencies
+
+
+def referenced_names(program: ast.Program) -> set[str]:
+    """Return every type name a program refers to, declared there or not."""
+    return names_in(name_dependencies(program))
+
+
+def names_in(dependencies: dict[str, set[str]]) -> set[str]:
+    """Return every name in the result of name_dependencies.
+
+    This is referenced_names, for callers that need the dependencies too.
+    """
+    names: set[str] = set()
+    for subject, targets in dependencies.items():
+        names.add(subject)
+        names.update(targets)
+    return names
+
+
+def mentions(program: ast.Program, name: str) -> Iterator[ast.ASTNode]:
+    """Return the nodes that have name as one of their own names.
+
+    They're in source order, except that a node comes before the nodes
+    under it.
+    """
+    for node in ast.walk(program):
+        if any(
+            getattr(node, field) == name for field in NAME_FIELDS.get(type(node), ())
+        ):
+            yield node
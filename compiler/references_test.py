@@ -0,0 +1,77 @@
+from compiler import references
+from compiler.parser import Parser
+
+_SOURCE = """\
+AbstractUniverse:
+    Source is a ViewPoint.
+    Source has a String named label.
+    Source has a Source named self.
+    Source creates a Greeting named greeting:
+        value: Other's text
+    Source can Describe using a Number named size:
+        Helper makes Source's greeting Print Extra's text.
+
+PhysicalUniverse:
+    Machine is a Computer.
+    Machine knows Source's greeting.
+    Machine makes Machine's terminal Output Source's greeting.
+"""
+
+
+def test_defined_names():
+    program = Parser().parse_to_ast(_SOURCE)
+    assert references.defined_names(program) == ["Source", "Machine"]
+
+
+def test_created_names():
+    program = Parser().parse_to_ast(_SOURCE)
+    assert references.created_names(program) == ["greeting"]
+
+
+def test_name_dependencies():
+    program = Parser().parse_to_ast(_SOURCE)
+    assert references.name_dependencies(program) == {
+        "Source": {
+            "ViewPoint",
+            "String",
+            "Greeting",
+            "Other",
+            "Number",
+            "Helper",
+            "Extra",
+        },
+        "Machine": {"Computer", "Source"},
+    }
+
+
+def test_referenced_names():
+    program = Parser().parse_to_ast(_SOURCE)
+    assert references.referenced_names(program) == {
+        "Source",
+        "ViewPoint",
+        "String",
+        "Greeting",
+        "Other",
+        "Number",
+        "Helper",
+        "Extra",
+        "Machine",
+        "Computer",
+    }
+
+
+def test_mentions():
+    program = Parser().parse_to_ast(_SOURCE)
+
+    assert [type(node).__name__ for node in references.mentions(program, "Other")] == [
+        "PropertyOrEntityReference"
+    ]
+    assert [
+        type(node).__name__ for node in references.mentions(program, "Machine")
+    ] == [
+        "TypeDeclaration",
+        "KnowledgeStatement",
+        "ActionExecution",
+        "PropertyOrEntityReference",
+    ]
+    assert list(references.mentions(program, "Nothing")) == []
@@ -0,0 +1,211 @@
+"""A long-running compile server that answers requests over a Unix socket.
+
+Starting Python, importing Lark and loading the parser tables costs more
+than checking a project that has barely changed. The server pays that
+once, keeps a Workspace of the project in memory, and only reparses the
+files that changed between requests.
+
+Requests and responses are JSON objects, one per line. A request has a
+"command":
+
+- "check" (or "compile", which does the same while there's no code
+  generation): brings the workspace up to date with the disk and returns
+  diagnostics. With "paths", a list of paths relative to the root, only
+  those files are refreshed and checked, along with the files they affect.
+- "stats": returns request latencies and the size of the workspace.
+- "shutdown": stops the server.
+
+Every response has "ok", which is false if the request failed (with the
+reason in "error") or if any checked file has diagnostics.
+"""
+
+import hashlib
+import json
+import socket
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, cast
+
+from compiler import project
+from compiler.workspace import Workspace
+
+# How many recent requests of each command the latency statistics cover.
+LATENCY_WINDOW = 1000
+
+
+def default_socket_path(root: Path) -> Path:
+    """Return the socket the server for a project root listens on by default.
+
+    It's in the temporary directory, since socket paths have to be short.
+    """
+    digest = hashlib.sha256(str(root.resolve()).encode()).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"define-{digest}.sock"
+
+
+class LatencyStats:
+    """The times recent requests took, by command."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        """Create empty statistics covering the last window requests."""
+        self._window = window
+        self._milliseconds: dict[str, deque[float]] = {}
+
+    def record(self, command: str, seconds: float) -> None:
+        """Record how long a request took."""
+        self._milliseconds.setdefault(command, deque(maxlen=self._window)).append(
+            seconds * 1000
+        )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return the count, mean, median, 95th percentile and maximum.
+
+        Times are in milliseconds, and are for the recent requests of each
+        command.
+        """
+        summary = {}
+        for command, times in self._milliseconds.items():
+            ordered = sorted(times)
+            summary[command] = {
+                "count": len(ordered),
+                "mean_ms": statistics.fmean(ordered),
+                "p50_ms": ordered[len(ordered) // 2],
+                "p95_ms": ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)],
+                "max_ms": ordered[-1],
+            }
+        return summary
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        compile_server = cast("CompileServer", self.server)
+        for line in self.rfile:
+            response = compile_server.respond(line)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    """Answers compile requests for one project over a Unix socket.
+
+    Requests are handled one at a time, in the thread that calls
+    serve_forever.
+    """
+
+    def __init__(self, socket_path: Path, workspace: Workspace) -> None:
+        """Start listening.
+
+        Args:
+            socket_path: Where to create the socket.
+            workspace: The project. It's brought up to date on each
+                request, so it doesn't need to have been scanned.
+
+        Raises:
+            RuntimeError: If a server is already listening on socket_path.
+        """
+        self.socket_path = socket_path
+        self.workspace = workspace
+        self.latency = LatencyStats()
+        _remove_stale_socket(socket_path)
+        super().__init__(str(socket_path), _RequestHandler)
+
+    def server_close(self) -> None:
+        """Stop listening and remove the socket."""
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+    def respond(self, line: bytes) -> dict[str, Any]:
+        """Answer one request.
+
+        Args:
+            line: The request, as a line of JSON.
+
+        Returns:
+            The response.
+        """
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            command = request["command"] if isinstance(request, dict) else None
+        except (ValueError, KeyError):
+            return {"ok": False, "error": "Requests must be JSON with a command"}
+        match command:
+            case "check" | "compile":
+                paths = request.get("paths")
+                if paths is not None and not (
+                    isinstance(paths, list)
+                    and all(isinstance(path, str) for path in paths)
+                ):
+                    return {"ok": False, "error": "paths must be a list of strings"}
+                try:
+                    response = self._check(paths)
+                except (OSError, TypeError) as e:
+                    return {"ok": False, "error": project.error_message(e)}
+            case "stats":
+                response = {
+                    "ok": True,
+                    "latency": self.latency.summary(),
+                    "files": len(self.workspace.files),
+                    "names": len(self.workspace.graph),
+                }
+            case "shutdown":
+                # shutdown() waits for serve_forever to return, so it can't
+                # be called from the thread that's serving.
+                threading.Thread(target=self.shutdown).start()
+                response = {"ok": True}
+            case _:
+                return {"ok": False, "error": f"Unknown command: {command!r}"}
+        self.latency.record(command, time.perf_counter() - start)
+        return response
+
+    def _check(self, paths: list[str] | None) -> dict[str, Any]:
+        if paths is None:
+            affected = self.workspace.scan()
+            checked = None
+        else:
+            requested = {Path(path) for path in paths}
+            affected = self.workspace.update(requested)
+            checked = requested | affected
+        diagnostics = self.workspace.check(checked)
+        return {
+            "ok": not diagnostics,
+            "files": len(self.workspace.files),
+            "affected": sorted(str(path) for path in affected),
+            "diagnostics": {
+                str(path): [str(diagnostic) for diagnostic in found]
+                for path, found in diagnostics.items()
+            },
+        }
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    """Remove a socket left behind by a server that's no longer running."""
+    if not socket_path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            socket_path.unlink()
+            return
+    raise RuntimeError(f"A server is already listening on {socket_path}")
+
+
+def send_request(
+    socket_path: Path, request: dict[str, Any], timeout: float | None = None
+) -> dict[str, Any]:
+    """Send one request to a server and wait for its response.
+
+    Raises:
+        OSError: If there's no server listening on socket_path.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(str(socket_path))
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        with connection.makefile("rb") as responses:
+            return json.loads(responses.readline())
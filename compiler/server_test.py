@@ -0,0 +1,125 @@
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from compiler import server
+from compiler.workspace import Workspace
+
+
+@pytest.fixture
+def running(tmp_path: Path) -> Iterator[tuple[Path, Path]]:
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "A.def").write_text("AbstractUniverse:\n    A is a ViewPoint.\n")
+    socket_path = tmp_path / "server.sock"
+    compile_server = server.CompileServer(socket_path, Workspace(root))
+    thread = threading.Thread(target=compile_server.serve_forever)
+    thread.start()
+    try:
+        yield root, socket_path
+    finally:
+        compile_server.shutdown()
+        thread.join()
+        compile_server.server_close()
+    assert not socket_path.exists()
+
+
+def test_check(running: tuple[Path, Path]):
+    root, socket_path = running
+    response = server.send_request(socket_path, {"command": "check"})
+    assert response == {
+        "ok": True,
+        "files": 1,
+        "affected": ["A.def"],
+        "diagnostics": {},
+    }
+
+    (root / "B.def").write_text("AbstractUniverse:\n    B is a Missing.\n")
+    response = server.send_request(socket_path, {"command": "compile"})
+    assert response["ok"] is False
+    assert response["affected"] == ["B.def"]
+    assert response["diagnostics"] == {"B.def": ["2:5: Unknown type name: Missing"]}
+
+    response = server.send_request(
+        socket_path, {"command": "check", "paths": ["A.def"]}
+    )
+    assert response == {"ok": True, "files": 2, "affected": [], "diagnostics": {}}
+
+
+def test_stats(running: tuple[Path, Path]):
+    _, socket_path = running
+    for _ in range(3):
+        server.send_request(socket_path, {"command": "check"})
+    response = server.send_request(socket_path, {"command": "stats"})
+    assert response["ok"] is True
+    assert response["files"] == 1
+    latency = response["latency"]["check"]
+    assert latency["count"] == 3
+    assert 0 <= latency["p50_ms"] <= latency["p95_ms"] <= latency["max_ms"]
+
+
+def test_bad_requests(running: tuple[Path, Path]):
+    _, socket_path = running
+    response = server.send_request(socket_path, {"command": "fly"})
+    assert response == {"ok": False, "error": "Unknown command: 'fly'"}
+    response = server.send_request(socket_path, {})
+    assert response["ok"] is False
+    for paths in ("A.def", [1], {"A.def": True}):
+        response = server.send_request(
+            socket_path, {"command": "check", "paths": paths}
+        )
+        assert response == {"ok": False, "error": "paths must be a list of strings"}
+    response = server.send_request(socket_path, {"command": "check", "paths": ["."]})
+    assert response["ok"] is False
+    assert response["error"].startswith("IsADirectoryError: ")
+    # The server is still answering.
+    response = server.send_request(socket_path, {"command": "check"})
+    assert response["ok"] is True
+
+
+def test_refuses_to_replace_running_server(running: tuple[Path, Path]):
+    root, socket_path = running
+    with pytest.raises(RuntimeError, match="already listening"):
+        server.CompileServer(socket_path, Workspace(root))
+
+
+def test_replaces_stale_socket(tmp_path: Path):
+    socket_path = tmp_path / "server.sock"
+    stale = server.CompileServer(socket_path, Workspace(tmp_path))
+    stale.socket.close()
+    with server.CompileServer(socket_path, Workspace(tmp_path)):
+        assert socket_path.exists()
+
+
+def test_shutdown_command(tmp_path: Path):
+    socket_path = tmp_path / "server.sock"
+    compile_server = server.CompileServer(socket_path, Workspace(tmp_path))
+    thread = threading.Thread(target=compile_server.serve_forever)
+    thread.start()
+    try:
+        response = server.send_request(socket_path, {"command": "shutdown"})
+        assert response == {"ok": True}
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+    finally:
+        if thread.is_alive():
+            compile_server.shutdown()
+            thread.join()
+        compile_server.server_close()
+
+
+def test_latency_stats():
+    stats = server.LatencyStats(window=2)
+    for seconds in [1.0, 0.002, 0.004]:
+        stats.record("check", seconds)
+    assert stats.summary() == {
+        "check": {
+            "count": 2,
+            "mean_ms": pytest.approx(3.0),
+            "p50_ms": pytest.approx(4.0),
+            "p95_ms": pytest.approx(4.0),
+            "max_ms": pytest.approx(4.0),
+        }
+    }
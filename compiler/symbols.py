@@ -0,0 +1,50 @@
+"""Identifier interning for a single compilation."""
+
+
+class SymbolTable:
+    """Interns the identifiers of one compilation.
+
+    Each distinct name is stored once, as a plain str, and has a small
+    integer ID. Nodes built with the same table share their name strings,
+    so comparing two names that are equal is an identity check, and the
+    names don't keep the lexer's Token objects (and their position
+    fields) alive.
+    """
+
+    __slots__ = ("_ids", "_names")
+
+    def __init__(self) -> None:
+        """Create an empty table."""
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+
+    def __len__(self) -> int:
+        """Return the number of distinct names in the table."""
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        """Return whether name has been interned."""
+        return name in self._ids
+
+    def symbol_id(self, name: str) -> int:
+        """Return the ID for name, adding it to the table if it's new."""
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            # str() drops any str subclass, such as lark.Token.
+            name = str(name)
+            symbol_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = symbol_id
+        return symbol_id
+
+    def intern(self, name: str) -> str:
+        """Return the canonical string for name, adding it if it's new."""
+        return self._names[self.symbol_id(name)]
+
+    def name(self, symbol_id: int) -> str:
+        """Return the name with the given ID.
+
+        Raises:
+            IndexError: If no name has that ID.
+        """
+        return self._names[symbol_id]
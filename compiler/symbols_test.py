@@ -0,0 +1,47 @@
+import lark
+import pytest
+
+from compiler.symbols import SymbolTable
+
+
+def test_intern_returns_same_object_for_equal_names():
+    symbols = SymbolTable()
+    first_token = lark.Token("IDENTIFIER", "Source")
+    second_token = lark.Token("IDENTIFIER", "Source")
+    assert first_token is not second_token
+    first = symbols.intern(first_token)
+    assert first == "Source"
+    assert symbols.intern(second_token) is first
+
+
+def test_intern_strips_token_type():
+    symbols = SymbolTable()
+    name = symbols.intern(lark.Token("IDENTIFIER", "Source"))
+    assert type(name) is str
+    assert symbols.intern("Source") is name
+
+
+def test_symbol_ids_are_dense_and_stable():
+    symbols = SymbolTable()
+    assert symbols.symbol_id("Source") == 0
+    assert symbols.symbol_id("Machine") == 1
+    assert symbols.symbol_id("Source") == 0
+    assert len(symbols) == 2
+
+
+def test_name_returns_interned_name():
+    symbols = SymbolTable()
+    symbol_id = symbols.symbol_id("Source")
+    assert symbols.name(symbol_id) is symbols.intern("Source")
+
+
+def test_name_unknown_id():
+    with pytest.raises(IndexError):
+        SymbolTable().name(0)
+
+
+def test_contains():
+    symbols = SymbolTable()
+    symbols.intern("Source")
+    assert "Source" in symbols
+    assert "Machine" not in symbols
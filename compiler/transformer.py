@@ -1,78 +1,209 @@
 """Lark transformer to convert parse tree to AST nodes."""
 
-from typing import Any
+import functools
+from collections.abc import Callable
+from typing import Any, cast
 
 import lark
 from lark.visitors import Discard, _DiscardType
 
-from compiler import ast
+from compiler import arena, ast
+from compiler.symbols import SymbolTable
 
 
-class DefineTransformer(lark.Transformer):
+def _span(items: list[Any]) -> int:
+    """Return the span from the first item of a rule to the end of its last.
+
+    Every rule that makes a node starts with a name token, and ends with a
+    token, a node, or a list of nodes.
+    """
+    first, last = items[0], items[-1]
+    while isinstance(last, list) and last:
+        last = last[-1]
+    if isinstance(last, ast.ASTNode):
+        end = ast.span_end(last.span)
+    elif isinstance(last, lark.Token):
+        # The lexer gives every token its positions.
+        end = cast("int", last.end_line), cast("int", last.end_column)
+    else:
+        return ast.NO_SPAN
+    if not isinstance(first, lark.Token):
+        return ast.NO_SPAN
+    return ast.make_span((cast("int", first.line), cast("int", first.column)), end)
+
+
+def _spanned[N: ast.ASTNode](
+    method: Callable[[Any, list[Any]], N],
+) -> Callable[[Any, list[Any]], N]:
+    """Give the node a rule method makes the span of the rule's items."""
+
+    @functools.wraps(method)
+    def wrapper(self: Any, items: list[Any]) -> N:
+        node = method(self, items)
+        node.span = _span(items)
+        return node
+
+    return wrapper
+
+
+class _BaseTransformer(lark.Transformer):
+    """The rules and tokens that every Define transformer handles alike."""
+
+    def __init__(self, symbols: SymbolTable | None = None) -> None:
+        """Create a transformer.
+
+        Args:
+            symbols: The table to intern identifiers into. Pass the same
+                table for every file in a compilation so that they share
+                name strings. A new table is used if none is given.
+        """
+        super().__init__()
+        self.symbols = symbols if symbols is not None else SymbolTable()
+
+    def action_parameters(self, items: list[Any]) -> list[Any]:
+        """Transform action parameters."""
+        return items
+
+    def parameter_sep(self, _items: list[Any]) -> _DiscardType:
+        """Discard a separator that carries parameters onto the next line.
+
+        A separator on one line is inlined into its SPACE, and discarded
+        with it.
+        """
+        return Discard
+
+    def action_body(self, items: list[Any]) -> list[Any]:
+        """Transform an action body."""
+        return items
+
+    def argument_list(self, items: list[Any]) -> list[Any]:
+        """Transform an argument list."""
+        return items
+
+    # Terminal tokens
+    # Method names must match token names (uppercase) - noqa: N802
+
+    def SPACE(  # noqa: N802
+        self, _token: lark.Token
+    ) -> _DiscardType:  # Returns Discard singleton
+        """Discard SPACE tokens - parser validates spacing, transformer doesn't need them."""
+        return Discard
+
+    def POSSESSIVE(  # noqa: N802
+        self, _token: lark.Token
+    ) -> _DiscardType:  # Returns Discard singleton
+        """Discard POSSESSIVE tokens - parser validates them, transformer doesn't need them."""
+        return Discard
+
+    def INDENT(  # noqa: N802
+        self, _token: lark.Token
+    ) -> _DiscardType:  # Returns Discard singleton
+        """Discard INDENT tokens - parser validates indentation, transformer doesn't need it."""
+        return Discard
+
+    def DEDENT(  # noqa: N802
+        self, _token: lark.Token
+    ) -> _DiscardType:  # Returns Discard singleton
+        """Discard DEDENT tokens - parser validates indentation, transformer doesn't need it."""
+        return Discard
+
+    def _NEWLINES(  # noqa: N802
+        self, _token: lark.Token
+    ) -> _DiscardType:  # Returns Discard singleton
+        """Discard the _NEWLINES token - parser validates newlines, transformer doesn't need them."""
+        return Discard
+
+
+class DefineTransformer(_BaseTransformer):
     """Transforms the Parse tree from DefineParser into AST nodes.
 
     Note that this expects a valid parse tree from DefineParser. Giving it
     an invalid parse tree will result in undefined behavior.
     """
 
+    def _name(self, token: lark.Token) -> str:
+        """Return the interned name of an IDENTIFIER or UNIVERSE_NAME token.
+
+        Names are only interned once the rule they're in is reduced, so
+        the rule can take its span from their tokens.
+        """
+        return self.symbols.intern(token)
+
     def start(self, items: list[Any]) -> ast.Program:
         """Transform the root start rule."""
         return ast.Program(items)
 
+    @_spanned
     def universe_section(self, items: list[Any]) -> ast.UniverseBlock:
         """Transform a universe section."""
         # Items: [UNIVERSE_NAME, statements...]
-        return ast.UniverseBlock(name=items[0], statements=items[1:])
+        return ast.UniverseBlock(name=self._name(items[0]), statements=items[1:])
 
+    @_spanned
     def compiler_type_declaration(
         self, items: list[Any]
     ) -> ast.CompilerTypeDeclaration:
         """Transform a compiler type declaration (e.g., Number is.)."""
         # Items: [IDENTIFIER, "is."]
-        return ast.CompilerTypeDeclaration(type_name=items[0])
+        return ast.CompilerTypeDeclaration(type_name=self._name(items[0]))
 
+    @_spanned
     def type_declaration(self, items: list[Any]) -> ast.TypeDeclaration:
         """Transform a type declaration with parent type (e.g., Source is a ViewPoint.)."""
         # Items: [IDENTIFIER, IDENTIFIER]
-        return ast.TypeDeclaration(type_name=items[0], parent_type=items[1])
+        return ast.TypeDeclaration(
+            type_name=self._name(items[0]), parent_type=self._name(items[1])
+        )
 
+    @_spanned
     def property_declaration(self, items: list[Any]) -> ast.PropertyDeclaration:
         """Transform a property declaration."""
         # Items: [IDENTIFIER, IDENTIFIER, IDENTIFIER]
         return ast.PropertyDeclaration(
-            type_name=items[0], property_type=items[1], property_name=items[2]
+            type_name=self._name(items[0]),
+            property_type=self._name(items[1]),
+            property_name=self._name(items[2]),
         )
 
+    @_spanned
     def entity_creation(self, items: list[Any]) -> ast.EntityCreation:
         """Transform an entity creation."""
         # Items: [IDENTIFIER, IDENTIFIER, IDENTIFIER, PropertyAssignment, ...]
         return ast.EntityCreation(
-            creator=items[0],
-            type_name=items[1],
-            entity_name=items[2],
+            creator=self._name(items[0]),
+            type_name=self._name(items[1]),
+            entity_name=self._name(items[2]),
             properties=items[3:],
         )
 
+    @_spanned
     def property_assignment(self, items: list[Any]) -> ast.PropertyAssignment:
         """Transform a property assignment."""
         # Items: [IDENTIFIER, value_reference]
-        return ast.PropertyAssignment(name=items[0], value=items[1])
+        return ast.PropertyAssignment(name=self._name(items[0]), value=items[1])
 
+    @_spanned
     def property_or_entity_reference(
         self, items: list[Any]
     ) -> ast.PropertyOrEntityReference:
         """Transform a property/entity reference."""
         # Items: [IDENTIFIER, IDENTIFIER]
-        return ast.PropertyOrEntityReference(owner=items[0], property_name=items[1])
+        return ast.PropertyOrEntityReference(
+            owner=self._name(items[0]), property_name=self._name(items[1])
+        )
 
+    @_spanned
     def knowledge_statement(self, items: list[Any]) -> ast.KnowledgeStatement:
         """Transform a knowledge statement."""
         # Items: [IDENTIFIER, property_or_entity_reference]
         pe_ref = items[1]
         return ast.KnowledgeStatement(
-            knower=items[0], owner=pe_ref.owner, entity_name=pe_ref.property_name
+            knower=self._name(items[0]),
+            owner=pe_ref.owner,
+            entity_name=pe_ref.property_name,
         )
 
+    @_spanned
     def action_declaration(self, items: list[Any]) -> ast.ActionDeclaration:
         """Transform an action declaration."""
         # If 3 items: [IDENTIFIER, IDENTIFIER, list[ActionExecution]]
@@ -85,84 +216,245 @@ class DefineTransformer(lark.Transformer):
             body = items[3]
 
         return ast.ActionDeclaration(
-            type_name=items[0], action_name=items[1], parameters=parameters, body=body
+            type_name=self._name(items[0]),
+            action_name=self._name(items[1]),
+            parameters=parameters,
+            body=body,
         )
 
-    def action_parameters(self, items: list[Any]) -> list[ast.ActionParameter]:
-        """Transform action parameters."""
-        return items
-
+    @_spanned
     def action_param(self, items: list[Any]) -> ast.ActionParameter:
         """Transform an action parameter."""
         # Items: [IDENTIFIER, IDENTIFIER]
-        return ast.ActionParameter(param_type=items[0], param_name=items[1])
-
-    def action_body(self, items: list[Any]) -> list[ast.ActionExecution]:
-        """Transform an action body."""
-        return items
+        return ast.ActionParameter(
+            param_type=self._name(items[0]), param_name=self._name(items[1])
+        )
 
+    @_spanned
     def action_execution(self, items: list[Any]) -> ast.ActionExecution:
         """Transform an action execution."""
         # Items: [IDENTIFIER, PropertyOrEntityReference, IDENTIFIER] or
         #        [IDENTIFIER, PropertyOrEntityReference, IDENTIFIER, list[ValueReference]]
-        actor = items[0]
+        actor = self._name(items[0])
         target = items[1]
-        action_name = items[2]
+        action_name = self._name(items[2])
         arguments = items[3] if len(items) == 4 else []
 
         return ast.ActionExecution(
             actor=actor, target=target, action_name=action_name, arguments=arguments
         )
 
-    def argument_list(self, items: list[Any]) -> list[ast.ValueReference]:
-        """Transform an argument list."""
-        return items
+    def STRING(self, token: lark.Token) -> ast.StringLiteral:  # noqa: N802
+        """Transform a string token."""
+        # str() drops the Token, and the positions it holds, for the span.
+        return ast.StringLiteral(str(token), span=_span([token]))
 
-    # Terminal tokens
-    # Method names must match token names (uppercase) - noqa: N802
+    def NUMBER(self, token: lark.Token) -> ast.NumberLiteral:  # noqa: N802
+        """Transform a number token."""
+        return ast.NumberLiteral(str(token), span=_span([token]))
 
-    def SPACE(  # noqa: N802
-        self, _token: lark.Token
-    ) -> _DiscardType:  # Returns Discard singleton
-        """Discard SPACE tokens - parser validates spacing, transformer doesn't need them."""
-        return Discard
 
-    def POSSESSIVE(  # noqa: N802
-        self, _token: lark.Token
-    ) -> _DiscardType:  # Returns Discard singleton
-        """Discard POSSESSIVE tokens - parser validates them, transformer doesn't need them."""
-        return Discard
+class ArenaTransformer(_BaseTransformer):
+    """Transforms the parse tree from DefineParser into an arena.Arena.
 
-    def IDENTIFIER(self, token: lark.Token) -> str:  # noqa: N802
-        """Transform an identifier token."""
-        return token
+    Rule methods add their node to the arena and return its index, so no
+    AST nodes are made. The arena has the same nodes, in the same order,
+    as arena.Arena.from_program would give for the AST DefineTransformer
+    makes.
+    """
 
-    def STRING(self, token: lark.Token) -> ast.StringLiteral:  # noqa: N802
-        """Transform a string token."""
-        return ast.StringLiteral(token)
+    def __init__(self, symbols: SymbolTable | None = None) -> None:
+        """Create a transformer.
+
+        Args:
+            symbols: The table the arena's names are IDs in (see
+                DefineTransformer). A new table is used if none is given.
+        """
+        super().__init__(symbols)
+        self.arena = arena.Arena(self.symbols)
+
+    def _symbol(self, token: lark.Token) -> int:
+        return self.arena.symbols.symbol_id(token)
+
+    def _items_span(self, items: list[Any]) -> int:
+        """Return the span of a rule's items, as _span does for AST nodes."""
+        first, last = items[0], items[-1]
+        while isinstance(last, list) and last:
+            last = last[-1]
+        if not isinstance(last, int):
+            return _span(items)
+        return ast.make_span(
+            (cast("int", first.line), cast("int", first.column)),
+            ast.span_end(self.arena.span(last)),
+        )
 
-    def NUMBER(self, token: lark.Token) -> ast.NumberLiteral:  # noqa: N802
-        """Transform a number token."""
-        return ast.NumberLiteral(token)
+    def _add(
+        self,
+        node_type: type[ast.ASTNode],
+        items: list[Any],
+        names: list[int],
+        children: list[int] | None = None,
+    ) -> int:
+        """Add a node with the span of the rule's items."""
+        return self.arena.add(node_type, names, children or (), self._items_span(items))
+
+    def start(self, items: list[Any]) -> arena.Arena:
+        """Transform the root start rule."""
+        self.arena.universes.extend(items)
+        return self.arena
 
-    def UNIVERSE_NAME(self, token: lark.Token) -> str:  # noqa: N802
-        """Transform a universe name token."""
-        return token
+    def universe_section(self, items: list[Any]) -> int:
+        """Add a universe block."""
+        return self._add(ast.UniverseBlock, items, [self._symbol(items[0])], items[1:])
 
-    def INDENT(  # noqa: N802
-        self, _token: lark.Token
-    ) -> _DiscardType:  # Returns Discard singleton
-        """Discard INDENT tokens - parser validates indentation, transformer doesn't need it."""
-        return Discard
+    def compiler_type_declaration(self, items: list[Any]) -> int:
+        """Add a compiler type declaration."""
+        return self._add(ast.CompilerTypeDeclaration, items, [self._symbol(items[0])])
 
-    def DEDENT(  # noqa: N802
-        self, _token: lark.Token
-    ) -> _DiscardType:  # Returns Discard singleton
-        """Discard DEDENT tokens - parser validates indentation, transformer doesn't need it."""
-        return Discard
+    def type_declaration(self, items: list[Any]) -> int:
+        """Add a type declaration with a parent type."""
+        return self._add(
+            ast.TypeDeclaration, items, [self._symbol(items[0]), self._symbol(items[1])]
+        )
 
-    def _NEWLINES(  # noqa: N802
-        self, _token: lark.Token
-    ) -> _DiscardType:  # Returns Discard singleton
-        """Discard the _NEWLINES token - parser validates newlines, transformer doesn't need them."""
-        return Discard
+    def property_declaration(self, items: list[Any]) -> int:
+        """Add a property declaration."""
+        return self._add(ast.PropertyDeclaration, items, list(map(self._symbol, items)))
+
+    def entity_creation(self, items: list[Any]) -> int:
+        """Add an entity creation."""
+        return self._add(
+            ast.EntityCreation,
+            items,
+            [self._symbol(token) for token in items[:3]],
+            items[3:],
+        )
+
+    def property_assignment(self, items: list[Any]) -> int:
+        """Add a property assignment."""
+        return self._add(
+            ast.PropertyAssignment, items, [self._symbol(items[0])], [items[1]]
+        )
+
+    def property_or_entity_reference(self, items: list[Any]) -> int:
+        """Add a property/entity reference."""
+        return self._add(
+            ast.PropertyOrEntityReference,
+            items,
+            [self._symbol(items[0]), self._symbol(items[1])],
+        )
+
+    def knowledge_statement(self, items: list[Any]) -> int:
+        """Add a knowledge statement."""
+        # Items: [IDENTIFIER, property_or_entity_reference]. The reference
+        # was the last node added, and is only wanted for its names.
+        reference = items[1]
+        owner, entity_name = self.arena.name_ids(reference)
+        span = self._items_span(items)
+        self.arena.pop()
+        return self.arena.add(
+            ast.KnowledgeStatement,
+            [self._symbol(items[0]), owner, entity_name],
+            span=span,
+        )
+
+    def action_declaration(self, items: list[Any]) -> int:
+        """Add an action declaration."""
+        # Items: [IDENTIFIER, IDENTIFIER, parameters?, body]
+        parameters = items[2] if len(items) == 4 else []
+        return self._add(
+            ast.ActionDeclaration,
+            items,
+            [self._symbol(items[0]), self._symbol(items[1])],
+            [*parameters, *items[-1]],
+        )
+
+    def action_param(self, items: list[Any]) -> int:
+        """Add an action parameter."""
+        return self._add(
+            ast.ActionParameter, items, [self._symbol(items[0]), self._symbol(items[1])]
+        )
+
+    def action_execution(self, items: list[Any]) -> int:
+        """Add an action execution."""
+        # Items: [IDENTIFIER, target, IDENTIFIER, arguments?]
+        arguments = items[3] if len(items) == 4 else []
+        return self._add(
+            ast.ActionExecution,
+            items,
+            [self._symbol(items[0]), self._symbol(items[2])],
+            [items[1], *arguments],
+        )
+
+    def STRING(self, token: lark.Token) -> int:  # noqa: N802
+        """Add a string literal."""
+        literal = self.arena.add_literal(str(token))
+        return self.arena.add(ast.StringLiteral, [literal], span=_span([token]))
+
+    def NUMBER(self, token: lark.Token) -> int:  # noqa: N802
+        """Add a number literal."""
+        literal = self.arena.add_literal(str(token))
+        return self.arena.add(ast.NumberLiteral, [literal], span=_span([token]))
+
+
+# Tokens inserted by the postlexer. Lark only runs lexer callbacks for
+# tokens that come from the lexer itself.
+_POSTLEX_TOKEN_TYPES = frozenset({"INDENT", "DEDENT"})
+
+
+def _without_discards(
+    method: Callable[[Any, list[Any]], Any],
+) -> Callable[[Any, list[Any]], Any]:
+    @functools.wraps(method)
+    def wrapper(self: Any, items: list[Any]) -> Any:
+        return method(
+            self,
+            [
+                item
+                for item in items
+                if item is not Discard
+                and not (
+                    isinstance(item, lark.Token) and item.type in _POSTLEX_TOKEN_TYPES
+                )
+            ],
+        )
+
+    return wrapper
+
+
+class InlineDefineTransformer(DefineTransformer):
+    """A DefineTransformer for Lark to run during LALR reductions.
+
+    When a transformer is passed to lark.Lark, Lark calls the token
+    methods as lexer callbacks and the rule methods as each rule is
+    reduced, so no parse tree is built. Lark doesn't drop the Discard
+    returned by token methods in that mode, and doesn't call them at all
+    for INDENT and DEDENT, so the rule methods here filter those out of
+    their children themselves.
+    """
+
+
+class InlineArenaTransformer(ArenaTransformer):
+    """An ArenaTransformer for Lark to run during LALR reductions.
+
+    See InlineDefineTransformer.
+    """
+
+
+def _filter_discards(inline: type, transformer: type) -> None:
+    """Wrap the rule methods of transformer on inline with _without_discards."""
+    for name in dir(transformer):
+        # Rule methods are lowercase; token methods are named after their
+        # (uppercase) terminals.
+        method = getattr(transformer, name)
+        if (
+            name.islower()
+            and not name.startswith("_")
+            and callable(method)
+            and name not in dir(lark.Transformer)
+        ):
+            setattr(inline, name, _without_discards(method))
+
+
+_filter_discards(InlineDefineTransformer, DefineTransformer)
+_filter_discards(InlineArenaTransformer, ArenaTransformer)
@@ -2,6 +2,7 @@ import textwrap
 
 from compiler import ast
 from compiler.parser import Parser
+from compiler.symbols import SymbolTable
 from compiler.transformer import DefineTransformer
 
 # Shared parser instance to avoid rebuilding the Lark parser for each test
@@ -13,10 +14,20 @@ def _strip(text: str) -> str:
 
 
 def _parse_and_transform(source: str) -> ast.Program:
-    """Parse source and transform to AST."""
+    """Parse source and transform to AST.
+
+    This also checks that parsing straight to the AST gives the same
+    result as transforming the parse tree.
+    """
     tree = _parser.parse(source)
     transformer = DefineTransformer()
-    return transformer.transform(tree)
+    program = transformer.transform(tree)
+    fused = _parser.parse_to_ast(source)
+    assert fused == program
+    assert [node.span for node in ast.walk(fused)] == [
+        node.span for node in ast.walk(program)
+    ]
+    return program
 
 
 # Basic Transformations
@@ -416,3 +427,79 @@ def test_nested_structures():
     assert len(action.body) == 1
     exec_stmt = action.body[0]
     assert isinstance(exec_stmt.arguments[0], ast.PropertyOrEntityReference)
+
+
+# Identifier interning
+
+
+def test_identifiers_are_interned_across_statements():
+    source = _strip(
+        """
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Source creates a String named greeting.
+
+        PhysicalUniverse:
+            Machine knows Source's greeting.
+        """
+    )
+    program = _parse_and_transform(source)
+    type_decl, entity = program.get_abstract_universe().statements
+    (knowledge,) = program.get_physical_universe().statements
+    assert isinstance(type_decl, ast.TypeDeclaration)
+    assert isinstance(entity, ast.EntityCreation)
+    assert isinstance(knowledge, ast.KnowledgeStatement)
+    assert type(type_decl.type_name) is str
+    assert type_decl.type_name is entity.creator
+    assert entity.creator is knowledge.owner
+    assert entity.entity_name is knowledge.entity_name
+
+
+def test_shared_symbol_table_interns_across_files():
+    symbols = SymbolTable()
+    first = _parser.parse_to_ast(
+        "AbstractUniverse:\n    Source is a ViewPoint.\n", symbols
+    )
+    second = DefineTransformer(symbols).transform(
+        _parser.parse("AbstractUniverse:\n    Source is a Consideration.\n")
+    )
+    first_decl = first.get_abstract_universe().statements[0]
+    second_decl = second.get_abstract_universe().statements[0]
+    assert isinstance(first_decl, ast.TypeDeclaration)
+    assert isinstance(second_decl, ast.TypeDeclaration)
+    assert first_decl.type_name is second_decl.type_name
+    assert "ViewPoint" in symbols
+    assert "Consideration" in symbols
+
+
+def test_nodes_have_the_spans_of_their_tokens():
+    source = _strip(
+        """
+        AbstractUniverse:
+            Source can Greet using a String named text,
+            a Number named times:
+                Source makes Source's label Print "hi", 2.
+        """
+    )
+    program = _parse_and_transform(source)
+    lines = _parser.parse_to_ast(source).lines
+    assert lines is not None
+
+    def text(node: ast.ASTNode) -> str:
+        start, end = lines.offsets(node.span)
+        return source[start:end]
+
+    (universe,) = program.universes
+    (action,) = universe.statements
+    assert isinstance(action, ast.ActionDeclaration)
+    (execution,) = action.body
+    assert ast.span_start(universe.span) == (1, 1)
+    assert ast.span_start(action.span) == (2, 5)
+    assert ast.span_end(action.span) == (4, 50)
+    assert [text(parameter) for parameter in action.parameters] == [
+        "String named text",
+        "Number named times",
+    ]
+    assert text(execution) == 'Source makes Source\'s label Print "hi", 2'
+    assert text(execution.target) == "Source's label"
+    assert [text(argument) for argument in execution.arguments] == ['"hi"', "2"]
@@ -0,0 +1,431 @@
+"""Checking that a parsed program means something.
+
+The grammar only says how statements are written. This checks what the
+spec says about what's in them: that every name is declared before it's
+used ("Declaration"), that a type's parent exists, that nothing is
+declared twice ("Name Conflicts and Redefinition"), that creators,
+knowers and actors are ViewPoints, that only declared properties are set,
+and that an action execution's target has the action and passes it
+arguments of the right types.
+
+It takes two passes over the statements. The first collects every type
+declaration into a TypeHierarchy, which numbers the types so that asking
+whether one is a subtype of another is a couple of comparisons. The second
+checks each statement in order, with the properties and actions declared
+so far in dicts keyed by type and name. Finding a member a type inherits
+walks up its parents, so a check costs the depth of the hierarchy at
+most, and validation is linear in the size of the program.
+"""
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from compiler import ast
+
+# What core.def declares, which every program has without declaring it
+# (see "Basic Types" and "Compiler Types" in the spec). A program may
+# declare these again, as core.def does, but not differently.
+PRELUDE: tuple[ast.ASTNode, ...] = (
+    ast.CompilerTypeDeclaration("Consideration"),
+    ast.TypeDeclaration("ViewPoint", "Consideration"),
+    ast.TypeDeclaration("DimensionPoint", "Consideration"),
+    ast.PropertyDeclaration("DimensionPoint", "ViewPoint", "owner"),
+    ast.CompilerTypeDeclaration("Number"),
+    ast.PropertyDeclaration("Number", "Number", "value"),
+    ast.CompilerTypeDeclaration("String"),
+    ast.PropertyDeclaration("String", "String", "value"),
+)
+
+_VIEW_POINT = "ViewPoint"
+# The types of literals, when the compiler needs to know them.
+_LITERAL_TYPES = {ast.StringLiteral: "String", ast.NumberLiteral: "Number"}
+
+
+@dataclass(frozen=True)
+class SemanticError:
+    """A statement that breaks a rule of the spec."""
+
+    message: str
+    # The span of the node the problem is in (see ast.make_span).
+    span: int = ast.NO_SPAN
+
+    def __str__(self) -> str:
+        """Return the message, after the position if there is one."""
+        if self.span == ast.NO_SPAN:
+            return self.message
+        line, column = ast.span_start(self.span)
+        return f"{line}:{column}: {self.message}"
+
+
+class TypeHierarchy:
+    """The types of a program, and which are subtypes of which.
+
+    Each type is numbered in a preorder walk of the tree its declarations
+    make, and also given the number after its last descendant, so a type
+    is a subtype of another exactly when its number falls in the other's
+    range. A type whose parent isn't declared is the root of a tree of its
+    own, and types in a cycle of parents are in no tree, and are no other
+    type's subtype. Neither kind of type is complete (see is_complete).
+    """
+
+    def __init__(self, parents: dict[str, str | None]) -> None:
+        """Create the hierarchy of some types, numbering them.
+
+        Args:
+            parents: Each type's parent, or None for a compiler type.
+        """
+        self._parents = parents
+        children: dict[str, list[str]] = {}
+        roots = []
+        for name, parent in parents.items():
+            if parent is None or parent not in parents:
+                roots.append(name)
+            else:
+                children.setdefault(parent, []).append(name)
+        self._first: dict[str, int] = {}
+        self._after: dict[str, int] = {}
+        self._complete: set[str] = set()
+        # Numbered with an explicit stack, as hierarchies can be deeper
+        # than Python's recursion limit.
+        count = 0
+        for root in roots:
+            complete = parents[root] is None
+            stack: list[tuple[str, bool]] = [(root, False)]
+            while stack:
+                name, done = stack.pop()
+                if done:
+                    self._after[name] = count
+                    continue
+                self._first[name] = count
+                count += 1
+                if complete:
+                    self._complete.add(name)
+                stack.append((name, True))
+                stack.extend((child, False) for child in children.get(name, ()))
+
+    def __contains__(self, name: object) -> bool:
+        """Return whether name is a type in the hierarchy."""
+        return name in self._parents
+
+    def __iter__(self) -> Iterator[str]:
+        """Return the name of every type in the hierarchy."""
+        return iter(self._parents)
+
+    def parent(self, name: str) -> str | None:
+        """Return a type's parent, or None if it has none."""
+        return self._parents.get(name)
+
+    def ancestors(self, name: str) -> Iterator[str]:
+        """Return a type, then its parent, and so on up to its root."""
+        seen = set()
+        current: str | None = name
+        while current is not None and current in self._parents:
+            if current in seen:
+                return
+            seen.add(current)
+            yield current
+            current = self._parents[current]
+
+    def is_complete(self, name: str) -> bool:
+        """Return whether a type's ancestors are all declared.
+
+        The first one that isn't is the root of every complete type's
+        ancestors: a compiler type.
+        """
+        return name in self._complete
+
+    def is_subtype(self, name: str, ancestor: str) -> bool:
+        """Return whether a type is ancestor or one of its subtypes."""
+        first = self._first.get(name)
+        ancestor_first = self._first.get(ancestor)
+        if first is None or ancestor_first is None:
+            return False
+        return ancestor_first <= first < self._after[ancestor]
+
+
+def _type_declarations(statements: Iterable[ast.ASTNode]) -> dict[str, str | None]:
+    parents: dict[str, str | None] = {}
+    for statement in statements:
+        if isinstance(statement, ast.TypeDeclaration):
+            parents.setdefault(statement.type_name, statement.parent_type)
+        elif isinstance(statement, ast.CompilerTypeDeclaration):
+            parents.setdefault(statement.type_name, None)
+    return parents
+
+
+class _Validator:
+    """One validation of a program."""
+
+    def __init__(self, hierarchy: TypeHierarchy) -> None:
+        self.hierarchy = hierarchy
+        self.errors: list[SemanticError] = []
+        self.types: set[str] = set()
+        # Each entity, with the statement that created it. ViewPoint types
+        # are entities too, but they're only referred to as types.
+        self.entities: dict[str, ast.EntityCreation] = {}
+        self.properties: dict[tuple[str, str], ast.PropertyDeclaration] = {}
+        self.actions: dict[tuple[str, str], ast.ActionDeclaration] = {}
+        for statement in PRELUDE:
+            if isinstance(statement, ast.BaseTypeDeclaration):
+                self.types.add(statement.type_name)
+            elif isinstance(statement, ast.PropertyDeclaration):
+                key = (statement.type_name, statement.property_name)
+                self.properties[key] = statement
+
+    def _error(self, message: str, node: ast.ASTNode) -> None:
+        self.errors.append(SemanticError(message, node.span))
+
+    def _known_type(self, name: str, node: ast.ASTNode) -> bool:
+        if name in self.types:
+            return True
+        self._error(f"Unknown type: {name}", node)
+        return False
+
+    def _view_point(self, name: str, role: str, node: ast.ASTNode) -> None:
+        if not self._known_type(name, node):
+            return
+        # An incomplete type's missing ancestor is reported where it's
+        # used, and what it would have made the type can't be known.
+        if self.hierarchy.is_complete(name) and not self.hierarchy.is_subtype(
+            name, _VIEW_POINT
+        ):
+            self._error(f"{role} {name} isn't a ViewPoint", node)
+
+    def _new_name(self, name: str, node: ast.ASTNode) -> bool:
+        if name in self.types or name in self.entities:
+            self._error(f"{name} is already declared", node)
+            return False
+        return True
+
+    def _property(self, type_name: str, name: str) -> ast.PropertyDeclaration | None:
+        for owner in self.hierarchy.ancestors(type_name):
+            declaration = self.properties.get((owner, name))
+            if declaration is not None:
+                return declaration
+        return None
+
+    def _action(self, type_name: str, name: str) -> ast.ActionDeclaration | None:
+        for owner in self.hierarchy.ancestors(type_name):
+            declaration = self.actions.get((owner, name))
+            if declaration is not None:
+                return declaration
+        return None
+
+    def _conforms(self, value_type: str | None, expected: str) -> bool:
+        # A value in error, or of an incomplete type, has been reported.
+        return (
+            value_type is None
+            or not self.hierarchy.is_complete(value_type)
+            or self.hierarchy.is_subtype(value_type, expected)
+        )
+
+    def _value_type(
+        self,
+        value: ast.ValueReference,
+        parameters: dict[tuple[str, str], str],
+    ) -> str | None:
+        """Return the type of a value, or None if it's in error.
+
+        Args:
+            value: The value.
+            parameters: The type of each parameter in scope, keyed by the
+                type declaring the action and the parameter's name.
+        """
+        literal_type = _LITERAL_TYPES.get(type(value))
+        if literal_type is not None:
+            return literal_type
+        if not isinstance(value, ast.PropertyOrEntityReference):
+            self._error(f"Can't check a {type(value).__name__}", value)
+            return None
+        owner, name = value.owner, value.property_name
+        parameter = parameters.get((owner, name))
+        if parameter is not None:
+            return parameter
+        entity = self.entities.get(name)
+        if entity is not None and entity.creator == owner:
+            return entity.type_name
+        # The owner is a type, whose property this is, or an entity,
+        # whose type has the property.
+        if owner in self.types:
+            owner_type = owner
+        elif owner in self.entities:
+            owner_type = self.entities[owner].type_name
+        else:
+            self._error(f"Unknown type or entity: {owner}", value)
+            return None
+        declaration = self._property(owner_type, name)
+        if declaration is None:
+            if self.hierarchy.is_complete(owner_type):
+                self._error(f"{owner} has no property or entity named {name}", value)
+            return None
+        return declaration.property_type
+
+    def _execution(
+        self,
+        execution: ast.ActionExecution,
+        parameters: dict[tuple[str, str], str],
+    ) -> None:
+        self._view_point(execution.actor, "Actor", execution)
+        target_type = self._value_type(execution.target, parameters)
+        argument_types = [
+            self._value_type(argument, parameters) for argument in execution.arguments
+        ]
+        if target_type is None:
+            return
+        action = self._action(target_type, execution.action_name)
+        if action is None:
+            if not self.hierarchy.is_complete(target_type):
+                return
+            self._error(
+                f"{target_type} has no action named {execution.action_name}",
+                execution,
+            )
+            return
+        if len(argument_types) != len(action.parameters):
+            self._error(
+                f"{action.type_name}'s {action.action_name} takes "
+                f"{len(action.parameters)} arguments, not {len(argument_types)}",
+                execution,
+            )
+            return
+        for argument, argument_type, parameter in zip(
+            execution.arguments, argument_types, action.parameters, strict=True
+        ):
+            if not self._conforms(argument_type, parameter.param_type):
+                self._error(
+                    f"{parameter.param_name} must be a {parameter.param_type}, "
+                    f"not a {argument_type}",
+                    argument,
+                )
+
+    def statement(self, statement: ast.ASTNode) -> None:
+        """Check a statement against what's declared before it."""
+        match statement:
+            case ast.CompilerTypeDeclaration():
+                if statement in PRELUDE:
+                    return
+                if self._new_name(statement.type_name, statement):
+                    self._error(
+                        f"Compiler types are only for the implementation of "
+                        f"Define: {statement.type_name}",
+                        statement,
+                    )
+                self.types.add(statement.type_name)
+            case ast.TypeDeclaration():
+                if statement in PRELUDE:
+                    return
+                self._known_type(statement.parent_type, statement)
+                self._new_name(statement.type_name, statement)
+                self.types.add(statement.type_name)
+            case ast.PropertyDeclaration():
+                if statement in PRELUDE:
+                    return
+                self._known_type(statement.type_name, statement)
+                self._known_type(statement.property_type, statement)
+                key = (statement.type_name, statement.property_name)
+                if key in self.properties:
+                    self._error(
+                        f"{statement.type_name} already has a property named "
+                        f"{statement.property_name}",
+                        statement,
+                    )
+                else:
+                    self.properties[key] = statement
+            case ast.EntityCreation():
+                self._view_point(statement.creator, "Creator", statement)
+                known = self._known_type(statement.type_name, statement)
+                for assignment in statement.properties:
+                    value_type = self._value_type(assignment.value, {})
+                    if not known:
+                        continue
+                    declaration = self._property(statement.type_name, assignment.name)
+                    if declaration is None:
+                        if not self.hierarchy.is_complete(statement.type_name):
+                            continue
+                        self._error(
+                            f"{statement.type_name} has no property named "
+                            f"{assignment.name}",
+                            assignment,
+                        )
+                    elif not self._conforms(value_type, declaration.property_type):
+                        self._error(
+                            f"{assignment.name} must be a "
+                            f"{declaration.property_type}, not a {value_type}",
+                            assignment,
+                        )
+                if self._new_name(statement.entity_name, statement):
+                    self.entities[statement.entity_name] = statement
+            case ast.KnowledgeStatement():
+                self._view_point(statement.knower, "Knower", statement)
+                self._view_point(statement.owner, "Owner", statement)
+                if statement.knower == statement.owner:
+                    self._error(
+                        f"{statement.knower} can't know its own entity", statement
+                    )
+                entity = self.entities.get(statement.entity_name)
+                if entity is None or entity.creator != statement.owner:
+                    self._error(
+                        f"{statement.owner} has no entity named "
+                        f"{statement.entity_name}",
+                        statement,
+                    )
+            case ast.ActionDeclaration():
+                self._known_type(statement.type_name, statement)
+                parameters: dict[tuple[str, str], str] = {}
+                for parameter in statement.parameters:
+                    self._known_type(parameter.param_type, parameter)
+                    key = (statement.type_name, parameter.param_name)
+                    if key in parameters:
+                        self._error(
+                            f"Parameter {parameter.param_name} is already declared",
+                            parameter,
+                        )
+                    parameters[key] = parameter.param_type
+                key = (statement.type_name, statement.action_name)
+                if key in self.actions:
+                    self._error(
+                        f"{statement.type_name} already has an action named "
+                        f"{statement.action_name}",
+                        statement,
+                    )
+                else:
+                    # Declared before its body, so the body can run it.
+                    self.actions[key] = statement
+                for execution in statement.body:
+                    self._execution(execution, parameters)
+            case ast.ActionExecution():
+                self._execution(statement, {})
+            case _:
+                self._error(f"Can't check a {type(statement).__name__}", statement)
+
+
+def _statements(programs: Iterable[ast.Program]) -> Iterator[ast.ASTNode]:
+    for program in programs:
+        for universe in program.universes:
+            yield from universe.statements
+
+
+def validate(
+    program: ast.Program, dependencies: Iterable[ast.Program] = ()
+) -> list[SemanticError]:
+    """Check a program against the rules of the spec.
+
+    Args:
+        program: The program to check.
+        dependencies: Programs whose declarations it uses, such as the
+            files it loads (see compiler.loader), dependencies first.
+            Their statements are checked too, but only the program's own
+            errors are returned.
+
+    Returns:
+        The errors in the program, in source order.
+    """
+    dependencies = list(dependencies)
+    statements = [*PRELUDE, *_statements(dependencies), *_statements([program])]
+    validator = _Validator(TypeHierarchy(_type_declarations(statements)))
+    for statement in _statements(dependencies):
+        validator.statement(statement)
+    validator.errors.clear()
+    for statement in _statements([program]):
+        validator.statement(statement)
+    return validator.errors
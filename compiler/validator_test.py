@@ -0,0 +1,239 @@
+import textwrap
+from pathlib import Path
+
+from compiler import ast, validator
+from compiler.parser import Parser
+from compiler.validator import TypeHierarchy
+
+_parser = Parser()
+
+_EXAMPLES = Path(__file__).parent.parent / "examples"
+
+
+def _errors(source: str) -> list[str]:
+    program = _parser.parse_to_ast(textwrap.dedent(source))
+    return [str(error) for error in validator.validate(program)]
+
+
+def test_hello_world():
+    computer = _parser.parse_to_ast((_EXAMPLES / "computer.def").read_text())
+    hello_world = _parser.parse_to_ast((_EXAMPLES / "helloworld.def").read_text())
+
+    assert validator.validate(computer) == []
+    assert validator.validate(hello_world, [computer]) == []
+    # Only the missing type is reported, not what it would have made
+    # Machine able to do.
+    assert [str(error) for error in validator.validate(hello_world)] == [
+        "7:5: Unknown type: Computer"
+    ]
+
+
+def test_valid_program():
+    source = """\
+        AbstractUniverse:
+            String is.
+            Source is a ViewPoint.
+            Shape is a DimensionPoint.
+            Shape has a Number named size.
+            Shape can Grow using a Shape named other, a Number named by:
+                Source makes Shape's other Grow Shape's other, Shape's by.
+            Circle is a Shape.
+            Source creates a Circle named ball:
+                size: 2
+            Other is a ViewPoint.
+            Other knows Source's ball.
+            Source makes Source's ball Grow Source's ball, ball's size.
+        """
+
+    assert _errors(source) == []
+
+
+def test_names_must_be_declared_before_use():
+    source = """\
+        AbstractUniverse:
+            Circle is a Shape.
+            Shape is a DimensionPoint.
+            Shape has a Colour named colour.
+            Source creates a Shape named ball.
+            Source is a ViewPoint.
+        """
+
+    assert _errors(source) == [
+        "2:5: Unknown type: Shape",
+        "4:5: Unknown type: Colour",
+        "5:5: Unknown type: Source",
+    ]
+
+
+def test_names_can_only_be_declared_once():
+    source = """\
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Source is a DimensionPoint.
+            Source creates a String named ball.
+            Source creates a Number named ball.
+            Source creates a String named Source.
+            ViewPoint is a DimensionPoint.
+        """
+
+    assert _errors(source) == [
+        "3:5: Source is already declared",
+        "5:5: ball is already declared",
+        "6:5: Source is already declared",
+        "7:5: ViewPoint is already declared",
+    ]
+
+
+def test_compiler_types():
+    source = """\
+        AbstractUniverse:
+            Number is.
+            Number has a Number named value.
+            Colour is.
+            Number has a String named value.
+        """
+
+    assert _errors(source) == [
+        "4:5: Compiler types are only for the implementation of Define: Colour",
+        "5:5: Number already has a property named value",
+    ]
+
+
+def test_properties():
+    source = """\
+        AbstractUniverse:
+            Shape is a DimensionPoint.
+            Shape has a Number named size.
+            Shape has a String named size.
+            Source is a ViewPoint.
+            Source creates a Shape named ball:
+                size: "big"
+                colour: "red"
+            Source creates a String named label:
+                value: Source's ball
+        """
+
+    assert _errors(source) == [
+        "4:5: Shape already has a property named size",
+        "7:9: size must be a Number, not a String",
+        "8:9: Shape has no property named colour",
+        "10:9: value must be a String, not a Shape",
+    ]
+
+
+def test_view_points():
+    source = """\
+        AbstractUniverse:
+            Shape is a DimensionPoint.
+            Source is a ViewPoint.
+            Other is a ViewPoint.
+            Shape creates a String named label.
+            Source creates a String named greeting.
+            Shape knows Source's greeting.
+            Source knows Source's greeting.
+            Other knows Source's missing.
+            Shape makes Source's greeting Print 1.
+        """
+
+    assert _errors(source) == [
+        "5:5: Creator Shape isn't a ViewPoint",
+        "7:5: Knower Shape isn't a ViewPoint",
+        "8:5: Source can't know its own entity",
+        "9:5: Source has no entity named missing",
+        "10:5: Actor Shape isn't a ViewPoint",
+        "10:5: String has no action named Print",
+    ]
+
+
+def test_action_executions():
+    source = """\
+        AbstractUniverse:
+            Source is a ViewPoint.
+            Shape is a DimensionPoint.
+            Shape can Move using a Number named x, a Number named y:
+                Source makes Shape's z Move 1, 2.
+            Source creates a Shape named ball.
+            Source makes Source's ball Move 1.
+            Source makes Source's ball Move 1, "2".
+            Source makes Source's ball Jump 1.
+            Source makes Source's missing Move 1, 2.
+            Source makes Other's ball Move 1, 2.
+        """
+
+    assert _errors(source) == [
+        "5:22: Shape has no property or entity named z",
+        "7:5: Shape's Move takes 2 arguments, not 1",
+        "8:40: y must be a Number, not a String",
+        "9:5: Shape has no action named Jump",
+        "10:18: Source has no property or entity named missing",
+        "11:18: Unknown type or entity: Other",
+    ]
+
+
+def test_members_are_inherited():
+    source = """\
+        AbstractUniverse:
+            Shape is a DimensionPoint.
+            Shape has a Number named size.
+            Shape can Grow using a Shape named other:
+                Source makes Shape's other Grow Shape's other.
+            Circle is a Shape.
+            Source is a ViewPoint.
+            Source creates a Circle named ball:
+                size: 1
+            Source makes Source's ball Grow Source's ball.
+        """
+
+    # The action body refers to Source before it's declared.
+    assert _errors(source) == ["5:9: Unknown type: Source"]
+
+
+def test_type_hierarchy():
+    hierarchy = TypeHierarchy(
+        {
+            "Consideration": None,
+            "ViewPoint": "Consideration",
+            "Source": "ViewPoint",
+            "Shape": "Consideration",
+            "Orphan": "Missing",
+            "Child": "Orphan",
+            "A": "B",
+            "B": "A",
+        }
+    )
+
+    assert hierarchy.is_subtype("Source", "Consideration")
+    assert hierarchy.is_subtype("Source", "Source")
+    assert not hierarchy.is_subtype("Source", "Shape")
+    assert not hierarchy.is_subtype("Consideration", "Source")
+    assert not hierarchy.is_subtype("Missing", "Missing")
+    assert hierarchy.is_subtype("Child", "Orphan")
+    assert not hierarchy.is_subtype("A", "B")
+    assert hierarchy.is_complete("Source")
+    assert not hierarchy.is_complete("Child")
+    assert not hierarchy.is_complete("A")
+    assert list(hierarchy.ancestors("Source")) == [
+        "Source",
+        "ViewPoint",
+        "Consideration",
+    ]
+    assert list(hierarchy.ancestors("A")) == ["A", "B"]
+    assert len(list(hierarchy)) == 8
+
+
+def test_deep_type_hierarchy():
+    depth = 100_000
+    parents: dict[str, str | None] = {"T0": None}
+    parents.update({f"T{i}": f"T{i - 1}" for i in range(1, depth)})
+
+    hierarchy = TypeHierarchy(parents)
+
+    assert hierarchy.is_subtype(f"T{depth - 1}", "T0")
+    assert not hierarchy.is_subtype("T0", "T1")
+
+
+def test_error_without_a_span():
+    error = validator.SemanticError("Unknown type: Foo")
+
+    assert str(error) == "Unknown type: Foo"
+    assert validator.SemanticError("x", ast.make_span((2, 3), (2, 5))).span
@@ -0,0 +1,267 @@
+"""Watching a project for edits and checking what they affect.
+
+On Linux, edits are noticed with inotify, called through ctypes. Elsewhere,
+or if inotify isn't available, the project is polled. A burst of edits
+(like an editor saving several files, or a checkout) is debounced into one
+update, and only the files the edits affect are checked again.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Protocol
+
+from compiler import project
+from compiler.workspace import Diagnostic, Workspace
+
+# How long the project has to be quiet before a burst of edits is checked.
+DEFAULT_DEBOUNCE_SECONDS = 0.02
+
+DEFAULT_POLL_INTERVAL_SECONDS = 0.5
+
+# From <sys/inotify.h>.
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+# struct inotify_event, without the name that follows it.
+_EVENT = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    """Reports the files in a project that change."""
+
+    def changes(self, timeout: float | None) -> set[Path]:
+        """Wait for files to change.
+
+        Args:
+            timeout: How long to wait, in seconds, or None to wait until
+                something changes.
+
+        Returns:
+            The .def files that were created, changed or removed, and the
+            directories that were removed (so every file that was in them
+            was too), relative to the project root. Empty if nothing
+            changed before timeout.
+        """
+        ...
+
+    def close(self) -> None:
+        """Stop watching."""
+        ...
+
+
+class InotifyWatcher:
+    """Watches a project with Linux's inotify."""
+
+    def __init__(self, root: Path) -> None:
+        """Start watching every directory under root.
+
+        Raises:
+            OSError: If inotify isn't available.
+        """
+        self.root = root
+        try:
+            self._libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            init = self._libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError("inotify is not available") from e
+        self._fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # The directory each watch descriptor is for, relative to root.
+        self._directories: dict[int, Path] = {}
+        self._watch_tree(Path())
+
+    def _watch_tree(self, directory: Path) -> set[Path]:
+        """Watch a directory and those under it.
+
+        Returns:
+            The .def files already in them.
+        """
+        found: set[Path] = set()
+        for current, subdirectories, files in os.walk(self.root / directory):
+            relative = Path(current).relative_to(self.root)
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(current), _WATCH_MASK | _IN_ONLYDIR
+            )
+            if wd < 0:
+                # Removed since it was listed.
+                subdirectories.clear()
+                continue
+            self._directories[wd] = relative
+            found.update(
+                relative / name for name in files if name.endswith(project.DEF_SUFFIX)
+            )
+        return found
+
+    def changes(self, timeout: float | None) -> set[Path]:
+        """Wait for files to change. See Watcher.changes."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                changed.update(self._handle_event(wd, mask, name))
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> set[Path]:
+        if mask & _IN_Q_OVERFLOW:
+            # Events were lost, so anything may have changed.
+            return {Path(), *project.discover_files(self.root)}
+        if mask & _IN_IGNORED:
+            self._directories.pop(wd, None)
+            return set()
+        directory = self._directories.get(wd)
+        if directory is None:
+            return set()
+        path = directory / name
+        if mask & _IN_ISDIR:
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                return self._watch_tree(path)
+            # The directory was removed or moved away. If it was moved
+            # within the project, its watches come back with its new path
+            # when it's moved to.
+            for watched, watched_directory in list(self._directories.items()):
+                if watched_directory == path or path in watched_directory.parents:
+                    self._libc.inotify_rm_watch(self._fd, watched)
+                    del self._directories[watched]
+            return {path}
+        if path.suffix == project.DEF_SUFFIX:
+            return {path}
+        return set()
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watches a project by checking the modification time of every file."""
+
+    def __init__(
+        self, root: Path, interval: float = DEFAULT_POLL_INTERVAL_SECONDS
+    ) -> None:
+        """Start watching.
+
+        Args:
+            root: The project root.
+            interval: How often to check, in seconds.
+        """
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in project.discover_files(self.root):
+            try:
+                stat = (self.root / path).stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float | None) -> set[Path]:
+        """Wait for files to change. See Watcher.changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._take_snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def open_watcher(root: Path) -> Watcher:
+    """Watch a project with inotify if possible, and by polling if not."""
+    try:
+        return InotifyWatcher(root)
+    except OSError:
+        return PollingWatcher(root)
+
+
+def _expand_directories(workspace: Workspace, changed: set[Path]) -> set[Path]:
+    """Replace the directories in changed with the known files under them."""
+    files = {path for path in changed if path.suffix == project.DEF_SUFFIX}
+    directories = changed - files
+    if directories:
+        files.update(
+            known
+            for known in workspace.files
+            if any(directory in known.parents for directory in directories)
+        )
+    return files
+
+
+def watch(
+    workspace: Workspace,
+    report: Callable[[set[Path], dict[Path, list[Diagnostic]]], None],
+    *,
+    watcher: Watcher | None = None,
+    debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+    stop: threading.Event | None = None,
+) -> None:
+    """Check the files that edits affect, until stopped.
+
+    Args:
+        workspace: The project. It should already have been scanned.
+        report: Called after each burst of edits, with the files whose
+            diagnostics may have changed (including removed files) and the
+            diagnostics of those that have any.
+        watcher: What to watch the project with. Defaults to open_watcher.
+        debounce: How long the project has to be quiet, in seconds, before
+            a burst of edits is checked.
+        stop: Set to stop watching. Checked at least every half second.
+    """
+    if watcher is None:
+        watcher = open_watcher(workspace.root)
+    stop = stop or threading.Event()
+    try:
+        while not stop.is_set():
+            changed = watcher.changes(timeout=0.5)
+            if not changed:
+                continue
+            while more := watcher.changes(timeout=debounce):
+                changed |= more
+            affected = workspace.update(_expand_directories(workspace, changed))
+            if affected:
+                report(affected, workspace.check(affected))
+    finally:
+        watcher.close()
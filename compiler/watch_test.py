@@ -0,0 +1,111 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from compiler import watch
+from compiler.workspace import Diagnostic, Workspace
+
+
+def _inotify_watcher(root: Path) -> watch.InotifyWatcher:
+    try:
+        return watch.InotifyWatcher(root)
+    except OSError:
+        pytest.skip("inotify is not available")
+
+
+def _changes(watcher: watch.Watcher) -> set[Path]:
+    changed = watcher.changes(timeout=5)
+    while more := watcher.changes(timeout=0.05):
+        changed |= more
+    return changed
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def make_watcher(request: pytest.FixtureRequest):
+    if request.param == "inotify":
+        return _inotify_watcher
+    return lambda root: watch.PollingWatcher(root, interval=0.01)
+
+
+def test_watcher_reports_changes(tmp_path: Path, make_watcher):
+    (tmp_path / "a.def").write_text("one")
+    (tmp_path / "notes.txt").write_text("")
+    watcher = make_watcher(tmp_path)
+    try:
+        assert watcher.changes(timeout=0.05) == set()
+
+        (tmp_path / "a.def").write_text("two, longer")
+        (tmp_path / "notes.txt").write_text("ignored")
+        assert _changes(watcher) == {Path("a.def")}
+
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.def").write_text("new")
+        assert Path("sub/b.def") in _changes(watcher)
+
+        (tmp_path / "a.def").unlink()
+        assert _changes(watcher) == {Path("a.def")}
+    finally:
+        watcher.close()
+
+
+def test_inotify_reports_removed_directories(tmp_path: Path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.def").write_text("")
+    watcher = _inotify_watcher(tmp_path)
+    try:
+        os.rename(tmp_path / "sub", tmp_path / "moved")
+        assert _changes(watcher) == {Path("sub"), Path("moved/b.def")}
+        (tmp_path / "moved" / "c.def").write_text("")
+        assert _changes(watcher) == {Path("moved/c.def")}
+    finally:
+        watcher.close()
+
+
+class _FakeWatcher:
+    def __init__(self, batches: list[set[Path]], stop: threading.Event) -> None:
+        self.batches = batches
+        self.stop = stop
+        self.closed = False
+
+    def changes(self, timeout: float | None) -> set[Path]:  # noqa: ARG002
+        if not self.batches:
+            self.stop.set()
+            return set()
+        return self.batches.pop(0)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_watch_debounces_and_checks_affected_files(tmp_path: Path):
+    (tmp_path / "A.def").write_text("AbstractUniverse:\n    A is a B.\n")
+    (tmp_path / "B.def").write_text("AbstractUniverse:\n    B is a ViewPoint.\n")
+    (tmp_path / "C.def").write_text("AbstractUniverse:\n    C is a ViewPoint.\n")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+    (tmp_path / "B.def").write_text("AbstractUniverse:\n    Other is a ViewPoint.\n")
+    (tmp_path / "sub").mkdir()
+    stop = threading.Event()
+    # Two bursts, with nothing in between them; the second one is only
+    # a removed directory that no known file was in.
+    watcher = _FakeWatcher(
+        [{Path("B.def")}, {Path("B.def")}, set(), {Path("sub")}], stop
+    )
+    reports: list[tuple[set[Path], dict[Path, list[Diagnostic]]]] = []
+
+    watch.watch(
+        workspace,
+        lambda affected, diagnostics: reports.append((affected, diagnostics)),
+        watcher=watcher,
+        stop=stop,
+    )
+
+    assert reports == [
+        (
+            {Path("A.def"), Path("B.def")},
+            {Path("A.def"): [Diagnostic("Unknown type name: B", 2, 5)]},
+        )
+    ]
+    assert watcher.closed
@@ -0,0 +1,454 @@
+"""An in-memory store of a project's ASTs, kept up to date file by file.
+
+Long-running tools (the compile server, watch mode and the language
+server) keep one Workspace. It holds the AST of every file along with
+the global-name dependency graph, and only reparses a file when its
+contents change.
+"""
+
+import hashlib
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import lark
+
+from compiler import ast, prelex, project, references
+from compiler.dependencies import DependencyGraph
+from compiler.parser import Parser
+from compiler.symbols import SymbolTable
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """A problem found in a file."""
+
+    message: str
+    # 1-based, if the problem has a position.
+    line: int | None = None
+    column: int | None = None
+    # The name the problem is about, if there is one, and the node that
+    # names it, for tools that need to point at it in the file.
+    name: str | None = field(default=None, compare=False)
+    node: ast.ASTNode | None = field(default=None, compare=False, repr=False)
+
+    def __str__(self) -> str:
+        """Return the message, after the position if there is one."""
+        if self.line is None:
+            return self.message
+        return f"{self.line}:{self.column}: {self.message}"
+
+
+def _start(node: ast.ASTNode | None) -> tuple[int | None, int | None]:
+    """Return the line and column a node starts at, if it has a span."""
+    if node is None or node.span == ast.NO_SPAN:
+        return None, None
+    return ast.span_start(node.span)
+
+
+def _declaration(program: ast.Program, name: str) -> ast.ASTNode | None:
+    """Return the first statement in a program that declares a type."""
+    return next(
+        (
+            stmt
+            for universe in program.universes
+            for stmt in universe.get_declarations_by_type_name(name)
+            if isinstance(stmt, ast.BaseTypeDeclaration)
+        ),
+        None,
+    )
+
+
+@dataclass
+class WorkspaceFile:
+    """What a Workspace knows about one file."""
+
+    path: Path
+    # The SHA-256 of the file's contents.
+    digest: bytes
+    # The AST, or None if the file didn't parse.
+    program: ast.Program | None
+    # Why the file didn't parse, if it didn't.
+    parse_errors: tuple[Diagnostic, ...] = ()
+    # Whether parse_errors only has the file's first syntax error, because
+    # the rest haven't been looked for yet (see set_recovered).
+    first_error_only: bool = False
+    defined: frozenset[str] = frozenset()
+    referenced: frozenset[str] = frozenset()
+    created: frozenset[str] = frozenset()
+    # The modification time and size of the file on disk when it was read,
+    # or None if its contents came from somewhere else.
+    mtime_ns: int | None = None
+    size: int | None = None
+
+
+def _parse_errors(e: Exception) -> tuple[Diagnostic, ...]:
+    if isinstance(e, prelex.InvalidSourceError):
+        # Every violation is reported, so they can all be fixed at once.
+        return tuple(
+            Diagnostic(violation.message, violation.line, violation.column)
+            for violation in e.violations
+        )
+    if isinstance(e, lark.exceptions.UnexpectedInput):
+        return (Diagnostic(project.error_message(e), e.line, e.column),)
+    return (Diagnostic(project.error_message(e)),)
+
+
+def _recovered_errors(errors: Iterable[Exception]) -> tuple[Diagnostic, ...]:
+    return tuple(diagnostic for error in errors for diagnostic in _parse_errors(error))
+
+
+class Workspace:
+    """The files of one project, parsed and indexed."""
+
+    def __init__(self, root: Path, *, parser: Parser | None = None) -> None:
+        """Create an empty workspace. Call scan to read the project.
+
+        Args:
+            root: The project root.
+            parser: The parser to use. A new one is made if not given.
+        """
+        self.root = root
+        self.parser = parser or Parser()
+        self.symbols = SymbolTable()
+        self.files: dict[Path, WorkspaceFile] = {}
+        # The dependencies between the names declared in the files.
+        self.graph = DependencyGraph()
+        # The files that declare each name, the files that refer to it,
+        # and the files that create an entity with it.
+        self._declaring: dict[str, set[Path]] = {}
+        self._referring: dict[str, set[Path]] = {}
+        self._creating: dict[str, set[Path]] = {}
+
+    def scan(self) -> set[Path]:
+        """Bring every file under the root up to date.
+
+        Returns:
+            The files whose diagnostics may have changed (see update).
+        """
+        return self.update(set(project.discover_files(self.root)) | self.files.keys())
+
+    def update(self, paths: Iterable[Path]) -> set[Path]:
+        """Bring files up to date with the disk.
+
+        Returns:
+            The files whose diagnostics may have changed: the files that
+            changed, the files that refer to a name whose declarations
+            changed, and the files that declare a name on a cycle that was
+            made or broken. Files that were removed are included.
+        """
+        return self._apply(self.refresh, paths)
+
+    def update_source(self, path: Path, source: str) -> set[Path]:
+        """Set a file's contents from somewhere other than the disk.
+
+        See set_source and update.
+        """
+        return self._apply(lambda path: self.set_source(path, source), [path])
+
+    def update_parsed(
+        self, path: Path, source: str, parsed: ast.Program | Exception
+    ) -> set[Path]:
+        """Set a file's contents and AST, parsed somewhere else.
+
+        This is for tools that parse files themselves, like the language
+        server, which parses open files incrementally. If parsed is a
+        syntax error, it's the only one the file has until set_recovered
+        is given the rest, since looking for them means parsing the whole
+        file again.
+
+        Args:
+            path: The file, relative to the root.
+            source: The file's contents.
+            parsed: The AST of source, or the error parsing it raised.
+
+        Returns:
+            The files whose diagnostics may have changed (see update).
+        """
+
+        def parse() -> ast.Program:
+            if isinstance(parsed, Exception):
+                raise parsed
+            return parsed
+
+        def change(path: Path) -> bool:
+            changed = self._update(path, source.encode("utf-8"), parse, recover=False)
+            self.files[path].mtime_ns = self.files[path].size = None
+            return changed
+
+        return self._apply(change, [path])
+
+    def _cycle_names(self) -> set[str]:
+        return {name for cycle in self.graph.cycles() for name in cycle}
+
+    def _apply(
+        self, change: Callable[[Path], bool], paths: Iterable[Path]
+    ) -> set[Path]:
+        cycle_names = self._cycle_names()
+        changed: set[Path] = set()
+        changed_names: set[str] = set()
+        for path in paths:
+            before = self.files.get(path)
+            if not change(path):
+                continue
+            changed.add(path)
+            after = self.files.get(path)
+            changed_names.update(
+                (before.defined if before else frozenset())
+                ^ (after.defined if after else frozenset())
+            )
+        if not changed:
+            return changed
+        cycle_names.symmetric_difference_update(self._cycle_names())
+        affected = set(changed)
+        for name in changed_names:
+            affected.update(self._referring.get(name, ()))
+        for name in cycle_names:
+            affected.update(self._declaring.get(name, ()))
+        return affected
+
+    def refresh(self, path: Path) -> bool:
+        """Bring one file up to date with the disk.
+
+        A file whose modification time and size haven't changed isn't read.
+        One that has changed is read and hashed, and only parsed again if
+        its contents are different.
+
+        Args:
+            path: The file, relative to the root.
+
+        Returns:
+            Whether the file's contents changed, or it was added or
+            removed.
+        """
+        try:
+            stat = (self.root / path).stat()
+        except FileNotFoundError:
+            return self.remove(path)
+        known = self.files.get(path)
+        if known and (known.mtime_ns, known.size) == (stat.st_mtime_ns, stat.st_size):
+            return False
+        try:
+            data = (self.root / path).read_bytes()
+        except FileNotFoundError:
+            return self.remove(path)
+        changed = self._update(path, data)
+        self.files[path].mtime_ns = stat.st_mtime_ns
+        self.files[path].size = stat.st_size
+        return changed
+
+    def set_source(self, path: Path, source: str) -> bool:
+        """Set a file's contents from somewhere other than the disk.
+
+        This is for contents an editor hasn't saved yet. The next refresh
+        of the file reads it from the disk again.
+
+        Returns:
+            Whether the file's contents changed.
+        """
+        changed = self._update(path, source.encode("utf-8"))
+        self.files[path].mtime_ns = self.files[path].size = None
+        return changed
+
+    def remove(self, path: Path) -> bool:
+        """Forget a file.
+
+        Returns:
+            Whether the file was known.
+        """
+        known = self.files.pop(path, None)
+        if known is None:
+            return False
+        self._unindex(known)
+        self.graph.remove_file(path)
+        return True
+
+    def _update(
+        self,
+        path: Path,
+        data: bytes,
+        parse: Callable[[], ast.Program] | None = None,
+        *,
+        recover: bool = True,
+    ) -> bool:
+        digest = hashlib.sha256(data).digest()
+        known = self.files.get(path)
+        if known is not None and known.digest == digest:
+            return False
+        updated = WorkspaceFile(path, digest, None)
+        try:
+            if parse is None:
+                updated.program = self.parser.parse_to_ast(
+                    prelex.decode(data), self.symbols
+                )
+            else:
+                updated.program = parse()
+        except prelex.InvalidSourceError as e:
+            updated.parse_errors = _parse_errors(e)
+            self.graph.remove_file(path)
+        except lark.exceptions.UnexpectedInput as e:
+            if recover:
+                # Parsing again past the first error finds the rest, so they
+                # can all be fixed at once. Only files with errors pay for it.
+                recovered = self.parser.recover(prelex.decode(data))
+                updated.parse_errors = _recovered_errors(recovered.errors)
+            else:
+                updated.parse_errors = _parse_errors(e)
+                updated.first_error_only = True
+            self.graph.remove_file(path)
+        except lark.exceptions.LarkError as e:
+            updated.parse_errors = _parse_errors(e)
+            self.graph.remove_file(path)
+        else:
+            dependencies = references.name_dependencies(updated.program)
+            updated.defined = frozenset(references.defined_names(updated.program))
+            updated.referenced = frozenset(references.names_in(dependencies))
+            updated.created = frozenset(references.created_names(updated.program))
+            self.graph.set_file(path, dependencies)
+        # Only the names that changed are indexed again, since an edit
+        # usually leaves most of a file's names as they were.
+        before = known or WorkspaceFile(path, b"", None)
+        self._reindex(path, self._declaring, before.defined, updated.defined)
+        self._reindex(path, self._referring, before.referenced, updated.referenced)
+        self._reindex(path, self._creating, before.created, updated.created)
+        self.files[path] = updated
+        return True
+
+    def set_recovered(
+        self, path: Path, source: str, errors: Iterable[Exception]
+    ) -> bool:
+        """Give a file every syntax error it has, once they've been found.
+
+        This finishes what update_parsed started for a file with a syntax
+        error, with the errors from Parser.recover. Since that's slow for a
+        large file, it can be done in the background, and the errors are
+        only kept if the file hasn't changed since.
+
+        Args:
+            path: The file, relative to the root.
+            source: The contents the errors were found in.
+            errors: The errors.
+
+        Returns:
+            Whether the errors were kept. The file's diagnostics only
+            change if they were, and no other file's do.
+        """
+        known = self.files.get(path)
+        if (
+            known is None
+            or not known.first_error_only
+            or known.digest != hashlib.sha256(source.encode("utf-8")).digest()
+        ):
+            return False
+        known.parse_errors = _recovered_errors(errors)
+        known.first_error_only = False
+        return True
+
+    def _unindex(self, known: WorkspaceFile) -> None:
+        self._reindex(known.path, self._declaring, known.defined, frozenset())
+        self._reindex(known.path, self._referring, known.referenced, frozenset())
+        self._reindex(known.path, self._creating, known.created, frozenset())
+
+    @staticmethod
+    def _reindex(
+        path: Path,
+        index: dict[str, set[Path]],
+        before: frozenset[str],
+        after: frozenset[str],
+    ) -> None:
+        for name in before - after:
+            index[name].discard(path)
+            if not index[name]:
+                del index[name]
+        for name in after - before:
+            index.setdefault(name, set()).add(path)
+
+    def declaring_files(self, name: str) -> set[Path]:
+        """Return the files that declare a name."""
+        return set(self._declaring.get(name, ()))
+
+    def referring_files(self, name: str) -> set[Path]:
+        """Return the files that refer to a name, or declare its members."""
+        return set(self._referring.get(name, ()))
+
+    def creating_files(self, name: str) -> set[Path]:
+        """Return the files that create an entity with a name."""
+        return set(self._creating.get(name, ()))
+
+    def dependents(self, paths: Iterable[Path]) -> set[Path]:
+        """Return the files whose diagnostics depend on other files.
+
+        Those are the files that refer to a name the other files declare,
+        and the files that declare a name on a cycle through one of them.
+        """
+        names: set[str] = set()
+        for path in paths:
+            if (known := self.files.get(path)) is not None:
+                names.update(known.defined)
+        found: set[Path] = set()
+        for name in names:
+            found.update(self._referring.get(name, ()))
+        for cycle in self.graph.cycles():
+            if names.intersection(cycle):
+                for name in cycle:
+                    found.update(self._declaring.get(name, ()))
+        return found
+
+    def diagnostics(
+        self, path: Path, cycles: list[list[str]] | None = None
+    ) -> list[Diagnostic]:
+        """Check one file.
+
+        A file that doesn't parse only has its parse errors. Otherwise, it
+        has a diagnostic for each name it refers to that isn't declared in
+        the workspace or built in, and for each cycle through a name it
+        declares.
+
+        Args:
+            path: The file.
+            cycles: The cycles in self.graph, if the caller already has
+                them. Finding them takes time in the size of the whole
+                graph, so callers checking many files find them once.
+        """
+        known = self.files[path]
+        if known.program is None:
+            return list(known.parse_errors)
+        program = known.program
+        diagnostics: list[Diagnostic] = []
+        for name in sorted(known.referenced - references.BUILTIN_TYPES):
+            if name not in self._declaring:
+                node = next(references.mentions(program, name), None)
+                diagnostics.append(
+                    Diagnostic(
+                        f"Unknown type name: {name}",
+                        *_start(node),
+                        name=name,
+                        node=node,
+                    )
+                )
+        if cycles is None:
+            cycles = self.graph.cycles()
+        for cycle in cycles:
+            name = next((name for name in cycle if name in known.defined), None)
+            if name is not None:
+                node = _declaration(program, name)
+                diagnostics.append(
+                    Diagnostic(
+                        f"Circular dependency: {' -> '.join(cycle)}",
+                        *_start(node),
+                        name=name,
+                        node=node,
+                    )
+                )
+        return diagnostics
+
+    def check(self, paths: set[Path] | None = None) -> dict[Path, list[Diagnostic]]:
+        """Check files, by default all of them.
+
+        Returns:
+            The diagnostics for each checked file that has any.
+        """
+        checked = sorted(self.files if paths is None else paths & self.files.keys())
+        cycles = self.graph.cycles()
+        results = {path: self.diagnostics(path, cycles) for path in checked}
+        return {path: found for path, found in results.items() if found}
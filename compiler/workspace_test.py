@@ -0,0 +1,216 @@
+import os
+from pathlib import Path
+
+import lark
+import pytest
+
+from compiler.workspace import Diagnostic, Workspace
+
+
+def _write_type(root: Path, name: str, *dependencies: str) -> Path:
+    lines = [f"    {name} is a ViewPoint.\n"]
+    lines.extend(
+        f"    {name} has a {dep} named {dep.lower()}.\n" for dep in dependencies
+    )
+    (root / f"{name}.def").write_text("AbstractUniverse:\n" + "".join(lines))
+    return Path(f"{name}.def")
+
+
+def test_scan_and_check(tmp_path: Path):
+    _write_type(tmp_path, "A", "B")
+    _write_type(tmp_path, "B", "Missing")
+    (tmp_path / "bad.def").write_text("AbstractUniverse:\n    Foo  is a Bar.\n")
+    workspace = Workspace(tmp_path)
+
+    assert workspace.scan() == {Path("A.def"), Path("B.def"), Path("bad.def")}
+
+    diagnostics = workspace.check()
+    assert diagnostics[Path("B.def")] == [
+        Diagnostic("Unknown type name: Missing", 3, 5)
+    ]
+    (parse_error,) = diagnostics[Path("bad.def")]
+    assert parse_error.message.startswith("UnexpectedToken: ")
+    assert (parse_error.line, parse_error.column) == (2, 9)
+    assert Path("A.def") not in diagnostics
+    assert workspace.declaring_files("A") == {Path("A.def")}
+
+
+def test_every_character_and_whitespace_problem_is_reported(tmp_path: Path):
+    (tmp_path / "bad.def").write_text(
+        "AbstractUniverse: \n\tFoo is a Bar.\n    Baz is a Bar.", newline=""
+    )
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    assert [(d.line, d.column) for d in workspace.check()[Path("bad.def")]] == [
+        (1, 18),
+        (2, 1),
+        (3, 18),
+    ]
+
+
+def test_every_syntax_error_is_reported(tmp_path: Path):
+    (tmp_path / "bad.def").write_text(
+        "AbstractUniverse:\n    Foo  is a Bar.\n    Baz is a Bar.\n    Qux is a Bar\n"
+    )
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    assert [(d.line, d.column) for d in workspace.check()[Path("bad.def")]] == [
+        (2, 9),
+        (4, 17),
+    ]
+
+
+def test_unchanged_files_are_not_reparsed(tmp_path: Path):
+    path = _write_type(tmp_path, "A")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+    program = workspace.files[path].program
+
+    assert workspace.scan() == set()
+    # A new modification time with the same contents is hashed, not parsed.
+    os.utime(tmp_path / path, ns=(1, 1))
+    assert workspace.scan() == set()
+    assert workspace.files[path].program is program
+    assert workspace.files[path].mtime_ns == 1
+
+
+def test_update_reports_affected_files(tmp_path: Path):
+    a = _write_type(tmp_path, "A", "B")
+    b = _write_type(tmp_path, "B")
+    c = _write_type(tmp_path, "C")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    # Changing what B.def declares affects A.def, which refers to B.
+    (tmp_path / b).write_text("AbstractUniverse:\n    Renamed is a ViewPoint.\n")
+    assert workspace.update([b]) == {a, b}
+    assert workspace.check() == {a: [Diagnostic("Unknown type name: B", 3, 5)]}
+
+    # Changing a file without changing what it declares affects only it.
+    _write_type(tmp_path, "C", "String")
+    assert workspace.update([c]) == {c}
+
+    (tmp_path / b).unlink()
+    assert workspace.update([b]) == {b}
+    assert b not in workspace.files
+
+
+def test_cycles(tmp_path: Path):
+    a = _write_type(tmp_path, "A", "B")
+    b = _write_type(tmp_path, "B")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    _write_type(tmp_path, "B", "A")
+    assert workspace.update([b]) == {a, b}
+    assert workspace.check() == {
+        a: [Diagnostic("Circular dependency: B -> A -> B", 2, 5)],
+        b: [Diagnostic("Circular dependency: B -> A -> B", 2, 5)],
+    }
+
+
+def test_check_finds_cycles_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    _write_type(tmp_path, "A", "B")
+    _write_type(tmp_path, "B", "C")
+    _write_type(tmp_path, "C", "A")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+    calls = []
+    cycles = workspace.graph.cycles
+    monkeypatch.setattr(workspace.graph, "cycles", lambda: calls.append(1) or cycles())
+
+    diagnostics = workspace.check()
+
+    assert len(diagnostics) == 3
+    assert len(calls) == 1
+
+
+def test_dependents(tmp_path: Path):
+    a = _write_type(tmp_path, "A", "B")
+    b = _write_type(tmp_path, "B", "C")
+    c = _write_type(tmp_path, "C", "B")
+    d = _write_type(tmp_path, "D")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    assert workspace.dependents([b]) == {a, b, c}
+    # A file refers to the names it declares, so it depends on itself.
+    assert workspace.dependents([a]) == {a}
+    assert workspace.dependents([d, Path("gone.def")]) == {d}
+
+
+def test_name_indexes(tmp_path: Path):
+    a = _write_type(tmp_path, "A")
+    (tmp_path / "B.def").write_text(
+        "AbstractUniverse:\n"
+        "    A has a Number named size.\n"
+        "    A creates a Number named first:\n"
+        "        value: 1\n"
+    )
+    b = Path("B.def")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    assert workspace.declaring_files("A") == {a}
+    assert workspace.referring_files("A") == {a, b}
+    assert workspace.creating_files("first") == {b}
+    assert workspace.creating_files("A") == set()
+
+    workspace.remove(b)
+    assert workspace.creating_files("first") == set()
+
+
+def test_update_source(tmp_path: Path):
+    path = _write_type(tmp_path, "A")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    assert workspace.update_source(path, "AbstractUniverse:\n    A is a Nope.\n")
+    assert workspace.check() == {path: [Diagnostic("Unknown type name: Nope", 2, 5)]}
+    # The disk is read again on the next refresh.
+    assert workspace.update([path]) == {path}
+    assert workspace.check() == {}
+
+
+def test_update_parsed(tmp_path: Path):
+    a = _write_type(tmp_path, "A")
+    b = _write_type(tmp_path, "B", "A")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+
+    source = "AbstractUniverse:\n    Renamed is a ViewPoint.\n"
+    program = workspace.parser.parse_to_ast(source)
+    assert workspace.update_parsed(a, source, program) == {a, b}
+    assert workspace.files[a].program is program
+    (diagnostic,) = workspace.check()[b]
+    assert diagnostic == Diagnostic("Unknown type name: A", 3, 5)
+    assert diagnostic.name == "A"
+
+    source = "AbstractUniverse:\n    A  is a ViewPoint.\n"
+    with pytest.raises(lark.exceptions.UnexpectedInput) as raised:
+        workspace.parser.parse_to_ast(source)
+    assert workspace.update_parsed(a, source, raised.value) == {a}
+    (parse_error,) = workspace.check()[a]
+    assert (parse_error.line, parse_error.column) == (2, 7)
+
+
+def test_set_recovered(tmp_path: Path):
+    path = _write_type(tmp_path, "A")
+    workspace = Workspace(tmp_path)
+    workspace.scan()
+    source = "AbstractUniverse:\n    A  is a ViewPoint.\n    B is a ViewPoint\n"
+    with pytest.raises(lark.exceptions.UnexpectedInput) as raised:
+        workspace.parser.parse_to_ast(source)
+
+    # Only the first error is known until the rest are looked for.
+    workspace.update_parsed(path, source, raised.value)
+    assert len(workspace.check()[path]) == 1
+    assert workspace.files[path].first_error_only
+    errors = workspace.parser.recover(source).errors
+    assert not workspace.set_recovered(path, source + "\n", errors)
+    assert workspace.set_recovered(path, source, errors)
+
+    assert [(d.line, d.column) for d in workspace.check()[path]] == [(2, 7), (3, 21)]
+    assert not workspace.set_recovered(path, source, errors)